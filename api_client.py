@@ -1,27 +1,143 @@
 # api_client.py
 import requests
 import json
-import time
+import threading
 import logging
 import urllib3
+from concurrent.futures import ThreadPoolExecutor
 
-from config import BASE_API_URL, MAIN_SITE_CHECK_URL, MAX_RETRIES, MAX_BACKOFF_DELAY, SESSION
+from config import BASE_API_URL, MAIN_SITE_CHECK_URL, MAX_RETRIES, MAX_BACKOFF_DELAY, SESSION, API_CACHE_TTL_SECONDS, API_REQUEST_IO_MAX_WORKERS
+from rate_governor import SHARED_RATE_GOVERNOR, parse_retry_after
+from response_cache import SHARED_RESPONSE_CACHE
+from pdf_stream import stream_base64_pdf_to_file
+from cancellation import current_token
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = logging.getLogger(__name__) 
 
+REQUEST_CANCELLED_ERROR = "تم إلغاء الطلب."
+ELIGIBILITY_REFUSAL_MESSAGE = "نعتذر منكم! لا يمكنكم حجز موعد للاستفادة من منحة البطالة لعدم استيفائكم لأحد شروط الأهلية اللازمة."
+
+
+class ApiError(str):
+    """
+    الخطأ الذي يعيده AnemAPIClient في (البيانات، الخطأ): نص الرسالة نفسه (str، فتبقى الاستخدامات الحالية كما هي)
+    مع نوعه ورمز HTTP إن وجد. النوع يحدد إعادة المحاولة (RETRY_POLICIES) وترجمة الرسالة وعدادات الفشل في المراقبة،
+    بدلاً من البحث عن كلمات داخل النص.
+    """
+    TRANSIENT_NETWORK = "transient_network" # انقطاع، مهلة، SSL
+    THROTTLED = "throttled" # 429
+    SERVER_ERROR = "server_error" # 5xx
+    CLIENT_ERROR = "client_error" # 4xx دائم (400/401/404...): إعادة الطلب لن تنجح
+    NOT_ELIGIBLE = "not_eligible" # رفض الأهلية من البوابة (Eligible:false)
+    INVALID_RESPONSE = "invalid_response" # رد ليس JSON أو غير متوقع
+    CANCELLED = "cancelled" # إيقاف المراقبة أو المهمة أو إغلاق البرنامج
+
+    def __new__(cls, message, kind, status_code=None, exception=None):
+        error = super().__new__(cls, message)
+        error.kind = kind
+        error.status_code = status_code
+        error.exception = exception # استثناء requests الأصلي لأخطاء الشبكة (لتمييز المهلة عن الانقطاع)
+        return error
+
+    def with_message(self, message):
+        """نفس النوع برسالة أخرى (مثلاً الرسالة المترجمة للمستخدم)."""
+        return ApiError(message, self.kind, self.status_code, self.exception)
+
+    @property
+    def is_connectivity_failure(self):
+        """الخادم غير متاح (شبكة أو 5xx)، وليس رفضًا لهذا الطلب بعينه: يُحتسب لوضع فقدان الاتصال في المراقبة."""
+        return self.kind in (ApiError.TRANSIENT_NETWORK, ApiError.SERVER_ERROR)
+
+
+# عدد مرات إعادة المحاولة لكل نوع خطأ (ضمن MAX_RETRIES). التأخير: backoff_general المتضاعف،
+# وبعد 429 الانتظار في rate_governor (Retry-After أو backoff_429 المتضاعف) لجميع العملاء.
+RETRY_POLICIES = {
+    ApiError.TRANSIENT_NETWORK: MAX_RETRIES,
+    ApiError.THROTTLED: MAX_RETRIES,
+    ApiError.SERVER_ERROR: MAX_RETRIES,
+    ApiError.CLIENT_ERROR: 0,
+    ApiError.NOT_ELIGIBLE: 0,
+    ApiError.INVALID_RESPONSE: 0,
+    ApiError.CANCELLED: 0,
+}
+
+
+def error_kind_for_status(status_code):
+    if status_code == 429:
+        return ApiError.THROTTLED
+    if status_code is None or status_code >= 500:
+        return ApiError.SERVER_ERROR
+    if status_code == 408: # مهلة من جهة الخادم
+        return ApiError.TRANSIENT_NETWORK
+    return ApiError.CLIENT_ERROR
+
+
+def error_kind(error):
+    """نوع الخطأ (ApiError.*)، أو None لرسائل الخطأ العادية (مثل أخطاء حفظ الملفات)."""
+    return getattr(error, "kind", None)
+
+
+class RequestCancelledError(Exception):
+    """رمز الإلغاء للخيط المستدعي أُلغي أثناء الطلب (إيقاف المراقبة، إلغاء مهمة، أو إغلاق البرنامج)."""
+
+
+_executor_lock = threading.Lock()
+_executor = None
+
+
+def _request_executor():
+    # يُنشأ عند أول طلب (لا خيوط إضافية عند بدء التشغيل)
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=API_REQUEST_IO_MAX_WORKERS, thread_name_prefix="anem-http")
+        return _executor
+
+
+def _close_abandoned_response(future):
+    # طلب أُلغي انتظاره ثم اكتمل: إعادة اتصاله إلى المجمع
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _send_cancellable(cancel_token, send):
+    """
+    تنفيذ send() (session.get/post) على خيط من _request_executor، والانتظار حتى اكتماله أو إلغاء cancel_token، أيهما أسبق.
+    عند الإلغاء يعود الخيط المستدعي فورًا (RequestCancelledError) ويُترك الطلب الجاري ليكتمل أو تنتهي مهلته في الخلفية،
+    ونتيجته تُهمل. لذلك يُستخدم للطلبات التي يمكن إهمال نتيجتها فقط (القراءة)، وليس لـ RendezVous/Create (انظر cancellable).
+    """
+    finished = threading.Event()
+    future = _request_executor().submit(send)
+    future.add_done_callback(lambda _future: finished.set())
+    handle = cancel_token.add_callback(finished.set)
+    try:
+        finished.wait()
+    finally:
+        cancel_token.remove_callback(handle)
+    if future.done():
+        return future.result()
+    if not future.cancel():
+        future.add_done_callback(_close_abandoned_response)
+    raise RequestCancelledError()
+
 
 class AnemAPIClient:
     def __init__(self, initial_backoff_general, initial_backoff_429, request_timeout):
         self.session = SESSION 
+        self.rate_governor = SHARED_RATE_GOVERNOR # معدل الطلبات وحالة 429 مشتركة بين جميع العملاء
+        self.response_cache = SHARED_RESPONSE_CACHE # معلومات التسجيل المسبق (الهوية فقط، انظر API_CACHE_TTL_SECONDS)
         self.base_url = BASE_API_URL
         self.initial_backoff_general = initial_backoff_general
         self.initial_backoff_429 = initial_backoff_429
         self.request_timeout = request_timeout
 
 
-    def _make_request(self, method, endpoint, params=None, data=None, extra_headers=None, is_site_check=False):
+    def _make_request(self, method, endpoint, params=None, data=None, extra_headers=None, is_site_check=False, stream_handler=None, cancellable=True):
+        # stream_handler: دالة تستقبل الرد الناجح (مفتوح بـ stream=True) وتعيد (النتيجة، الخطأ) بدلاً من تحليل JSON كاملاً في الذاكرة
+        # cancellable=False: الإلغاء يمنع الإرسال وإعادة المحاولة فقط، والطلب المرسل تُنتظر نتيجته دائمًا حتى يسجلها المستدعي
+        # الأخطاء تُعاد كـ ApiError، وإعادة المحاولة حسب RETRY_POLICIES لنوع الخطأ (4xx مثلاً لا يُعاد)
         url = f"{self.base_url}/{endpoint}" if not is_site_check else MAIN_SITE_CHECK_URL
 
         headers = self.session.headers.copy()
@@ -29,70 +145,78 @@ class AnemAPIClient:
             headers.update(extra_headers)
 
         current_retry = 0
-        max_retries_for_this_call = 0 if is_site_check else MAX_RETRIES 
+        max_retries_for_this_call = 0 if is_site_check else MAX_RETRIES
         current_delay_general = self.initial_backoff_general
         current_delay_429 = self.initial_backoff_429
 
-        last_error_message_for_request = "فشل غير محدد" # قيمة افتراضية للخطأ الأخير
+        last_error = ApiError("فشل غير محدد", ApiError.TRANSIENT_NETWORK) # قيمة افتراضية للخطأ الأخير
+        cancel_token = current_token() # رمز الخيط المستدعي: الإلغاء يقطع الانتظار والطلب الجاري فورًا
+        failed_result = False if is_site_check else None
 
-        while current_retry <= max_retries_for_this_call:
-            actual_delay_to_use = current_delay_general 
+        while True:
             log_prefix = f"الطلب {method.upper()} إلى {url}"
             if is_site_check:
                 log_prefix = f"فحص توفر الموقع: {url}"
-            
+
             logger.debug(f"{log_prefix} (محاولة {current_retry + 1}/{max_retries_for_this_call + 1}) مع البيانات: {params or data}")
-            
+
+            if cancel_token.is_cancelled() or (not is_site_check and not self.rate_governor.acquire(cancel_token)): # ينتظر انتهاء أي إيقاف 429 عام ورمزًا من المعدل المشترك
+                logger.info(f"{log_prefix}: تم الإلغاء قبل الإرسال.")
+                return failed_result, ApiError(REQUEST_CANCELLED_ERROR, ApiError.CANCELLED)
+
             try:
                 response = None
                 request_timeout_val = 5 if is_site_check else self.request_timeout
 
                 if method.upper() == 'GET':
-                    response = self.session.get(url, params=params, headers=headers, timeout=request_timeout_val, verify=False)
+                    send = lambda: self.session.get(url, params=params, headers=headers, timeout=request_timeout_val, verify=False, stream=stream_handler is not None)
                 elif method.upper() == 'POST':
-                    headers['Content-Type'] = 'application/json' 
-                    response = self.session.post(url, json=data, headers=headers, timeout=request_timeout_val, verify=False)
+                    headers['Content-Type'] = 'application/json'
+                    send = lambda: self.session.post(url, json=data, headers=headers, timeout=request_timeout_val, verify=False)
                 else:
                     unsupported_method_error = f"الطريقة {method} غير مدعومة لـ {url}"
                     logger.error(unsupported_method_error)
-                    return None, unsupported_method_error
+                    return None, ApiError(unsupported_method_error, ApiError.CLIENT_ERROR)
+                response = _send_cancellable(cancel_token, send) if cancellable else send()
 
                 logger.debug(f"استجابة الخادم لـ {url}: {response.status_code}")
 
-                if response.status_code == 429: 
-                    actual_delay_to_use = current_delay_429
-                    logger.warning(f"خطأ 429 (طلبات كثيرة جدًا) من الخادم لـ {url}. الانتظار {actual_delay_to_use} ثانية.")
-                    if current_retry >= max_retries_for_this_call:
-                        final_429_error = "طلبات كثيرة جدًا للخادم (429). يرجى الانتظار والمحاولة لاحقًا."
-                        logger.error(f"تم تجاوز الحد الأقصى لإعادة المحاولة (429) لـ {url}. الرسالة المُعادة: {final_429_error}")
-                        return None, final_429_error
-                    time.sleep(actual_delay_to_use)
-                    current_delay_429 = min(current_delay_429 * 2, MAX_BACKOFF_DELAY) 
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    actual_delay_to_use = retry_after if retry_after is not None else current_delay_429
+                    logger.warning(f"خطأ 429 (طلبات كثيرة جدًا) من الخادم لـ {url}. الانتظار {actual_delay_to_use} ثانية{' (Retry-After)' if retry_after is not None else ''}.")
+                    self.rate_governor.on_throttled(actual_delay_to_use) # الانتظار يتم في acquire() لجميع العملاء، وليس لهذا الطلب فقط
+                    last_error = ApiError("طلبات كثيرة جدًا للخادم (429). يرجى الانتظار والمحاولة لاحقًا.", ApiError.THROTTLED, 429)
+                    if current_retry >= min(max_retries_for_this_call, RETRY_POLICIES[ApiError.THROTTLED]):
+                        logger.error(f"تم تجاوز الحد الأقصى لإعادة المحاولة (429) لـ {url}. الرسالة المُعادة: {last_error}")
+                        return failed_result, last_error
+                    current_delay_429 = min(current_delay_429 * 2, MAX_BACKOFF_DELAY)
                     current_retry += 1
-                    last_error_message_for_request = "طلبات كثيرة جدًا (429)" # تحديث رسالة الخطأ الأخيرة
                     continue
-                
-                actual_delay_to_use = current_delay_general # إعادة التعيين إلى التأخير العام إذا لم يكن الخطأ 429
-                response.raise_for_status() 
-                
-                if is_site_check: 
-                    return True, None 
-                
+
+                response.raise_for_status()
+
+                if is_site_check:
+                    return True, None
+                self.rate_governor.on_success()
+                if stream_handler is not None:
+                    return self._run_stream_handler(stream_handler, response, cancel_token) # أخطاء الشبكة أثناء القراءة تصل إلى معالجات الأخطاء أدناه (إعادة المحاولة)
+
                 try:
                     json_response = response.json()
                     if endpoint == 'RendezVous/Create' and isinstance(json_response, dict) and json_response.get("Eligible") is False:
                         logger.warning(f"استجابة JSON من {url} تشير إلى Eligible:false. الاستجابة: {json_response}")
-                        return json_response, None 
+                        return json_response, None
                     return json_response, None
                 except json.JSONDecodeError:
                     json_decode_error_msg_short = "خطأ في تحليل البيانات المستلمة من الخادم (ليست JSON)."
                     json_decode_error_msg_full = f"خطأ في تحليل استجابة JSON من {url}. الاستجابة (أول 200 حرف): {response.text[:200] if response else 'No response object'}"
                     logger.error(json_decode_error_msg_full)
-                    
+
                     if endpoint == 'RendezVous/Create' and response and response.text:
                         logger.warning(f"استجابة نصية غير JSON من {url} ولكنها تحتوي على نص: {response.text[:200]}")
                         if "\"Eligible\":false" in response.text.lower():
-                             message_from_text = "نعتذر منكم! لا يمكنكم حجز موعد للاستفادة من منحة البطالة لعدم استيفائكم لأحد شروط الأهلية اللازمة." 
+                             message_from_text = ELIGIBILITY_REFUSAL_MESSAGE
                              constructed_response = {"Eligible": False, "message": message_from_text, "raw_text": True}
                              logger.info(f"تم بناء استجابة Eligible:false من النص الخام لـ {url}: {constructed_response}")
                              return constructed_response, None
@@ -100,82 +224,97 @@ class AnemAPIClient:
                         # إذا لم يكن Eligible:false، أرجع خطأ تحليل مع النص الخام
                         raw_text_error_detail = "استجابة نصية غير متوقعة من الخادم."
                         logger.error(f"الطلب إلى {url} فشل بسبب استجابة نصية غير متوقعة. الرسالة المُعادة: {raw_text_error_detail}")
-                        return {"raw_text": response.text, "is_non_json_success_heuristic": "Eligible" in response.text}, raw_text_error_detail
-                    
+                        return {"raw_text": response.text, "is_non_json_success_heuristic": "Eligible" in response.text}, ApiError(raw_text_error_detail, ApiError.INVALID_RESPONSE, response.status_code)
+
                     logger.error(f"الطلب إلى {url} فشل بسبب خطأ في تحليل JSON. الرسالة المُعادة: {json_decode_error_msg_short}")
-                    return None, json_decode_error_msg_short
+                    return None, ApiError(json_decode_error_msg_short, ApiError.INVALID_RESPONSE, response.status_code)
 
+            except RequestCancelledError:
+                logger.info(f"{log_prefix}: تم إلغاء الطلب الجاري.")
+                return failed_result, ApiError(REQUEST_CANCELLED_ERROR, ApiError.CANCELLED)
             except requests.exceptions.SSLError as e:
-                error_message = f"خطأ SSL عند الاتصال بـ {url}: {str(e)}"
-                if is_site_check: return False, error_message
-                logger.error(f"{log_prefix} (محاولة {current_retry + 1}): {error_message}")
-                last_error_message_for_request = error_message
-            except requests.exceptions.ConnectTimeout as e: 
-                error_message = f"انتهت مهلة الاتصال بالخادم ({url}): {str(e)}"
-                if is_site_check: return False, error_message
-                logger.warning(f"{log_prefix} (محاولة {current_retry + 1}): {error_message}")
-                last_error_message_for_request = error_message
-            except requests.exceptions.ReadTimeout as e: 
-                error_message = f"انتهت مهلة القراءة من الخادم ({url}): {str(e)}"
-                if is_site_check: return False, error_message
-                logger.warning(f"{log_prefix} (محاولة {current_retry + 1}): {error_message}")
-                last_error_message_for_request = error_message
+                last_error = ApiError(f"خطأ SSL عند الاتصال بـ {url}: {str(e)}", ApiError.TRANSIENT_NETWORK, exception=e)
+                logger.error(f"{log_prefix} (محاولة {current_retry + 1}): {last_error}")
+            except requests.exceptions.ConnectTimeout as e:
+                last_error = ApiError(f"انتهت مهلة الاتصال بالخادم ({url}): {str(e)}", ApiError.TRANSIENT_NETWORK, exception=e)
+                logger.warning(f"{log_prefix} (محاولة {current_retry + 1}): {last_error}")
+            except requests.exceptions.ReadTimeout as e:
+                last_error = ApiError(f"انتهت مهلة القراءة من الخادم ({url}): {str(e)}", ApiError.TRANSIENT_NETWORK, exception=e)
+                logger.warning(f"{log_prefix} (محاولة {current_retry + 1}): {last_error}")
             except requests.exceptions.Timeout as e: # هذا يشمل ConnectTimeout و ReadTimeout بشكل عام
-                error_message = f"انتهت مهلة الطلب لـ {url}: {str(e)}"
-                if is_site_check: return False, error_message
-                logger.warning(f"{log_prefix} (محاولة {current_retry + 1}): {error_message}")
-                last_error_message_for_request = error_message
+                last_error = ApiError(f"انتهت مهلة الطلب لـ {url}: {str(e)}", ApiError.TRANSIENT_NETWORK, exception=e)
+                logger.warning(f"{log_prefix} (محاولة {current_retry + 1}): {last_error}")
             except requests.exceptions.ConnectionError as e:
-                error_message = f"خطأ في الاتصال بالخادم ({url}): {str(e)}"
-                if is_site_check: return False, error_message
-                logger.error(f"{log_prefix} (محاولة {current_retry + 1}): {error_message}")
-                last_error_message_for_request = error_message
-            except requests.exceptions.HTTPError as e: 
-                status_code = response.status_code if response else "N/A"
-                error_message = f"خطأ HTTP {status_code} من الخادم لـ {url}: {str(e)}"
-                if is_site_check: return False, error_message
-                logger.error(f"{log_prefix} (محاولة {current_retry + 1}): {error_message}. الاستجابة: {response.text[:200] if response else 'N/A'}")
-                last_error_message_for_request = error_message
-                
+                last_error = ApiError(f"خطأ في الاتصال بالخادم ({url}): {str(e)}", ApiError.TRANSIENT_NETWORK, exception=e)
+                logger.error(f"{log_prefix} (محاولة {current_retry + 1}): {last_error}")
+            except requests.exceptions.HTTPError as e:
+                status_code = response.status_code if response is not None else None # Response تُقيَّم False لأخطاء HTTP
+                last_error = ApiError(f"خطأ HTTP {status_code or 'N/A'} من الخادم لـ {url}: {str(e)}", error_kind_for_status(status_code), status_code, e)
+                if not is_site_check:
+                    if last_error.kind == ApiError.SERVER_ERROR and response is not None:
+                        self.rate_governor.on_server_error(parse_retry_after(response.headers.get("Retry-After")))
+                    logger.error(f"{log_prefix} (محاولة {current_retry + 1}): {last_error}. الاستجابة: {response.text[:200] if response else 'N/A'}")
+
                 if endpoint == 'RendezVous/Create' and response is not None:
                     try:
                         parsed_error_json = response.json()
                         if isinstance(parsed_error_json, dict) and parsed_error_json.get("Eligible") is False:
                             logger.warning(f"استجابة خطأ HTTP من {url} ولكنها JSON مع Eligible:false. الاستجابة: {parsed_error_json}")
-                            return parsed_error_json, None 
-                        
+                            return parsed_error_json, None
+
                         # إذا لم يكن Eligible:false، فهو خطأ حقيقي
-                        http_json_error_detail = f"خطأ من الخادم ({status_code}) مع تفاصيل JSON."
+                        http_json_error_detail = last_error.with_message(f"خطأ من الخادم ({status_code}) مع تفاصيل JSON.")
                         logger.error(f"الطلب إلى {url} فشل بخطأ HTTP مع تفاصيل JSON. الرسالة المُعادة: {http_json_error_detail}")
                         return parsed_error_json, http_json_error_detail
-                    except json.JSONDecodeError: 
-                        http_text_error_detail = f"خطأ من الخادم ({status_code}) مع استجابة نصية."
+                    except json.JSONDecodeError:
                         logger.warning(f"استجابة نصية غير JSON لخطأ HTTP من {url}: {response.text[:200]}")
+                        if "\"eligible\":false" in response.text.lower():
+                            http_text_error_detail = ApiError(ELIGIBILITY_REFUSAL_MESSAGE, ApiError.NOT_ELIGIBLE, status_code)
+                        else:
+                            http_text_error_detail = last_error.with_message(f"خطأ من الخادم ({status_code}) مع استجابة نصية.")
                         logger.error(f"الطلب إلى {url} فشل بخطأ HTTP مع استجابة نصية. الرسالة المُعادة: {http_text_error_detail}")
                         return {"raw_text": response.text, "http_status_code": status_code}, http_text_error_detail
-            except requests.exceptions.RequestException as e: 
-                error_message = f"خطأ عام في الطلب لـ {url}: {str(e)}"
-                if is_site_check: return False, error_message
-                logger.error(f"{log_prefix} (محاولة {current_retry + 1}): {error_message}")
-                generic_request_error_msg = "حدث خطأ عام أثناء محاولة الاتصال بالخادم."
-                logger.error(f"الطلب إلى {url} فشل بخطأ عام. الرسالة المُعادة: {generic_request_error_msg}")
-                return None, generic_request_error_msg 
-
-            if current_retry >= max_retries_for_this_call:
-                final_error_message_after_retries = f"فشل الاتصال بالخادم بعد عدة محاولات. ({last_error_message_for_request.split(':')[0].strip()})" 
-                logger.error(f"تم تجاوز الحد الأقصى لإعادة المحاولة لـ {url} بعد خطأ: {last_error_message_for_request}. الرسالة المُعادة: {final_error_message_after_retries}")
-                return None, final_error_message_after_retries
-            
-            time.sleep(actual_delay_to_use)
-            current_delay_general = min(current_delay_general * 2, MAX_BACKOFF_DELAY) 
+            except requests.exceptions.RequestException as e: # مثل انقطاع الاتصال أثناء قراءة الرد (ChunkedEncodingError)
+                last_error = ApiError(f"خطأ عام في الطلب لـ {url}: {str(e)}", ApiError.TRANSIENT_NETWORK, exception=e)
+                logger.error(f"{log_prefix} (محاولة {current_retry + 1}): {last_error}")
+            finally:
+                if stream_handler is not None and response is not None:
+                    response.close() # إعادة الاتصال إلى المجمع حتى لو لم يُقرأ الرد كاملاً
+
+            if is_site_check:
+                return False, last_error
+            retries_for_error = min(max_retries_for_this_call, RETRY_POLICIES[last_error.kind])
+            if current_retry >= retries_for_error:
+                if retries_for_error == 0:
+                    logger.error(f"الطلب إلى {url} فشل بخطأ من نوع {last_error.kind} (المحاولة {current_retry + 1}، بدون إعادة أخرى). الرسالة المُعادة: {last_error}")
+                    return None, last_error
+                final_error_after_retries = last_error.with_message(f"فشل الاتصال بالخادم بعد عدة محاولات. ({str(last_error).split(':')[0].strip()})")
+                logger.error(f"تم تجاوز الحد الأقصى لإعادة المحاولة لـ {url} بعد خطأ: {last_error}. الرسالة المُعادة: {final_error_after_retries}")
+                return None, final_error_after_retries
+
+            if cancel_token.wait(current_delay_general): # انتظار إعادة المحاولة ينتهي فور الإلغاء
+                logger.info(f"{log_prefix}: تم الإلغاء أثناء انتظار إعادة المحاولة.")
+                return None, ApiError(REQUEST_CANCELLED_ERROR, ApiError.CANCELLED)
+            current_delay_general = min(current_delay_general * 2, MAX_BACKOFF_DELAY)
             current_retry += 1
-        
-        # إذا خرج من الحلقة دون نجاح أو إرجاع مبكر
-        ultimate_fallback_error = "فشل الاتصال بالخادم بعد جميع المحاولات."
-        logger.error(f"الطلب إلى {url} فشل بعد جميع المحاولات (fallback). الرسالة المُعادة: {ultimate_fallback_error}")
-        return None, ultimate_fallback_error
 
 
+    @staticmethod
+    def _run_stream_handler(stream_handler, response, cancel_token):
+        # الإلغاء أثناء قراءة الرد يغلقه من خيط الإلغاء، فتفشل القراءة الجارية فورًا (وتحذف الملف الجزئي)
+        handle = cancel_token.add_callback(response.close)
+        try:
+            result = stream_handler(response)
+        except Exception:
+            if cancel_token.is_cancelled():
+                raise RequestCancelledError()
+            raise
+        finally:
+            cancel_token.remove_callback(handle)
+        if result[1] is not None and cancel_token.is_cancelled():
+            raise RequestCancelledError()
+        return result
+
     def check_main_site_availability(self):
         logger.info(f"بدء فحص توفر الموقع الرئيسي: {MAIN_SITE_CHECK_URL}")
         # يتم التعامل مع is_site_check داخل _make_request لتعطيل إعادة المحاولة
@@ -187,7 +326,21 @@ class AnemAPIClient:
         return available, None
 
 
+    def _cached_get(self, endpoint, params):
+        """طلب GET عبر ذاكرة الردود: رد مخزن صالح يعاد دون طلب، والرد الناجح الجديد يُخزن."""
+        ttl_seconds = API_CACHE_TTL_SECONDS.get(endpoint)
+        if ttl_seconds:
+            cached_data = self.response_cache.get(endpoint, params, ttl_seconds)
+            if cached_data is not None:
+                logger.debug(f"رد مخزن لـ {endpoint} مع {params}.")
+                return cached_data, None
+        data, error = self._make_request('GET', endpoint, params=params)
+        if ttl_seconds and not error and isinstance(data, dict):
+            self.response_cache.put(endpoint, params, data)
+        return data, error
+
     def validate_candidate(self, wassit_number, identity_doc_number):
+        # دائمًا من البوابة: الرد يحمل الأهلية وحالة الموعد (انظر API_CACHE_TTL_SECONDS)
         params = {
             "wassitNumber": wassit_number,
             "identityDocNumber": identity_doc_number
@@ -196,7 +349,12 @@ class AnemAPIClient:
 
     def get_pre_inscription_info(self, pre_inscription_id):
         params = {"Id": pre_inscription_id}
-        return self._make_request('GET', 'PreInscription/GetPreInscription', params=params)
+        return self._cached_get('PreInscription/GetPreInscription', params)
+
+    def get_cached_pre_inscription_info(self, pre_inscription_id):
+        """معلومات التسجيل المسبق من الذاكرة إذا كانت صالحة، وإلا None (بدون أي طلب)."""
+        endpoint = 'PreInscription/GetPreInscription'
+        return self.response_cache.get(endpoint, {"Id": pre_inscription_id}, API_CACHE_TTL_SECONDS[endpoint])
 
     def get_available_dates(self, structure_id, pre_inscription_id):
         params = {
@@ -215,7 +373,9 @@ class AnemAPIClient:
             "demandeurId": demandeur_id
         }
         headers = {'g-recaptcha-response': ''} 
-        return self._make_request('POST', 'RendezVous/Create', data=payload, extra_headers=headers)
+        # غير قابل للتكرار: إذا أُرسل الطلب فقد يُحجز الموعد في البوابة، لذلك لا يُترك في الخلفية عند الإيقاف أو الإغلاق
+        # بل تُنتظر نتيجته (حتى مهلة الطلب) ليُسجل rdv_id للعضو
+        return self._make_request('POST', 'RendezVous/Create', data=payload, extra_headers=headers, cancellable=False)
 
     def download_pdf(self, report_type, pre_inscription_id):
         endpoint = f"download/{report_type}"
@@ -227,3 +387,13 @@ class AnemAPIClient:
         # حاليًا، الكود يفترض أن استجابة PDF الناجحة ستكون JSON مع حقل "base64Pdf".
         return self._make_request('GET', endpoint, params=params)
 
+    def download_pdf_to_file(self, report_type, pre_inscription_id, file_path):
+        """
+        تحميل شهادة PDF مباشرة إلى file_path: الرد يُقرأ بثًا ويُفك ترميز base64 دفعة بدفعة إلى ملف .part
+        يُعاد تسميته عند الاكتمال، دون الاحتفاظ بالرد أو الملف كاملاً في الذاكرة.
+        يعيد ({"path", "size", "sha256"}، None) أو (None، رسالة الخطأ).
+        """
+        endpoint = f"download/{report_type}"
+        params = {"PreInscriptionId": pre_inscription_id}
+        return self._make_request('GET', endpoint, params=params, stream_handler=lambda response: stream_base64_pdf_to_file(response, file_path))
+
@@ -0,0 +1,469 @@
+# benchmarks.py
+"""
+مقاييس أداء محلية (لا تتصل بالبوابة الحقيقية).
+الاستخدام:
+    python benchmarks.py memory [--sizes 10000 100000]
+    python benchmarks.py throughput [--sizes 100 1000 10000] [--latency-ms 2] [--rate-429 0.01] [--rate-5xx 0.01] [--skip-pdf]
+    python benchmarks.py pdf [--sizes-kb 150 2000] [--count 20]
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import requests
+
+from member import Member, KNOWN_STATUSES
+from mock_anem_server import add_server_arguments
+
+try:
+    import resource # غير متوفر على Windows
+except ImportError:
+    resource = None
+
+
+class LegacyMember:
+    """نسخة من تمثيل Member السابق: كائن عادي بقاموس __dict__ لكل عضو (للمقارنة فقط)."""
+    def __init__(self, data):
+        self.nin = data['nin']
+        self.wassit_no = data['wassit_no']
+        self.ccp = data['ccp']
+        self.phone_number = data.get('phone_number', "")
+        self.nom_fr = data.get('nom_fr', "")
+        self.prenom_fr = data.get('prenom_fr', "")
+        self.nom_ar = data.get('nom_ar', "")
+        self.prenom_ar = data.get('prenom_ar', "")
+        self.pre_inscription_id = data.get('pre_inscription_id')
+        self.demandeur_id = data.get('demandeur_id')
+        self.structure_id = data.get('structure_id')
+        self.status = data.get('status', "جديد")
+        self.last_activity_detail = data.get('last_activity_detail', "")
+        self.full_last_activity_detail = data.get('full_last_activity_detail', "")
+        self.rdv_date = data.get('rdv_date')
+        self.rdv_id = data.get('rdv_id')
+        self.rdv_source = data.get('rdv_source')
+        self.pdf_honneur_path = data.get('pdf_honneur_path')
+        self.pdf_rdv_path = data.get('pdf_rdv_path')
+        self.is_processing = False
+        self.has_actual_pre_inscription = data.get('has_actual_pre_inscription', False)
+        self.already_has_rdv = data.get('already_has_rdv', False)
+        self.consecutive_failures = data.get('consecutive_failures', 0)
+        self.have_allocation = data.get('have_allocation', False)
+        self.allocation_details = data.get('allocation_details', {})
+
+
+def generate_roster_json(size, seed=1234):
+    """قائمة أعضاء اصطناعية بتوزيع حالات واقعي، مسلسلة كنص JSON (كما في members_data.json)."""
+    rng = random.Random(seed)
+    common_statuses = ["مكتمل", "لا توجد مواعيد", "لديه موعد مسبق", "تم التحقق", "جديد", "مستفيد حاليًا من المنحة"]
+    members = []
+    for i in range(size):
+        status = rng.choice(common_statuses) if rng.random() < 0.9 else rng.choice(KNOWN_STATUSES)
+        member = Member(f"{100000000000000000 + i}", f"{2000000000 + i}", f"{rng.randrange(10**11, 10**12)}", f"0{rng.randrange(500000000, 799999999)}")
+        member.nom_ar, member.prenom_ar = "بن علي", "محمد"
+        member.nom_fr, member.prenom_fr = "BENALI", "MOHAMED"
+        member.pre_inscription_id = str(rng.randrange(10**6, 10**7))
+        member.demandeur_id = str(rng.randrange(10**6, 10**7))
+        member.structure_id = str(rng.randrange(100, 999))
+        member.status = status
+        member.set_activity_detail("لا توجد مواعيد متاحة حاليًا." if status == "لا توجد مواعيد" else "تم التحقق بنجاح.")
+        member.has_actual_pre_inscription = True
+        member.already_has_rdv = status in ("لديه موعد مسبق", "مكتمل")
+        members.append(member.to_dict())
+    return json.dumps(members, ensure_ascii=False)
+
+
+def measure_roster_memory(member_factory, roster_json):
+    """الذاكرة المحتفظ بها (بايت) بعد بناء القائمة من JSON، بعد تحرير القواميس المؤقتة."""
+    gc.collect()
+    tracemalloc.start()
+    data_list = json.loads(roster_json) # كل نص حالة هنا كائن منفصل، تمامًا كما عند التحميل الفعلي
+    roster = [member_factory(data) for data in data_list]
+    del data_list
+    gc.collect()
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del roster
+    return current
+
+
+def run_memory_benchmark(sizes):
+    print(f"{'الحجم':>10} | {'قبل (بايت/عضو)':>16} | {'بعد (بايت/عضو)':>16} | {'التوفير':>8}")
+    for size in sizes:
+        roster_json = generate_roster_json(size)
+        legacy_bytes = measure_roster_memory(LegacyMember, roster_json)
+        slotted_bytes = measure_roster_memory(Member.from_dict, roster_json)
+        saving = 100.0 * (legacy_bytes - slotted_bytes) / legacy_bytes if legacy_bytes else 0.0
+        print(f"{size:>10} | {legacy_bytes / size:>16.0f} | {slotted_bytes / size:>16.0f} | {saving:>7.1f}%")
+
+
+# --- سرعة دورة المراقبة مقابل الخادم المحلي ---
+LATENCY_PROBE_INTERVAL_MS = 10
+
+
+def generate_fresh_roster(size, seed=1234):
+    """أعضاء جدد (لم يتم فحصهم بعد) بأرقام NIN من 18 رقمًا."""
+    rng = random.Random(seed)
+    return [
+        Member(f"{100000000000000000 + i}", f"{2000000000 + i}", f"{rng.randrange(10**11, 10**12)}", f"0{rng.randrange(500000000, 799999999)}")
+        for i in range(size)
+    ]
+
+
+def start_mock_server_process(server_args):
+    """تشغيل mock_anem_server.py في عملية منفصلة (حتى لا يُحسب عمل الخادم في قياس CPU). يعيد (العملية، الرابط)."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_anem_server.py")
+    command = [sys.executable, script, "--port", "0", "--latency-ms", str(server_args.latency_ms), "--jitter-ms", str(server_args.jitter_ms),
+               "--rate-429", str(server_args.rate_429), "--rate-5xx", str(server_args.rate_5xx), "--retry-after", str(server_args.retry_after),
+               "--booking-rate", str(server_args.booking_rate), "--pdf-kb", str(server_args.pdf_kb)]
+    if server_args.seed is not None:
+        command += ["--seed", str(server_args.seed)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, encoding="utf-8")
+    first_line = process.stdout.readline().strip()
+    if not first_line.startswith("MOCK_ANEM_READY "):
+        process.kill()
+        raise RuntimeError(f"فشل تشغيل الخادم المحلي: {first_line!r}")
+    return process, first_line.split(" ", 1)[1]
+
+
+def fetch_server_stats(root_url):
+    return requests.get(root_url + "__stats", timeout=5).json()
+
+
+def peak_rss_mb():
+    """ذروة الذاكرة المقيمة للعملية (MB)، أو None إذا لم تكن متاحة."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024 # macOS: بايت، Linux: كيلوبايت
+    try:
+        import psutil # اختياري على Windows
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_monitoring_cycle(monitoring_thread):
+    """
+    الفحص الأولي بحلقة المراقبة الفعلية (MonitoringThread.run: الجدولة، الحجز، نقاط الحفظ، التأخير بين الأعضاء)
+    في خيط القياس. الحلقة لا تنتهي وحدها: القياس يوقفها عند اكتمال الفحص الأولي (initial_scan_completed).
+    """
+    monitoring_thread.run()
+
+
+def measure_monitoring_cycle(app, size, root_url, args):
+    """قياس دورة واحدة لقائمة من size عضو، مع مسار تحديث الواجهة الفعلي (التجميع + النموذج + الجدول)."""
+    from PyQt5.QtCore import Qt, QTimer, QEventLoop
+    from PyQt5.QtWidgets import QTableView, QAbstractItemView
+    from config import SETTING_MIN_MEMBER_DELAY, SETTING_MAX_MEMBER_DELAY, SETTING_BACKOFF_429, SETTING_BACKOFF_GENERAL, SETTING_REQUEST_TIMEOUT, DEFAULT_SETTINGS
+    from threads import MonitoringThread
+    from roster import Roster
+    from members_table_model import MembersTableModel
+    from gui_update_coalescer import GuiUpdateCoalescer
+    from search_index import MemberSearchIndex
+    from rate_governor import SHARED_RATE_GOVERNOR
+    from response_cache import SHARED_RESPONSE_CACHE
+    from monitor_checkpoints import SHARED_MONITOR_CHECKPOINTS
+
+    SHARED_RESPONSE_CACHE.clear() # دورة باردة: نفس أرقام NIN تتكرر بين الأحجام
+    SHARED_MONITOR_CHECKPOINTS.prune(()) # وإلا يستأنف الأعضاء مواعيدهم المحفوظة من الحجم السابق بدلاً من الفحص الأولي
+    members = generate_fresh_roster(size)
+    table = QTableView()
+    model = MembersTableModel(table) # النموذج والتجميع يُحذفان مع الجدول في نهاية القياس
+    model.set_members(members)
+    table.setSelectionBehavior(QAbstractItemView.SelectRows)
+    table.setModel(model)
+    table.resize(1200, 700)
+    table.show()
+    search_index = MemberSearchIndex(lambda: members)
+    status_messages = []
+    gui_time = [0.0] # الوقت المستغرق في تطبيق التحديثات على خيط الواجهة
+
+    # نفس عمل update_member_gui_in_table و handle_member_processing_signal في الواجهة الرئيسية
+    members_by_id = {member.member_id: member for member in members}
+    def apply_member_update(member_id, status_text, detail_text, icon_name_str):
+        started = time.perf_counter()
+        member = members_by_id[member_id]
+        search_index.invalidate(member)
+        model.set_icon_name(member, icon_name_str)
+        model.refresh_member(member)
+        gui_time[0] += time.perf_counter() - started
+
+    def apply_processing_state(member_id, is_processing_now):
+        started = time.perf_counter()
+        member = members_by_id[member_id]
+        member.is_processing = is_processing_now
+        row = model.row_of(member)
+        if is_processing_now and row >= 0:
+            table.selectRow(row)
+            table.scrollTo(model.index(row, 0), QAbstractItemView.EnsureVisible)
+        model.refresh_member(member)
+        gui_time[0] += time.perf_counter() - started
+
+    def apply_log_message(message, is_general=True, member_obj=None, member_id=-1):
+        status_messages.append(message)
+
+    coalescer = GuiUpdateCoalescer(apply_member_update, apply_processing_state, apply_log_message, parent=table)
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update({SETTING_MIN_MEMBER_DELAY: 0, SETTING_MAX_MEMBER_DELAY: 0, SETTING_BACKOFF_429: args.backoff, SETTING_BACKOFF_GENERAL: args.backoff, SETTING_REQUEST_TIMEOUT: 10})
+    monitoring_thread = MonitoringThread(Roster(members), settings) # لا يتم تشغيل start(): run() يُنفذ في خيط القياس
+    monitoring_thread.prepare_start(settings)
+    monitoring_thread.api_client.base_url = root_url + "AllocationChomage/api"
+    monitoring_thread.CONSECUTIVE_NETWORK_ERROR_THRESHOLD = float("inf") # وضع فقدان الاتصال يفحص الموقع الحقيقي: معطل في القياس
+    if args.skip_pdf: # مرحلة التحميل فقط تُستبدل، وباقي الحلقة كما هي
+        monitoring_thread.process_pdf_download = lambda main_list_idx, member_obj: (False, False)
+    monitoring_thread.update_member_gui_signal.connect(coalescer.queue_member_update)
+    monitoring_thread.global_log_signal.connect(coalescer.queue_log_message)
+    monitoring_thread.member_being_processed_signal.connect(coalescer.queue_processing_state)
+
+    # مقياس تأخر حلقة الأحداث: مؤقت دوري، والتأخر هو الفرق بين الفاصل الفعلي والمطلوب
+    lags_ms = []
+    last_tick = [0.0]
+    def on_probe_tick():
+        now = time.perf_counter()
+        lags_ms.append(max(0.0, (now - last_tick[0]) * 1000 - LATENCY_PROBE_INTERVAL_MS))
+        last_tick[0] = now
+    probe_timer = QTimer()
+    probe_timer.setTimerType(Qt.PreciseTimer)
+    probe_timer.setInterval(LATENCY_PROBE_INTERVAL_MS)
+    probe_timer.timeout.connect(on_probe_tick)
+
+    loop = QEventLoop()
+    worker = threading.Thread(target=run_monitoring_cycle, args=(monitoring_thread,), name="BenchmarkCycle", daemon=True)
+    scan_finished_at = [None]
+    def on_done_tick():
+        if scan_finished_at[0] is None and monitoring_thread.initial_scan_completed:
+            scan_finished_at[0] = time.perf_counter()
+            monitoring_thread.stop_monitoring() # الحلقة تنتظر الآن الفحص الدوري التالي
+        if not worker.is_alive():
+            loop.quit()
+    done_timer = QTimer()
+    done_timer.setInterval(LATENCY_PROBE_INTERVAL_MS)
+    done_timer.timeout.connect(on_done_tick)
+
+    stats_before = fetch_server_stats(root_url)
+    governor_wait_before = SHARED_RATE_GOVERNOR.total_wait_seconds
+    cache_hits_before = SHARED_RESPONSE_CACHE.hits
+    app.processEvents()
+    gc.collect()
+    wall_started, cpu_started = time.perf_counter(), time.process_time()
+    last_tick[0] = wall_started
+    probe_timer.start()
+    done_timer.start()
+    worker.start()
+    loop.exec_()
+    worker.join()
+    app.sendPostedEvents() # الإشارات الأخيرة من خيط القياس
+    coalescer.flush()
+    app.processEvents()
+    wall_seconds = (scan_finished_at[0] or time.perf_counter()) - wall_started
+    cpu_seconds = time.process_time() - cpu_started
+    probe_timer.stop()
+    done_timer.stop()
+    stats_after = fetch_server_stats(root_url)
+    governor_wait_seconds = SHARED_RATE_GOVERNOR.total_wait_seconds - governor_wait_before
+
+    table.close()
+    table.deleteLater()
+    app.processEvents()
+    return {
+        "size": size,
+        "wall_seconds": wall_seconds,
+        "members_per_second": size / wall_seconds if wall_seconds else 0.0,
+        "cpu_seconds": cpu_seconds,
+        "cpu_percent": 100.0 * cpu_seconds / wall_seconds if wall_seconds else 0.0,
+        "gui_apply_seconds": gui_time[0],
+        "peak_rss_mb": peak_rss_mb(),
+        "loop_lag_p50_ms": percentile(lags_ms, 0.50),
+        "loop_lag_p95_ms": percentile(lags_ms, 0.95),
+        "loop_lag_max_ms": max(lags_ms) if lags_ms else 0.0,
+        "requests": stats_after["requests"] - stats_before["requests"],
+        "injected_429": stats_after["injected_429"] - stats_before["injected_429"],
+        "injected_5xx": stats_after["injected_5xx"] - stats_before["injected_5xx"],
+        "governor_wait_seconds": governor_wait_seconds,
+        "governor_rate": SHARED_RATE_GOVERNOR.current_rate,
+        "cache_hits": SHARED_RESPONSE_CACHE.hits - cache_hits_before,
+    }
+
+
+def path_is_inside(path, directory):
+    try:
+        return os.path.commonpath([os.path.abspath(path), os.path.abspath(directory)]) == os.path.abspath(directory)
+    except ValueError: # Windows: قرصان مختلفان
+        return False
+
+
+def redirect_app_data_dir(sandbox_home):
+    """
+    توجيه APP_DATA_DIR وكل مسارات الملفات المبنية عليه في config إلى مجلد القياس، على كل الأنظمة.
+    config يُستورد مع member.py قبل إنشاء المجلد المؤقت، و QStandardPaths على Windows يتجاهل HOME/XDG_*،
+    لذلك لا يكفي تغيير متغيرات البيئة: يجب تعديل المسارات قبل استيراد أي مخزن (response_cache، monitor_checkpoints، pdf_manifest).
+    """
+    import config
+    real_app_data_dir = config.APP_DATA_DIR
+    sandbox_app_data_dir = os.path.join(sandbox_home, config.APP_NAME_FOR_DATA_DIR)
+    os.makedirs(sandbox_app_data_dir, exist_ok=True)
+    for name, value in list(vars(config).items()):
+        if name.isupper() and isinstance(value, str) and path_is_inside(value, real_app_data_dir):
+            setattr(config, name, os.path.join(sandbox_app_data_dir, os.path.relpath(value, real_app_data_dir)))
+    config.APP_DATA_DIR = sandbox_app_data_dir
+
+
+def ensure_stores_sandboxed(sandbox_home):
+    """القياس يمسح ذاكرة الردود ونقاط حفظ المراقبة ويكتب أعضاء وهميين: يرفض العمل إذا كان أي مخزن مشترك خارج مجلد القياس."""
+    from response_cache import SHARED_RESPONSE_CACHE
+    from monitor_checkpoints import SHARED_MONITOR_CHECKPOINTS
+    from pdf_manifest import SHARED_PDF_MANIFEST
+    for store in (SHARED_RESPONSE_CACHE, SHARED_MONITOR_CHECKPOINTS, SHARED_PDF_MANIFEST):
+        if not path_is_inside(store.db_path, sandbox_home):
+            raise SystemExit(f"رفض تشغيل القياس: {store.STORE_NAME} يشير إلى {store.db_path} خارج مجلد القياس {sandbox_home} (بيانات التطبيق الحقيقية).")
+
+
+def prepare_sandbox():
+    """مجلد مؤقت لكل ما يكتبه البرنامج أثناء القياس (بيانات التطبيق والمخازن)، والسجل إلى ملف داخله. يعيد (المجلد، مسار السجل)."""
+    sandbox_home = tempfile.mkdtemp(prefix="anem_benchmark_")
+    if os.name != "nt":
+        # المستندات (ملفات PDF) تذهب إلى مجلد مؤقت بدلاً من مجلد المستخدم
+        os.environ["HOME"] = sandbox_home
+        os.environ["XDG_CONFIG_HOME"] = os.path.join(sandbox_home, ".config")
+        os.environ["XDG_DATA_HOME"] = os.path.join(sandbox_home, ".local", "share")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    redirect_app_data_dir(sandbox_home)
+    ensure_stores_sandboxed(sandbox_home)
+    # نفس مستوى السجل في البرنامج (INFO إلى ملف)، حتى تكون تكلفة التسجيل جزءًا من القياس دون إغراق الشاشة
+    log_path = os.path.join(sandbox_home, "benchmark.log")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(threadName)s - %(filename)s:%(lineno)d - %(message)s",
+                        handlers=[logging.FileHandler(log_path, encoding='utf-8')])
+    return sandbox_home, log_path
+
+
+def run_throughput_benchmark(args):
+    if os.name == "nt" and not args.skip_pdf:
+        print("ملاحظة: تحميل ملفات PDF معطل على Windows في هذا القياس (المسار هو مجلد المستندات الحقيقي).")
+        args.skip_pdf = True
+    _sandbox_home, log_path = prepare_sandbox()
+
+    from PyQt5.QtWidgets import QApplication
+    from rate_governor import SHARED_RATE_GOVERNOR
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    SHARED_RATE_GOVERNOR.configure(max_rate=args.max_rate, burst=max(1, int(args.max_rate)))
+
+    server_process, root_url = start_mock_server_process(args)
+    try:
+        print(f"الخادم المحلي: {root_url} (زمن الاستجابة {args.latency_ms}ms، 429: {args.rate_429:.1%}، 5xx: {args.rate_5xx:.1%})، السجل: {log_path}")
+        print(f"{'الحجم':>7} | {'زمن الدورة (ث)':>14} | {'عضو/ث':>7} | {'CPU (ث)':>8} | {'CPU %':>6} | {'الواجهة (ث)':>11} | {'ذروة RSS (MB)':>13} | {'تأخر الأحداث p50/p95/max (ms)':>29} | {'طلبات':>7} | {'429':>5} | {'5xx':>5} | {'انتظار المنظم (ث)':>17} | {'من الذاكرة':>10}")
+        for size in sorted(args.sizes): # ذروة RSS تراكمية للعملية، لذلك من الأصغر إلى الأكبر
+            result = measure_monitoring_cycle(app, size, root_url, args)
+            rss_text = f"{result['peak_rss_mb']:.1f}" if result["peak_rss_mb"] is not None else "غير متاح"
+            lag_text = f"{result['loop_lag_p50_ms']:.1f} / {result['loop_lag_p95_ms']:.1f} / {result['loop_lag_max_ms']:.1f}"
+            print(f"{size:>7} | {result['wall_seconds']:>14.2f} | {result['members_per_second']:>7.1f} | {result['cpu_seconds']:>8.2f} | {result['cpu_percent']:>6.1f} | "
+                  f"{result['gui_apply_seconds']:>11.3f} | {rss_text:>13} | {lag_text:>29} | {result['requests']:>7} | {result['injected_429']:>5} | {result['injected_5xx']:>5} | {result['governor_wait_seconds']:>17.2f} | {result['cache_hits']:>10}")
+            if args.json:
+                print(json.dumps(result), file=sys.stderr)
+    finally:
+        server_process.terminate()
+        server_process.wait(timeout=5)
+
+
+# --- ذاكرة تحميل ملفات PDF: المسار السابق (JSON كامل + فك base64 كامل) مقابل البث إلى ملف ---
+def legacy_download_pdf_to_file(api_client, report_type, pre_inscription_id, file_path):
+    """المسار السابق في الخيوط: الرد كاملاً كـ JSON، ثم b64decode للنص كاملاً، ثم الكتابة دفعة واحدة (للمقارنة فقط)."""
+    import base64
+    response_data, api_err = api_client.download_pdf(report_type, pre_inscription_id)
+    if api_err:
+        return None, api_err
+    pdf_content = base64.b64decode(response_data if isinstance(response_data, str) else response_data.get("base64Pdf"))
+    with open(file_path, 'wb') as f:
+        f.write(pdf_content)
+    return {"path": file_path, "size": len(pdf_content)}, None
+
+
+def measure_pdf_downloads(download_function, api_client, output_dir, count):
+    """(ذروة ذاكرة Python أثناء التحميل بالبايت، متوسط زمن التحميل بالثواني)."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    for i in range(count):
+        _info, error = download_function(api_client, "HonneurEngagementReport", str(1000000 + i), os.path.join(output_dir, f"bench_{i}.pdf"))
+        if error:
+            raise RuntimeError(f"فشل التحميل أثناء القياس: {error}")
+    elapsed = time.perf_counter() - started
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed / count
+
+
+def run_pdf_benchmark(args):
+    sandbox_home, log_path = prepare_sandbox()
+    from api_client import AnemAPIClient
+    from rate_governor import SHARED_RATE_GOVERNOR
+    SHARED_RATE_GOVERNOR.configure(max_rate=1000.0, burst=1000)
+    api_client = AnemAPIClient(initial_backoff_general=0.2, initial_backoff_429=0.2, request_timeout=30)
+    streaming_download = lambda client, report_type, pre_id, file_path: client.download_pdf_to_file(report_type, pre_id, file_path)
+
+    print(f"السجل: {log_path}")
+    print(f"{'حجم PDF (KB)':>12} | {'ذروة السابق (KB)':>16} | {'ذروة البث (KB)':>14} | {'النسبة':>7} | {'زمن السابق (ms)':>15} | {'زمن البث (ms)':>13}")
+    for pdf_kb in args.sizes_kb:
+        server_args = argparse.Namespace(**{**vars(args), "pdf_kb": pdf_kb})
+        server_process, root_url = start_mock_server_process(server_args)
+        try:
+            api_client.base_url = root_url + "AllocationChomage/api"
+            output_dir = tempfile.mkdtemp(prefix="pdf_", dir=sandbox_home)
+            streaming_download(api_client, "HonneurEngagementReport", "1", os.path.join(output_dir, "warmup.pdf")) # الاتصال الأول والاستيرادات خارج القياس
+            legacy_peak, legacy_seconds = measure_pdf_downloads(legacy_download_pdf_to_file, api_client, output_dir, args.count)
+            stream_peak, stream_seconds = measure_pdf_downloads(streaming_download, api_client, output_dir, args.count)
+        finally:
+            server_process.terminate()
+            server_process.wait(timeout=5)
+        ratio = legacy_peak / stream_peak if stream_peak else 0.0
+        print(f"{pdf_kb:>12} | {legacy_peak / 1024:>16.0f} | {stream_peak / 1024:>14.0f} | {ratio:>6.1f}x | {legacy_seconds * 1000:>15.1f} | {stream_seconds * 1000:>13.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="مقاييس أداء برنامج إدارة مواعيد منحة البطالة")
+    subparsers = parser.add_subparsers(dest="command")
+    memory_parser = subparsers.add_parser("memory", help="مقارنة حجم تمثيل العضو في الذاكرة")
+    memory_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    throughput_parser = subparsers.add_parser("throughput", help="زمن دورة المراقبة، CPU، الذاكرة وتأخر الواجهة مقابل خادم ANEM محلي")
+    throughput_parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    throughput_parser.add_argument("--backoff", type=float, default=0.2, help="تأخير إعادة المحاولة للعميل بعد 429/5xx (ثوانٍ)")
+    throughput_parser.add_argument("--max-rate", type=float, default=500.0, help="سقف منظم الطلبات المشترك أثناء القياس (طلب/ثانية)")
+    throughput_parser.add_argument("--skip-pdf", action="store_true", help="عدم تحميل ملفات PDF للأعضاء الذين تم حجز مواعيدهم")
+    throughput_parser.add_argument("--json", action="store_true", help="طباعة النتائج بصيغة JSON على stderr")
+    add_server_arguments(throughput_parser)
+    throughput_parser.set_defaults(latency_ms=2.0, jitter_ms=0.5)
+    pdf_parser = subparsers.add_parser("pdf", help="ذروة الذاكرة وزمن تحميل شهادة PDF: المسار السابق مقابل البث إلى ملف")
+    pdf_parser.add_argument("--count", type=int, default=20, help="عدد التحميلات لكل حجم")
+    add_server_arguments(pdf_parser)
+    pdf_parser.set_defaults(latency_ms=2.0, jitter_ms=0.5)
+    pdf_parser.add_argument("--sizes-kb", type=int, nargs="+", default=[150, 2000], help="أحجام ملفات PDF التي يرسلها الخادم (KB)، بدلاً من --pdf-kb")
+    args = parser.parse_args(argv)
+
+    if args.command == "memory":
+        run_memory_benchmark(args.sizes)
+    elif args.command == "throughput":
+        run_throughput_benchmark(args)
+    elif args.command == "pdf":
+        run_pdf_benchmark(args)
+    else:
+        parser.print_help()
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# bulk_import.py
+import csv
+import os
+import logging
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from member import Member
+from utils import clean_ccp_digits
+from config import NIN_LENGTH, CCP_LENGTH
+
+try:
+    import openpyxl # اختياري: مطلوب فقط لاستيراد ملفات Excel
+except ImportError:
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FILE_FILTER = "CSV / Excel (*.csv *.txt *.xlsx *.xlsm);;CSV (*.csv *.txt);;Excel (*.xlsx *.xlsm)"
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm")
+
+# أسماء الأعمدة المقبولة في السطر الأول (بعد التحويل إلى أحرف صغيرة وحذف المسافات)
+_HEADER_ALIASES = {
+    "nin": "nin", "رقمالتعريف": "nin", "رقمالتعريفالوطني": "nin", "التعريفالوطني": "nin",
+    "wassit": "wassit_no", "wassit_no": "wassit_no", "wassitno": "wassit_no", "الوسيط": "wassit_no", "رقمالوسيط": "wassit_no", "رقمطالبالشغل": "wassit_no",
+    "ccp": "ccp", "الحسابالبريدي": "ccp", "رقمالحسابالبريدي": "ccp",
+    "phone": "phone_number", "phone_number": "phone_number", "tel": "phone_number", "الهاتف": "phone_number", "رقمالهاتف": "phone_number",
+}
+_DEFAULT_COLUMN_ORDER = ("nin", "wassit_no", "ccp", "phone_number") # عند غياب سطر العناوين
+PROGRESS_EVERY_ROWS = 500
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer(): # Excel يخزن الأرقام الطويلة كأعداد
+        value = int(value)
+    return str(value).strip()
+
+
+def _header_mapping(first_row):
+    """خريطة فهرس العمود -> اسم الحقل إذا كان السطر الأول سطر عناوين، وإلا None."""
+    mapping = {}
+    for col, cell in enumerate(first_row):
+        key = _cell_text(cell).lower().replace(" ", "").replace("(", "").replace(")", "")
+        if key in _HEADER_ALIASES:
+            mapping[col] = _HEADER_ALIASES[key]
+    return mapping if "nin" in mapping.values() else None
+
+
+def _iter_csv_rows(path):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        for row in csv.reader(f, dialect):
+            yield row
+
+
+def _iter_excel_rows(path):
+    if openpyxl is None:
+        raise ImportError("استيراد ملفات Excel يتطلب مكتبة openpyxl (pip install openpyxl). يمكنك حفظ الملف بصيغة CSV بدلاً من ذلك.")
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True) # قراءة متدفقة دون تحميل الملف كاملاً
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def iter_import_rows(path):
+    """صفوف الملف (قوائم خلايا) بشكل متدفق، حسب امتداده."""
+    if os.path.splitext(path)[1].lower() in EXCEL_EXTENSIONS:
+        return _iter_excel_rows(path)
+    return _iter_csv_rows(path)
+
+
+def validate_import_row(raw_fields):
+    """
+    نفس قواعد نافذة الإضافة: NIN من 18 رقمًا، رقم الوسيط غير فارغ، CCP من 12 رقمًا (10 للحساب + 2 للمفتاح).
+    يعيد (البيانات، None) أو (None، سبب الرفض).
+    """
+    nin = _cell_text(raw_fields.get("nin"))
+    wassit_no = _cell_text(raw_fields.get("wassit_no"))
+    ccp = clean_ccp_digits(_cell_text(raw_fields.get("ccp")))
+    phone_number = _cell_text(raw_fields.get("phone_number"))
+    if not (nin and wassit_no and ccp):
+        return None, "حقول ناقصة (رقم التعريف، رقم الوسيط، والحساب البريدي مطلوبة)"
+    if len(nin) != NIN_LENGTH or not nin.isdigit():
+        return None, f"رقم التعريف الوطني يجب أن يتكون من {NIN_LENGTH} رقمًا"
+    if len(ccp) != CCP_LENGTH:
+        return None, f"رقم الحساب البريدي يجب أن يتكون من {CCP_LENGTH} رقمًا"
+    return {"nin": nin, "wassit_no": wassit_no, "ccp": ccp, "phone_number": phone_number}, None
+
+
+class MemberImportThread(QThread):
+    """
+    قراءة وتحقق ملف الاستيراد خارج خيط الواجهة.
+    لا يلمس قائمة الأعضاء: يعيد قائمة الأعضاء الجدد لتتم إضافتها دفعة واحدة في خيط الواجهة.
+    """
+    progress_signal = pyqtSignal(int, int) # عدد الصفوف المقروءة، عدد الأعضاء المقبولين
+    import_finished_signal = pyqtSignal(list, int, int, list) # الأعضاء الجدد، المكررون، المرفوضون، أمثلة أسباب الرفض
+    import_failed_signal = pyqtSignal(str)
+
+    MAX_REPORTED_ERRORS = 20
+
+    def __init__(self, path, existing_nins, existing_wassit_nos, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self._seen_nins = set(existing_nins) # فهرس التكرار: الأعضاء الحاليون + ما تم قبوله من الملف
+        self._seen_wassit_nos = set(existing_wassit_nos)
+        self.is_running = True
+
+    def stop(self):
+        self.is_running = False
+
+    def run(self):
+        new_members, duplicates_count, rejected_count, error_samples = [], 0, 0, []
+        rows_read = 0
+        try:
+            column_mapping = None
+            for row_number, row in enumerate(iter_import_rows(self.path), start=1):
+                if not self.is_running:
+                    logger.info(f"تم إلغاء استيراد الأعضاء من {self.path} بعد {rows_read} صف.")
+                    return
+                if not row or not any(_cell_text(cell) for cell in row):
+                    continue # سطر فارغ
+                if column_mapping is None:
+                    column_mapping = _header_mapping(row)
+                    if column_mapping is not None:
+                        continue # سطر العناوين
+                    column_mapping = dict(enumerate(_DEFAULT_COLUMN_ORDER))
+                rows_read += 1
+                raw_fields = {field: row[col] for col, field in column_mapping.items() if col < len(row)}
+                data, error = validate_import_row(raw_fields)
+                if error:
+                    rejected_count += 1
+                    if len(error_samples) < self.MAX_REPORTED_ERRORS:
+                        error_samples.append(f"السطر {row_number}: {error}")
+                elif data["nin"] in self._seen_nins or data["wassit_no"] in self._seen_wassit_nos:
+                    duplicates_count += 1
+                else:
+                    self._seen_nins.add(data["nin"])
+                    self._seen_wassit_nos.add(data["wassit_no"])
+                    new_members.append(Member(data["nin"], data["wassit_no"], data["ccp"], data["phone_number"]))
+                if rows_read % PROGRESS_EVERY_ROWS == 0:
+                    self.progress_signal.emit(rows_read, len(new_members))
+        except Exception as e:
+            logger.exception(f"فشل استيراد الأعضاء من {self.path}: {e}")
+            self.import_failed_signal.emit(str(e))
+            return
+        self.progress_signal.emit(rows_read, len(new_members))
+        logger.info(f"استيراد {self.path}: {rows_read} صف، {len(new_members)} جديد، {duplicates_count} مكرر، {rejected_count} مرفوض.")
+        self.import_finished_signal.emit(new_members, duplicates_count, rejected_count, error_samples)
@@ -0,0 +1,94 @@
+# cancellation.py
+import itertools
+import threading
+import weakref
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class CancellationToken:
+    """
+    رمز إلغاء مشترك بين خيوط العمل (بدلاً من فحص is_running كل ثانية أثناء time.sleep).
+    - wait(timeout) ينتظر على Event وينتهي فور الإلغاء، لذلك يأخذ الإيقاف والإغلاق أجزاء من الثانية.
+    - add_callback لمن ينتظر شيئًا آخر (مثل طلب HTTP جارٍ): الدالة تُستدعى مرة واحدة عند الإلغاء.
+    - الرمز الابن (parent=...) يُلغى مع أبيه؛ الأب لا يحتفظ بأبنائه إلا بمرجع ضعيف.
+    """
+
+    def __init__(self, parent=None):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = {} # handle -> دالة تُستدعى عند الإلغاء
+        self._handles = itertools.count()
+        self._children = weakref.WeakSet()
+        if parent is not None:
+            parent._add_child(self)
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+            children = list(self._children)
+        for callback in callbacks: # خارج القفل: الدالة قد تستدعي remove_callback أو تلغي رموزًا أخرى
+            try:
+                callback()
+            except Exception as e:
+                logger.exception(f"خطأ في دالة الإلغاء {callback}: {e}")
+        for child in children:
+            child.cancel()
+
+    def is_cancelled(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        """ينتظر حتى timeout ثانية أو الإلغاء. يعيد True إذا تم الإلغاء."""
+        return self._event.wait(timeout)
+
+    def add_callback(self, callback):
+        """تسجيل دالة تُستدعى عند الإلغاء (فورًا إذا كان الرمز ملغى). يعيد handle لـ remove_callback."""
+        with self._lock:
+            if not self._event.is_set():
+                handle = next(self._handles)
+                self._callbacks[handle] = callback
+                return handle
+        callback()
+        return None
+
+    def remove_callback(self, handle):
+        if handle is not None:
+            with self._lock:
+                self._callbacks.pop(handle, None)
+
+    def _add_child(self, child):
+        with self._lock:
+            if not self._event.is_set():
+                self._children.add(child)
+                return
+        child.cancel()
+
+
+_bound_tokens = threading.local()
+
+
+@contextmanager
+def bind_token(token):
+    """ربط رمز بالخيط الحالي طوال الكتلة: طلبات AnemAPIClient من هذا الخيط تُلغى معه (انظر current_token)."""
+    previous = getattr(_bound_tokens, "token", None)
+    _bound_tokens.token = token
+    try:
+        yield token
+    finally:
+        _bound_tokens.token = previous
+
+
+def current_token():
+    """رمز الخيط الحالي، أو رمز إغلاق البرنامج إذا لم يُربط رمز."""
+    return getattr(_bound_tokens, "token", None) or SHARED_SHUTDOWN_TOKEN
+
+
+# --- Shared Shutdown Token (يُلغى عند إغلاق البرنامج؛ جميع رموز الخيوط أبناء له) ---
+SHARED_SHUTDOWN_TOKEN = CancellationToken()
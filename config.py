@@ -48,6 +48,12 @@ DATA_FILE = os.path.join(APP_DATA_DIR, "members_data.json")
 SETTINGS_FILE = os.path.join(APP_DATA_DIR, "app_settings.json")
 ACTIVATION_STATUS_FILE = os.path.join(APP_DATA_DIR, "activation_status.json")
 DEVICE_ID_FILE = os.path.join(APP_DATA_DIR, "device_id.dat") # ملف جديد لـ device_id
+DEVICE_INFO_CACHE_FILE = os.path.join(APP_DATA_DIR, "device_info_cache.json") # بصمة الجهاز و IP العام المخزنة مؤقتًا (firebase_service.py)
+MEMBERS_DB_FILE = os.path.join(APP_DATA_DIR, "members_data.db") # مخزن SQLite الاختياري للأعضاء
+API_CACHE_DB_FILE = os.path.join(APP_DATA_DIR, "api_cache.db") # ذاكرة ردود البوابة (response_cache.py)
+PDF_MANIFEST_DB_FILE = os.path.join(APP_DATA_DIR, "pdf_manifest.db") # سجل ملفات PDF المحملة (pdf_manifest.py)
+PDF_BULK_QUEUE_FILE = os.path.join(APP_DATA_DIR, "pdf_bulk_queue.json") # الأعضاء المتبقون في التحميل الجماعي (يُستأنف بعد إعادة التشغيل)
+MONITOR_CHECKPOINT_DB_FILE = os.path.join(APP_DATA_DIR, "monitor_checkpoints.db") # آخر فحص ونتيجة وموعد الفحص التالي لكل عضو (monitor_checkpoints.py)
 
 # --- Temporary and Backup File Names (Updated to use APP_DATA_DIR) ---
 DATA_FILE_TMP = DATA_FILE + ".tmp"
@@ -60,8 +66,9 @@ STYLESHEET_FILE = "styles_dark.txt" # يبقى كما هو، يُفترض أنه
 FIREBASE_SERVICE_ACCOUNT_KEY_FILE = "firebase_service_account_key.json" # يبقى كما هو، يُفترض أنه مورد
 
 # --- API Configuration ---
-BASE_API_URL = "https://ac-controle.anem.dz/AllocationChomage/api"
-MAIN_SITE_CHECK_URL = "https://ac-controle.anem.dz/"
+# يمكن توجيههما إلى خادم محلي (mock_anem_server.py) عبر متغيرات البيئة للاختبار وقياس الأداء
+BASE_API_URL = os.environ.get("ANEM_BASE_API_URL", "https://ac-controle.anem.dz/AllocationChomage/api")
+MAIN_SITE_CHECK_URL = os.environ.get("ANEM_MAIN_SITE_CHECK_URL", "https://ac-controle.anem.dz/")
 
 # --- Session Object (shared across API clients if needed) ---
 SESSION = requests.Session()
@@ -85,6 +92,11 @@ SETTING_MONITORING_INTERVAL = "monitoring_interval"
 SETTING_BACKOFF_429 = "backoff_429"
 SETTING_BACKOFF_GENERAL = "backoff_general"
 SETTING_REQUEST_TIMEOUT = "request_timeout"
+SETTING_STORAGE_BACKEND = "storage_backend"
+
+# --- Storage Backends ---
+STORAGE_BACKEND_JSON = "json"
+STORAGE_BACKEND_SQLITE = "sqlite"
 
 # --- Default Settings (if settings file is missing or corrupted) ---
 DEFAULT_SETTINGS = {
@@ -93,19 +105,51 @@ DEFAULT_SETTINGS = {
     SETTING_MONITORING_INTERVAL: 1,
     SETTING_BACKOFF_429: 60,
     SETTING_BACKOFF_GENERAL: 5,
-    SETTING_REQUEST_TIMEOUT: 30
+    SETTING_REQUEST_TIMEOUT: 30,
+    SETTING_STORAGE_BACKEND: STORAGE_BACKEND_JSON
 }
 
 # --- Retry Mechanism Constants (used by AnemAPIClient) ---
 MAX_RETRIES = 3
 MAX_BACKOFF_DELAY = 120
+API_RATE_MAX_PER_SECOND = 2.0 # الحد الأقصى لمعدل الطلبات المشترك بين جميع العملاء (rate_governor.py)
+API_RATE_MIN_PER_SECOND = 0.05 # أدنى معدل بعد أخطاء 429/5xx المتتالية
+API_RATE_BURST = 4 # عدد الطلبات المسموح بها دفعة واحدة بعد فترة هدوء
+API_REQUEST_IO_MAX_WORKERS = 16 # خيوط تنفيذ طلبات HTTP (api_client.py): الخيط المستدعي ينتظرها أو إلغاء رمزه، أيهما أسبق
+
+# --- Response Cache (response_cache.py) ---
+# بيانات الهوية فقط. validateCandidate لا يُخزن: الأهلية وحالة الموعد يجب أن تكون حديثة دائمًا
+# (رد سابق للحجز من الذاكرة كان يمسح rdv_id ويعيد حجز العضو).
+API_CACHE_TTL_SECONDS = {
+    "PreInscription/GetPreInscription": 7 * 24 * 3600, # الاسم واللقب لا يتغيران تقريبًا
+}
+API_CACHE_MAX_ENTRIES = 50000
+
+# --- Monitoring Scheduler (monitor_scheduler.py) ---
+# فترة فحص أعضاء الحجز هي فترة المراقبة في الإعدادات؛ باقي الفئات:
+SCHEDULER_PDF_INTERVAL_SECONDS = 5 * 60 # موعد محجوز وملفات PDF ناقصة
+SCHEDULER_RETRY_INTERVAL_SECONDS = 5 * 60 # بعد خطأ مؤقت (تتضاعف مع الفشل المتتالي)
+SCHEDULER_SLOW_INTERVAL_SECONDS = 6 * 3600 # يتطلب تسجيل مسبق، غير مؤهل للحجز
+SCHEDULER_UNCHANGED_BACKOFF_FACTOR = 1.5 # مضاعف الفترة عند تكرار نفس النتيجة
+SCHEDULER_BUSY_RETRY_SECONDS = 30 # عضو قيد المعالجة في خيط آخر: إعادة المحاولة بعد
+MONITOR_CHECKPOINT_FRESHNESS_SECONDS = 6 * 3600 # عند بدء المراقبة: العضو الذي فُحص قبل أقل من هذه المدة لا يدخل الفحص الأولي، ويُفحص على أبعد تقدير عند انتهائها
+PDF_MANIFEST_SWEEP_INTERVAL_SECONDS = 30 * 60 # فحص سلامة ملفات PDF المسجلة (الأول عند بدء المراقبة)
 
 # --- Other Application Constants ---
 MAX_ERROR_DISPLAY_LENGTH = 70
+NIN_LENGTH = 18 # رقم التعريف الوطني
+CCP_LENGTH = 12 # الحساب البريدي: 10 أرقام للحساب + رقمان للمفتاح
+MEMBERS_SAVE_DEBOUNCE_MS = 1500 # تجميع تغييرات الأعضاء في عملية كتابة واحدة على القرص
+SEARCH_DEBOUNCE_MS = 250 # انتظار توقف الكتابة في حقل البحث قبل تطبيق الفلتر
+GUI_UPDATE_COALESCE_MS = 80 # تجميع إشارات خيط المراقبة في دفعة تحديث واحدة للواجهة
+INITIAL_FETCH_MAX_WORKERS = 2 # عدد خيوط طابور جلب المعلومات الأولية (التأخير بين الأعضاء مشترك بينها)
+PDF_DOWNLOAD_MAX_WORKERS = 3 # عدد خيوط طابور تحميل الشهادات (download_manager.py)
 APP_ID_FALLBACK = 'anem-booking-app-pyqt14-refactored-v2' # تم تغيير الـ fallback قليلاً للتمييز
 
 # --- Firebase Activation Constants ---
 FIRESTORE_ACTIVATION_CODES_COLLECTION = "activation_codes"
+DEVICE_INFO_CACHE_TTL_SECONDS = 6 * 3600 # صلاحية بصمة الجهاز المخزنة (اسم الجهاز، النظام، IP المحلي والعام)
+DEVICE_INFO_FAILED_IP_RETRY_SECONDS = 5 * 60 # إذا فشل الحصول على IP العام: إعادة المحاولة بعد هذه المدة بدلاً من TTL الكامل
 
 try:
     APP_ID = __app_id
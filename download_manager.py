@@ -0,0 +1,229 @@
+# download_manager.py
+import os
+import json
+import time
+import threading
+import logging
+
+from PyQt5.QtCore import QObject, QThreadPool
+
+from threads import MemberPdfDownloadJob, PdfDownloadSignals
+from fetch_queue import MemberRequestPacer
+from config import (
+    PDF_DOWNLOAD_MAX_WORKERS, PDF_BULK_QUEUE_FILE,
+    SETTING_MIN_MEMBER_DELAY, SETTING_MAX_MEMBER_DELAY, DEFAULT_SETTINGS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PersistedBulkQueue:
+    """
+    قائمة NIN للأعضاء المتبقين في التحميل الجماعي، محفوظة في APP_DATA_DIR لاستئناف التحميل بعد إعادة التشغيل.
+    الكتابة عبر ملف مؤقت ثم استبدال ذري (مثل ملف الإعدادات)، والملف يُحذف عند فراغ القائمة.
+    """
+
+    def __init__(self, path=PDF_BULK_QUEUE_FILE):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                nins = json.load(f)
+            return [nin for nin in nins if isinstance(nin, str) and nin]
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"تعذر قراءة طابور التحميل الجماعي {self.path}، سيتم تجاهله: {e}")
+            return []
+
+    def save(self, nins):
+        try:
+            if not nins:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(list(nins), f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"فشل حفظ طابور التحميل الجماعي {self.path}: {e}")
+
+
+class PdfDownloadManager(QObject):
+    """
+    طابور واحد محدود لتحميل شهادات PDF (بدلاً من DownloadAllPdfsThread لكل عضو).
+    - عدد ثابت من الخيوط المعاد استخدامها (QThreadPool)، وعضو واحد = مهمة واحدة على الأكثر في الطابور.
+    - المهمة تحجز العضو (SHARED_MEMBER_CLAIMS) قبل التحميل، فتنتظر خيط المراقبة أو الجلب الأولي الجاري له.
+    - تحميل نفس (ID التسجيل المسبق، نوع الشهادة) مرتين في نفس الوقت، حتى من خيط المراقبة، يتم مرة واحدة (SHARED_PDF_DOWNLOADS).
+    - التحميل الجماعي يلتزم بالتأخير بين الأعضاء من الإعدادات، ويُحفظ ما تبقى منه في PDF_BULK_QUEUE_FILE
+      ليُستأنف بعد إعادة التشغيل (resume_bulk).
+    - progress_signal يعطي تقدم الدفعة الحالية (من أول مهمة حتى فراغ الطابور) مع السرعة والوقت المتبقي.
+    - المهام المنتظرة يمكن إلغاؤها قبل أن تبدأ، والجارية تتوقف بعد الشهادة الحالية.
+    """
+
+    def __init__(self, settings, max_workers=PDF_DOWNLOAD_MAX_WORKERS, parent=None, bulk_queue=None):
+        super().__init__(parent)
+        self.signals = PdfDownloadSignals(self) # يتم ربط الإشارات مرة واحدة في الواجهة
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_workers)
+        self._pacer = MemberRequestPacer(
+            settings.get(SETTING_MIN_MEMBER_DELAY, DEFAULT_SETTINGS[SETTING_MIN_MEMBER_DELAY]),
+            settings.get(SETTING_MAX_MEMBER_DELAY, DEFAULT_SETTINGS[SETTING_MAX_MEMBER_DELAY])
+        )
+        self._bulk_queue = bulk_queue or PersistedBulkQueue()
+        self._lock = threading.Lock()
+        self._jobs = {} # id(member) -> المهمة المنتظرة أو الجارية
+        self._bulk_nins = {} # NIN -> None: أعضاء التحميل الجماعي المتبقون (بالترتيب)، نسخة مما في الملف
+        self._batch_total = 0
+        self._batch_done = 0
+        self._batch_started_at = None
+        self._batch_bytes = 0
+
+    def update_settings(self, settings):
+        self._pacer.set_delays(
+            settings.get(SETTING_MIN_MEMBER_DELAY, DEFAULT_SETTINGS[SETTING_MIN_MEMBER_DELAY]),
+            settings.get(SETTING_MAX_MEMBER_DELAY, DEFAULT_SETTINGS[SETTING_MAX_MEMBER_DELAY])
+        )
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._jobs)
+
+    def bulk_remaining_count(self):
+        with self._lock:
+            return len(self._bulk_nins)
+
+    def is_downloading(self, member):
+        with self._lock:
+            job = self._jobs.get(id(member))
+            return job is not None and job.member is member and job.is_running
+
+    def submit(self, member, api_client, interactive=True):
+        """إضافة عضو إلى الطابور. يعيد False إذا كانت له مهمة منتظرة أو جارية بالفعل."""
+        with self._lock:
+            if not self._submit_locked(member, api_client, interactive):
+                return False
+            progress = self._progress_locked()
+        self.signals.progress_signal.emit(*progress)
+        return True
+
+    def submit_many(self, members, api_client):
+        """تحميل جماعي (غير تفاعلي) لعدة أعضاء على نفس الطابور المحدود، مع حفظه للاستئناف. يعيد عدد الأعضاء المضافين."""
+        added = 0
+        with self._lock:
+            for member in members:
+                self._bulk_nins[member.nin] = None
+                if self._submit_locked(member, api_client, interactive=False):
+                    added += 1
+            self._bulk_queue.save(self._bulk_nins)
+            progress = self._progress_locked()
+        if added:
+            logger.info(f"تمت إضافة {added} عضو إلى طابور تحميل الشهادات.")
+            self.signals.progress_signal.emit(*progress)
+        return added
+
+    def resume_bulk(self, members, api_client, is_still_needed):
+        """
+        استئناف التحميل الجماعي المحفوظ من جلسة سابقة. is_still_needed(member): هل ما زال العضو بحاجة إلى شهادات
+        (مثلاً حسب السجل)؛ الأعضاء المحذوفون أو المكتملون يُزالون من الطابور. يعيد عدد الأعضاء المستأنفين.
+        """
+        saved_nins = self._bulk_queue.load()
+        if not saved_nins:
+            return 0
+        members_by_nin = {member.nin: member for member in members}
+        members_to_resume = [members_by_nin[nin] for nin in saved_nins if nin in members_by_nin and is_still_needed(members_by_nin[nin])]
+        if not members_to_resume:
+            self._bulk_queue.save(())
+            logger.info(f"طابور التحميل الجماعي المحفوظ ({len(saved_nins)} عضو) لم يعد يحتوي على شهادات ناقصة.")
+            return 0
+        logger.info(f"استئناف التحميل الجماعي: {len(members_to_resume)} من أصل {len(saved_nins)} عضو في الطابور المحفوظ.")
+        return self.submit_many(members_to_resume, api_client)
+
+    def cancel(self, member):
+        with self._lock:
+            if self._bulk_nins.pop(member.nin, 0) is None:
+                self._bulk_queue.save(self._bulk_nins)
+            job = self._jobs.get(id(member))
+            if job is None or job.member is not member:
+                return
+            self._cancel_job_locked(job)
+            progress = self._progress_locked()
+        self.signals.progress_signal.emit(*progress)
+
+    def cancel_bulk(self):
+        """إيقاف التحميل الجماعي: إلغاء مهامه وحذف الطابور المحفوظ (التحميلات الفردية تستمر)."""
+        with self._lock:
+            for job in list(self._jobs.values()):
+                if not job.interactive:
+                    self._cancel_job_locked(job)
+            self._bulk_nins = {}
+            self._bulk_queue.save(())
+            progress = self._progress_locked()
+        self.signals.progress_signal.emit(*progress)
+        logger.info("تم إيقاف التحميل الجماعي للشهادات.")
+
+    def cancel_all(self):
+        """إلغاء جميع المهام (عند الإغلاق). الطابور الجماعي المحفوظ يبقى كما هو ليُستأنف في الجلسة التالية."""
+        with self._lock:
+            for job in list(self._jobs.values()):
+                self._cancel_job_locked(job)
+            progress = self._progress_locked()
+        self.signals.progress_signal.emit(*progress)
+        logger.info("تم إلغاء جميع مهام تحميل الشهادات المنتظرة.")
+
+    def shutdown(self, timeout_ms=2000):
+        self.cancel_all()
+        if not self._pool.waitForDone(timeout_ms):
+            logger.warning("مهام تحميل الشهادات لم تنتهِ في الوقت المناسب عند الإغلاق.")
+
+    # --- دوال داخلية ---
+    def _submit_locked(self, member, api_client, interactive):
+        existing_job = self._jobs.get(id(member))
+        if existing_job is not None and existing_job.member is member: # منتظرة أو جارية: لا مهمة ثانية لنفس العضو
+            existing_job.interactive = existing_job.interactive or interactive
+            return False
+        job = MemberPdfDownloadJob(member, api_client, self.signals, interactive, pacer=self._pacer, on_done=self._job_done)
+        self._jobs[id(member)] = job
+        if self._batch_started_at is None:
+            self._batch_started_at = time.monotonic()
+        self._batch_total += 1
+        self._pool.start(job)
+        return True
+
+    def _cancel_job_locked(self, job):
+        job.stop()
+        if self._pool.tryTake(job): # لم تبدأ بعد: إزالتها من طابور المجمع مباشرة
+            self._jobs.pop(id(job.member), None)
+            self._batch_total -= 1
+            self._reset_batch_if_idle_locked()
+
+    def _job_done(self, job):
+        # يُستدعى من خيط المهمة
+        with self._lock:
+            if self._jobs.get(id(job.member)) is job:
+                del self._jobs[id(job.member)]
+            if job.is_running and self._bulk_nins.pop(job.member.nin, 0) is None: # انتهت (بنجاح أو فشل) ولم تُوقف عند الإغلاق
+                self._bulk_queue.save(self._bulk_nins)
+            self._batch_done += 1
+            self._batch_bytes += job.downloaded_bytes
+            progress = self._progress_locked()
+            self._reset_batch_if_idle_locked()
+        self.signals.progress_signal.emit(*progress)
+
+    def _progress_locked(self):
+        """(المنتهون، الإجمالي، عضو/دقيقة، بايت/ثانية، الثواني المتبقية أو -1) منذ بداية الدفعة الحالية."""
+        elapsed = time.monotonic() - self._batch_started_at if self._batch_started_at is not None else 0.0
+        if elapsed <= 0 or not self._batch_done:
+            return self._batch_done, self._batch_total, 0.0, 0.0, -1.0
+        members_per_second = self._batch_done / elapsed
+        eta_seconds = (self._batch_total - self._batch_done) / members_per_second
+        return self._batch_done, self._batch_total, members_per_second * 60, self._batch_bytes / elapsed, eta_seconds
+
+    def _reset_batch_if_idle_locked(self):
+        if not self._jobs:
+            self._batch_total = 0
+            self._batch_done = 0
+            self._batch_started_at = None
+            self._batch_bytes = 0
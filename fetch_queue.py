@@ -0,0 +1,115 @@
+# fetch_queue.py
+import time
+import random
+import threading
+import logging
+
+from PyQt5.QtCore import QObject, QThreadPool
+
+from threads import FetchInitialInfoJob, FetchInitialInfoSignals
+from config import SETTING_MIN_MEMBER_DELAY, SETTING_MAX_MEMBER_DELAY, DEFAULT_SETTINGS, INITIAL_FETCH_MAX_WORKERS
+
+logger = logging.getLogger(__name__)
+
+
+class MemberRequestPacer:
+    """
+    تأخير مشترك بين المهام: كل مهمة تحجز موعد بدئها بعد سابقتها بفاصل عشوائي
+    بين الحد الأدنى والأقصى للتأخير بين الأعضاء (نفس إعدادات المراقبة).
+    """
+
+    def __init__(self, min_delay, max_delay):
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self.set_delays(min_delay, max_delay)
+
+    def set_delays(self, min_delay, max_delay):
+        with self._lock:
+            self._min_delay = max(0.0, float(min_delay))
+            self._max_delay = max(self._min_delay, float(max_delay))
+
+    def wait_for_turn(self, cancel_token):
+        """ينتظر حتى موعد المهمة. يعيد False إذا أُلغي cancel_token (CancellationToken) أثناء الانتظار."""
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_slot)
+            self._next_slot = start_at + random.uniform(self._min_delay, self._max_delay)
+        return not cancel_token.wait(max(0.0, start_at - time.monotonic()))
+
+
+class InitialFetchQueue(QObject):
+    """
+    طابور واحد محدود لجلب المعلومات الأولية (بدلاً من FetchInitialInfoThread لكل عضو).
+    - عدد ثابت من الخيوط المعاد استخدامها (QThreadPool)، والمهام المنتهية لا يُحتفظ بها.
+    - عضو واحد = مهمة واحدة على الأكثر في الطابور، والمهمة تحجز العضو (SHARED_MEMBER_CLAIMS) فتنتظر خيط المراقبة أو التحميل الجاري له.
+    - المهام المنتظرة يمكن إلغاؤها قبل أن تبدأ، والجارية تتوقف عند نقطة التحقق التالية.
+    """
+
+    def __init__(self, settings, max_workers=INITIAL_FETCH_MAX_WORKERS, parent=None):
+        super().__init__(parent)
+        self.signals = FetchInitialInfoSignals(self) # يتم ربط الإشارات مرة واحدة في الواجهة
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_workers)
+        self._pacer = MemberRequestPacer(
+            settings.get(SETTING_MIN_MEMBER_DELAY, DEFAULT_SETTINGS[SETTING_MIN_MEMBER_DELAY]),
+            settings.get(SETTING_MAX_MEMBER_DELAY, DEFAULT_SETTINGS[SETTING_MAX_MEMBER_DELAY])
+        )
+        self._lock = threading.Lock()
+        self._jobs = {} # id(member) -> المهمة المنتظرة أو الجارية
+
+    def update_settings(self, settings):
+        self._pacer.set_delays(
+            settings.get(SETTING_MIN_MEMBER_DELAY, DEFAULT_SETTINGS[SETTING_MIN_MEMBER_DELAY]),
+            settings.get(SETTING_MAX_MEMBER_DELAY, DEFAULT_SETTINGS[SETTING_MAX_MEMBER_DELAY])
+        )
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._jobs)
+
+    def submit(self, member, api_client, auto_check_after=False):
+        """
+        إضافة عضو إلى الطابور. إذا كانت له مهمة منتظرة يتم الاحتفاظ بها (تقرأ بيانات العضو عند التنفيذ)،
+        وإذا كانت مهمته جارية يتم إيقافها وإضافة مهمة جديدة (مثلاً بعد تعديل المعرفات).
+        """
+        with self._lock:
+            existing_job = self._jobs.get(id(member))
+            if existing_job is not None and existing_job.member is member:
+                if not existing_job.started and existing_job.is_running:
+                    existing_job.auto_check_after = existing_job.auto_check_after or auto_check_after
+                    existing_job.api_client = api_client
+                    return False
+                existing_job.stop()
+            job = FetchInitialInfoJob(member, api_client, self.signals, self._pacer, auto_check_after, on_done=self._job_done)
+            self._jobs[id(member)] = job
+        self._pool.start(job)
+        return True
+
+    def cancel(self, member):
+        with self._lock:
+            job = self._jobs.get(id(member))
+            if job is None or job.member is not member:
+                return
+            self._cancel_job_locked(job)
+
+    def cancel_all(self):
+        with self._lock:
+            for job in list(self._jobs.values()):
+                self._cancel_job_locked(job)
+        logger.info("تم إلغاء جميع مهام جلب المعلومات الأولية المنتظرة.")
+
+    def shutdown(self, timeout_ms=2000):
+        self.cancel_all()
+        if not self._pool.waitForDone(timeout_ms):
+            logger.warning("مهام جلب المعلومات الأولية لم تنتهِ في الوقت المناسب عند الإغلاق.")
+
+    def _cancel_job_locked(self, job):
+        job.stop()
+        if self._pool.tryTake(job): # لم تبدأ بعد: إزالتها من طابور المجمع مباشرة
+            self._jobs.pop(id(job.member), None)
+
+    def _job_done(self, job):
+        # يُستدعى من خيط المهمة
+        with self._lock:
+            if self._jobs.get(id(job.member)) is job:
+                del self._jobs[id(job.member)]
@@ -1,6 +1,4 @@
 # firebase_service.py (User App - Updated to align with Admin Panel Logic - AppData Paths)
-import firebase_admin
-from firebase_admin import credentials, firestore
 import os
 import json
 import logging
@@ -19,13 +17,31 @@ from config import (
     # --- استخدام الثوابت المحدثة للمسارات ---
     ACTIVATION_STATUS_FILE, 
     DEVICE_ID_FILE, # تم استيراد هذا حديثًا
-    FIRESTORE_ACTIVATION_CODES_COLLECTION
+    DEVICE_INFO_CACHE_FILE,
+    FIRESTORE_ACTIVATION_CODES_COLLECTION,
+    DEVICE_INFO_CACHE_TTL_SECONDS, DEVICE_INFO_FAILED_IP_RETRY_SECONDS
 )
 from utils import resource_path
 
 
 logger = logging.getLogger(__name__)
 
+# firebase_admin (ومعه gRPC و Firestore) يُستورد عند أول تهيئة فقط، وليس عند تحميل الوحدة: أبطأ استيراد في بدء التشغيل
+firebase_admin = None
+credentials = None
+firestore = None
+
+
+def _import_firebase_sdk():
+    global firebase_admin, credentials, firestore
+    if firebase_admin is None:
+        import firebase_admin as firebase_admin_module
+        from firebase_admin import exceptions as _exceptions_module # noqa: F401 (firebase_admin.exceptions في معالجة الأخطاء)
+        from firebase_admin import credentials as credentials_module, firestore as firestore_module
+        credentials, firestore = credentials_module, firestore_module
+        firebase_admin = firebase_admin_module
+
+
 class FirebaseService:
     _instance = None
     _lock = threading.Lock()
@@ -37,17 +53,35 @@ class FirebaseService:
                     cls._instance = super(FirebaseService, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self):
-        if hasattr(self, '_initialized_by_instance') and self._initialized_by_instance:
-            return
+    def __init__(self, initialize=True):
+        """
+        initialize=False: إنشاء الكائن فقط دون تحميل بيانات الاعتماد وإنشاء عميل Firestore
+        (عملية بطيئة)، ليتم ذلك لاحقًا عبر initialize() من خيط في الخلفية عند بدء التشغيل.
+        """
+        if not hasattr(self, '_initialized_by_instance'):
+            with self._lock:
+                if not hasattr(self, '_initialized_by_instance'):
+                    self.db = None
+                    self.app_initialized = False
+                    self._code_listeners = {}  # To store active listeners {code_id: listener_watch_object}
+                    self._listener_stop_events = {} # {code_id: threading.Event()}
+                    self._device_lock = threading.Lock()
+                    self._device_id = None # يُقرأ من DEVICE_ID_FILE مرة واحدة
+                    self._device_info_cache = None # {"cached_at": ..., "device_info": {...}}، نسخة من DEVICE_INFO_CACHE_FILE
+                    self._initialized_by_instance = False
+        if initialize:
+            self.initialize()
+
+    def initialize(self):
+        """تهيئة Firebase Admin SDK (مرة واحدة، آمنة من أي خيط). تعيد is_initialized()."""
+        if self._initialized_by_instance:
+            return self.is_initialized()
 
         with self._lock:
-            self.db = None
-            self.app_initialized = False
-            self._code_listeners = {}  # To store active listeners {code_id: listener_watch_object}
-            self._listener_stop_events = {} # {code_id: threading.Event()}
-
+            if self._initialized_by_instance:
+                return self.is_initialized()
             try:
+                _import_firebase_sdk()
                 key_file_path = resource_path(FIREBASE_SERVICE_ACCOUNT_KEY_FILE)
                 logger.info(f"FirebaseService (User): Attempting to initialize Firebase using key file: {key_file_path}")
 
@@ -71,6 +105,7 @@ class FirebaseService:
             except Exception as e:
                 logger.exception(f"FirebaseService (User): An error occurred during Firebase Admin SDK initialization: {e}")
                 self._initialized_by_instance = False
+        return self.is_initialized()
 
     def is_initialized(self):
         return self.app_initialized and self.db is not None
@@ -87,8 +122,17 @@ class FirebaseService:
             return dt_obj.astimezone(datetime.timezone.utc)
         return None
 
-    def get_device_info(self):
-        device_info = {}
+    def get_device_id(self):
+        """
+        المسار السريع لمعرف الجهاز فقط (generated_device_id): قراءة DEVICE_ID_FILE مرة واحدة في الجلسة
+        (أو إنشاؤه)، دون جمع بقية البصمة ودون أي وصول إلى الشبكة.
+        """
+        with self._device_lock:
+            if self._device_id is None:
+                self._device_id = self._load_or_create_device_id()
+            return self._device_id
+
+    def _load_or_create_device_id(self):
         # --- استخدام DEVICE_ID_FILE من config.py ---
         local_device_id_file = DEVICE_ID_FILE 
         generated_id = None
@@ -105,12 +149,64 @@ class FirebaseService:
                 logger.info(f"FirebaseService (User): Generated and stored new device UUID: {generated_id} to {local_device_id_file}")
             else:
                 logger.debug(f"FirebaseService (User): Loaded device UUID: {generated_id} from {local_device_id_file}")
-            device_info["generated_device_id"] = generated_id
+            return generated_id
         except Exception as e:
             logger.error(f"FirebaseService (User): Error getting or creating device UUID at {local_device_id_file}: {e}")
             # كحل بديل، قم بإنشاء معرف مؤقت في الذاكرة فقط إذا فشلت الكتابة/القراءة
-            device_info["generated_device_id"] = str(uuid.uuid4()) + "-inmemory"
+            return str(uuid.uuid4()) + "-inmemory"
+
+    def get_device_info(self, force_refresh=False):
+        """
+        بصمة الجهاز الكاملة (لتسجيل التفعيل). تُخزن مع وقت جمعها في DEVICE_INFO_CACHE_FILE بجانب معرف الجهاز،
+        وتُعاد من الذاكرة أو الملف ما دامت أحدث من DEVICE_INFO_CACHE_TTL_SECONDS (أو DEVICE_INFO_FAILED_IP_RETRY_SECONDS
+        إذا فشل الحصول على IP العام). لمعرف الجهاز فقط استخدم get_device_id().
+        """
+        device_id = self.get_device_id()
+        with self._device_lock:
+            if not force_refresh:
+                if self._device_info_cache is None:
+                    self._device_info_cache = self._read_device_info_cache_file()
+                if self._is_device_info_cache_fresh(self._device_info_cache, device_id):
+                    return dict(self._device_info_cache["device_info"])
+            device_info = self._collect_device_info(device_id)
+            self._device_info_cache = {"cached_at": time.time(), "device_info": device_info}
+            if not device_id.endswith("-inmemory"):
+                self._write_device_info_cache_file(self._device_info_cache)
+            return dict(device_info)
+
+    def _is_device_info_cache_fresh(self, cache, device_id):
+        if not cache or not isinstance(cache.get("device_info"), dict):
+            return False
+        device_info = cache["device_info"]
+        if device_info.get("generated_device_id") != device_id:
+            return False
+        ttl_seconds = DEVICE_INFO_CACHE_TTL_SECONDS
+        if str(device_info.get("public_ip", "N/A")).startswith("Error_"):
+            ttl_seconds = DEVICE_INFO_FAILED_IP_RETRY_SECONDS
+        age_seconds = time.time() - cache.get("cached_at", 0)
+        return 0 <= age_seconds < ttl_seconds
+
+    def _read_device_info_cache_file(self):
+        if not os.path.exists(DEVICE_INFO_CACHE_FILE):
+            return None
+        try:
+            with open(DEVICE_INFO_CACHE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"FirebaseService (User): Could not read device info cache {DEVICE_INFO_CACHE_FILE}: {e}")
+            return None
+
+    def _write_device_info_cache_file(self, cache):
+        tmp_path = DEVICE_INFO_CACHE_FILE + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, DEVICE_INFO_CACHE_FILE)
+        except Exception as e:
+            logger.warning(f"FirebaseService (User): Could not save device info cache {DEVICE_INFO_CACHE_FILE}: {e}")
 
+    def _collect_device_info(self, generated_id):
+        device_info = {"generated_device_id": generated_id}
 
         try: device_info["system_username"] = getpass.getuser()
         except Exception: device_info["system_username"] = "N/A"
@@ -276,7 +372,7 @@ class FirebaseService:
         if not code_to_activate or not code_to_activate.strip():
             return False, "كود التفعيل فارغ أو غير صالح.", None
 
-        current_device_full_info = self.get_device_info()
+        current_device_full_info = self.get_device_info() # من الذاكرة المؤقتة إذا كانت حديثة
         current_device_id = current_device_full_info.get("generated_device_id")
         if not current_device_id or "-inmemory" in current_device_id: # التحقق إذا كان المعرف مؤقتًا
             logger.error("FirebaseService (User): Failed to get persistent current device ID for activation.")
@@ -2,13 +2,14 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
     QPushButton, QDialog, QFormLayout, QDialogButtonBox,
-    QSpinBox, QStyle, QApplication, QDesktopWidget, QTextEdit,
+    QSpinBox, QStyle, QApplication, QDesktopWidget, QTextEdit, QComboBox,
     QScrollArea, QFrame,QSizePolicy, QGridLayout, QGraphicsDropShadowEffect
 )
 from PyQt5.QtCore import Qt, QTimer, QPoint, QEasingCurve, QPropertyAnimation, QRegularExpression, pyqtSignal, QDateTime
 from PyQt5.QtGui import QIcon, QRegularExpressionValidator, QColor, QPixmap, QFont
 
-from utils import QColorConstants # Assuming utils.py is available and contains QColorConstants
+from utils import QColorConstants, clean_ccp_digits, format_ccp_digits # Assuming utils.py is available and contains QColorConstants
+from config import CCP_LENGTH
 import datetime # Ensure datetime is imported for type checking
 
 
@@ -153,13 +154,8 @@ class AddMemberDialog(QDialog):
         layout.addRow(self.buttons)
 
     def format_ccp_input(self, text):
-        cleaned_text = ''.join(filter(str.isdigit, text))
-        if len(cleaned_text) > 12:
-            cleaned_text = cleaned_text[:12]
-        if len(cleaned_text) > 10:
-            formatted_text = f"{cleaned_text[:10]} {cleaned_text[10:]}"
-        else:
-            formatted_text = cleaned_text
+        cleaned_text = clean_ccp_digits(text)[:CCP_LENGTH]
+        formatted_text = format_ccp_digits(cleaned_text)
         self.ccp_input.blockSignals(True)
         self.ccp_input.setText(formatted_text)
         self.ccp_input.setCursorPosition(len(formatted_text))
@@ -216,13 +212,8 @@ class EditMemberDialog(QDialog):
         layout.addRow(self.buttons)
 
     def format_ccp_input_edit(self, text):
-        cleaned_text = ''.join(filter(str.isdigit, text))
-        if len(cleaned_text) > 12:
-            cleaned_text = cleaned_text[:12]
-        if len(cleaned_text) > 10:
-            formatted_text = f"{cleaned_text[:10]} {cleaned_text[10:]}"
-        else:
-            formatted_text = cleaned_text
+        cleaned_text = clean_ccp_digits(text)[:CCP_LENGTH]
+        formatted_text = format_ccp_digits(cleaned_text)
         
         current_cursor_pos = self.ccp_input.cursorPosition()
         self.ccp_input.blockSignals(True)
@@ -254,7 +245,8 @@ class SettingsDialog(QDialog):
         from config import ( 
             SETTING_MIN_MEMBER_DELAY, SETTING_MAX_MEMBER_DELAY,
             SETTING_MONITORING_INTERVAL, SETTING_BACKOFF_429,
-            SETTING_BACKOFF_GENERAL, SETTING_REQUEST_TIMEOUT, DEFAULT_SETTINGS
+            SETTING_BACKOFF_GENERAL, SETTING_REQUEST_TIMEOUT, DEFAULT_SETTINGS,
+            SETTING_STORAGE_BACKEND, STORAGE_BACKEND_JSON, STORAGE_BACKEND_SQLITE
         )
 
         self.current_settings = current_settings
@@ -291,6 +283,12 @@ class SettingsDialog(QDialog):
         self.request_timeout_spin.setValue(self.current_settings.get(SETTING_REQUEST_TIMEOUT, DEFAULT_SETTINGS[SETTING_REQUEST_TIMEOUT]))
         self.request_timeout_spin.setSuffix(" ثانية")
 
+        self.storage_backend_combo = QComboBox(self)
+        self.storage_backend_combo.addItem("ملف JSON (افتراضي)", STORAGE_BACKEND_JSON)
+        self.storage_backend_combo.addItem("قاعدة بيانات SQLite (للقوائم الكبيرة)", STORAGE_BACKEND_SQLITE)
+        current_backend = self.current_settings.get(SETTING_STORAGE_BACKEND, DEFAULT_SETTINGS[SETTING_STORAGE_BACKEND])
+        backend_index = self.storage_backend_combo.findData(current_backend)
+        self.storage_backend_combo.setCurrentIndex(backend_index if backend_index >= 0 else 0)
 
         layout.addRow("أقل تأخير بين الأعضاء:", self.min_delay_spin)
         layout.addRow("أقصى تأخير بين الأعضاء:", self.max_delay_spin)
@@ -298,6 +296,7 @@ class SettingsDialog(QDialog):
         layout.addRow("تأخير أولي لخطأ 429 (طلبات كثيرة):", self.backoff_429_spin)
         layout.addRow("تأخير أولي للأخطاء العامة:", self.backoff_general_spin)
         layout.addRow("مهلة الطلب للواجهة البرمجية (API):", self.request_timeout_spin)
+        layout.addRow("طريقة تخزين بيانات الأعضاء:", self.storage_backend_combo)
 
 
         self.buttons = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Cancel, Qt.Horizontal, self)
@@ -311,7 +310,7 @@ class SettingsDialog(QDialog):
         from config import ( 
             SETTING_MIN_MEMBER_DELAY, SETTING_MAX_MEMBER_DELAY,
             SETTING_MONITORING_INTERVAL, SETTING_BACKOFF_429,
-            SETTING_BACKOFF_GENERAL, SETTING_REQUEST_TIMEOUT
+            SETTING_BACKOFF_GENERAL, SETTING_REQUEST_TIMEOUT, SETTING_STORAGE_BACKEND
         )
         min_val = self.min_delay_spin.value()
         max_val = self.max_delay_spin.value()
@@ -325,7 +324,8 @@ class SettingsDialog(QDialog):
             SETTING_MONITORING_INTERVAL: self.monitoring_interval_spin.value(),
             SETTING_BACKOFF_429: self.backoff_429_spin.value(),
             SETTING_BACKOFF_GENERAL: self.backoff_general_spin.value(),
-            SETTING_REQUEST_TIMEOUT: self.request_timeout_spin.value()
+            SETTING_REQUEST_TIMEOUT: self.request_timeout_spin.value(),
+            SETTING_STORAGE_BACKEND: self.storage_backend_combo.currentData()
         }
 
 class ViewMemberDialog(QDialog):
@@ -0,0 +1,64 @@
+# gui_update_coalescer.py
+import logging
+
+from PyQt5.QtCore import QObject, QTimer
+
+from config import GUI_UPDATE_COALESCE_MS
+
+logger = logging.getLogger(__name__)
+
+
+class GuiUpdateCoalescer(QObject):
+    """
+    طبقة تجميع بين إشارات خيوط الفحص وواجهة المستخدم.
+    - الإشارات (تحديث صف، بدء/انتهاء المعالجة، رسالة الحالة) تُخزن فقط، مع الاحتفاظ بآخر قيمة لكل عضو (حسب member_id،
+      حتى لا تنتقل التحديثات المعلقة إلى صف آخر إذا أضيف أو حُذف عضو قبل تطبيقها).
+    - كل GUI_UPDATE_COALESCE_MS يتم تطبيق الدفعة مرة واحدة: حالة المعالجة أولاً، ثم تحديث الصف، ثم آخر رسالة.
+    - المؤقت لا يعمل إلا عند وجود تحديثات معلقة.
+    """
+
+    def __init__(self, apply_member_update, apply_processing_state, apply_log_message, interval_ms=GUI_UPDATE_COALESCE_MS, parent=None):
+        super().__init__(parent)
+        self._apply_member_update = apply_member_update # (member_id, status_text, detail_text, icon_name_str)
+        self._apply_processing_state = apply_processing_state # (member_id, is_processing)
+        self._apply_log_message = apply_log_message # (message, is_general, member_obj, member_id)
+        self._pending_updates = {} # member_id -> آخر (status_text, detail_text, icon_name_str)
+        self._pending_processing = {} # member_id -> آخر قيمة is_processing
+        self._pending_log = None
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(interval_ms)
+        self._flush_timer.timeout.connect(self.flush)
+
+    # --- منافذ الإشارات (تعمل على خيط الواجهة، عمل ثابت لكل إشارة) ---
+    def queue_member_update(self, member_id, status_text, detail_text, icon_name_str):
+        self._pending_updates[member_id] = (status_text, detail_text, icon_name_str)
+        self._schedule()
+
+    def queue_processing_state(self, member_id, is_processing_now):
+        self._pending_processing[member_id] = is_processing_now
+        self._schedule()
+
+    def queue_log_message(self, message, is_general=True, member_obj=None, member_id=-1):
+        self._pending_log = (message, is_general, member_obj, member_id) # الرسائل الوسيطة تُستبدل بآخر رسالة
+        self._schedule()
+
+    def _schedule(self):
+        if not self._flush_timer.isActive(): # عدم إعادة التشغيل: أقصى تأخير هو فترة المؤقت
+            self._flush_timer.start()
+
+    def flush(self):
+        """تطبيق جميع التحديثات المعلقة فورًا (يُستدعى أيضًا قبل إيقاف المراقبة)."""
+        self._flush_timer.stop()
+        pending_processing, self._pending_processing = self._pending_processing, {}
+        pending_updates, self._pending_updates = self._pending_updates, {}
+        pending_log, self._pending_log = self._pending_log, None
+
+        for member_id, is_processing_now in pending_processing.items():
+            self._apply_processing_state(member_id, is_processing_now)
+        for member_id, (status_text, detail_text, icon_name_str) in pending_updates.items():
+            self._apply_member_update(member_id, status_text, detail_text, icon_name_str)
+        if pending_log is not None:
+            self._apply_log_message(*pending_log)
+        if pending_updates or pending_processing:
+            logger.debug(f"دفعة تحديث الواجهة: {len(pending_updates)} صف، {len(pending_processing)} حالة معالجة.")
@@ -1,5 +1,8 @@
 # main_app.py (User App - Enhanced Activation & Error Handling - Data Safety V2 - Activation Thread & UI Fixes V2 - AppData Paths Confirmed - Auto Check & AttributeError Fix)
 import sys
+import startup_profiler # قبل أي استيراد آخر: وضع --profile-startup يقيس أزمنة الاستيراد
+if startup_profiler.is_requested():
+    startup_profiler.enable()
 import json
 import os
 import logging
@@ -10,9 +13,9 @@ import shutil
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QPushButton, QTableWidget, QTableWidgetItem,
+    QLabel, QPushButton, QTableView,
     QMessageBox, QHeaderView, QStatusBar, QFrame, QAction, QStyle,
-    QMenu, QLineEdit, QComboBox, QAbstractItemView, QDesktopWidget, QDialog
+    QMenu, QLineEdit, QComboBox, QAbstractItemView, QDesktopWidget, QDialog, QFileDialog, QProgressDialog
 )
 from PyQt5.QtCore import QTimer, Qt, QDateTime, QLocale, QStandardPaths, QUrl, pyqtSignal, QThread, QSize
 from PyQt5.QtGui import QIcon, QColor, QPalette, QDesktopServices, QFontDatabase
@@ -24,20 +27,33 @@ from gui_components import (
 )
 
 from api_client import AnemAPIClient
+from response_cache import SHARED_RESPONSE_CACHE
 from member import Member
-from threads import FetchInitialInfoThread, MonitoringThread, SingleMemberCheckThread, DownloadAllPdfsThread
+from members_table_model import MembersTableModel
+from persistence import MembersPersistence
+from member_store import SqliteMemberStore
+from search_index import MemberSearchIndex
+from gui_update_coalescer import GuiUpdateCoalescer
+from threads import MonitoringThread, SHARED_MEMBER_CLAIMS, member_pdf_output_dir
+from roster import Roster
+from cancellation import SHARED_SHUTDOWN_TOKEN
+from fetch_queue import InitialFetchQueue
+from download_manager import PdfDownloadManager
+from pdf_manifest import SHARED_PDF_MANIFEST
+from bulk_import import MemberImportThread, IMPORT_FILE_FILTER
 from config import (
     # الملفات التي تم نقلها إلى APP_DATA_DIR
     DATA_FILE,
     SETTINGS_FILE,
     # الملفات المؤقتة والاحتياطية المرتبطة بها
-    DATA_FILE_TMP, DATA_FILE_BAK,
+    DATA_FILE_BAK,
     SETTINGS_FILE_TMP, SETTINGS_FILE_BAK,
     # الثوابت الأخرى
     STYLESHEET_FILE, # يبقى كما هو (مورد)
     DEFAULT_SETTINGS, SETTING_MIN_MEMBER_DELAY, SETTING_MAX_MEMBER_DELAY,
     SETTING_MONITORING_INTERVAL, SETTING_BACKOFF_429, SETTING_BACKOFF_GENERAL,
     SETTING_REQUEST_TIMEOUT, MAX_ERROR_DISPLAY_LENGTH,
+    SETTING_STORAGE_BACKEND, STORAGE_BACKEND_SQLITE, SEARCH_DEBOUNCE_MS,
     FIREBASE_SERVICE_ACCOUNT_KEY_FILE, # يبقى كما هو (مورد)
     FIRESTORE_ACTIVATION_CODES_COLLECTION,
     ACTIVATION_STATUS_FILE, # هذا الآن من APP_DATA_DIR عبر config.py
@@ -47,6 +63,7 @@ from logger_setup import setup_logging # logger_setup سيستخدم LOG_FILE م
 from utils import QColorConstants, get_icon_name_for_status, resource_path
 
 logger = setup_logging()
+startup_profiler.milestone("استيراد وحدات main_app")
 
 
 def load_custom_fonts():
@@ -99,6 +116,40 @@ class ActivationProcessingThread(QThread):
         self.is_running = False
 
 
+class StartupVerificationThread(QThread):
+    """
+    المرحلة البطيئة من بدء التشغيل عندما يكون البرنامج مفعلًا محليًا: تهيئة Firebase، ثم التحقق
+    من الكود عبر الإنترنت (يجمع verify_online_status_and_device معلومات الجهاز و IP العام عند الحفظ).
+    النافذة الرئيسية تظهر فورًا من التفعيل المحلي، والوظائف لا تُقفل إلا إذا فشل هذا التحقق.
+    """
+    verification_finished = pyqtSignal(bool, bool, str, object) # Firebase مهيأ، الكود صالح، الرسالة، بيانات الكود من الخادم
+
+    def __init__(self, firebase_service_instance, local_code, local_device_id, parent=None):
+        super().__init__(parent)
+        self.firebase_service = firebase_service_instance
+        self.local_code = local_code
+        self.local_device_id = local_device_id
+        self.is_running = True
+
+    def run(self):
+        try:
+            firebase_ok = self.firebase_service.initialize()
+            if not firebase_ok:
+                if self.is_running:
+                    self.verification_finished.emit(False, False, "خدمة Firebase غير مهيأة.", None)
+                return
+            is_valid, message, server_code_data = self.firebase_service.verify_online_status_and_device(self.local_code, self.local_device_id)
+            if self.is_running:
+                self.verification_finished.emit(True, is_valid, message, server_code_data)
+        except Exception as e:
+            logger.exception(f"StartupVerificationThread: خطأ غير متوقع أثناء التحقق من التفعيل: {e}")
+            if self.is_running:
+                self.verification_finished.emit(True, False, f"خطأ غير متوقع أثناء التحقق: {e}", None)
+
+    def stop(self):
+        self.is_running = False
+
+
 class AnemApp(QMainWindow):
     COL_ICON, COL_FULL_NAME_AR, COL_NIN, COL_WASSIT, COL_CCP, COL_PHONE_NUMBER, COL_STATUS, COL_RDV_DATE, COL_DETAILS = range(9)
     subscription_updated_signal = pyqtSignal(object, str)
@@ -108,16 +159,21 @@ class AnemApp(QMainWindow):
         self._should_initialize_ui = False
         # تهيئة activation_successful مبكرًا لتجنب AttributeError
         self.activation_successful = False
-        self.firebase_service = FirebaseService() # هذا سيستخدم DEVICE_ID_FILE و ACTIVATION_STATUS_FILE من config
+        # التهيئة الثقيلة لـ Firebase تتم في StartupVerificationThread (أو قبل حوار التفعيل إذا لم يكن مفعلًا محليًا)
+        self.firebase_service = FirebaseService(initialize=False) # هذا سيستخدم DEVICE_ID_FILE و ACTIVATION_STATUS_FILE من config
         self.activated_code_id = None
         self.current_subscription_data = None
-        self.current_device_id = self.firebase_service.get_device_info().get("generated_device_id")
+        self.current_device_id = None
+        self.activation_verification_pending = False # مفعل محليًا، والتحقق عبر الإنترنت جارٍ في الخلفية
+        self.startup_verification_thread = None
         self.activation_dialog_open = False
         self.toast_notifications = []
         self.settings = {}
         self.activation_thread = None
 
+        startup_profiler.milestone("AnemApp.__init__")
         self._initialize_and_check_activation()
+        startup_profiler.milestone("التحقق من التفعيل")
         if not self.activation_successful: # سيعتمد على القيمة المحدثة من _initialize_and_check_activation
             logger.critical("AnemApp __init__: فشل تفعيل البرنامج. لن يتم إكمال تهيئة واجهة المستخدم.")
             # لا حاجة لـ QTimer.singleShot هنا، سيتم الخروج من البرنامج إذا لم تنجح التهيئة
@@ -140,6 +196,14 @@ class AnemApp(QMainWindow):
         self.members_list = []
         self.filtered_members_list = []
         self.is_filter_active = False
+        self.member_index_by_nin = {} # NIN -> الفهرس الأصلي في members_list (بحث O(1) لمعالجات الإشارات)
+        self.member_index_by_id = {} # member_id -> الفهرس الأصلي (إشارات خيوط الفحص تحمل member_id)
+        self._members_with_new_ids = [] # أعضاء محملون دون member_id محفوظ: يُحفظون بعد التحميل
+        self.roster = Roster() # النسخة التي يعمل عليها خيط المراقبة، تُنشر عند كل تغيير في العضوية (_rebuild_member_index)
+        # حفظ مؤجل وتدريجي خارج خيط الواجهة (ملف JSON أو قاعدة بيانات SQLite حسب الإعدادات)
+        self.members_persistence = MembersPersistence(lambda: self.members_list, store=self._open_member_store(), parent=self)
+        self.members_persistence.save_failed_signal.connect(self._handle_members_save_failed)
+        self.search_index = MemberSearchIndex(lambda: self.members_list) # مفاتيح بحث موحدة محسوبة مسبقًا لكل عضو
 
         self.api_client = AnemAPIClient(
             initial_backoff_general=self.settings.get(SETTING_BACKOFF_GENERAL, DEFAULT_SETTINGS[SETTING_BACKOFF_GENERAL]),
@@ -147,9 +211,23 @@ class AnemApp(QMainWindow):
             request_timeout=self.settings.get(SETTING_REQUEST_TIMEOUT, DEFAULT_SETTINGS[SETTING_REQUEST_TIMEOUT])
         )
 
-        self.initial_fetch_threads = []
-        self.single_check_thread = None
-        self.active_download_all_pdfs_threads = {}
+        # طابور محدود لجلب المعلومات الأولية (خيوط معاد استخدامها وتأخير مشترك بين الأعضاء)
+        self.initial_fetch_queue = InitialFetchQueue(self.settings, parent=self)
+        self.initial_fetch_queue.signals.update_member_gui_signal.connect(self._handle_initial_fetch_gui_update)
+        self.initial_fetch_queue.signals.new_data_fetched_signal.connect(self._handle_initial_fetch_name_update)
+        self.initial_fetch_queue.signals.global_log_signal.connect(self._handle_initial_fetch_log)
+        self.initial_fetch_queue.signals.member_processing_started_signal.connect(self._handle_initial_fetch_started)
+        self.initial_fetch_queue.signals.member_processing_finished_signal.connect(self._handle_initial_fetch_finished)
+        # طابور محدود لتحميل الشهادات (فردي أو جماعي)
+        self.pdf_download_manager = PdfDownloadManager(self.settings, parent=self)
+        self.pdf_download_manager.signals.report_finished_signal.connect(self._handle_pdf_report_finished)
+        self.pdf_download_manager.signals.member_finished_signal.connect(self._handle_pdf_member_finished)
+        self.pdf_download_manager.signals.member_processing_started_signal.connect(self._handle_pdf_download_started)
+        self.pdf_download_manager.signals.member_processing_finished_signal.connect(self._handle_pdf_download_processing_finished)
+        self.pdf_download_manager.signals.progress_signal.connect(self._handle_pdf_download_progress)
+        self.pdf_download_manager.signals.global_log_signal.connect(self._handle_initial_fetch_log)
+        self.import_thread = None
+        self.import_progress_dialog = None
         self.active_spinner_row_in_view = -1
         self.spinner_char_idx = 0
         self.spinner_chars = ['◐', '◓', '◑', '◒']
@@ -157,19 +235,24 @@ class AnemApp(QMainWindow):
         self.row_spinner_timer.timeout.connect(self.update_active_row_spinner_display)
         self.row_spinner_timer_interval = 150
 
-        self.monitoring_thread = MonitoringThread(self.members_list, self.settings.copy())
-        self.monitoring_thread.update_member_gui_signal.connect(self.update_member_gui_in_table)
-        self.monitoring_thread.new_data_fetched_signal.connect(self.update_member_name_in_table)
-        self.monitoring_thread.global_log_signal.connect(self.update_status_bar_message)
-        self.monitoring_thread.member_being_processed_signal.connect(self.handle_member_processing_signal)
+        # إشارات خيط المراقبة الكثيفة تُجمع وتُطبق في دفعة واحدة لكل نبضة بدلاً من تحديث الواجهة عند كل إشارة
+        self.gui_update_coalescer = GuiUpdateCoalescer(self._handle_member_gui_update_by_id, self._handle_member_processing_by_id, self._handle_member_log_by_id, parent=self)
+        self.monitoring_thread = MonitoringThread(self.roster, self.settings.copy())
+        self.monitoring_thread.update_member_gui_signal.connect(self.gui_update_coalescer.queue_member_update)
+        self.monitoring_thread.new_data_fetched_signal.connect(self._handle_member_name_update_by_id)
+        self.monitoring_thread.global_log_signal.connect(self.gui_update_coalescer.queue_log_message)
+        self.monitoring_thread.member_being_processed_signal.connect(self.gui_update_coalescer.queue_processing_state)
         self.monitoring_thread.countdown_update_signal.connect(self.update_countdown_timer_display)
 
         self.subscription_updated_signal.connect(self._handle_subscription_update_from_signal)
 
         self.init_ui()
         self.load_stylesheet() # ستستخدم STYLESHEET_FILE من config (يُفترض أنه مورد)
+        startup_profiler.milestone("بناء الواجهة")
         self.load_members_data() # ستستخدم DATA_FILE من config
+        startup_profiler.milestone(f"تحميل بيانات الأعضاء ({len(self.members_list)})")
         QTimer.singleShot(0, self.apply_app_settings)
+        QTimer.singleShot(0, self._resume_bulk_pdf_downloads) # بعد apply_app_settings (نفس ترتيب الجدولة) لاستخدام api_client الجديد
         logger.info("AnemApp __init__: اكتملت التهيئة.")
 
     def close_app_due_to_error(self, message=""):
@@ -194,44 +277,93 @@ class AnemApp(QMainWindow):
 
     def _perform_activation_check_logic(self):
         logger.info("AnemApp: بدء التحقق من تفعيل البرنامج...")
-        if not self.firebase_service.is_initialized(): # firebase_service يستخدم FIREBASE_SERVICE_ACCOUNT_KEY_FILE
+        # firebase_service.check_local_activation() ستستخدم ACTIVATION_STATUS_FILE من config (قراءة ملف فقط)
+        is_locally_activated, local_code, local_device_id, local_data = self.firebase_service.check_local_activation()
+
+        if is_locally_activated and local_code and local_device_id:
+            # بدء سريع: الواجهة تعمل فورًا من التفعيل المحلي، وتهيئة Firebase والتحقق عبر الإنترنت في الخلفية
+            logger.info(f"AnemApp: البرنامج مفعل محليًا بالكود: {local_code} للجهاز: {local_device_id}. سيتم التحقق من الصلاحية عبر الإنترنت في الخلفية...")
+            self.activated_code_id = local_code
+            self.current_device_id = local_device_id
+            self.activation_verification_pending = True
+            QTimer.singleShot(0, lambda: self._start_startup_verification(local_code, local_device_id))
+            return True
+
+        if not self._ensure_firebase_initialized_for_dialog():
+            return False
+        logger.info("AnemApp: البرنامج غير مفعل محليًا أو التحقق المحلي فشل. يتطلب التفعيل عبر الإنترنت.")
+        return self._show_activation_dialog_loop()
+
+    def _ensure_firebase_initialized_for_dialog(self):
+        # حوار التفعيل يحتاج إلى Firebase ومعرف الجهاز فورًا (التشغيل الأول فقط، أو بعد إلغاء التفعيل)
+        if not self.firebase_service.initialize(): # firebase_service يستخدم FIREBASE_SERVICE_ACCOUNT_KEY_FILE
             logger.critical(f"AnemApp: خدمة Firebase غير مهيأة. تأكد من وجود ملف '{FIREBASE_SERVICE_ACCOUNT_KEY_FILE}'.")
             if not hasattr(self, 'toast_notifications'): self.toast_notifications = []
             QMessageBox.critical(self, "خطأ فادح في الاتصال",
                                  f"لا يمكن تهيئة خدمة المصادقة.\nالرجاء التأكد من وجود ملف '{FIREBASE_SERVICE_ACCOUNT_KEY_FILE}' وأنه صالح, ومن وجود اتصال بالإنترنت.\nسيتم إغلاق البرنامج.",
                                  QMessageBox.Ok)
             return False
+        if not self.current_device_id:
+            self.current_device_id = self.firebase_service.get_device_id() # بدون جمع البصمة أو طلبات الشبكة
+        return True
 
-        # firebase_service.check_local_activation() ستستخدم ACTIVATION_STATUS_FILE من config
-        is_locally_activated, local_code, local_device_id, local_data = self.firebase_service.check_local_activation()
+    def _start_startup_verification(self, local_code, local_device_id):
+        if self.startup_verification_thread and self.startup_verification_thread.isRunning():
+            return
+        self.update_status_bar_message("جاري التحقق من التفعيل عبر الإنترنت في الخلفية...", is_general_message=True)
+        self.startup_verification_thread = StartupVerificationThread(self.firebase_service, local_code, local_device_id, self)
+        self.startup_verification_thread.verification_finished.connect(
+            lambda firebase_ok, is_valid, message, server_code_data, code=local_code: self._handle_startup_verification_finished(code, firebase_ok, is_valid, message, server_code_data)
+        )
+        self.startup_verification_thread.start()
 
-        if is_locally_activated and local_code and local_device_id:
-            logger.info(f"AnemApp: البرنامج مفعل محليًا بالكود: {local_code} للجهاز: {local_device_id}. يتم التحقق من الصلاحية عبر الإنترنت...")
+    def _handle_startup_verification_finished(self, local_code, firebase_ok, is_still_valid_online, online_message, server_code_data):
+        self.activation_verification_pending = False
+        if local_code != self.activated_code_id: # تغير التفعيل أثناء التحقق (مثلاً إعادة التفعيل بكود آخر)
+            return
 
-            # firebase_service.verify_online_status_and_device() ستستخدم ACTIVATION_STATUS_FILE
-            is_still_valid_online, online_message, server_code_data = self.firebase_service.verify_online_status_and_device(local_code, local_device_id)
+        if not firebase_ok:
+            logger.critical(f"AnemApp: خدمة Firebase غير مهيأة. تأكد من وجود ملف '{FIREBASE_SERVICE_ACCOUNT_KEY_FILE}'.")
+            QMessageBox.critical(self, "خطأ فادح في الاتصال",
+                                 f"لا يمكن تهيئة خدمة المصادقة.\nالرجاء التأكد من وجود ملف '{FIREBASE_SERVICE_ACCOUNT_KEY_FILE}' وأنه صالح, ومن وجود اتصال بالإنترنت.\nسيتم تعطيل وظائف البرنامج.",
+                                 QMessageBox.Ok)
+            self.activation_successful = False
+            self._disable_app_functions()
+            return
 
-            if is_still_valid_online and server_code_data:
-                logger.info(f"AnemApp: الكود المحلي '{local_code}' صالح وحالته '{server_code_data.get('status', 'UNKNOWN')}' في Firebase.")
-                self.current_subscription_data = server_code_data
-                self.activated_code_id = local_code
-                self.firebase_service.listen_to_activation_code_changes(self.activated_code_id, self._pass_subscription_update_to_signal)
-                return True # التفعيل ناجح
-            else:
-                user_facing_message = "فشل التحقق من التفعيل المحلي عبر الإنترنت. قد يكون الاشتراك قد انتهى أو تم إلغاؤه."
-                if "لم يعد هذا الجهاز مصرحًا له" in online_message:
-                    user_facing_message = "لم يعد هذا الجهاز مصرحًا له باستخدام هذا الكود."
-                elif "تم إلغاء هذا الاشتراك" in online_message:
-                     user_facing_message = "تم إلغاء هذا الاشتراك من قبل المسؤول."
-                elif "الاشتراك منتهي الصلاحية" in online_message or "قد انتهت صلاحيته" in online_message:
-                    user_facing_message = "صلاحية اشتراكك الحالي قد انتهت."
-
-                logger.warning(f"AnemApp: الكود المحلي '{local_code}' لم يعد صالحًا عبر الإنترنت: {online_message}.")
-                self._clear_local_activation_and_state(f"الكود المحلي ({local_code}) لم يعد صالحًا: {online_message}")
-                return self._show_activation_dialog_loop(initial_message=user_facing_message, initial_is_error=True)
+        if is_still_valid_online and server_code_data:
+            logger.info(f"AnemApp: الكود المحلي '{local_code}' صالح وحالته '{server_code_data.get('status', 'UNKNOWN')}' في Firebase.")
+            self.current_subscription_data = server_code_data
+            self.firebase_service.listen_to_activation_code_changes(self.activated_code_id, self._pass_subscription_update_to_signal)
+            self.update_status_bar_message("تم التحقق من التفعيل عبر الإنترنت.", is_general_message=True)
+            return
 
-        logger.info("AnemApp: البرنامج غير مفعل محليًا أو التحقق المحلي فشل. يتطلب التفعيل عبر الإنترنت.")
-        return self._show_activation_dialog_loop()
+        user_facing_message = "فشل التحقق من التفعيل المحلي عبر الإنترنت. قد يكون الاشتراك قد انتهى أو تم إلغاؤه."
+        if "لم يعد هذا الجهاز مصرحًا له" in online_message:
+            user_facing_message = "لم يعد هذا الجهاز مصرحًا له باستخدام هذا الكود."
+        elif "تم إلغاء هذا الاشتراك" in online_message:
+             user_facing_message = "تم إلغاء هذا الاشتراك من قبل المسؤول."
+        elif "الاشتراك منتهي الصلاحية" in online_message or "قد انتهت صلاحيته" in online_message:
+            user_facing_message = "صلاحية اشتراكك الحالي قد انتهت."
+
+        logger.warning(f"AnemApp: الكود المحلي '{local_code}' لم يعد صالحًا عبر الإنترنت: {online_message}.")
+        self.activation_successful = False
+        self._disable_app_functions() # قفل الوظائف حتى إعادة التفعيل
+        self._clear_local_activation_and_state(f"الكود المحلي ({local_code}) لم يعد صالحًا: {online_message}")
+        if not self._ensure_firebase_initialized_for_dialog():
+            return
+        self.activation_successful = self._show_activation_dialog_loop(initial_message=user_facing_message, initial_is_error=True)
+        if self.activation_successful:
+            self._enable_app_functions()
+            self._resume_bulk_pdf_downloads()
+
+    def _is_subscription_usable(self):
+        # أثناء التحقق في الخلفية عند بدء التشغيل، التفعيل المحلي يكفي
+        if not self.activation_successful:
+            return False
+        if self.current_subscription_data:
+            return self.current_subscription_data.get("status","").upper() == "ACTIVE"
+        return self.activation_verification_pending
 
     def _clear_local_activation_and_state(self, reason=""):
         logger.info(f"AnemApp: مسح بيانات التفعيل المحلية. السبب: {reason}")
@@ -487,6 +619,7 @@ class AnemApp(QMainWindow):
                 critical_error_occurred = True # التأكيد على وجود خطأ فادح
             elif old_status != "ACTIVE" and not critical_error_occurred: # إذا كانت الحالة السابقة ليست نشطة والآن أصبحت نشطة
                 self._enable_app_functions()
+                self._resume_bulk_pdf_downloads()
                 self._show_toast("تم تحديث معلومات الاشتراك بنجاح. البرنامج نشط.", type="success")
 
         elif not error_message: # لا توجد بيانات محدثة ولا يوجد خطأ (حالة غير متوقعة)
@@ -517,8 +650,16 @@ class AnemApp(QMainWindow):
         self.add_member_button.setEnabled(False)
         self.remove_member_button.setEnabled(False)
         if hasattr(self, 'settings_action'): self.settings_action.setEnabled(False)
+        if hasattr(self, 'import_members_action'): self.import_members_action.setEnabled(False)
         if self.monitoring_thread.isRunning(): # إيقاف المراقبة إذا كانت تعمل
-            self.stop_monitoring()
+            if self.monitoring_thread.manual_only:
+                self.monitoring_thread.stop_monitoring() # تشغيل للفحص الفوري فقط: إلغاء الطلبات المتبقية
+            else:
+                self.stop_monitoring()
+        # الطابور الجماعي قد يُستأنف من التفعيل المحلي قبل انتهاء التحقق عبر الإنترنت: لا جلب ولا تحميل باشتراك غير صالح.
+        # cancel_all يحتفظ بالطابور المحفوظ ليُستأنف بعد إعادة التفعيل
+        self.initial_fetch_queue.cancel_all()
+        self.pdf_download_manager.cancel_all()
 
     def _enable_app_functions(self):
         logger.info("AnemApp: Enabling application functions.")
@@ -527,6 +668,7 @@ class AnemApp(QMainWindow):
         self.add_member_button.setEnabled(True)
         self.remove_member_button.setEnabled(True)
         if hasattr(self, 'settings_action'): self.settings_action.setEnabled(True)
+        if hasattr(self, 'import_members_action'): self.import_members_action.setEnabled(True)
 
     def init_ui(self):
         central_widget = QWidget()
@@ -540,6 +682,14 @@ class AnemApp(QMainWindow):
         self.settings_action.triggered.connect(self.open_settings_dialog)
         file_menu.addAction(self.settings_action)
 
+        self.export_json_action = QAction(QIcon.fromTheme("document-save-as"), "تصدير بيانات الأعضاء إلى JSON...", self)
+        self.export_json_action.triggered.connect(self.export_members_to_json)
+        file_menu.addAction(self.export_json_action)
+
+        self.import_members_action = QAction(QIcon.fromTheme("document-open"), "استيراد أعضاء من ملف (CSV/Excel)...", self)
+        self.import_members_action.triggered.connect(self.import_members_from_file)
+        file_menu.addAction(self.import_members_action)
+
         tools_menu = menubar.addMenu("أدوات")
         self.toggle_search_filter_action = QAction("إظهار/إخفاء البحث والفلترة", self)
         self.toggle_search_filter_action.setCheckable(True)
@@ -585,7 +735,11 @@ class AnemApp(QMainWindow):
 
         self.search_input = QLineEdit(self)
         self.search_input.setPlaceholderText("بحث بالاسم, NIN, الوسيط...")
-        self.search_input.textChanged.connect(self.apply_filter_and_search)
+        self.search_debounce_timer = QTimer(self) # تطبيق البحث بعد توقف الكتابة بدلاً من كل حرف
+        self.search_debounce_timer.setSingleShot(True)
+        self.search_debounce_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_debounce_timer.timeout.connect(self.apply_filter_and_search)
+        self.search_input.textChanged.connect(self.search_debounce_timer.start)
         search_filter_layout.addWidget(self.search_input, 2)
 
         self.filter_by_combo = QComboBox(self)
@@ -625,21 +779,24 @@ class AnemApp(QMainWindow):
         self.status_bar_label = QLabel("جاهز.")
         self.last_scan_label = QLabel("")
         self.countdown_label = QLabel("")
+        self.countdown_prefix = ""
+        self.countdown_deadline = 0.0 # time.monotonic() لنهاية العد التنازلي الحالي (من إشارة واحدة لكل انتظار)
+        self.countdown_timer = QTimer(self) # يعمل فقط أثناء العد التنازلي
+        self.countdown_timer.setInterval(1000)
+        self.countdown_timer.timeout.connect(self._render_countdown)
         self.statusBar.addWidget(self.status_bar_label, 1)
         self.statusBar.addPermanentWidget(self.countdown_label)
         self.statusBar.addPermanentWidget(self.last_scan_label)
 
 
-        self.table = QTableWidget(self)
-        self.table.setColumnCount(self.COL_DETAILS + 1)
-        self.table.setHorizontalHeaderLabels([
-            "أيقونة", "الاسم الكامل", "رقم التعريف", "رقم الوسيط",
-            "الحساب البريدي", "رقم الهاتف", "الحالة", "تاريخ الموعد", "آخر تحديث/خطأ"
-        ])
+        # جدول افتراضي (Model/View): يتم رسم الصفوف المرئية فقط، ولا يتم إنشاء عناصر لكل خلية
+        self.members_model = MembersTableModel(self)
+        self.table = QTableView(self)
+        self.table.setModel(self.members_model)
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Interactive)
         self.table.setAlternatingRowColors(True)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self.show_table_context_menu)
 
@@ -654,9 +811,9 @@ class AnemApp(QMainWindow):
         header.setSectionResizeMode(self.COL_DETAILS, QHeaderView.Stretch)
 
 
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.verticalHeader().setDefaultSectionSize(30)
-        self.table.itemDoubleClicked.connect(self.edit_member_details)
+        self.table.doubleClicked.connect(self.edit_member_details)
         self.table.verticalHeader().setVisible(True) # إظهار أرقام الصفوف
         main_layout.addWidget(self.table)
 
@@ -687,8 +844,7 @@ class AnemApp(QMainWindow):
         main_layout.addLayout(bottom_controls_layout)
 
         # تعطيل الوظائف مبدئيًا إذا لم يكن التفعيل ناجحًا
-        if not self.activation_successful or \
-           (self.current_subscription_data and self.current_subscription_data.get("status", "").upper() != "ACTIVE"):
+        if not self._is_subscription_usable():
             self._disable_app_functions()
         else:
             self._enable_app_functions() # تمكين إذا كان التفعيل ناجحًا
@@ -730,11 +886,12 @@ class AnemApp(QMainWindow):
 
 
     def apply_filter_and_search(self):
-        search_term = self.search_input.text().lower().strip()
+        self.search_debounce_timer.stop() # تم التطبيق مباشرة (فلتر أو مسح)، لا حاجة لتطبيق مؤجل
+        search_term = self.search_input.text().strip()
         filter_key = self.filter_by_combo.itemData(self.filter_by_combo.currentIndex())
         filter_value_data = self.filter_value_combo.itemData(self.filter_value_combo.currentIndex())
 
-        current_list_to_filter = list(self.members_list) # ابدأ دائمًا من القائمة الكاملة
+        current_list_to_filter = self.members_list # ابدأ دائمًا من القائمة الكاملة
 
         self.is_filter_active = bool(search_term or (filter_key and filter_value_data is not None))
 
@@ -746,62 +903,51 @@ class AnemApp(QMainWindow):
             self._last_filter_applied = False # تتبع حالة الفلتر
             return
 
-        temp_filtered_list = []
-
-        for member in current_list_to_filter:
-            match_search = True
-            if search_term:
-                match_search = (search_term in (member.nin or "").lower() or
-                                search_term in (member.wassit_no or "").lower() or
-                                search_term in (member.get_full_name_ar() or "").lower() or
-                                search_term in (member.nom_fr or "").lower() or
-                                search_term in (member.prenom_fr or "").lower() or
-                                search_term in (member.phone_number or "").lower() or
-                                search_term in (member.ccp or "").lower())
-
-            match_filter = True
-            if filter_key and filter_value_data is not None: # فقط إذا تم اختيار قيمة للفلتر
-                if filter_key == "status":
-                    match_filter = member.status == filter_value_data
-                elif filter_key == "has_rdv":
-                    match_filter = member.already_has_rdv == filter_value_data
-                elif filter_key == "have_allocation":
-                    match_filter = member.have_allocation == filter_value_data
-                elif filter_key == "pdf_honneur":
-                    match_filter = bool(member.pdf_honneur_path) == filter_value_data
-                elif filter_key == "pdf_rdv":
-                    match_filter = bool(member.pdf_rdv_path) == filter_value_data
-
-            if match_search and match_filter:
-                temp_filtered_list.append(member)
+        # الفلاتر المدعومة بفهارس قاعدة البيانات (عند استخدام SQLite) تُنفذ كاستعلام بدلاً من المرور على جميع الأعضاء
+        indexed_filter_applied = False
+        if filter_key and filter_value_data is not None:
+            matching_nins = self.members_persistence.query_nins(filter_key, filter_value_data)
+            if matching_nins is not None:
+                current_list_to_filter = [self.members_list[self.member_index_by_nin[nin]] for nin in matching_nins if nin in self.member_index_by_nin]
+                indexed_filter_applied = True
+
+        if filter_key and filter_value_data is not None and not indexed_filter_applied: # فقط إذا تم اختيار قيمة للفلتر
+            if filter_key == "status":
+                current_list_to_filter = [m for m in current_list_to_filter if m.status == filter_value_data]
+            elif filter_key == "has_rdv":
+                current_list_to_filter = [m for m in current_list_to_filter if m.already_has_rdv == filter_value_data]
+            elif filter_key == "have_allocation":
+                current_list_to_filter = [m for m in current_list_to_filter if m.have_allocation == filter_value_data]
+            elif filter_key == "pdf_honneur":
+                current_list_to_filter = [m for m in current_list_to_filter if bool(m.pdf_honneur_path) == filter_value_data]
+            elif filter_key == "pdf_rdv":
+                current_list_to_filter = [m for m in current_list_to_filter if bool(m.pdf_rdv_path) == filter_value_data]
+
+        # البحث عبر الفهرس (مفاتيح موحدة محسوبة مسبقًا) بدلاً من تحويل سبعة حقول لكل عضو
+        temp_filtered_list = self.search_index.search(search_term, current_list_to_filter)
 
         self.filtered_members_list = temp_filtered_list
-        self.update_table() # تحديث الجدول بالقائمة المفلترة
+        self.members_model.set_members(self.filtered_members_list) # الفلترة لا تغير القائمة الرئيسية: تحديث النموذج فقط
         self.update_status_bar_message(f"تم تطبيق الفلتر. عدد النتائج: {len(self.filtered_members_list)}", is_general_message=True)
         self._last_filter_applied = True # تتبع حالة الفلتر
 
     def show_table_context_menu(self, position):
-        selected_items = self.table.selectedItems()
-        item_at_pos = self.table.itemAt(position) # الحصول على العنصر عند موضع النقر
+        selected_rows = self.table.selectionModel().selectedRows()
+        index_at_pos = self.table.indexAt(position) # الحصول على الخلية عند موضع النقر
 
-        if not item_at_pos and not selected_items: # إذا لم يكن هناك عنصر محدد أو نقر على عنصر
+        if not index_at_pos.isValid() and not selected_rows: # إذا لم يكن هناك صف محدد أو نقر على خلية
             return
 
         row_index_in_table = -1
-        if item_at_pos: # إذا تم النقر على عنصر، استخدم صفه
-            row_index_in_table = item_at_pos.row()
-        elif selected_items: # إذا لم يتم النقر على عنصر ولكن هناك تحديد، استخدم صف أول عنصر محدد
-            row_index_in_table = selected_items[0].row()
-
-        if row_index_in_table < 0: return # لم يتم تحديد صف صالح
-
-        current_list_for_context = self.filtered_members_list if self.is_filter_active else self.members_list
-        if row_index_in_table >= len(current_list_for_context): return # تحقق من الحدود
-
-        member = current_list_for_context[row_index_in_table]
-        try:
-            original_member_index = self.members_list.index(member) # الحصول على الفهرس الأصلي
-        except ValueError:
+        if index_at_pos.isValid(): # إذا تم النقر على خلية، استخدم صفها
+            row_index_in_table = index_at_pos.row()
+        elif selected_rows: # إذا لم يتم النقر على خلية ولكن هناك تحديد، استخدم أول صف محدد
+            row_index_in_table = selected_rows[0].row()
+
+        member = self.members_model.member_at(row_index_in_table)
+        if member is None: return # لم يتم تحديد صف صالح
+        original_member_index = self._original_index_of(member) # الحصول على الفهرس الأصلي
+        if original_member_index < 0:
             logger.error(f"العضو {member.nin} من القائمة المفلترة غير موجود في القائمة الرئيسية.")
             self._show_toast(f"خطأ: العضو {self._get_member_display_name_with_index(member, -1)} غير موجود بشكل صحيح.", type="error")
             return
@@ -817,6 +963,11 @@ class AnemApp(QMainWindow):
         check_now_action.triggered.connect(lambda: self.check_member_now(original_member_index))
         menu.addAction(check_now_action)
 
+        if len(selected_rows) > 1:
+            check_selected_now_action = QAction(QIcon.fromTheme("system-search"), f"فحص الآن للأعضاء المحددين ({len(selected_rows)})", self)
+            check_selected_now_action.triggered.connect(self.check_selected_members_now)
+            menu.addAction(check_selected_now_action)
+
         can_download_any_pdf = bool(member.pre_inscription_id) and \
                                member.status in ["لديه موعد مسبق", "تم الحجز", "مكتمل", "فشل تحميل PDF", "مستفيد حاليًا من المنحة"]
 
@@ -825,11 +976,20 @@ class AnemApp(QMainWindow):
         download_all_action.triggered.connect(lambda: self.download_all_member_pdfs(original_member_index))
         menu.addAction(download_all_action)
 
+        if self.pdf_download_manager.bulk_remaining_count():
+            stop_bulk_download_action = QAction(QIcon.fromTheme("process-stop"), f"إيقاف التحميل الجماعي للشهادات ({self.pdf_download_manager.bulk_remaining_count()} متبقٍ)", self)
+            stop_bulk_download_action.triggered.connect(self.stop_bulk_pdf_downloads)
+            menu.addAction(stop_bulk_download_action)
+        else:
+            bulk_download_action = QAction(QIcon.fromTheme("document-save-all", QIcon.fromTheme("document-save")), "تحميل الشهادات الناقصة لجميع الأعضاء", self)
+            bulk_download_action.triggered.connect(self.download_missing_pdfs_for_all_members)
+            menu.addAction(bulk_download_action)
+
         menu.addSeparator()
 
         edit_action = QAction(QIcon.fromTheme("document-edit"), f"تعديل بيانات {member_display_name_with_index}", self)
-        # تمرير عنصر الجدول (أو None إذا لم يتم النقر على عنصر) إلى edit_member_details
-        edit_action.triggered.connect(lambda: self.edit_member_details(self.table.item(row_index_in_table, 0)))
+        # تمرير فهرس الصف في النموذج إلى edit_member_details
+        edit_action.triggered.connect(lambda: self.edit_member_details(self.members_model.index(row_index_in_table, 0)))
         menu.addAction(edit_action)
 
         delete_action = QAction(QIcon.fromTheme("edit-delete"), f"حذف {member_display_name_with_index}", self)
@@ -851,39 +1011,55 @@ class AnemApp(QMainWindow):
             self._show_toast("خطأ في عرض معلومات العضو (فهرس غير صالح).", type="error")
 
     def check_member_now(self, original_member_index):
-        if not self.activation_successful or (self.current_subscription_data and self.current_subscription_data.get("status","").upper() != "ACTIVE"):
+        if 0 <= original_member_index < len(self.members_list):
+            self.check_members_now([self.members_list[original_member_index]])
+        else:
+            logger.warning(f"check_member_now: فهرس خاطئ {original_member_index}")
+            self._show_toast("خطأ في بدء الفحص الفوري (فهرس غير صالح).", type="error")
+
+    def check_selected_members_now(self):
+        members = [self.members_model.member_at(index.row()) for index in self.table.selectionModel().selectedRows()]
+        self.check_members_now([m for m in members if m is not None])
+
+    def check_members_now(self, members):
+        """
+        "فحص الآن" لعضو أو عدة أعضاء: طلبات ذات أولوية في طابور خيط المراقبة (نفس العميل والتأخير بين الأعضاء).
+        إذا كانت المراقبة متوقفة، يعمل نفس الخيط للفحص الفوري فقط وينتهي عند فراغ الطابور.
+        """
+        if not self._is_subscription_usable():
             self._show_toast("لا يمكن إجراء الفحص. البرنامج غير مفعل أو الاشتراك غير نشط.", type="error")
             return
 
-        if 0 <= original_member_index < len(self.members_list):
-            member = self.members_list[original_member_index]
-            member_display_name = self._get_member_display_name_with_index(member, original_member_index)
-
-            if member.is_processing: # التحقق إذا كان العضو قيد المعالجة بالفعل
-                 self._show_toast(f"العضو '{member_display_name}' قيد المعالجة حاليًا. يرجى الانتظار.", type="warning")
-                 return
+        members_to_check = [m for m in members if not SHARED_MEMBER_CLAIMS.is_claimed(m) and self._original_index_of(m) >= 0]
+        if not members_to_check:
+            self._show_toast("الأعضاء المحددون قيد المعالجة حاليًا. يرجى الانتظار.", type="warning")
+            return
 
-            if self.single_check_thread and self.single_check_thread.isRunning():
-                self._show_toast("فحص آخر قيد التنفيذ بالفعل. يرجى الانتظار.", type="warning")
-                return
+        added = self.monitoring_thread.request_check_now(members_to_check)
+        for member in members_to_check: # استجابة فورية في الجدول قبل أن يصل دور العضو
+            member.set_activity_detail("في طابور الفحص الفوري...")
+            self.update_member_gui_in_table(self._original_index_of(member), member.status, member.last_activity_detail, get_icon_name_for_status(member.status))
+        self._ensure_engine_running_for_check_now()
 
-            logger.info(f"طلب فحص فوري للعضو: {member_display_name}")
-            self.update_status_bar_message(f"بدء الفحص الفوري للعضو: {member_display_name}...", is_general_message=False)
-            self._show_toast(f"بدء الفحص الفوري للعضو: {member_display_name}", type="info")
-
-            self.single_check_thread = SingleMemberCheckThread(member, original_member_index, self.api_client, self.settings.copy())
-            self.single_check_thread.update_member_gui_signal.connect(self.update_member_gui_in_table)
-            self.single_check_thread.new_data_fetched_signal.connect(self.update_member_name_in_table)
-            self.single_check_thread.member_processing_started_signal.connect(lambda idx: self.handle_member_processing_signal(idx, True))
-            self.single_check_thread.member_processing_finished_signal.connect(lambda idx: self.handle_member_processing_signal(idx, False))
-            self.single_check_thread.global_log_signal.connect(self.update_status_bar_message)
-            self.single_check_thread.start()
+        if len(members_to_check) == 1:
+            member_display_name = self._get_member_display_name_with_index(members_to_check[0], self._original_index_of(members_to_check[0]))
+            message = f"بدء الفحص الفوري للعضو: {member_display_name}"
         else:
-            logger.warning(f"check_member_now: فهرس خاطئ {original_member_index}")
-            self._show_toast("خطأ في بدء الفحص الفوري (فهرس غير صالح).", type="error")
+            message = f"تمت إضافة {added} عضو إلى طابور الفحص الفوري"
+        logger.info(f"طلب فحص فوري: {len(members_to_check)} عضو ({added} جديد في الطابور).")
+        self.update_status_bar_message(message + "...", is_general_message=False)
+        self._show_toast(message, type="info")
+
+    def _ensure_engine_running_for_check_now(self):
+        """تشغيل خيط المراقبة للفحص الفوري فقط إذا لم يكن يعمل (أو كان ينهي تشغيلًا سابقًا للفحص الفوري)."""
+        if self.monitoring_thread.accepts_check_now():
+            return
+        self.monitoring_thread.wait() # تشغيل سابق للفحص الفوري فقط ينتهي الآن
+        self.monitoring_thread.prepare_start(self.settings.copy(), manual_only=True)
+        self.monitoring_thread.start()
 
     def download_all_member_pdfs(self, original_member_index):
-        if not self.activation_successful or (self.current_subscription_data and self.current_subscription_data.get("status","").upper() != "ACTIVE"):
+        if not self._is_subscription_usable():
             self._show_toast("لا يمكن تحميل الشهادات. البرنامج غير مفعل أو الاشتراك غير نشط.", type="error")
             return
 
@@ -894,11 +1070,7 @@ class AnemApp(QMainWindow):
         member = self.members_list[original_member_index]
         member_display_name = self._get_member_display_name_with_index(member, original_member_index)
 
-        if member.is_processing and self.active_download_all_pdfs_threads.get(original_member_index): # تحقق إذا كان قيد المعالجة بواسطة هذا الخيط
-            self._show_toast(f"تحميل شهادات العضو '{member_display_name}' قيد التنفيذ بالفعل.", type="warning")
-            return
-
-        if self.active_download_all_pdfs_threads.get(original_member_index) and self.active_download_all_pdfs_threads[original_member_index].isRunning():
+        if self.pdf_download_manager.is_downloading(member):
             self._show_toast(f"تحميل شهادات العضو '{member_display_name}' قيد التنفيذ بالفعل.", type="warning")
             return
 
@@ -910,29 +1082,76 @@ class AnemApp(QMainWindow):
         self.update_status_bar_message(f"بدء تحميل جميع الشهادات لـ {member_display_name}...", is_general_message=False)
         self._show_toast(f"بدء تحميل جميع الشهادات لـ {member_display_name}", type="info")
 
-        all_pdfs_thread = DownloadAllPdfsThread(member, original_member_index, self.api_client)
-        all_pdfs_thread.all_pdfs_download_finished_signal.connect(self.handle_all_pdfs_download_finished)
-        all_pdfs_thread.individual_pdf_status_signal.connect(self.handle_individual_pdf_status)
-        all_pdfs_thread.member_processing_started_signal.connect(lambda idx: self.handle_member_processing_signal(idx, True))
-        # ربط انتهاء الخيط بـ _clear_active_download_thread لضمان تنظيف الحالة
-        all_pdfs_thread.member_processing_finished_signal.connect(lambda idx, ri=original_member_index: self._clear_active_download_thread(ri))
-        all_pdfs_thread.global_log_signal.connect(self.update_status_bar_message)
-
-        self.active_download_all_pdfs_threads[original_member_index] = all_pdfs_thread
-        all_pdfs_thread.start()
-
-    def _clear_active_download_thread(self, original_member_index):
-        if original_member_index in self.active_download_all_pdfs_threads:
-            del self.active_download_all_pdfs_threads[original_member_index]
-        # التأكد من أن is_processing يتم تحديثها بشكل صحيح
-        self.handle_member_processing_signal(original_member_index, False) # استدعاء هذا لتحديث is_processing
-        if 0 <= original_member_index < len(self.members_list):
-            member = self.members_list[original_member_index]
-            member_display_name = self._get_member_display_name_with_index(member, original_member_index)
-            self.update_status_bar_message(f"انتهت معالجة تحميل الشهادات للعضو: {member_display_name}", is_general_message=True)
+        self.pdf_download_manager.submit(member, self.api_client)
+
+    def download_missing_pdfs_for_all_members(self):
+        """تحميل جماعي: كل عضو لديه موعد وشهاداته غير مكتملة، على طابور التحميل المحدود (دون رسائل لكل عضو)."""
+        if not self._is_subscription_usable():
+            self._show_toast("لا يمكن تحميل الشهادات. البرنامج غير مفعل أو الاشتراك غير نشط.", type="error")
+            return
+        members_to_download = [m for m in self.members_list if self._member_needs_pdf_download(m)]
+        if not members_to_download:
+            self._show_toast("جميع الشهادات محملة بالفعل.", type="info")
+            return
+        added = self.pdf_download_manager.submit_many(members_to_download, self.api_client)
+        logger.info(f"تحميل جماعي للشهادات: {added} عضو (من {len(members_to_download)} بحاجة إلى شهادات).")
+        self._show_toast(f"بدء تحميل شهادات {added} عضو.", type="info")
 
+    def stop_bulk_pdf_downloads(self):
+        self.pdf_download_manager.cancel_bulk()
+        self.update_status_bar_message("تم إيقاف التحميل الجماعي للشهادات.", is_general_message=True)
 
-    def handle_individual_pdf_status(self, original_member_index, pdf_type, file_path_or_status_msg_from_thread, success, error_msg_for_toast_from_thread):
+    def _resume_bulk_pdf_downloads(self):
+        """استئناف التحميل الجماعي الذي لم يكتمل في الجلسة السابقة (الطابور محفوظ في APP_DATA_DIR)."""
+        if not self._is_subscription_usable():
+            return
+        resumed = self.pdf_download_manager.resume_bulk(self.members_list, self.api_client, self._member_needs_pdf_download)
+        if resumed:
+            self._show_toast(f"استئناف تحميل شهادات {resumed} عضو من الجلسة السابقة.", type="info")
+
+    @staticmethod
+    def _member_needs_pdf_download(member):
+        # السجل يحدد الملفات الموجودة دون الوصول إلى القرص
+        return bool(member.pre_inscription_id) and \
+               member.status in ["لديه موعد مسبق", "تم الحجز", "مكتمل", "فشل تحميل PDF", "مستفيد حاليًا من المنحة"] and \
+               not SHARED_PDF_MANIFEST.is_member_complete(member)
+
+    # --- إشارات طابور تحميل الشهادات (تحمل كائن العضو؛ يتم تحويله إلى الفهرس الحالي هنا) ---
+    def _handle_pdf_download_started(self, member):
+        original_member_index = self._original_index_of(member)
+        if original_member_index >= 0:
+            self.handle_member_processing_signal(original_member_index, True)
+
+    def _handle_pdf_download_processing_finished(self, member):
+        original_member_index = self._original_index_of(member)
+        if original_member_index >= 0:
+            self.handle_member_processing_signal(original_member_index, False)
+
+    def _handle_pdf_report_finished(self, member, pdf_type, file_path_or_status_msg, success, error_msg, interactive):
+        original_member_index = self._original_index_of(member)
+        if original_member_index >= 0:
+            self.handle_individual_pdf_status(original_member_index, pdf_type, file_path_or_status_msg, success, error_msg, interactive)
+
+    def _handle_pdf_member_finished(self, member, honneur_path, rdv_path, overall_status_msg, all_success, first_error_msg, interactive):
+        original_member_index = self._original_index_of(member)
+        if original_member_index >= 0:
+            self.handle_all_pdfs_download_finished(original_member_index, honneur_path, rdv_path, overall_status_msg, all_success, first_error_msg, interactive)
+
+    def _handle_pdf_download_progress(self, done_count, total_count, members_per_minute, bytes_per_second, eta_seconds):
+        if total_count <= 1:
+            return # تحميل فردي: الرسائل الخاصة بالعضو تكفي
+        if done_count >= total_count:
+            self.update_status_bar_message(f"تحميل الشهادات: اكتمل ({total_count} عضو).", is_general_message=True)
+            self._show_toast(f"انتهى تحميل شهادات {total_count} عضو.", type="success")
+            return
+        progress_msg = f"تحميل الشهادات: {done_count}/{total_count} عضو"
+        if eta_seconds >= 0:
+            eta_minutes, eta_secs = divmod(int(eta_seconds), 60)
+            progress_msg += f" | {members_per_minute:.1f} عضو/دقيقة، {bytes_per_second / 1024:.0f} ك.ب/ثانية | الوقت المتبقي: ~{eta_minutes:02d}:{eta_secs:02d}"
+        self.update_status_bar_message(progress_msg, is_general_message=True)
+
+
+    def handle_individual_pdf_status(self, original_member_index, pdf_type, file_path_or_status_msg_from_thread, success, error_msg_for_toast_from_thread, interactive=True):
         if not (0 <= original_member_index < len(self.members_list)):
             return
         member = self.members_list[original_member_index]
@@ -948,22 +1167,24 @@ class AnemApp(QMainWindow):
                 member.pdf_rdv_path = file_path
 
             activity_detail = f"تم تحميل شهادة {pdf_type_ar} بنجاح إلى {os.path.basename(file_path)}."
-            member.set_activity_detail(file_path_or_status_msg_from_thread if os.path.exists(file_path_or_status_msg_from_thread) else activity_detail)
-            toast_msg = f"للعضو {member_name_display}: {activity_detail}\nالمسار: {file_path}"
-            self._show_toast(toast_msg, type="success", duration=5000)
-            self.update_status_bar_message(f"تم تحميل شهادة {pdf_type_ar} للعضو {member_name_display}.", is_general_message=True)
+            member.set_activity_detail(activity_detail)
+            if interactive:
+                toast_msg = f"للعضو {member_name_display}: {activity_detail}\nالمسار: {file_path}"
+                self._show_toast(toast_msg, type="success", duration=5000)
+                self.update_status_bar_message(f"تم تحميل شهادة {pdf_type_ar} للعضو {member_name_display}.", is_general_message=True)
         else:
             activity_detail = file_path_or_status_msg_from_thread # إذا فشل، فهذه رسالة الخطأ
             member.set_activity_detail(activity_detail, is_error=True)
-            toast_msg = f"للعضو {member_name_display}: فشل تحميل شهادة {pdf_type_ar}. السبب: {error_msg_for_toast_from_thread or activity_detail}"
-            self._show_toast(toast_msg, type="error", duration=6000)
-            self.update_status_bar_message(f"فشل تحميل شهادة {pdf_type_ar} للعضو {member_name_display}.", is_general_message=True)
+            if interactive:
+                toast_msg = f"للعضو {member_name_display}: فشل تحميل شهادة {pdf_type_ar}. السبب: {error_msg_for_toast_from_thread or activity_detail}"
+                self._show_toast(toast_msg, type="error", duration=6000)
+                self.update_status_bar_message(f"فشل تحميل شهادة {pdf_type_ar} للعضو {member_name_display}.", is_general_message=True)
 
         self.update_member_gui_in_table(original_member_index, member.status, member.last_activity_detail, get_icon_name_for_status(member.status))
-        self.save_members_data()
+        self.save_members_data(member)
 
 
-    def handle_all_pdfs_download_finished(self, original_member_index, honneur_path, rdv_path, overall_status_msg, all_success, first_error_msg):
+    def handle_all_pdfs_download_finished(self, original_member_index, honneur_path, rdv_path, overall_status_msg, all_success, first_error_msg, interactive=True):
         if not (0 <= original_member_index < len(self.members_list)):
             logger.warning(f"handle_all_pdfs_download_finished: فهرس خاطئ {original_member_index}")
             return
@@ -984,6 +1205,10 @@ class AnemApp(QMainWindow):
                      member.status = "تم الحجز" # أو أي حالة مناسبة أخرى
 
             member.set_activity_detail(overall_status_msg)
+            if not interactive: # تحميل جماعي: التقدم الإجمالي يظهر في شريط الحالة
+                self.update_member_gui_in_table(original_member_index, member.status, member.last_activity_detail, get_icon_name_for_status(member.status))
+                self.save_members_data(member)
+                return
             final_toast_msg = f"للعضو {member_name_display}: {overall_status_msg}"
             self._show_toast(final_toast_msg, type="success", duration=7000)
             self.update_status_bar_message(f"اكتمل تحميل شهادات العضو {member_name_display}.", is_general_message=True)
@@ -992,18 +1217,8 @@ class AnemApp(QMainWindow):
             folder_to_open = None
             if honneur_path: folder_to_open = os.path.dirname(honneur_path)
             elif rdv_path: folder_to_open = os.path.dirname(rdv_path)
-
-            # إذا لم يتم تحديد مسار، حاول بناء المسار الافتراضي
-            if not folder_to_open and member.pre_inscription_id: # تأكد من وجود pre_inscription_id
-                documents_location = QStandardPaths.writableLocation(QStandardPaths.DocumentsLocation)
-                base_app_dir_name = "ملفات_المنحة_البرنامج"
-                member_name_for_folder_path = member.get_full_name_ar()
-                if not member_name_for_folder_path or member_name_for_folder_path.isspace():
-                    member_name_for_folder_path = member.nin # استخدام NIN كاسم مجلد احتياطي
-                safe_folder_name_part = "".join(c for c in member_name_for_folder_path if c.isalnum() or c in (' ', '_', '-')).rstrip().replace(" ", "_")
-                if not safe_folder_name_part: safe_folder_name_part = member.nin # احتياطي آخر
-                folder_to_open = os.path.join(documents_location, base_app_dir_name, safe_folder_name_part)
-
+            elif member.pre_inscription_id: # نفس المجلد الذي يستخدمه طابور التحميل
+                folder_to_open = member_pdf_output_dir(member)
 
             if folder_to_open and os.path.exists(folder_to_open):
                 reply = QMessageBox.question(self, 'فتح المجلد', f"تم حفظ الملفات بنجاح في المجلد:\n{folder_to_open}\n\nهل تريد فتح هذا المجلد؟",
@@ -1022,12 +1237,13 @@ class AnemApp(QMainWindow):
             if first_error_msg and first_error_msg not in final_detail_msg: # إضافة الخطأ الأول إذا لم يكن موجودًا بالفعل
                 final_detail_msg += f" (الخطأ الأول: {first_error_msg.split(':')[0]})" # عرض الجزء الأول من الخطأ فقط
             member.set_activity_detail(final_detail_msg, is_error=True)
-            final_toast_msg = f"للعضو {member_name_display}: فشل تحميل بعض الشهادات.\n{overall_status_msg}"
-            self._show_toast(final_toast_msg, type="error", duration=7000)
-            self.update_status_bar_message(f"فشل تحميل بعض شهادات العضو {member_name_display}.", is_general_message=True)
+            if interactive:
+                final_toast_msg = f"للعضو {member_name_display}: فشل تحميل بعض الشهادات.\n{overall_status_msg}"
+                self._show_toast(final_toast_msg, type="error", duration=7000)
+                self.update_status_bar_message(f"فشل تحميل بعض شهادات العضو {member_name_display}.", is_general_message=True)
 
         self.update_member_gui_in_table(original_member_index, member.status, member.last_activity_detail, get_icon_name_for_status(member.status))
-        self.save_members_data()
+        self.save_members_data(member)
 
 
     def remove_specific_member(self, original_member_index):
@@ -1055,10 +1271,6 @@ class AnemApp(QMainWindow):
         self._show_toast(f"تم حذف العضو: {member_display_name}", type="info")
         self.save_members_data() # حفظ التغييرات
 
-        # تحديث فهرس المراقبة إذا لزم الأمر
-        if self.monitoring_thread and self.monitoring_thread.current_member_index_to_process >= len(self.members_list):
-            self.monitoring_thread.current_member_index_to_process = 0 # أو أي منطق آخر مناسب لإعادة التعيين
-
 
     def load_app_settings(self):
         loaded_settings = None
@@ -1146,14 +1358,132 @@ class AnemApp(QMainWindow):
         dialog = SettingsDialog(self.settings.copy(), self) # تمرير نسخة من الإعدادات
         if dialog.exec_() == SettingsDialog.Accepted:
             new_settings = dialog.get_settings()
+            old_storage_backend = self.settings.get(SETTING_STORAGE_BACKEND, DEFAULT_SETTINGS[SETTING_STORAGE_BACKEND])
             self.settings.update(new_settings) # تحديث الإعدادات في الذاكرة
             self.save_app_settings() # حفظ الإعدادات المحدثة في الملف
             self.apply_app_settings() # تطبيق الإعدادات على المكونات النشطة
+            if new_settings.get(SETTING_STORAGE_BACKEND, old_storage_backend) != old_storage_backend:
+                self._switch_storage_backend(new_settings[SETTING_STORAGE_BACKEND])
             self._show_toast("تم حفظ الإعدادات بنجاح وتطبيقها.", type="success")
             logger.info("تم تحديث إعدادات التطبيق.")
             self.update_status_bar_message("تم تحديث الإعدادات.", is_general_message=True)
 
 
+    def _open_member_store(self):
+        if self.settings.get(SETTING_STORAGE_BACKEND, DEFAULT_SETTINGS[SETTING_STORAGE_BACKEND]) != STORAGE_BACKEND_SQLITE:
+            return None
+        try:
+            return SqliteMemberStore()
+        except Exception as e:
+            logger.exception(f"فشل فتح قاعدة بيانات الأعضاء. سيتم استخدام ملف JSON بدلاً منها: {e}")
+            return None
+
+    def _switch_storage_backend(self, new_backend):
+        # كتابة التغييرات المعلقة في المخزن الحالي، ثم كتابة القائمة كاملة في المخزن الجديد دون إعادة تشغيل
+        self.members_persistence.flush()
+        old_store = self.members_persistence.store
+        new_store = None
+        if new_backend == STORAGE_BACKEND_SQLITE:
+            try:
+                new_store = SqliteMemberStore()
+            except Exception as e:
+                logger.exception(f"فشل إنشاء قاعدة بيانات الأعضاء: {e}")
+                self._show_toast(f"فشل إنشاء قاعدة بيانات الأعضاء: {e}. سيتم الاستمرار باستخدام ملف JSON.", type="error", duration=6000)
+                self.settings[SETTING_STORAGE_BACKEND] = DEFAULT_SETTINGS[SETTING_STORAGE_BACKEND]
+                self.save_app_settings()
+                return
+        self.members_persistence.set_store(new_store)
+        self.members_persistence.flush()
+        if new_store is not None:
+            new_store.set_meta(new_store.META_JSON_MIGRATED, DATA_FILE) # القائمة الحالية أصبحت في قاعدة البيانات
+        if old_store is not None:
+            old_store.close()
+        backend_display = "قاعدة بيانات SQLite" if new_store is not None else "ملف JSON"
+        logger.info(f"تم تبديل طريقة تخزين بيانات الأعضاء إلى: {backend_display}")
+        self._show_toast(f"تم نقل بيانات {len(self.members_list)} عضو إلى {backend_display}.", type="info", duration=5000)
+
+    def export_members_to_json(self):
+        documents_location = QStandardPaths.writableLocation(QStandardPaths.DocumentsLocation)
+        export_path, _ = QFileDialog.getSaveFileName(self, "تصدير بيانات الأعضاء", os.path.join(documents_location, "members_data_export.json"), "JSON (*.json)")
+        if not export_path:
+            return
+        try:
+            self.members_persistence.flush() # ضمان تصدير أحدث البيانات
+            store = self.members_persistence.store
+            if store is not None:
+                exported_count = store.export_json(export_path)
+            else:
+                shutil.copy2(DATA_FILE, export_path)
+                exported_count = len(self.members_list)
+            logger.info(f"تم تصدير بيانات {exported_count} عضو إلى {export_path}")
+            self._show_toast(f"تم تصدير بيانات {exported_count} عضو إلى:\n{export_path}", type="success", duration=5000)
+        except Exception as e:
+            logger.exception(f"فشل تصدير بيانات الأعضاء إلى {export_path}: {e}")
+            self._show_toast(f"فشل تصدير بيانات الأعضاء: {e}", type="error")
+
+    def import_members_from_file(self):
+        if not self._is_subscription_usable():
+            self._show_toast("لا يمكن استيراد الأعضاء. البرنامج غير مفعل أو الاشتراك غير نشط.", type="error")
+            return
+        if self.import_thread and self.import_thread.isRunning():
+            self._show_toast("عملية استيراد أخرى قيد التنفيذ بالفعل.", type="warning")
+            return
+        documents_location = QStandardPaths.writableLocation(QStandardPaths.DocumentsLocation)
+        import_path, _ = QFileDialog.getOpenFileName(self, "استيراد أعضاء", documents_location, IMPORT_FILE_FILTER)
+        if not import_path:
+            return
+
+        logger.info(f"بدء استيراد الأعضاء من {import_path}")
+        # القراءة والتحقق في خيط منفصل؛ التكرار يُفحص عبر مجموعات NIN/الوسيط الحالية
+        self.import_thread = MemberImportThread(import_path, self.member_index_by_nin.keys(), (m.wassit_no for m in self.members_list), self)
+        self.import_progress_dialog = QProgressDialog("جاري قراءة الملف...", "إلغاء", 0, 0, self) # نطاق 0-0: مؤشر انشغال (عدد الصفوف غير معروف مسبقًا)
+        self.import_progress_dialog.setWindowTitle("استيراد أعضاء")
+        self.import_progress_dialog.setWindowModality(Qt.WindowModal)
+        self.import_progress_dialog.setMinimumDuration(0)
+        self.import_progress_dialog.canceled.connect(self.import_thread.stop)
+        self.import_thread.progress_signal.connect(self._handle_import_progress)
+        self.import_thread.import_finished_signal.connect(self._handle_import_finished)
+        self.import_thread.import_failed_signal.connect(self._handle_import_failed)
+        self.import_thread.finished.connect(self._close_import_progress_dialog)
+        self.import_thread.start()
+
+    def _handle_import_progress(self, rows_read, accepted_count):
+        if self.import_progress_dialog:
+            self.import_progress_dialog.setLabelText(f"تمت قراءة {rows_read} صف ({accepted_count} عضو جديد)...")
+
+    def _close_import_progress_dialog(self):
+        if self.import_progress_dialog:
+            self.import_progress_dialog.close()
+            self.import_progress_dialog = None
+
+    def _handle_import_failed(self, error_message):
+        self._show_toast(f"فشل استيراد الأعضاء: {error_message}", type="error", duration=6000)
+        self.update_status_bar_message(f"فشل استيراد الأعضاء: {error_message}", is_general_message=True)
+
+    def _handle_import_finished(self, new_members, duplicates_count, rejected_count, error_samples):
+        self._close_import_progress_dialog()
+        # إضافة جميع الأعضاء ثم إعادة تعيين النموذج وجدولة حفظ واحد (بدلاً من تحديث وحفظ لكل عضو)
+        existing_nins = set(self.member_index_by_nin) # قد تكون القائمة تغيرت أثناء القراءة
+        new_members = [m for m in new_members if m.nin not in existing_nins]
+        if new_members:
+            self.members_list.extend(new_members)
+            if self.is_filter_active:
+                self._rebuild_member_index()
+                self.apply_filter_and_search()
+            else:
+                self.update_table()
+            self.save_members_data()
+            for member in new_members: # جلب المعلومات الأولية عبر الطابور المحدود (بدون فحص فوري لكل عضو)
+                self.initial_fetch_queue.submit(member, self.api_client)
+
+        summary = f"تم استيراد {len(new_members)} عضو. مكرر: {duplicates_count}، مرفوض: {rejected_count}."
+        logger.info(summary)
+        self.update_status_bar_message(summary, is_general_message=True)
+        if error_samples:
+            QMessageBox.warning(self, "نتيجة الاستيراد", summary + "\n\nأمثلة على الصفوف المرفوضة:\n" + "\n".join(error_samples))
+        else:
+            self._show_toast(summary, type="success" if new_members else "info", duration=5000)
+
     def apply_app_settings(self):
         # إعادة تهيئة AnemAPIClient بالإعدادات الجديدة
         self.api_client = AnemAPIClient(
@@ -1162,6 +1492,9 @@ class AnemApp(QMainWindow):
             request_timeout=self.settings.get(SETTING_REQUEST_TIMEOUT, DEFAULT_SETTINGS[SETTING_REQUEST_TIMEOUT])
         )
 
+        self.initial_fetch_queue.update_settings(self.settings) # التأخير بين الأعضاء لطابور الجلب الأولي
+        self.pdf_download_manager.update_settings(self.settings) # ونفس التأخير للتحميل الجماعي للشهادات
+
         # تحديث إعدادات خيط المراقبة إذا كان يعمل
         if self.monitoring_thread.isRunning():
             self.monitoring_thread.update_thread_settings(self.settings.copy())
@@ -1244,38 +1577,31 @@ class AnemApp(QMainWindow):
 
 
     def update_active_row_spinner_display(self):
-        if self.active_spinner_row_in_view == -1 or not (0 <= self.active_spinner_row_in_view < self.table.rowCount()):
-            return # لا يوجد صف نشط للسبينر أو الفهرس خارج الحدود
-
-        current_list_displayed = self.filtered_members_list if self.is_filter_active else self.members_list
+        if self.active_spinner_row_in_view == -1:
+            return # لا يوجد صف نشط للسبينر
 
         # التحقق إذا كان الفهرس لا يزال صالحًا في القائمة المعروضة
-        if self.active_spinner_row_in_view >= len(current_list_displayed):
+        member = self.members_model.member_at(self.active_spinner_row_in_view)
+        if member is None:
             self.row_spinner_timer.stop()
             self.active_spinner_row_in_view = -1
+            self.members_model.set_spinner(-1)
             return
-
-        member = current_list_displayed[self.active_spinner_row_in_view]
-        try:
-            original_member_index = self.members_list.index(member) # الحصول على الفهرس الأصلي
-        except ValueError: # إذا لم يعد العضو موجودًا في القائمة الرئيسية
+        original_member_index = self._original_index_of(member) # الحصول على الفهرس الأصلي
+        if original_member_index < 0: # إذا لم يعد العضو موجودًا في القائمة الرئيسية
             self.row_spinner_timer.stop()
             self.active_spinner_row_in_view = -1
             return
 
-        # إذا لم يعد العضو قيد المعالجة (باستثناء حالات خاصة مثل تحميل PDF أو فحص فردي لا يزال جاريًا)
+        # إذا لم يعد العضو قيد المعالجة (باستثناء حالات خاصة مثل تحميل PDF لا يزال جاريًا)
         if not member.is_processing:
             # تحقق إذا كان هناك خيط تحميل PDF نشط لهذا العضو
-            is_still_pdf_downloading = self.active_download_all_pdfs_threads.get(original_member_index) and \
-                                       self.active_download_all_pdfs_threads[original_member_index].isRunning()
-            # تحقق إذا كان هناك خيط فحص فردي نشط لهذا العضو
-            is_still_single_checking = self.single_check_thread and \
-                                       self.single_check_thread.isRunning() and \
-                                       self.single_check_thread.index == original_member_index
-
-            if not is_still_pdf_downloading and not is_still_single_checking: # إذا لم تكن هناك عمليات أخرى نشطة
+            is_still_pdf_downloading = self.pdf_download_manager.is_downloading(member)
+
+            if not is_still_pdf_downloading: # إذا لم تكن هناك عمليات أخرى نشطة
                 self.row_spinner_timer.stop()
                 self.active_spinner_row_in_view = -1
+                self.members_model.set_spinner(-1)
             # تحديث واجهة المستخدم لتعكس الحالة النهائية (إزالة السبينر)
             self.update_member_gui_in_table(original_member_index, member.status, member.last_activity_detail, get_icon_name_for_status(member.status))
             return
@@ -1284,10 +1610,7 @@ class AnemApp(QMainWindow):
         self.spinner_char_idx = (self.spinner_char_idx + 1) % len(self.spinner_chars)
         char = self.spinner_chars[self.spinner_char_idx]
 
-        icon_item_in_table = self.table.item(self.active_spinner_row_in_view, self.COL_ICON)
-        if icon_item_in_table:
-            icon_item_in_table.setText(char) # عرض حرف السبينر
-            icon_item_in_table.setIcon(QIcon()) # إزالة الأيقونة
+        self.members_model.set_spinner(self.active_spinner_row_in_view, char) # إعادة رسم خلية الأيقونة فقط
 
 
     def handle_member_processing_signal(self, original_member_index, is_processing_now):
@@ -1299,15 +1622,12 @@ class AnemApp(QMainWindow):
         member.is_processing = is_processing_now # تحديث حالة المعالجة للعضو
 
         # البحث عن الصف المقابل في الجدول (قد يكون مفلترًا)
-        row_in_table_to_update = -1
-        current_list_displayed = self.filtered_members_list if self.is_filter_active else self.members_list
-        try:
-            row_in_table_to_update = current_list_displayed.index(member)
-        except ValueError: # إذا لم يتم العثور على العضو في القائمة المعروضة حاليًا (نادر)
+        row_in_table_to_update = self.members_model.row_of(member)
+        if row_in_table_to_update < 0: # إذا لم يتم العثور على العضو في القائمة المعروضة حاليًا (نادر)
             return
 
-        if not (0 <= row_in_table_to_update < self.table.rowCount()):
-             logger.warning(f"HMP Signal: فهرس الجدول المحسوب {row_in_table_to_update} خارج الحدود لـ {self.table.rowCount()} صفوف.")
+        if not (0 <= row_in_table_to_update < self.members_model.rowCount()):
+             logger.warning(f"HMP Signal: فهرس الجدول المحسوب {row_in_table_to_update} خارج الحدود لـ {self.members_model.rowCount()} صفوف.")
              return
 
         member_display_name = self._get_member_display_name_with_index(member, original_member_index)
@@ -1317,16 +1637,10 @@ class AnemApp(QMainWindow):
 
             # تحديد الصف وجعله مرئيًا
             self.table.selectRow(row_in_table_to_update)
-            first_column_item = self.table.item(row_in_table_to_update, 0) # أي عنصر في الصف
-            if first_column_item:
-                self.table.scrollToItem(first_column_item, QAbstractItemView.EnsureVisible)
-
-            icon_item = self.table.item(row_in_table_to_update, self.COL_ICON)
-            if icon_item:
-                icon_item.setText(self.spinner_chars[self.spinner_char_idx]) # عرض أول حرف سبينر
-                icon_item.setIcon(QIcon()) # إزالة الأيقونة
+            self.table.scrollTo(self.members_model.index(row_in_table_to_update, 0), QAbstractItemView.EnsureVisible)
 
-            self.highlight_processing_row(row_in_table_to_update, force_processing_display=True) # تمييز الصف
+            self.members_model.set_spinner(row_in_table_to_update, self.spinner_chars[self.spinner_char_idx]) # عرض أول حرف سبينر
+            self.highlight_processing_row(row_in_table_to_update) # تمييز الصف
 
             if not self.row_spinner_timer.isActive(): # بدء مؤقت السبينر إذا لم يكن نشطًا
                 self.row_spinner_timer.start(self.row_spinner_timer_interval)
@@ -1334,82 +1648,28 @@ class AnemApp(QMainWindow):
             self.update_status_bar_message(f"جاري معالجة العضو: {member_display_name}...", is_general_message=False)
 
         else: # إذا انتهت المعالجة
-            # تحقق إذا كان هناك عمليات أخرى لا تزال نشطة لهذا العضو (مثل تحميل PDF أو فحص فردي)
-            is_still_pdf_downloading = self.active_download_all_pdfs_threads.get(original_member_index) and \
-                                       self.active_download_all_pdfs_threads[original_member_index].isRunning()
-            is_still_single_checking = self.single_check_thread and \
-                                       self.single_check_thread.isRunning() and \
-                                       self.single_check_thread.index == original_member_index
-
-            if not is_still_pdf_downloading and not is_still_single_checking: # فقط إذا لم تكن هناك عمليات أخرى
+            # تحقق إذا كان هناك عمليات أخرى لا تزال نشطة لهذا العضو (مثل تحميل PDF)
+            is_still_pdf_downloading = self.pdf_download_manager.is_downloading(member)
+
+            if not is_still_pdf_downloading: # فقط إذا لم تكن هناك عمليات أخرى
                 if self.active_spinner_row_in_view == row_in_table_to_update: # إذا كان هذا هو الصف النشط للسبينر
                     self.row_spinner_timer.stop()
                     self.active_spinner_row_in_view = -1 # إلغاء تحديد الصف النشط للسبينر
-                    icon_item = self.table.item(row_in_table_to_update, self.COL_ICON)
-                    if icon_item:
-                        icon_item.setText("") # إزالة حرف السبينر
-
-            self.highlight_processing_row(row_in_table_to_update, force_processing_display=False) # إزالة تمييز الصف
-
+                    self.members_model.set_spinner(-1) # إزالة حرف السبينر
 
-    def highlight_processing_row(self, row_index_in_table, force_processing_display=None):
-        if not (0 <= row_index_in_table < self.table.rowCount()):
-            return # الفهرس خارج الحدود
+            self.highlight_processing_row(row_in_table_to_update) # إزالة تمييز الصف
 
-        current_list_displayed = self.filtered_members_list if self.is_filter_active else self.members_list
-        if row_index_in_table >= len(current_list_displayed): # تحقق إضافي
-            return
 
-        member = current_list_displayed[row_index_in_table]
-        is_processing_flag = force_processing_display if force_processing_display is not None else member.is_processing
-
-        item_for_selection_check = self.table.item(row_index_in_table, 0) # أي عمود للتحقق من التحديد
-        is_row_selected_by_user_or_code = False
-        if item_for_selection_check:
-            is_row_selected_by_user_or_code = item_for_selection_check.isSelected() # التحقق من التحديد
-
-        # ألوان الخلفية
-        default_bg_color = self.table.palette().color(QPalette.Base)
-        alternate_bg_color = QColor(self.table.palette().color(QPalette.AlternateBase)) if self.table.alternatingRowColors() else default_bg_color
-        processing_bg_color = QColorConstants.PROCESSING_ROW_DARK_THEME
-        selection_bg_color_from_qss = QColor("#00A2E8") # لون التحديد من QSS
-
-        for col in range(self.table.columnCount()):
-            item = self.table.item(row_index_in_table, col)
-            if item:
-                if is_processing_flag: # إذا كان الصف قيد المعالجة
-                    item.setBackground(processing_bg_color)
-                    item.setForeground(Qt.white)
-                elif is_row_selected_by_user_or_code: # إذا كان الصف محددًا
-                    if item.background() != selection_bg_color_from_qss: # تجنب إعادة التعيين غير الضرورية
-                         item.setBackground(selection_bg_color_from_qss)
-                    if item.foreground().color() != Qt.white: # تأكد من لون النص
-                         item.setForeground(Qt.white)
-                else: # إذا لم يكن قيد المعالجة ولا محددًا (الحالة العادية)
-                    status_text_for_color = member.status
-                    specific_color = None
-                    # تحديد لون خاص بناءً على حالة العضو
-                    if status_text_for_color == "مستفيد حاليًا من المنحة": specific_color = QColorConstants.BENEFITING_GREEN_DARK_THEME
-                    elif status_text_for_color == "بيانات الإدخال خاطئة": specific_color = QColorConstants.PINK_DARK_THEME
-                    elif status_text_for_color == "لديه موعد مسبق": specific_color = QColorConstants.LIGHT_BLUE_DARK_THEME
-                    elif status_text_for_color == "غير مؤهل للحجز": specific_color = QColorConstants.ORANGE_RED_DARK_THEME
-                    elif status_text_for_color == "مكتمل": specific_color = QColorConstants.LIGHT_GREEN_DARK_THEME
-                    elif "فشل" in status_text_for_color or "غير مؤهل" in status_text_for_color or "خطأ" in status_text_for_color:
-                        specific_color = QColorConstants.LIGHT_PINK_DARK_THEME
-                    elif "يتطلب تسجيل مسبق" in status_text_for_color: specific_color = QColorConstants.LIGHT_YELLOW_DARK_THEME
-
-                    if specific_color:
-                        item.setBackground(specific_color)
-                    else: # إذا لم يكن هناك لون خاص، استخدم الألوان الافتراضية/المتناوبة
-                        if self.table.alternatingRowColors() and row_index_in_table % 2 != 0 :
-                            item.setBackground(alternate_bg_color)
-                        else:
-                            item.setBackground(default_bg_color)
-                    item.setForeground(self.table.palette().color(QPalette.Text)) # لون النص الافتراضي
+    def highlight_processing_row(self, row_index_in_table):
+        # الألوان (المعالجة/الحالة) يحسبها النموذج من كائن العضو مباشرة؛ لون التحديد يأتي من QSS
+        # لذلك يكفي إعلام العرض بتغير هذا الصف فقط
+        member = self.members_model.member_at(row_index_in_table)
+        if member is not None:
+            self.members_model.refresh_member(member)
 
 
     def add_member(self):
-        if not self.activation_successful or (self.current_subscription_data and self.current_subscription_data.get("status","").upper() != "ACTIVE"):
+        if not self._is_subscription_usable():
             self._show_toast("لا يمكن إضافة أعضاء. البرنامج غير مفعل أو الاشتراك غير نشط.", type="error")
             return
 
@@ -1440,32 +1700,24 @@ class AnemApp(QMainWindow):
             self.members_list.append(member)
 
             if self.is_filter_active: # إذا كان الفلتر نشطًا، أعد تطبيقه
+                self._rebuild_member_index() # تغيرت العضوية (الفلترة وحدها لا تعيد بناء الفهارس)
                 self.apply_filter_and_search()
             else: # إذا لم يكن الفلتر نشطًا، قم بتحديث الجدول مباشرة
                 self.update_table()
 
-            current_original_index = self.members_list.index(member) # الحصول على الفهرس الأصلي للعضو الجديد
+            current_original_index = self._original_index_of(member) # الحصول على الفهرس الأصلي للعضو الجديد
             member_display_name_add = self._get_member_display_name_with_index(member, current_original_index)
             logger.info(f"تمت إضافة العضو: {member_display_name_add}, Phone={data['phone_number']}")
             self.update_status_bar_message(f"تمت إضافة العضو: {member_display_name_add}. جاري جلب المعلومات الأولية...", is_general_message=False)
             self._show_toast(f"تمت إضافة العضو: {member_display_name_add}. جاري جلب المعلومات الأولية...", type="info")
 
-            # بدء خيط جلب المعلومات الأولية للعضو الجديد
-            fetch_thread = FetchInitialInfoThread(member, current_original_index, self.api_client, self.settings.copy())
-            fetch_thread.update_member_gui_signal.connect(self.update_member_gui_in_table)
-            fetch_thread.new_data_fetched_signal.connect(self.update_member_name_in_table)
-            fetch_thread.member_processing_started_signal.connect(lambda idx: self.handle_member_processing_signal(idx, True))
-            # عند انتهاء جلب المعلومات الأولية، قم بتشغيل الفحص الفوري
-            fetch_thread.member_processing_finished_signal.connect(
-                lambda idx, new_member_original_idx=current_original_index: self._trigger_auto_check_after_add(new_member_original_idx)
-            )
-            self.initial_fetch_threads.append(fetch_thread)
-            fetch_thread.start()
+            # إضافة العضو إلى طابور جلب المعلومات الأولية، ثم فحص فوري عند الانتهاء
+            self.initial_fetch_queue.submit(member, self.api_client, auto_check_after=True)
 
     def _trigger_auto_check_after_add(self, original_member_index):
         """
-        يتم استدعاؤها بعد انتهاء FetchInitialInfoThread للعضو المضاف حديثًا.
-        تقوم ببدء فحص فوري (SingleMemberCheckThread) للعضو.
+        يتم استدعاؤها بعد انتهاء مهمة جلب المعلومات الأولية للعضو المضاف حديثًا.
+        تقوم بطلب فحص فوري للعضو (check_member_now).
         """
         if 0 <= original_member_index < len(self.members_list):
             member = self.members_list[original_member_index]
@@ -1476,28 +1728,54 @@ class AnemApp(QMainWindow):
         else:
             logger.warning(f"_trigger_auto_check_after_add: فهرس خاطئ {original_member_index}")
 
+    # --- إشارات طابور جلب المعلومات الأولية (تحمل كائن العضو؛ يتم تحويله إلى الفهرس الحالي هنا) ---
+    def _handle_initial_fetch_gui_update(self, member, status_text, detail_text, icon_name_str):
+        original_member_index = self._original_index_of(member)
+        if original_member_index >= 0:
+            self.update_member_gui_in_table(original_member_index, status_text, detail_text, icon_name_str)
+
+    def _handle_initial_fetch_name_update(self, member, nom_ar, prenom_ar):
+        original_member_index = self._original_index_of(member)
+        if original_member_index >= 0:
+            self.update_member_name_in_table(original_member_index, nom_ar, prenom_ar)
+
+    def _handle_initial_fetch_log(self, message, is_general, member_obj):
+        original_member_index = self._original_index_of(member_obj) if member_obj is not None else None
+        self.update_status_bar_message(message, is_general, member_obj, original_member_index)
+
+    def _handle_initial_fetch_started(self, member):
+        original_member_index = self._original_index_of(member)
+        if original_member_index >= 0:
+            self.handle_member_processing_signal(original_member_index, True)
+
+    def _handle_initial_fetch_finished(self, member, auto_check_after):
+        original_member_index = self._original_index_of(member)
+        if original_member_index < 0: # تم حذف العضو أثناء الجلب
+            return
+        self.handle_member_processing_signal(original_member_index, False)
+        if auto_check_after: # الفحص الفوري يرفض الأعضاء قيد المعالجة، لذا يتم بعد إنهاء حالة المعالجة
+            self._trigger_auto_check_after_add(original_member_index)
 
-    def edit_member_details(self, item):
-        if not self.activation_successful or (self.current_subscription_data and self.current_subscription_data.get("status","").upper() != "ACTIVE"):
+
+    def edit_member_details(self, index=None):
+        if not self._is_subscription_usable():
             self._show_toast("لا يمكن تعديل الأعضاء. البرنامج غير مفعل أو الاشتراك غير نشط.", type="error")
             return
 
         row_in_table = -1
-        if not item: # إذا تم استدعاء الوظيفة بدون عنصر (مثلاً من قائمة السياق بدون نقر مزدوج)
+        if index is None or not index.isValid(): # إذا تم استدعاء الوظيفة بدون فهرس صالح
             selected_rows = self.table.selectionModel().selectedRows()
             if not selected_rows: return # لا يوجد تحديد
             row_in_table = selected_rows[0].row() # استخدام أول صف محدد
         else:
-            row_in_table = item.row() # استخدام صف العنصر المنقور عليه
-
-        current_list_for_edit = self.filtered_members_list if self.is_filter_active else self.members_list
-        if not (0 <= row_in_table < len(current_list_for_edit)): return # تحقق من الحدود
+            row_in_table = index.row() # استخدام صف الخلية المنقور عليها
 
-        member_to_edit_from_display = current_list_for_edit[row_in_table]
-        try:
-            original_member_index = self.members_list.index(member_to_edit_from_display) # الحصول على الفهرس الأصلي
+        member_to_edit_from_display = self.members_model.member_at(row_in_table)
+        if member_to_edit_from_display is None: return # تحقق من الحدود
+        original_member_index = self._original_index_of(member_to_edit_from_display) # الحصول على الفهرس الأصلي
+        if original_member_index >= 0:
             member_to_edit = self.members_list[original_member_index] # الحصول على الكائن الفعلي من القائمة الرئيسية
-        except ValueError:
+        else:
             member_display_name_err = self._get_member_display_name_with_index(member_to_edit_from_display, -1)
             logger.error(f"فشل العثور على العضو {member_display_name_err} في القائمة الرئيسية عند التعديل.")
             self._show_toast(f"خطأ: فشل العثور على العضو {member_display_name_err} للتعديل.", type="error")
@@ -1531,11 +1809,19 @@ class AnemApp(QMainWindow):
                         logger.warning(f"فشل تعديل العضو {member_display_name_edit_title} بسبب تكرار مع {conflicting_member_display}")
                         return
 
+            # الردود المخزنة للمعرفات القديمة والجديدة لم تعد موثوقة
+            SHARED_RESPONSE_CACHE.invalidate_member(member_to_edit)
+
             # تحديث بيانات العضو
             member_to_edit.nin = new_data["nin"]
             member_to_edit.wassit_no = new_data["wassit_no"]
             member_to_edit.ccp = new_data["ccp"]
             member_to_edit.phone_number = new_data["phone_number"]
+            SHARED_RESPONSE_CACHE.invalidate_member(member_to_edit)
+            if nin_changed: # تحديث فهارس NIN بعد تغيير المعرف
+                self._rebuild_member_index()
+                self.members_model.reindex()
+            self.search_index.invalidate(member_to_edit)
 
             member_display_after_edit = self._get_member_display_name_with_index(member_to_edit, original_member_index)
 
@@ -1562,6 +1848,7 @@ class AnemApp(QMainWindow):
                 member_to_edit.is_processing = False # ضمان أنه ليس قيد المعالجة
                 member_to_edit.have_allocation = False
                 member_to_edit.allocation_details = {}
+                self.search_index.invalidate(member_to_edit) # تم مسح الأسماء
 
                 if self.is_filter_active: self.apply_filter_and_search()
                 else: self.update_table_row(original_member_index, member_to_edit) # تحديث الصف في الجدول
@@ -1569,28 +1856,19 @@ class AnemApp(QMainWindow):
                 self.update_status_bar_message(f"تم تعديل بيانات العضو {member_display_after_edit}. جاري إعادة جلب المعلومات...", is_general_message=False)
                 self._show_toast(f"تم تعديل بيانات العضو {member_display_after_edit}. جاري إعادة جلب المعلومات...", type="info")
 
-                # بدء خيط جلب المعلومات الأولية من جديد
-                fetch_thread = FetchInitialInfoThread(member_to_edit, original_member_index, self.api_client, self.settings.copy())
-                fetch_thread.update_member_gui_signal.connect(self.update_member_gui_in_table)
-                fetch_thread.new_data_fetched_signal.connect(self.update_member_name_in_table)
-                fetch_thread.member_processing_started_signal.connect(lambda idx: self.handle_member_processing_signal(idx, True))
-                # عند انتهاء جلب المعلومات، قم بتشغيل الفحص الفوري
-                fetch_thread.member_processing_finished_signal.connect(
-                     lambda idx, edited_member_idx=original_member_index: self._trigger_auto_check_after_add(edited_member_idx)
-                )
-                self.initial_fetch_threads.append(fetch_thread)
-                fetch_thread.start()
+                # إعادة جلب المعلومات الأولية عبر الطابور (يوقف أي جلب جارٍ بالمعرفات القديمة)، ثم فحص فوري
+                self.initial_fetch_queue.submit(member_to_edit, self.api_client, auto_check_after=True)
             else: # إذا لم يتم تغيير المعرفات الرئيسية
                 if self.is_filter_active: self.apply_filter_and_search()
                 else: self.update_table_row(original_member_index, member_to_edit) # تحديث الصف في الجدول
                 self.update_status_bar_message(f"تم تعديل بيانات العضو: {member_display_after_edit}", is_general_message=True)
                 self._show_toast(f"تم تعديل بيانات العضو: {member_display_after_edit}", type="success")
 
-            self.save_members_data() # حفظ التغييرات
+            self.save_members_data(member_to_edit) # حفظ التغييرات
 
 
     def remove_member(self):
-        if not self.activation_successful or (self.current_subscription_data and self.current_subscription_data.get("status","").upper() != "ACTIVE"):
+        if not self._is_subscription_usable():
             self._show_toast("لا يمكن حذف الأعضاء. البرنامج غير مفعل أو الاشتراك غير نشط.", type="error")
             return
 
@@ -1605,11 +1883,7 @@ class AnemApp(QMainWindow):
             current_list_for_display = self.filtered_members_list if self.is_filter_active else self.members_list
             if 0 <= row_in_table < len(current_list_for_display):
                 member_to_remove_display_obj = current_list_for_display[row_in_table]
-                original_idx_for_display_remove = -1
-                try:
-                    original_idx_for_display_remove = self.members_list.index(member_to_remove_display_obj)
-                except ValueError:
-                    pass # تجاهل إذا لم يتم العثور عليه (نادر)
+                original_idx_for_display_remove = self._original_index_of(member_to_remove_display_obj) # -1 إذا لم يتم العثور عليه (نادر)
                 member_to_remove_display_name = self._get_member_display_name_with_index(member_to_remove_display_obj, original_idx_for_display_remove)
                 confirm_msg = f"هل أنت متأكد أنك تريد حذف العضو '{member_to_remove_display_name}'؟"
 
@@ -1626,17 +1900,24 @@ class AnemApp(QMainWindow):
                 members_to_delete_from_display.append(current_list_for_display[row_in_table])
 
         deleted_count = 0
+        ids_to_delete = set()
         for member_to_delete in members_to_delete_from_display:
-            if member_to_delete in self.members_list: # التأكد من وجود العضو في القائمة الرئيسية
-                original_idx_before_delete = self.members_list.index(member_to_delete)
+            original_idx_before_delete = self._original_index_of(member_to_delete)
+            if original_idx_before_delete >= 0: # التأكد من وجود العضو في القائمة الرئيسية
                 deleted_member_display_name = self._get_member_display_name_with_index(member_to_delete, original_idx_before_delete)
-                self.members_list.remove(member_to_delete) # الحذف من القائمة الرئيسية
+                ids_to_delete.add(id(member_to_delete))
+                self.initial_fetch_queue.cancel(member_to_delete) # لا فائدة من جلب معلومات عضو محذوف
+                self.pdf_download_manager.cancel(member_to_delete)
                 logger.info(f"تم حذف العضو: {deleted_member_display_name}")
                 deleted_count +=1
             else:
                 logger.warning(f"محاولة حذف عضو {member_to_delete.nin} غير موجود في القائمة الرئيسية.")
+        if ids_to_delete:
+            # الحذف من القائمة الرئيسية في تمريرة واحدة (خيط المراقبة يكمل على نسخته، والنسخة الجديدة تُنشر مع الفهارس)
+            self.members_list[:] = [m for m in self.members_list if id(m) not in ids_to_delete]
 
         if self.is_filter_active: # إذا كان الفلتر نشطًا، أعد تطبيقه
+            self._rebuild_member_index() # تغيرت العضوية (الفلترة وحدها لا تعيد بناء الفهارس)
             self.apply_filter_and_search()
         else: # إذا لم يكن الفلتر نشطًا، قم بتحديث الجدول مباشرة
             self.update_table()
@@ -1646,148 +1927,86 @@ class AnemApp(QMainWindow):
             self._show_toast(f"تم حذف {deleted_count} عضو/أعضاء بنجاح.", type="info")
 
         self.save_members_data() # حفظ التغييرات
-        # تحديث فهرس المراقبة إذا لزم الأمر
-        if self.monitoring_thread and self.monitoring_thread.current_member_index_to_process >= len(self.members_list):
-            self.monitoring_thread.current_member_index_to_process = 0 # أو أي منطق آخر مناسب لإعادة التعيين
 
 
     def update_table(self):
-        self.table.setRowCount(0) # مسح الجدول قبل إعادة الملء
+        # إعادة تعيين النموذج مرة واحدة بدلاً من إنشاء عناصر لكل خلية؛ العرض يطلب الصفوف المرئية فقط
         list_to_display = self.filtered_members_list if self.is_filter_active else self.members_list
-        for row_idx, member_obj in enumerate(list_to_display):
-            self.table.insertRow(row_idx)
-            self.update_table_row(row_idx, member_obj) # ملء بيانات الصف
+        self._rebuild_member_index() # كل تغيير في العضوية (إضافة/حذف/تحميل) يمر من هنا
+        self.members_model.set_members(list_to_display) # يعيد بناء خريطة الصفوف المعروضة أيضًا
         if not self.is_filter_active: # حفظ البيانات فقط عند عرض القائمة الكاملة (تجنب الحفظ المتكرر عند الفلترة)
             self.save_members_data()
 
+    def _rebuild_member_index(self):
+        self.member_index_by_nin = {m.nin: idx for idx, m in enumerate(self.members_list)}
+        self.member_index_by_id = {m.member_id: idx for idx, m in enumerate(self.members_list)}
+        self.search_index.mark_roster_changed() # مزامنة مفاتيح البحث عند البحث التالي
+        self.roster.publish(self.members_list) # نسخة جديدة لخيط المراقبة (يلتقطها في خطوته التالية دون إيقاف)
+
+    def _index_of_member_id(self, member_id):
+        """الفهرس الأصلي للعضو حسب member_id في O(1)، أو -1 إذا حُذف (تحديثات متأخرة لعضو محذوف تُتجاهل)."""
+        idx = self.member_index_by_id.get(member_id, -1)
+        if 0 <= idx < len(self.members_list) and self.members_list[idx].member_id == member_id:
+            return idx
+        return -1 # المعرفات لا يعاد استخدامها: عدم وجوده في الفهرس يعني أنه حُذف
+
+    def _original_index_of(self, member):
+        """الفهرس الأصلي للعضو في members_list في O(1)، أو -1 إذا لم يعد موجودًا."""
+        idx = self.member_index_by_nin.get(member.nin, -1)
+        if 0 <= idx < len(self.members_list) and self.members_list[idx] is member:
+            return idx
+        # الفهرس قديم (تغيرت القائمة دون المرور بـ update_table)، إعادة البناء مرة واحدة
+        self._rebuild_member_index()
+        idx = self.member_index_by_nin.get(member.nin, -1)
+        if 0 <= idx < len(self.members_list) and self.members_list[idx] is member:
+            return idx
+        return -1
+
     def update_table_row(self, row_in_table, member):
-        # أيقونة الحالة
-        item_icon = QTableWidgetItem()
-        item_icon.setTextAlignment(Qt.AlignCenter)
-        self.table.setItem(row_in_table, self.COL_ICON, item_icon) # سيتم تحديث الأيقونة لاحقًا
-
-        # الاسم الكامل
-        item_full_name_ar = QTableWidgetItem(member.get_full_name_ar())
-        item_full_name_ar.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        self.table.setItem(row_in_table, self.COL_FULL_NAME_AR, item_full_name_ar)
-
-        # رقم التعريف الوطني
-        item_nin = QTableWidgetItem(member.nin)
-        item_nin.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        self.table.setItem(row_in_table, self.COL_NIN, item_nin)
-
-        # رقم الوسيط
-        item_wassit = QTableWidgetItem(member.wassit_no)
-        item_wassit.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        self.table.setItem(row_in_table, self.COL_WASSIT, item_wassit)
-
-        # رقم الحساب البريدي (مع التنسيق)
-        ccp_display = member.ccp
-        if len(member.ccp) == 12: # تنسيق CCP إذا كان 12 رقمًا
-             ccp_display = f"{member.ccp[:10]} {member.ccp[10:]}"
-        item_ccp = QTableWidgetItem(ccp_display)
-        item_ccp.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        self.table.setItem(row_in_table, self.COL_CCP, item_ccp)
-
-        # رقم الهاتف
-        item_phone = QTableWidgetItem(member.phone_number or "") # عرض فارغ إذا لم يكن هناك رقم
-        item_phone.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        self.table.setItem(row_in_table, self.COL_PHONE_NUMBER, item_phone)
-
-        # الحالة (سيتم تحديثها مع الأيقونة)
-        item_status = QTableWidgetItem()
-        item_status.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        self.table.setItem(row_in_table, self.COL_STATUS, item_status)
-
-        # تاريخ الموعد (مع مصدره)
-        rdv_date_display_text = member.rdv_date if member.rdv_date else ""
-        if member.rdv_date:
-            if member.rdv_source == "system":
-                rdv_date_display_text += " (نظام)"
-            elif member.rdv_source == "discovered":
-                rdv_date_display_text += " (مكتشف)"
-        item_rdv = QTableWidgetItem(rdv_date_display_text)
-        item_rdv.setTextAlignment(Qt.AlignCenter | Qt.AlignVCenter)
-        self.table.setItem(row_in_table, self.COL_RDV_DATE, item_rdv)
-
-        # آخر تحديث/خطأ (مع تلميح للتفاصيل الكاملة)
-        detail_to_show = member.last_activity_detail # الرسالة المختصرة
-        item_details = QTableWidgetItem(detail_to_show)
-        item_details.setToolTip(member.full_last_activity_detail) # الرسالة الكاملة كتلميح
-        item_details.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        self.table.setItem(row_in_table, self.COL_DETAILS, item_details)
-
-        # تحديث الأيقونة والحالة الفعلية باستخدام update_member_gui_in_table
-        try:
-            original_member_index = self.members_list.index(member) # الحصول على الفهرس الأصلي
-            # استدعاء الوظيفة التي تحدث الأيقونة والحالة بناءً على الفهرس الأصلي
-            self.update_member_gui_in_table(original_member_index, member.status, member.last_activity_detail, get_icon_name_for_status(member.status))
-        except ValueError: # إذا لم يتم العثور على العضو في القائمة الرئيسية (نادر)
-            status_item = self.table.item(row_in_table, self.COL_STATUS)
-            if status_item: status_item.setText(member.status)
-            icon_item = self.table.item(row_in_table, self.COL_ICON)
-            if icon_item:
-                qt_icon = self.style().standardIcon(getattr(QStyle, get_icon_name_for_status(member.status), QStyle.SP_CustomBase))
-                icon_item.setIcon(qt_icon)
-                icon_item.setText("") # إزالة أي نص من خلية الأيقونة
+        # النموذج يقرأ البيانات مباشرة من كائن العضو، لذا يكفي إعادة رسم الصف
+        self.members_model.set_icon_name(member, get_icon_name_for_status(member.status))
+        self.members_model.refresh_member(member)
+
+
+    # --- إشارات خيوط الفحص (تحمل member_id؛ يتم تحويله إلى الفهرس الحالي هنا) ---
+    def _handle_member_gui_update_by_id(self, member_id, status_text, detail_text, icon_name_str):
+        original_member_index = self._index_of_member_id(member_id)
+        if original_member_index >= 0:
+            self.update_member_gui_in_table(original_member_index, status_text, detail_text, icon_name_str)
+
+    def _handle_member_processing_by_id(self, member_id, is_processing_now):
+        original_member_index = self._index_of_member_id(member_id)
+        if original_member_index >= 0:
+            self.handle_member_processing_signal(original_member_index, is_processing_now)
 
+    def _handle_member_name_update_by_id(self, member_id, nom_ar, prenom_ar):
+        original_member_index = self._index_of_member_id(member_id)
+        if original_member_index >= 0:
+            self.update_member_name_in_table(original_member_index, nom_ar, prenom_ar)
+
+    def _handle_member_log_by_id(self, message, is_general=True, member_obj=None, member_id=-1):
+        original_member_index = self._index_of_member_id(member_id) if member_obj is not None else None
+        self.update_status_bar_message(message, is_general, member_obj, original_member_index)
 
     def update_member_gui_in_table(self, original_member_index, status_text, detail_text, icon_name_str):
         if not (0 <= original_member_index < len(self.members_list)):
             return # الفهرس الأصلي غير صالح
 
         member = self.members_list[original_member_index] # الحصول على العضو من القائمة الرئيسية
+        self.members_persistence.mark_dirty(member) # حالة العضو تغيرت، جدولة حفظ مؤجل (حتى لو لم يكن معروضًا)
+        self.search_index.invalidate(member) # الخيوط قد تحدث الاسم أيضًا
 
         # البحث عن الصف المقابل في الجدول (قد يكون مفلترًا)
-        row_in_table_to_update = -1
-        current_list_displayed = self.filtered_members_list if self.is_filter_active else self.members_list
-        try:
-            row_in_table_to_update = current_list_displayed.index(member)
-        except ValueError: # إذا لم يتم العثور على العضو في القائمة المعروضة حاليًا
+        row_in_table_to_update = self.members_model.row_of(member)
+        if row_in_table_to_update < 0: # إذا لم يتم العثور على العضو في القائمة المعروضة حاليًا
             return
 
-        if not (0 <= row_in_table_to_update < self.table.rowCount()):
+        if not (0 <= row_in_table_to_update < self.members_model.rowCount()):
              return # الفهرس المحسوب للجدول خارج الحدود
 
-        # تحديث البيانات الأساسية التي قد تتغير (مثل الاسم بعد الجلب الأولي)
-        self.table.item(row_in_table_to_update, self.COL_FULL_NAME_AR).setText(member.get_full_name_ar())
-        self.table.item(row_in_table_to_update, self.COL_NIN).setText(member.nin)
-        self.table.item(row_in_table_to_update, self.COL_WASSIT).setText(member.wassit_no)
-        ccp_display = member.ccp
-        if len(member.ccp) == 12: ccp_display = f"{member.ccp[:10]} {member.ccp[10:]}"
-        self.table.item(row_in_table_to_update, self.COL_CCP).setText(ccp_display)
-        self.table.item(row_in_table_to_update, self.COL_PHONE_NUMBER).setText(member.phone_number or "")
-
-        # تحديث تاريخ الموعد (قد يتغير)
-        rdv_date_display_text = member.rdv_date if member.rdv_date else ""
-        if member.rdv_date:
-            if member.rdv_source == "system":
-                rdv_date_display_text += " (نظام)"
-            elif member.rdv_source == "discovered":
-                rdv_date_display_text += " (مكتشف)"
-        self.table.item(row_in_table_to_update, self.COL_RDV_DATE).setText(rdv_date_display_text)
-
-        # تحديث التفاصيل (الرسالة المختصرة والتلميح)
-        detail_to_show_gui = member.last_activity_detail # الرسالة المختصرة من الكائن
-        self.table.item(row_in_table_to_update, self.COL_DETAILS).setText(detail_to_show_gui)
-        self.table.item(row_in_table_to_update, self.COL_DETAILS).setToolTip(member.full_last_activity_detail) # الرسالة الكاملة
-
-        # تحديث الحالة والأيقونة
-        icon_item = self.table.item(row_in_table_to_update, self.COL_ICON)
-        status_text_item = self.table.item(row_in_table_to_update, self.COL_STATUS)
-        status_text_item.setText(status_text) # تحديث نص الحالة
-
-        if icon_item:
-            # إذا كان الصف هو الصف النشط للسبينر والعضو قيد المعالجة، لا تغير الأيقونة (دع السبينر يعمل)
-            if self.active_spinner_row_in_view == row_in_table_to_update and member.is_processing:
-                icon_item.setIcon(QIcon()) # قد يكون النص هو السبينر
-            else: # وإلا، قم بتحديث الأيقونة
-                qt_icon = self.style().standardIcon(getattr(QStyle, icon_name_str, QStyle.SP_CustomBase))
-                icon_item.setIcon(qt_icon)
-                icon_item.setText("") # تأكد من إزالة أي نص من خلية الأيقونة
-
-        # تحديث لون خلفية الصف
-        self.highlight_processing_row(row_in_table_to_update, force_processing_display=None)
+        # تحديث الأيقونة ثم إعادة رسم الخلايا التي تغيرت فقط في هذا الصف
+        self.members_model.set_icon_name(member, icon_name_str)
+        self.members_model.refresh_member(member)
 
         # منطق التوست (مع التحقق من suppress_initial_messages)
         msg_attr_prefix = f"_toast_shown_{original_member_index}_" # بادئة لأسماء متغيرات التوست
@@ -1825,21 +2044,15 @@ class AnemApp(QMainWindow):
             member = self.members_list[original_member_index]
             member.nom_ar = nom_ar
             member.prenom_ar = prenom_ar
+            self.search_index.invalidate(member)
 
             # البحث عن الصف المقابل في الجدول (قد يكون مفلترًا)
-            row_in_table_to_update = -1
-            current_list_displayed = self.filtered_members_list if self.is_filter_active else self.members_list
-            try:
-                row_in_table_to_update = current_list_displayed.index(member)
-                if 0 <= row_in_table_to_update < self.table.rowCount():
-                    full_name_item = self.table.item(row_in_table_to_update, self.COL_FULL_NAME_AR)
-                    if full_name_item:
-                        full_name_item.setText(member.get_full_name_ar()) # تحديث الاسم في الجدول
-                    if not self.suppress_initial_messages: # عرض توست إذا لم يتم كبت الرسائل
-                        self._show_toast(f"تم تحديث اسم العضو.", type="info", member_obj=member, original_idx_if_member=original_member_index)
-            except ValueError: # إذا لم يتم العثور على العضو في القائمة المعروضة
-                pass # لا تفعل شيئًا، سيتم تحديثه عند إعادة رسم الجدول بالكامل
-            self.save_members_data() # حفظ البيانات بعد تحديث الاسم
+            row_in_table_to_update = self.members_model.row_of(member) # -1 إذا لم يكن معروضًا (سيتم تحديثه عند إعادة رسم الجدول)
+            if 0 <= row_in_table_to_update < self.members_model.rowCount():
+                self.members_model.refresh_member(member) # تحديث الاسم في الجدول
+                if not self.suppress_initial_messages: # عرض توست إذا لم يتم كبت الرسائل
+                    self._show_toast(f"تم تحديث اسم العضو.", type="info", member_obj=member, original_idx_if_member=original_member_index)
+            self.save_members_data(member) # حفظ مؤجل بعد تحديث الاسم
 
 
     def update_status_bar_message(self, message, is_general_message=True, member_obj=None, original_idx_if_member=None):
@@ -1863,32 +2076,46 @@ class AnemApp(QMainWindow):
                  self.countdown_label.setText("")
 
 
-    def update_countdown_timer_display(self, time_remaining_str):
-        if hasattr(self, 'countdown_label'): # تأكد من وجود الملصق
-            self.countdown_label.setText(time_remaining_str)
+    def update_countdown_timer_display(self, countdown_prefix="", deadline=0.0):
+        if not hasattr(self, 'countdown_label'): # تأكد من وجود الملصق
+            return
+        self.countdown_prefix = countdown_prefix
+        self.countdown_deadline = deadline
+        self._render_countdown()
+        if deadline > 0 and self.countdown_label.text():
+            self.countdown_timer.start()
+
+    def _render_countdown(self):
+        remaining = int(self.countdown_deadline - time.monotonic() + 0.999) # التقريب للأعلى كما في العد بالثواني الكاملة
+        if self.countdown_deadline <= 0 or remaining <= 0:
+            self.countdown_timer.stop()
+            self.countdown_label.setText("")
+            return
+        minutes, seconds = divmod(remaining, 60)
+        hours, minutes = divmod(minutes, 60)
+        self.countdown_label.setText(f"{self.countdown_prefix}{hours:02d}:{minutes:02d}:{seconds:02d}")
 
 
     def start_monitoring(self):
-        if not self.activation_successful or not self.current_subscription_data or self.current_subscription_data.get("status","").upper() != "ACTIVE":
+        if not self._is_subscription_usable():
             self._show_toast("لا يمكن بدء المراقبة. البرنامج غير مفعل أو الاشتراك غير نشط.", type="error")
             return
 
         if not self.members_list:
             self._show_toast("يرجى إضافة أعضاء أولاً لبدء المراقبة.", type="warning")
             return
-        if not self.monitoring_thread.isRunning():
+        switched_from_check_now = False
+        if self.monitoring_thread.isRunning() and self.monitoring_thread.manual_only: # يعمل للفحص الفوري فقط
+            switched_from_check_now = self.monitoring_thread.continue_as_monitoring()
+            if not switched_from_check_now:
+                self.monitoring_thread.wait() # انتهت طلبات الفحص الفوري والخيط ينهي عمله الآن
+        if switched_from_check_now or not self.monitoring_thread.isRunning():
             logger.info("بدء المراقبة...")
-            self.monitoring_thread.members_list_ref = self.members_list # تحديث مرجع قائمة الأعضاء
-            self.monitoring_thread.is_running = True
-            self.monitoring_thread.is_connection_lost_mode = False # إعادة التعيين عند البدء
-            self.monitoring_thread.current_member_index_to_process = 0 # البدء من الأول
-            self.monitoring_thread.consecutive_network_error_trigger_count = 0 # إعادة التعيين
-            self.monitoring_thread.update_thread_settings(self.settings.copy()) # تطبيق الإعدادات الحالية
-            self.monitoring_thread.start()
+            if not switched_from_check_now: # عند التحول يستمر الخيط بنفس العميل والإعدادات التي بدأ بها
+                self.monitoring_thread.prepare_start(self.settings.copy()) # إعادة تعيين الحالة ورمز الإلغاء، وتطبيق الإعدادات الحالية
+                self.monitoring_thread.start()
             self.start_button.setEnabled(False)
-            self.stop_button.setEnabled(True)
-            self.add_member_button.setEnabled(False) # تعطيل الإضافة أثناء المراقبة
-            self.remove_member_button.setEnabled(False) # تعطيل الحذف أثناء المراقبة
+            self.stop_button.setEnabled(True) # الإضافة والحذف والاستيراد تبقى متاحة: الخيط يلتقط كل نسخة جديدة من القائمة
             monitoring_interval_minutes = self.settings.get(SETTING_MONITORING_INTERVAL, DEFAULT_SETTINGS[SETTING_MONITORING_INTERVAL])
             self.update_status_bar_message(f"بدأت المراقبة (الدورة كل {monitoring_interval_minutes} دقيقة)...", is_general_message=False)
             self._show_toast(f"بدأت المراقبة (الدورة كل {monitoring_interval_minutes} دقيقة).", type="info")
@@ -1898,28 +2125,26 @@ class AnemApp(QMainWindow):
 
 
     def stop_monitoring(self):
-        if self.monitoring_thread.isRunning():
+        if self.monitoring_thread.isRunning() and not self.monitoring_thread.manual_only:
             logger.info("تم طلب إيقاف المراقبة.")
             self.monitoring_thread.stop_monitoring() # إرسال إشارة الإيقاف للخيط
+            self.gui_update_coalescer.flush() # تطبيق التحديثات المعلقة قبل إعادة تعيين حالة المعالجة
             # إيقاف مؤقت السبينر إذا كان نشطًا وتحديث واجهة المستخدم للصف النشط
             if self.row_spinner_timer.isActive():
                 self.row_spinner_timer.stop()
-                if self.active_spinner_row_in_view != -1 and self.active_spinner_row_in_view < self.table.rowCount():
-                    current_list_displayed = self.filtered_members_list if self.is_filter_active else self.members_list
-                    if self.active_spinner_row_in_view < len(current_list_displayed):
-                        member_at_spinner = current_list_displayed[self.active_spinner_row_in_view]
-                        try:
-                            original_member_index = self.members_list.index(member_at_spinner)
-                            if 0 <= original_member_index < len(self.members_list):
-                                member = self.members_list[original_member_index]
-                                member.is_processing = False # ضمان أن الحالة ليست قيد المعالجة
-                                self.update_member_gui_in_table(original_member_index, member.status, member.last_activity_detail, get_icon_name_for_status(member.status))
-                        except ValueError:
-                             pass # تجاهل إذا لم يتم العثور عليه
+                if self.active_spinner_row_in_view != -1:
+                    member_at_spinner = self.members_model.member_at(self.active_spinner_row_in_view)
+                    if member_at_spinner is not None:
+                        original_member_index = self._original_index_of(member_at_spinner)
+                        if 0 <= original_member_index < len(self.members_list): # تجاهل إذا لم يتم العثور عليه
+                            member = self.members_list[original_member_index]
+                            member.is_processing = False # ضمان أن الحالة ليست قيد المعالجة
+                            self.update_member_gui_in_table(original_member_index, member.status, member.last_activity_detail, get_icon_name_for_status(member.status))
                 self.active_spinner_row_in_view = -1 # إعادة تعيين الصف النشط للسبينر
+                self.members_model.set_spinner(-1)
 
             # تمكين/تعطيل الأزرار بناءً على حالة التفعيل
-            if self.activation_successful and self.current_subscription_data and self.current_subscription_data.get("status","").upper() == "ACTIVE":
+            if self._is_subscription_usable():
                 self._enable_app_functions() # تمكين الوظائف إذا كان الاشتراك لا يزال نشطًا
             else:
                 self._disable_app_functions() # تعطيل إذا لم يكن كذلك
@@ -1927,7 +2152,7 @@ class AnemApp(QMainWindow):
 
             self.update_status_bar_message("تم إيقاف المراقبة بنجاح.", is_general_message=True)
             self._show_toast("تم إيقاف المراقبة.", type="info")
-            self.update_countdown_timer_display("") # مسح العد التنازلي
+            self.update_countdown_timer_display() # مسح العد التنازلي
             # التأكد من أن جميع الأعضاء ليسوا في حالة "is_processing"
             for i in range(len(self.members_list)):
                 if self.members_list[i].is_processing:
@@ -1940,6 +2165,14 @@ class AnemApp(QMainWindow):
 
     def load_members_data(self):
         self.suppress_initial_messages = True # كبت رسائل التوست أثناء التحميل الأولي
+        if self.members_persistence.store is not None and self._load_members_from_store():
+            self.filtered_members_list = list(self.members_list)
+            self.members_persistence.mark_clean() # البيانات المحملة مطابقة لما في قاعدة البيانات
+            self._save_new_member_ids()
+            self.update_table()
+            QTimer.singleShot(200, lambda: setattr(self, 'suppress_initial_messages', False))
+            return
+
         loaded_successfully = False
         primary_path = DATA_FILE # المسار من config.py
         backup_path = DATA_FILE_BAK # المسار من config.py
@@ -1948,7 +2181,7 @@ class AnemApp(QMainWindow):
             try:
                 with open(primary_path, 'r', encoding='utf-8') as f:
                     data_list = json.load(f)
-                    self.members_list = [Member.from_dict(data) for data in data_list]
+                    self.members_list = self._members_from_dicts(data_list)
                     for member in self.members_list: # ضمان أن is_processing هي False عند التحميل
                         member.is_processing = False
                     loaded_successfully = True
@@ -1964,7 +2197,7 @@ class AnemApp(QMainWindow):
             try:
                 with open(backup_path, 'r', encoding='utf-8') as f:
                     data_list = json.load(f)
-                    self.members_list = [Member.from_dict(data) for data in data_list]
+                    self.members_list = self._members_from_dicts(data_list)
                     for member in self.members_list: # ضمان أن is_processing هي False
                         member.is_processing = False
                     loaded_successfully = True
@@ -1992,45 +2225,69 @@ class AnemApp(QMainWindow):
             self.update_status_bar_message(f"ملف البيانات غير موجود أو تالف. يمكنك إضافة أعضاء جدد.", is_general_message=True)
 
         self.filtered_members_list = list(self.members_list) # تهيئة القائمة المفلترة
+        self._save_new_member_ids()
         self.update_table() # تحديث الجدول بالبيانات المحملة
 
         # إلغاء كبت رسائل التوست بعد فترة قصيرة للسماح للواجهة بالاستقرار
         QTimer.singleShot(200, lambda: setattr(self, 'suppress_initial_messages', False))
 
 
-    def save_members_data(self):
-        primary_path = DATA_FILE # المسار من config.py
-        tmp_path = DATA_FILE_TMP # المسار من config.py
-        bak_path = DATA_FILE_BAK # المسار من config.py
-        try:
-            data_to_save = []
-            for member in self.members_list:
-                member_dict = member.to_dict()
-                member_dict['is_processing'] = False # ضمان أن is_processing لا يتم حفظها كـ True
-                data_to_save.append(member_dict)
+    def _members_from_dicts(self, data_list):
+        members, self._members_with_new_ids = Member.list_from_dicts(data_list)
+        return members
 
-            with open(tmp_path, 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, ensure_ascii=False, indent=4)
+    def _save_new_member_ids(self):
+        """حفظ الأعضاء الذين أخذوا member_id جديدًا عند التحميل (نقاط حفظ المراقبة مرتبطة به)."""
+        if self._members_with_new_ids:
+            logger.info(f"حفظ معرفات {len(self._members_with_new_ids)} عضو محمل دون معرف محفوظ.")
+        for member in self._members_with_new_ids:
+            self.members_persistence.mark_dirty(member)
+        self._members_with_new_ids = []
 
-            if os.path.exists(primary_path):
+    def _load_members_from_store(self):
+        store = self.members_persistence.store
+        try:
+            if not store.is_json_migrated():
+                self._migrate_members_json_to_store(store)
+            member_dicts = store.load_member_dicts()
+            self.members_list = self._members_from_dicts(member_dicts)
+            for member in self.members_list: # ضمان أن is_processing هي False عند التحميل
+                member.is_processing = False
+            logger.info(f"تم تحميل بيانات {len(self.members_list)} أعضاء من قاعدة البيانات {store.db_path}")
+            return True
+        except Exception as e:
+            logger.exception(f"خطأ عند تحميل البيانات من قاعدة البيانات {store.db_path}: {e}. سيتم استخدام ملف JSON.")
+            self._show_toast(f"فشل تحميل قاعدة بيانات الأعضاء: {e}. سيتم استخدام ملف JSON.", type="error", duration=6000)
+            self.members_persistence.set_store(None)
+            return False
+
+    def _migrate_members_json_to_store(self, store):
+        # ترحيل لمرة واحدة من members_data.json (أو نسخته الاحتياطية) إلى قاعدة البيانات
+        member_dicts, source_path = [], ""
+        for path in (DATA_FILE, DATA_FILE_BAK):
+            if os.path.exists(path):
                 try:
-                    shutil.copy2(primary_path, bak_path) # استخدام copy2 للحفاظ على الميتاداتا
-                    logger.debug(f"تم إنشاء نسخة احتياطية من {primary_path} إلى {bak_path}")
-                except Exception as e_bak:
-                    logger.error(f"فشل في إنشاء نسخة احتياطية لملف بيانات الأعضاء {primary_path}: {e_bak}")
+                    with open(path, 'r', encoding='utf-8') as f:
+                        member_dicts = json.load(f)
+                    source_path = path
+                    break
+                except Exception as e:
+                    logger.error(f"تعذر قراءة {path} لترحيله إلى قاعدة البيانات: {e}")
+        if member_dicts and store.count() == 0:
+            store.migrate_from_json_list(member_dicts, source_path)
+            self._show_toast(f"تم ترحيل بيانات {len(member_dicts)} عضو إلى قاعدة البيانات.", type="info", duration=5000)
+        else:
+            store.set_meta(store.META_JSON_MIGRATED, source_path or "none")
 
-            os.replace(tmp_path, primary_path) # استبدال الملف الأساسي بالملف المؤقت
-            logger.info(f"تم حفظ بيانات الأعضاء بنجاح في {primary_path}")
+    def save_members_data(self, member=None):
+        # لا تتم الكتابة فورًا: يتم تعليم العضو المعدل (أو القائمة) ويجمع المحرك التغييرات في كتابة واحدة مؤجلة
+        self.members_persistence.mark_dirty(member)
 
-        except Exception as e:
-            logger.exception(f"خطأ عند حفظ بيانات الأعضاء في {primary_path}: {e}")
-            self.update_status_bar_message(f"خطأ عند حفظ البيانات: {e}", is_general_message=True)
-            self._show_toast(f"فشل حفظ بيانات الأعضاء: {e}", type="error")
-            if os.path.exists(tmp_path): # محاولة حذف الملف المؤقت إذا كان لا يزال موجودًا
-                try:
-                    os.remove(tmp_path)
-                except Exception as e_del_tmp:
-                    logger.error(f"فشل في حذف الملف المؤقت لبيانات الأعضاء {tmp_path} بعد خطأ في الحفظ: {e_del_tmp}")
+    def _handle_members_save_failed(self, error_message):
+        primary_path = DATA_FILE # المسار من config.py
+        self.update_status_bar_message(f"خطأ عند حفظ البيانات: {error_message}", is_general_message=True)
+        self._show_toast(f"فشل حفظ بيانات الأعضاء: {error_message}", type="error")
+        logger.error(f"فشل الحفظ المؤجل لبيانات الأعضاء في {primary_path}: {error_message}")
 
 
     def closeEvent(self, event):
@@ -2043,42 +2300,36 @@ class AnemApp(QMainWindow):
             self.activation_thread.stop()
             self.activation_thread.wait(1500) # انتظار حتى 1.5 ثانية
 
+        if self.startup_verification_thread and self.startup_verification_thread.isRunning():
+            self.startup_verification_thread.stop() # قد يكون عالقًا في طلب شبكة: لا انتظار طويل
+            self.startup_verification_thread.wait(500)
+
         # إيقاف مستمع تحديثات الاشتراك
         if self.activated_code_id and self.firebase_service and self.firebase_service.is_initialized():
             logger.info(f"AnemApp: Stopping listener for activation code {self.activated_code_id} before closing.")
             self.firebase_service.stop_listening_to_code_changes(self.activated_code_id)
 
-        # إيقاف خيط المراقبة
-        if self.monitoring_thread.isRunning():
+        # إيقاف خيط المراقبة والمهام أولاً (is_running = False قبل الإلغاء، حتى لا تُسجل الطلبات الملغاة كأخطاء للأعضاء)
+        monitoring_was_running = self.monitoring_thread.isRunning()
+        if monitoring_was_running:
             logger.info("إيقاف المراقبة قبل الإغلاق...")
             self.monitoring_thread.stop_monitoring()
-            if not self.monitoring_thread.wait(3000): # انتظار حتى 3 ثواني
+        self.initial_fetch_queue.cancel_all()
+        self.pdf_download_manager.cancel_all()
+        SHARED_SHUTDOWN_TOKEN.cancel() # أي انتظار أو طلب HTTP متبقٍ في أي خيط ينتهي فورًا
+        if monitoring_was_running and not self.monitoring_thread.wait(3000): # انتظار حتى 3 ثواني
+            if self.monitoring_thread.booking_in_flight: # طلب الحجز المرسل لا يُلغى: انتظار نتيجته (حتى مهلة الطلب) لتُحفظ مع العضو
+                logger.info("انتظار نتيجة طلب حجز موعد جارٍ قبل الإغلاق...")
+                self.monitoring_thread.wait(int(self.monitoring_thread.api_client.request_timeout * 1000) + 3000)
+            if self.monitoring_thread.isRunning():
                 logger.warning("خيط المراقبة لم ينتهِ في الوقت المناسب.")
 
-        # حفظ البيانات والإعدادات
-        self.save_members_data()
-        self.save_app_settings()
+        self.initial_fetch_queue.shutdown() # إلغاء المهام المنتظرة وانتظار الجارية (حتى ثانيتين) قبل الحفظ النهائي
+        self.pdf_download_manager.shutdown() # نفس الشيء لطابور تحميل الشهادات
 
-        # إيقاف الخيوط الأخرى
-        for thread in self.initial_fetch_threads:
-            if thread.isRunning():
-                thread.quit() # طلب إنهاء الخيط
-                if not thread.wait(2000): # انتظار حتى ثانيتين
-                    logger.warning(f"الخيط {thread} لم ينتهِ في الوقت المناسب عند الإغلاق.")
-
-        if self.single_check_thread and self.single_check_thread.isRunning():
-            self.single_check_thread.quit()
-            if not self.single_check_thread.wait(1000): # انتظار ثانية واحدة
-                 logger.warning("خيط الفحص الفردي لم ينته في الوقت المناسب.")
-
-        active_pdf_dl_threads_copy = list(self.active_download_all_pdfs_threads.values()) # نسخة لتجنب التعديل أثناء التكرار
-        if active_pdf_dl_threads_copy:
-            for pdf_thread in active_pdf_dl_threads_copy:
-                if pdf_thread.isRunning():
-                    pdf_thread.stop() # استخدام stop إذا كانت الطريقة مخصصة للإيقاف الآمن
-                    if not pdf_thread.wait(2000): # انتظار ثانيتين
-                        logger.warning(f"خيط تحميل جميع ملفات PDF {pdf_thread} لم ينتهِ في الوقت المناسب.")
-            self.active_download_all_pdfs_threads.clear() # مسح القاموس
+        # حفظ البيانات والإعدادات (حفظ فوري لأي تغييرات معلقة في محرك الحفظ المؤجل)
+        self.members_persistence.shutdown()
+        self.save_app_settings()
 
         # إيقاف المؤقتات
         if hasattr(self, 'datetime_timer') and self.datetime_timer.isActive(): self.datetime_timer.stop()
@@ -2089,6 +2340,7 @@ class AnemApp(QMainWindow):
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
+    startup_profiler.milestone("QApplication")
     main_window = AnemApp()
 
     # التحقق إذا كان يجب إظهار الواجهة الرئيسية
@@ -2099,5 +2351,7 @@ if __name__ == '__main__':
         # لا حاجة لـ sys.exit(1) هنا لأن البرنامج سينتهي بشكل طبيعي إذا لم يتم إظهار النافذة
         # أو يمكن إضافته إذا كنت تريد رمز خروج محدد للفشل
     else:
+        startup_profiler.watch_first_paint(main_window) # --profile-startup: التقرير في السجل بعد أول رسم
         main_window.show()
+        startup_profiler.milestone("show()")
         sys.exit(app.exec_())
@@ -1,8 +1,82 @@
 # member.py
+import sys
+import threading
+
 from config import MAX_ERROR_DISPLAY_LENGTH
 
+# سجل الحالات: كل نص حالة يُخزن مرة واحدة، والعضو يحتفظ برقم صغير بدلاً منه.
+# الحالات غير المعروفة (مثلاً من ملف بيانات قديم) تُسجل عند أول استخدام.
+KNOWN_STATUSES = (
+    "جديد", "جاري جلب الاسم...", "جاري التحقق (فوري)...", "تم التحقق", "تم التحقق (فوري)",
+    "تم جلب المعلومات", "تم جلب المعلومات (فوري)", "يتطلب تسجيل مسبق", "لا توجد مواعيد",
+    "لديه موعد مسبق", "تم الحجز", "مكتمل", "مستفيد حاليًا من المنحة", "غير مؤهل للحجز",
+    "غير مؤهل مبدئيًا", "بيانات الإدخال خاطئة", "فشل التحقق", "فشل التحقق الأولي",
+    "فشل جلب المعلومات", "فشل جلب التواريخ", "فشل الحجز", "فشل تحميل PDF", "فشل بشكل متكرر",
+    "خطأ في الجلب الأولي", "خطأ في الفحص الفوري", "خطأ في المعالجة",
+)
+_STATUS_TEXTS = [sys.intern(text) for text in KNOWN_STATUSES]
+_STATUS_CODES = {text: code for code, text in enumerate(_STATUS_TEXTS)}
+_status_registry_lock = threading.Lock()
+_member_id_lock = threading.Lock()
+_last_member_id = 0 # آخر member_id صدر في هذه الجلسة (جديد أو مستعاد من البيانات المحفوظة)
+
+
+def status_code_for(status_text):
+    code = _STATUS_CODES.get(status_text)
+    if code is None:
+        with _status_registry_lock: # خيوط العمل قد تضبط حالة جديدة في نفس الوقت
+            code = _STATUS_CODES.get(status_text)
+            if code is None:
+                code = len(_STATUS_TEXTS)
+                _STATUS_TEXTS.append(sys.intern(str(status_text)))
+                _STATUS_CODES[_STATUS_TEXTS[code]] = code
+    return code
+
+
+def status_text_for(code):
+    return _STATUS_TEXTS[code]
+
+
+def _new_member_id():
+    global _last_member_id
+    with _member_id_lock:
+        _last_member_id += 1
+        return _last_member_id
+
+
+def _restore_member_ids(saved_ids):
+    """
+    المعرفات المحفوظة التي تُستعاد كما هي: غير مكررة وأكبر من كل معرف صدر في هذه الجلسة
+    (None لغيرها، فيبقى للعضو معرفه الجديد). المعرفات الجديدة بعدها تبدأ بعد أكبر معرف مستعاد.
+    """
+    global _last_member_id
+    with _member_id_lock:
+        floor = _last_member_id
+        restored, seen = [], set()
+        for saved_id in saved_ids:
+            if type(saved_id) is int and saved_id > floor and saved_id not in seen:
+                seen.add(saved_id)
+                restored.append(saved_id)
+            else:
+                restored.append(None)
+        if seen:
+            _last_member_id = max(_last_member_id, max(seen))
+        return restored
+
+
 class Member:
+    __slots__ = (
+        'member_id', 'nin', 'wassit_no', 'ccp', 'phone_number',
+        'nom_fr', 'prenom_fr', 'nom_ar', 'prenom_ar',
+        'pre_inscription_id', 'demandeur_id', 'structure_id',
+        '_status_code', 'last_activity_detail', 'full_last_activity_detail',
+        'rdv_date', 'rdv_id', 'rdv_source', 'pdf_honneur_path', 'pdf_rdv_path',
+        'is_processing', 'has_actual_pre_inscription', 'already_has_rdv', 'consecutive_failures',
+        'have_allocation', '_allocation_details',
+    )
+
     def __init__(self, nin, wassit_no, ccp, phone_number=""):
+        self.member_id = _new_member_id() # معرف ثابت (يُحفظ مع العضو): تستخدمه الإشارات والجدولة ونقاط حفظ المراقبة بدلاً من الفهرس
         self.nin = nin
         self.wassit_no = wassit_no
         self.ccp = ccp
@@ -30,12 +104,34 @@ class Member:
         self.have_allocation = False 
         self.allocation_details = {} 
 
+    @property
+    def status(self):
+        return _STATUS_TEXTS[self._status_code]
+
+    @status.setter
+    def status(self, value):
+        self._status_code = status_code_for(value)
+
+    @property
+    def status_code(self):
+        return self._status_code
+
+    @property
+    def allocation_details(self):
+        # أغلب الأعضاء دون تفاصيل منحة: يُخزن None بدلاً من قاموس فارغ لكل عضو
+        details = self._allocation_details
+        return details if details is not None else {}
+
+    @allocation_details.setter
+    def allocation_details(self, value):
+        self._allocation_details = value or None
 
     def get_full_name_ar(self):
         return f"{self.nom_ar or ''} {self.prenom_ar or ''}".strip()
 
     def to_dict(self):
         return {
+            'member_id': self.member_id,
             'nin': self.nin,
             'wassit_no': self.wassit_no,
             'ccp': self.ccp,
@@ -75,6 +171,8 @@ class Member:
         member.status = data.get('status', "جديد")
         member.full_last_activity_detail = data.get('full_last_activity_detail', data.get('last_activity_detail', "")) 
         member.last_activity_detail = data.get('last_activity_detail', "")
+        if member.last_activity_detail == member.full_last_activity_detail:
+            member.last_activity_detail = member.full_last_activity_detail # نص واحد مشترك بدلاً من نسختين
         if not member.last_activity_detail and member.full_last_activity_detail:
             if len(member.full_last_activity_detail) > MAX_ERROR_DISPLAY_LENGTH:
                 member.last_activity_detail = member.full_last_activity_detail[:MAX_ERROR_DISPLAY_LENGTH] + "..."
@@ -99,6 +197,22 @@ class Member:
         member.allocation_details = data.get('allocation_details', {})
         return member
 
+    @classmethod
+    def list_from_dicts(cls, data_list):
+        """
+        الأعضاء من قائمة محفوظة مع استعادة member_id المحفوظ لكل منهم.
+        يعيد (الأعضاء، من أخذ معرفًا جديدًا): بيانات قديمة دون معرف أو معرف مكرر، ويجب حفظهم من جديد.
+        """
+        restored_ids = _restore_member_ids([data.get('member_id') for data in data_list])
+        members = [cls.from_dict(data) for data in data_list]
+        members_with_new_ids = []
+        for member, restored_id in zip(members, restored_ids):
+            if restored_id is None:
+                members_with_new_ids.append(member)
+            else:
+                member.member_id = restored_id
+        return members, members_with_new_ids
+
     def set_activity_detail(self, detail_message, is_error=False):
         self.full_last_activity_detail = str(detail_message) 
 
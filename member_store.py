@@ -0,0 +1,150 @@
+# member_store.py
+import json
+import os
+import threading
+import logging
+
+from config import MEMBERS_DB_FILE
+from sqlite_store import open_connection
+
+logger = logging.getLogger(__name__)
+
+# مفاتيح الفلاتر في شريط البحث -> أعمدة مفهرسة في قاعدة البيانات
+FILTER_KEY_TO_COLUMN = {
+    "status": "status",
+    "has_rdv": "already_has_rdv",
+    "have_allocation": "have_allocation",
+    "pdf_honneur": "has_pdf_honneur",
+    "pdf_rdv": "has_pdf_rdv",
+}
+
+
+class SqliteMemberStore:
+    """
+    مخزن أعضاء اختياري مبني على SQLite (داخل APP_DATA_DIR).
+    - كل عضو صف واحد: نفس مخطط Member.to_dict() مخزن كنص JSON، مع أعمدة مفهرسة للفلترة.
+    - الحفظ يحدّث الصفوف المعدلة فقط (UPSERT)، وترتيب القائمة محفوظ في عمود position.
+    - اتصال منفصل لكل خيط (الواجهة للقراءة، خيط الكاتب للكتابة)؛ وضع WAL يسمح بالقراءة أثناء الكتابة.
+    """
+    META_JSON_MIGRATED = "json_migrated"
+
+    def __init__(self, db_path=MEMBERS_DB_FILE):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._ensure_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = open_connection(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def _ensure_schema(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS members (
+                    nin TEXT PRIMARY KEY,
+                    position INTEGER NOT NULL,
+                    status TEXT,
+                    already_has_rdv INTEGER NOT NULL DEFAULT 0,
+                    have_allocation INTEGER NOT NULL DEFAULT 0,
+                    has_pdf_honneur INTEGER NOT NULL DEFAULT 0,
+                    has_pdf_rdv INTEGER NOT NULL DEFAULT 0,
+                    data TEXT NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_members_status ON members(status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_members_has_rdv ON members(already_has_rdv)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_members_have_allocation ON members(have_allocation)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_members_position ON members(position)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- الميتاداتا والترحيل ---
+    def get_meta(self, key, default=None):
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def is_json_migrated(self):
+        return self.get_meta(self.META_JSON_MIGRATED) is not None
+
+    def migrate_from_json_list(self, member_dicts, source_path):
+        """ترحيل لمرة واحدة من members_data.json (يتم تسجيله في جدول meta)."""
+        self.write_changes([self.row_from_dict(d, pos) for pos, d in enumerate(member_dicts)], [d.get('nin') for d in member_dicts])
+        self.set_meta(self.META_JSON_MIGRATED, source_path)
+        logger.info(f"تم ترحيل {len(member_dicts)} عضو من {source_path} إلى قاعدة البيانات {self.db_path}")
+
+    # --- القراءة ---
+    def load_member_dicts(self):
+        rows = self._connection().execute("SELECT data FROM members ORDER BY position").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM members").fetchone()[0]
+
+    def query_nins(self, filter_key, filter_value):
+        """استعلام مفهرس يعيد قائمة NIN المطابقة للفلتر (بترتيب القائمة)."""
+        column = FILTER_KEY_TO_COLUMN.get(filter_key)
+        if column is None:
+            return None
+        value = filter_value if column == "status" else int(bool(filter_value))
+        rows = self._connection().execute(f"SELECT nin FROM members WHERE {column} = ? ORDER BY position", (value,)).fetchall()
+        return [row[0] for row in rows]
+
+    # --- الكتابة ---
+    @staticmethod
+    def row_from_dict(member_dict, position):
+        return (
+            member_dict.get('nin'), position, member_dict.get('status'),
+            int(bool(member_dict.get('already_has_rdv'))), int(bool(member_dict.get('have_allocation'))),
+            int(bool(member_dict.get('pdf_honneur_path'))), int(bool(member_dict.get('pdf_rdv_path'))),
+            json.dumps(member_dict, ensure_ascii=False)
+        )
+
+    def write_changes(self, upsert_rows, ordered_nins=None, deleted_nins=()):
+        """
+        upsert_rows: صفوف الأعضاء المعدلين فقط (من row_from_dict).
+        ordered_nins: إذا لم يكن None، فهو ترتيب القائمة الكامل (بعد إضافة/حذف) ويتم حذف من ليس فيه.
+        deleted_nins: NIN قديمة يجب حذفها (مثلاً بعد تعديل NIN لعضو).
+        """
+        conn = self._connection()
+        with conn:
+            if deleted_nins:
+                conn.executemany("DELETE FROM members WHERE nin = ?", [(nin,) for nin in deleted_nins])
+            if upsert_rows:
+                conn.executemany("""
+                    INSERT INTO members (nin, position, status, already_has_rdv, have_allocation, has_pdf_honneur, has_pdf_rdv, data)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(nin) DO UPDATE SET
+                        position = excluded.position, status = excluded.status,
+                        already_has_rdv = excluded.already_has_rdv, have_allocation = excluded.have_allocation,
+                        has_pdf_honneur = excluded.has_pdf_honneur, has_pdf_rdv = excluded.has_pdf_rdv,
+                        data = excluded.data""", upsert_rows)
+            if ordered_nins is not None:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS roster_order (nin TEXT PRIMARY KEY, position INTEGER)")
+                conn.execute("DELETE FROM roster_order")
+                conn.executemany("INSERT OR REPLACE INTO roster_order (nin, position) VALUES (?, ?)", [(nin, pos) for pos, nin in enumerate(ordered_nins)])
+                conn.execute("DELETE FROM members WHERE nin NOT IN (SELECT nin FROM roster_order)")
+                conn.execute("""
+                    UPDATE members SET position = (SELECT position FROM roster_order WHERE roster_order.nin = members.nin)
+                    WHERE position != (SELECT position FROM roster_order WHERE roster_order.nin = members.nin)""")
+
+    def export_json(self, export_path):
+        """تصدير القائمة بنفس تنسيق members_data.json."""
+        member_dicts = self.load_member_dicts()
+        tmp_path = export_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(member_dicts, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, export_path)
+        return len(member_dicts)
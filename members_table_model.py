@@ -0,0 +1,210 @@
+# members_table_model.py
+import logging
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QIcon, QColor
+from PyQt5.QtWidgets import QApplication, QStyle
+
+from utils import QColorConstants, get_icon_name_for_status
+
+logger = logging.getLogger(__name__)
+
+
+class MembersTableModel(QAbstractTableModel):
+    """
+    نموذج جدول افتراضي (Model/View) مبني مباشرة على قائمة الأعضاء المعروضة.
+    لا يتم إنشاء أي عناصر للخلايا؛ العرض يطلب البيانات للصفوف المرئية فقط عبر data().
+    """
+    COL_ICON, COL_FULL_NAME_AR, COL_NIN, COL_WASSIT, COL_CCP, COL_PHONE_NUMBER, COL_STATUS, COL_RDV_DATE, COL_DETAILS = range(9)
+    HEADERS = [
+        "أيقونة", "الاسم الكامل", "رقم التعريف", "رقم الوسيط",
+        "الحساب البريدي", "رقم الهاتف", "الحالة", "تاريخ الموعد", "آخر تحديث/خطأ"
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._members = [] # مرجع للقائمة المعروضة (الكاملة أو المفلترة)
+        self._row_by_nin = {} # NIN -> رقم الصف المعروض (بحث O(1) بدلاً من list.index)
+        self._icon_cache = {} # اسم أيقونة QStyle -> QIcon (تجنب إعادة إنشاء الأيقونات لكل خلية)
+        self._icon_name_overrides = {} # id(member) -> اسم الأيقونة المرسل من الخيوط (مثل SP_MessageBoxCritical)
+        self._rendered_states = {} # id(member) -> (member, مفتاح ألوان الصف، نصوص الخلايا) كما رُسمت آخر مرة عبر refresh_member
+        self.spinner_row = -1
+        self.spinner_char = ""
+
+    # --- واجهة النموذج الأساسية ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._members)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section] if 0 <= section < len(self.HEADERS) else None
+        return str(section + 1) # أرقام الصفوف كما في QTableWidget
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if not (0 <= row < len(self._members)):
+            return None
+        member = self._members[row]
+
+        if role == Qt.DisplayRole:
+            return self._display_text(member, row, col)
+        if role == Qt.DecorationRole:
+            if col == self.COL_ICON and not self._is_spinner_row(row, member):
+                return self._icon_for_member(member)
+            return None
+        if role == Qt.BackgroundRole:
+            return self._background_for_member(member)
+        if role == Qt.ForegroundRole:
+            return QColor(Qt.white) if member.is_processing else None
+        if role == Qt.ToolTipRole:
+            if col == self.COL_DETAILS:
+                return member.full_last_activity_detail
+            return None
+        if role == Qt.TextAlignmentRole:
+            if col in (self.COL_ICON, self.COL_RDV_DATE):
+                return int(Qt.AlignCenter | Qt.AlignVCenter)
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    # --- واجهة التطبيق ---
+    def set_members(self, members_list):
+        """استبدال القائمة المعروضة بالكامل (تحميل، فلترة، إضافة/حذف)."""
+        self.beginResetModel()
+        self._members = members_list
+        self.reindex()
+        live_ids = {id(m) for m in members_list}
+        self._icon_name_overrides = {k: v for k, v in self._icon_name_overrides.items() if k in live_ids}
+        self._rendered_states = {} # إعادة التعيين ترسم كل شيء من جديد
+        if not (0 <= self.spinner_row < len(members_list)):
+            self.spinner_row = -1
+        self.endResetModel()
+
+    def members(self):
+        return self._members
+
+    def reindex(self):
+        """إعادة بناء خريطة NIN -> الصف (بعد إعادة التعيين أو تعديل NIN لعضو معروض)."""
+        self._row_by_nin = {m.nin: row for row, m in enumerate(self._members)}
+
+    def row_of(self, member):
+        """رقم الصف المعروض للعضو في O(1)، أو -1 إذا لم يكن معروضًا حاليًا."""
+        row = self._row_by_nin.get(member.nin, -1)
+        if row == -1:
+            return -1
+        if not (0 <= row < len(self._members) and self._members[row] is member):
+            self.reindex() # الخريطة قديمة (تغيرت القائمة دون إعادة تعيين)، إعادة البناء مرة واحدة
+            row = self._row_by_nin.get(member.nin, -1)
+            if not (0 <= row < len(self._members) and self._members[row] is member):
+                return -1
+        return row
+
+    def member_at(self, row):
+        if 0 <= row < len(self._members):
+            return self._members[row]
+        return None
+
+    def refresh_row(self, row, first_col=None, last_col=None):
+        """إعلام العرض بتغير صف واحد فقط (أو مجال أعمدة منه) بدلاً من إعادة بناء الجدول."""
+        if not (0 <= row < len(self._members)):
+            return
+        first_col = self.COL_ICON if first_col is None else first_col
+        last_col = self.COL_DETAILS if last_col is None else last_col
+        self.dataChanged.emit(self.index(row, first_col), self.index(row, last_col))
+
+    def refresh_member(self, member):
+        """
+        إعادة رسم الخلايا التي تغير محتواها فقط لهذا العضو (مقارنة بآخر حالة مرسومة).
+        تغير الحالة أو وضع المعالجة يغير ألوان الصف كله، فيُعاد رسم الصف بالكامل.
+        """
+        row = self.row_of(member)
+        if row < 0:
+            return
+        row_style_key = (member.is_processing, member.status)
+        cell_texts = tuple(self._display_text(member, row, col) for col in range(self.COL_FULL_NAME_AR, len(self.HEADERS)))
+        icon_name_str = self._icon_name_overrides.get(id(member)) or get_icon_name_for_status(member.status)
+        previous = self._rendered_states.get(id(member))
+        self._rendered_states[id(member)] = (member, row_style_key, (icon_name_str,) + cell_texts)
+        if previous is None or previous[0] is not member or previous[1] != row_style_key:
+            self.refresh_row(row)
+            return
+        changed_cols = [col for col, (old, new) in enumerate(zip(previous[2], (icon_name_str,) + cell_texts)) if old != new]
+        if changed_cols:
+            self.refresh_row(row, changed_cols[0], changed_cols[-1])
+
+    def set_icon_name(self, member, icon_name_str):
+        if icon_name_str and icon_name_str != get_icon_name_for_status(member.status):
+            self._icon_name_overrides[id(member)] = icon_name_str
+        else:
+            self._icon_name_overrides.pop(id(member), None)
+
+    def set_spinner(self, row, char=""):
+        """تحديد صف السبينر وحرفه الحالي، مع إعادة رسم خلية الأيقونة فقط."""
+        previous_row = self.spinner_row
+        self.spinner_row = row
+        self.spinner_char = char
+        if previous_row != row:
+            self.refresh_row(previous_row, self.COL_ICON, self.COL_ICON)
+        self.refresh_row(row, self.COL_ICON, self.COL_ICON)
+
+    # --- دوال مساعدة للعرض ---
+    def _is_spinner_row(self, row, member):
+        return row == self.spinner_row and member.is_processing
+
+    def _display_text(self, member, row, col):
+        if col == self.COL_ICON:
+            return self.spinner_char if self._is_spinner_row(row, member) else ""
+        if col == self.COL_FULL_NAME_AR:
+            return member.get_full_name_ar()
+        if col == self.COL_NIN:
+            return member.nin
+        if col == self.COL_WASSIT:
+            return member.wassit_no
+        if col == self.COL_CCP:
+            ccp = member.ccp or ""
+            return f"{ccp[:10]} {ccp[10:]}" if len(ccp) == 12 else ccp # تنسيق CCP إذا كان 12 رقمًا
+        if col == self.COL_PHONE_NUMBER:
+            return member.phone_number or ""
+        if col == self.COL_STATUS:
+            return member.status
+        if col == self.COL_RDV_DATE:
+            rdv_date_display_text = member.rdv_date if member.rdv_date else ""
+            if member.rdv_date:
+                if member.rdv_source == "system":
+                    rdv_date_display_text += " (نظام)"
+                elif member.rdv_source == "discovered":
+                    rdv_date_display_text += " (مكتشف)"
+            return rdv_date_display_text
+        if col == self.COL_DETAILS:
+            return member.last_activity_detail
+        return None
+
+    def _icon_for_member(self, member):
+        icon_name_str = self._icon_name_overrides.get(id(member)) or get_icon_name_for_status(member.status)
+        icon = self._icon_cache.get(icon_name_str)
+        if icon is None:
+            style = QApplication.style()
+            icon = style.standardIcon(getattr(QStyle, icon_name_str, QStyle.SP_CustomBase)) if style else QIcon()
+            self._icon_cache[icon_name_str] = icon
+        return icon
+
+    def _background_for_member(self, member):
+        if member.is_processing:
+            return QColorConstants.PROCESSING_ROW_DARK_THEME
+        status_text_for_color = member.status or ""
+        # تحديد لون خاص بناءً على حالة العضو (None = الألوان الافتراضية/المتناوبة للعرض)
+        if status_text_for_color == "مستفيد حاليًا من المنحة": return QColorConstants.BENEFITING_GREEN_DARK_THEME
+        if status_text_for_color == "بيانات الإدخال خاطئة": return QColorConstants.PINK_DARK_THEME
+        if status_text_for_color == "لديه موعد مسبق": return QColorConstants.LIGHT_BLUE_DARK_THEME
+        if status_text_for_color == "غير مؤهل للحجز": return QColorConstants.ORANGE_RED_DARK_THEME
+        if status_text_for_color == "مكتمل": return QColorConstants.LIGHT_GREEN_DARK_THEME
+        if "فشل" in status_text_for_color or "غير مؤهل" in status_text_for_color or "خطأ" in status_text_for_color:
+            return QColorConstants.LIGHT_PINK_DARK_THEME
+        if "يتطلب تسجيل مسبق" in status_text_for_color: return QColorConstants.LIGHT_YELLOW_DARK_THEME
+        return None
@@ -0,0 +1,330 @@
+# mock_anem_server.py
+"""
+خادم HTTP محلي يحاكي واجهة ANEM التي يستدعيها AnemAPIClient، لاختبار البرنامج وقياس أدائه
+دون إرسال أي طلب إلى البوابة الحقيقية.
+الاستخدام:
+    python mock_anem_server.py [--port 8765] [--latency-ms 20] [--rate-429 0.02] [--rate-5xx 0.01] [--booking-rate 0.1] [--pdf-kb 150]
+ثم توجيه البرنامج إلى الخادم عبر متغيرات البيئة:
+    ANEM_BASE_API_URL=http://127.0.0.1:8765/AllocationChomage/api
+    ANEM_MAIN_SITE_CHECK_URL=http://127.0.0.1:8765/
+"""
+import argparse
+import base64
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/AllocationChomage/api/"
+STATS_PATH = "/__stats"
+
+# توزيع حالات المترشحين (محدد حسب NIN، فنفس العضو يحصل دائمًا على نفس الرد)
+PROFILE_HAS_ALLOCATION = 0.03 # مستفيد حاليًا من المنحة
+PROFILE_NOT_ELIGIBLE = 0.03 # غير مؤهل
+PROFILE_INVALID_INPUT = 0.02 # بيانات الإدخال خاطئة
+PROFILE_HAS_RDV = 0.07 # لديه موعد مسبق
+PROFILE_NO_PRE_INSCRIPTION = 0.05 # مؤهل دون تسجيل مسبق
+
+_NAMES_AR = [("بن علي", "محمد"), ("بوزيد", "أمينة"), ("حداد", "ياسين"), ("مرابط", "فاطمة"), ("قاسمي", "عبد القادر"), ("شريف", "سارة")]
+_NAMES_FR = [("BENALI", "MOHAMED"), ("BOUZID", "AMINA"), ("HADDAD", "YACINE"), ("MERABET", "FATIMA"), ("KACEMI", "ABDELKADER"), ("CHERIF", "SARA")]
+
+
+def _stable_fraction(*parts):
+    """قيمة ثابتة في [0, 1) مشتقة من النص (نفس المدخل = نفس القيمة في كل تشغيل)."""
+    return zlib.crc32("|".join(str(p) for p in parts).encode("utf-8")) / 2**32
+
+
+def build_pdf_payload(size_kb):
+    """ملف PDF صالح البنية بحجم تقريبي size_kb، مرمز base64 كما تعيده البوابة."""
+    header = b"%PDF-1.4\n1 0 obj << /Type /Catalog >> endobj\n"
+    trailer = b"\ntrailer << /Root 1 0 R >>\n%%EOF\n"
+    padding_len = max(0, size_kb * 1024 - len(header) - len(trailer))
+    padding = (b"% mock ANEM report padding line\n" * (padding_len // 32 + 1))[:padding_len]
+    return base64.b64encode(header + padding + trailer).decode("ascii")
+
+
+class MockAnemConfig:
+    """إعدادات سلوك الخادم. يمكن تعديلها أثناء التشغيل (القراءة تتم عند كل طلب)."""
+
+    def __init__(self, latency_ms=20.0, jitter_ms=5.0, rate_429=0.0, rate_5xx=0.0, retry_after_seconds=1,
+                 booking_rate=0.1, pdf_kb=150, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429 # نسبة الطلبات التي تُرفض بـ 429 (مع ترويسة Retry-After)
+        self.rate_5xx = rate_5xx # نسبة الطلبات التي تفشل بـ 500/502/503
+        self.retry_after_seconds = retry_after_seconds
+        self.booking_rate = booking_rate # نسبة الأعضاء الذين تتوفر لهم مواعيد
+        self.pdf_kb = pdf_kb
+        self.seed = seed
+
+
+class MockAnemServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address, config):
+        super().__init__(server_address, MockAnemRequestHandler)
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "injected_429": 0, "injected_5xx": 0, "endpoints": {}}
+        self._pdf_payload_kb = None
+        self._pdf_payload = None
+        self._next_rdv_id = 1
+        self._booked_rdv_ids = {} # preInscriptionId -> rendezVousId: validateCandidate يعكس الحجوزات كما تفعل البوابة
+        self._thread = None
+
+    @property
+    def root_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def base_api_url(self):
+        return self.root_url + API_PREFIX.strip("/")
+
+    def start_in_background(self):
+        """تشغيل الخادم في خيط خلفي (للاستخدام من الكود). يعيد الخادم نفسه."""
+        self._thread = threading.Thread(target=self.serve_forever, name="MockAnemServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def random(self):
+        with self._rng_lock:
+            return self._rng.random()
+
+    def choice(self, options):
+        with self._rng_lock:
+            return self._rng.choice(options)
+
+    def sample_latency_seconds(self):
+        with self._rng_lock:
+            latency_ms = self._rng.gauss(self.config.latency_ms, self.config.jitter_ms) if self.config.jitter_ms else self.config.latency_ms
+        return max(0.0, latency_ms) / 1000.0
+
+    def pdf_payload(self):
+        if self._pdf_payload_kb != self.config.pdf_kb:
+            self._pdf_payload = build_pdf_payload(self.config.pdf_kb)
+            self._pdf_payload_kb = self.config.pdf_kb
+        return self._pdf_payload
+
+    def allocate_rdv_id(self, pre_inscription_id):
+        with self._stats_lock:
+            rdv_id = self._next_rdv_id
+            self._next_rdv_id += 1
+            self._booked_rdv_ids[str(pre_inscription_id)] = rdv_id
+        return rdv_id
+
+    def booked_rdv_id(self, pre_inscription_id):
+        with self._stats_lock:
+            return self._booked_rdv_ids.get(str(pre_inscription_id))
+
+    def count(self, endpoint, injected=None):
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["endpoints"][endpoint] = self.stats["endpoints"].get(endpoint, 0) + 1
+            if injected:
+                self.stats[injected] += 1
+
+    def stats_snapshot(self):
+        with self._stats_lock:
+            return json.loads(json.dumps(self.stats))
+
+
+class MockAnemRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # إبقاء الاتصال مفتوحًا كما يفعل requests.Session مع البوابة
+    server_version = "MockANEM/1.0"
+    disable_nagle_algorithm = True # الترويسات والمحتوى يُرسلان في كتابتين: بدون هذا يضيف تأخير ACK حوالي 40ms لكل طلب
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    # --- الاستقبال ---
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        parts = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        body = self._read_json_body() if method == "POST" else None
+
+        if parts.path == STATS_PATH:
+            return self._send_json(200, self.server.stats_snapshot())
+        if parts.path == "/": # فحص توفر الموقع الرئيسي
+            self.server.count("site_check")
+            return self._send(200, b"<html><body>Mock ANEM</body></html>", "text/html; charset=utf-8")
+        if not parts.path.startswith(API_PREFIX):
+            return self._send_json(404, {"message": f"Unknown path {parts.path}"})
+
+        endpoint = parts.path[len(API_PREFIX):]
+        time.sleep(self.server.sample_latency_seconds())
+
+        config = self.server.config
+        roll = self.server.random()
+        if roll < config.rate_429:
+            self.server.count(endpoint, "injected_429")
+            return self._send_json(429, {"message": "Too Many Requests"}, {"Retry-After": str(config.retry_after_seconds)})
+        if roll < config.rate_429 + config.rate_5xx:
+            self.server.count(endpoint, "injected_5xx")
+            return self._send_json(self.server.choice((500, 502, 503)), {"message": "Service indisponible"})
+        self.server.count(endpoint)
+
+        if method == "GET" and endpoint == "validateCandidate/query":
+            return self._send_json(200, self._validate_candidate(params))
+        if method == "GET" and endpoint == "PreInscription/GetPreInscription":
+            return self._send_json(200, self._pre_inscription(params))
+        if method == "GET" and endpoint == "RendezVous/GetAvailableDates":
+            return self._send_json(200, self._available_dates(params))
+        if method == "POST" and endpoint == "RendezVous/Create":
+            return self._send_json(200, self._create_rendezvous(body or {}))
+        if method == "GET" and endpoint.startswith("download/"):
+            return self._send_json(200, {"base64Pdf": self.server.pdf_payload()})
+        return self._send_json(404, {"message": f"Unknown endpoint {method} {endpoint}"})
+
+    # --- الردود (نفس بنية ردود البوابة التي تقرؤها الخيوط) ---
+    def _validate_candidate(self, params):
+        nin = params.get("identityDocNumber", "")
+        wassit_no = params.get("wassitNumber", "")
+        if not nin or not wassit_no:
+            return {"validInput": False, "eligible": False, "controls": [{"name": "matchIdentity", "result": False, "message": "المعلومات غير متطابقة"}]}
+
+        profile = _stable_fraction("profile", nin)
+        pre_inscription_id = str(10**9 + zlib.crc32(nin.encode("utf-8")) % 10**9)
+        name_index = zlib.crc32(pre_inscription_id.encode("utf-8")) % len(_NAMES_AR)
+        response = {
+            "validInput": True, "eligible": True, "haveAllocation": False, "detailsAllocation": {},
+            "havePreInscription": True, "haveRendezVous": False,
+            "preInscriptionId": pre_inscription_id,
+            "demandeurId": str(2 * 10**9 + zlib.crc32(wassit_no.encode("utf-8")) % 10**9),
+            "structureId": str(100 + zlib.crc32(nin[:6].encode("utf-8")) % 900),
+            "rendezVousId": None, "controls": [],
+        }
+        booked_rdv_id = self.server.booked_rdv_id(pre_inscription_id)
+        if booked_rdv_id is not None:
+            response["haveRendezVous"] = True
+            response["rendezVousId"] = booked_rdv_id
+            return response
+        threshold = PROFILE_HAS_ALLOCATION
+        if profile < threshold:
+            nom_ar, prenom_ar = _NAMES_AR[name_index]
+            nom_fr, prenom_fr = _NAMES_FR[name_index]
+            response["haveAllocation"] = True
+            response["detailsAllocation"] = {"nomAr": nom_ar, "prenomAr": prenom_ar, "nomFr": nom_fr, "prenomFr": prenom_fr, "dateDebut": "2024-01-01T00:00:00"}
+            return response
+        threshold += PROFILE_NOT_ELIGIBLE
+        if profile < threshold:
+            response["eligible"] = False
+            return response
+        threshold += PROFILE_INVALID_INPUT
+        if profile < threshold:
+            response["validInput"] = False
+            response["controls"] = [{"name": "matchIdentity", "result": False, "message": "رقم التعريف الوطني لا يتطابق مع رقم الوسيط"}]
+            return response
+        threshold += PROFILE_HAS_RDV
+        if profile < threshold:
+            response["haveRendezVous"] = True
+            response["rendezVousId"] = zlib.crc32(nin.encode("utf-8")) % 10**7
+            return response
+        threshold += PROFILE_NO_PRE_INSCRIPTION
+        if profile < threshold:
+            response["havePreInscription"] = False
+        return response
+
+    def _pre_inscription(self, params):
+        pre_inscription_id = params.get("Id", "")
+        name_index = zlib.crc32(pre_inscription_id.encode("utf-8")) % len(_NAMES_AR)
+        nom_ar, prenom_ar = _NAMES_AR[name_index]
+        nom_fr, prenom_fr = _NAMES_FR[name_index]
+        return {"id": pre_inscription_id, "nomDemandeurAr": nom_ar, "prenomDemandeurAr": prenom_ar, "nomDemandeurFr": nom_fr, "prenomDemandeurFr": prenom_fr}
+
+    def _available_dates(self, params):
+        if _stable_fraction("dates", params.get("PreInscriptionId", "")) >= self.server.config.booking_rate:
+            return {"dates": []}
+        first_day = date.today() + timedelta(days=7)
+        return {"dates": [(first_day + timedelta(days=offset)).strftime("%d/%m/%Y") for offset in range(3)]}
+
+    def _create_rendezvous(self, payload):
+        if not payload.get("preInscriptionId") or not payload.get("rdvdate"):
+            return {"Eligible": False, "serviceUp": True, "message": "معلومات الحجز ناقصة."}
+        return {"code": 0, "rendezVousId": self.server.allocate_rdv_id(payload["preInscriptionId"])}
+
+    # --- أدوات الإرسال ---
+    def _read_json_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return None
+        try:
+            return json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError:
+            return None
+
+    def _send_json(self, status_code, payload, extra_headers=None):
+        self._send(status_code, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8", extra_headers)
+
+    def _send(self, status_code, body, content_type, extra_headers=None):
+        self.send_response(status_code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for header, value in (extra_headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def add_server_arguments(parser):
+    """خيارات سلوك الخادم (مشتركة بين هذا الملف و benchmarks.py)."""
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="متوسط زمن الاستجابة")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="الانحراف المعياري لزمن الاستجابة")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="نسبة ردود 429 (0-1)")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="نسبة ردود 5xx (0-1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="قيمة Retry-After بالثواني في ردود 429")
+    parser.add_argument("--booking-rate", type=float, default=0.1, help="نسبة الأعضاء الذين تتوفر لهم مواعيد")
+    parser.add_argument("--pdf-kb", type=int, default=150, help="حجم ملف PDF المرسل")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args):
+    return MockAnemConfig(args.latency_ms, args.jitter_ms, args.rate_429, args.rate_5xx, args.retry_after, args.booking_rate, args.pdf_kb, args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="خادم ANEM محلي للاختبار وقياس الأداء")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 لاختيار منفذ متاح تلقائيًا")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    server = MockAnemServer((args.host, args.port), config_from_args(args))
+    print(f"MOCK_ANEM_READY {server.root_url}", flush=True) # السطر الأول تقرؤه benchmarks.py لمعرفة المنفذ
+    print(f"ANEM_BASE_API_URL={server.base_api_url}", flush=True)
+    print(f"ANEM_MAIN_SITE_CHECK_URL={server.root_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"إحصائيات الخادم: {server.stats_snapshot()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# monitor_checkpoints.py
+import json
+import sqlite3
+import time
+import logging
+
+from config import MONITOR_CHECKPOINT_DB_FILE
+from sqlite_store import SqliteStore
+
+logger = logging.getLogger(__name__)
+
+
+class MemberCheckpoint:
+    __slots__ = ("nin", "status", "result_key", "unchanged_streak", "last_checked_at", "next_due_at")
+
+    def __init__(self, nin, status, result_key, unchanged_streak, last_checked_at, next_due_at):
+        self.nin = nin # NIN وقت الفحص: نقطة الحفظ لا تصلح بعد تعديل معرفات العضو
+        self.status = status
+        self.result_key = result_key # نفس مفتاح النتيجة في MonitoringScheduler.record_result
+        self.unchanged_streak = unchanged_streak
+        self.last_checked_at = last_checked_at # time.time() (وليس monotonic: يجب أن يبقى صالحًا بعد إعادة التشغيل)
+        self.next_due_at = next_due_at # time.time() لموعد الفحص التالي، أو None (خارج الجدولة)
+
+
+class MonitorCheckpointStore(SqliteStore):
+    """
+    نقاط حفظ المراقبة لكل عضو (حسب member_id المحفوظ مع العضو) في SQLite داخل APP_DATA_DIR: وقت آخر فحص، آخر نتيجة وموعد الفحص التالي.
+    عند بدء المراقبة تستعيد MonitoringScheduler جدولة الأعضاء الذين فُحصوا حديثًا بدلاً من فحص الجميع من جديد.
+    - القراءة من نسخة في الذاكرة تُحمل عند أول استخدام، والكتابة فورية (فحص واحد كل بضع ثوانٍ على الأكثر).
+    - أي خطأ في قاعدة البيانات يعطل الحفظ فقط؛ المراقبة تعمل كما لو لم تكن هناك نقاط حفظ.
+    """
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS monitor_checkpoints (
+            member_id INTEGER PRIMARY KEY,
+            nin TEXT NOT NULL,
+            status TEXT,
+            result_key TEXT,
+            unchanged_streak INTEGER NOT NULL,
+            last_checked_at REAL NOT NULL,
+            next_due_at REAL
+        )""",
+        "DROP TABLE IF EXISTS member_checkpoints", # نقاط حفظ الإصدار السابق (حسب NIN): الأعضاء يُفحصون مرة واحدة من جديد
+    )
+    STORE_NAME = "نقاط حفظ المراقبة"
+    DISABLED_EFFECT = "ستعمل المراقبة دون استئناف"
+
+    def __init__(self, db_path=MONITOR_CHECKPOINT_DB_FILE):
+        super().__init__(db_path)
+        self._checkpoints = None # member_id -> MemberCheckpoint
+
+    def get(self, member_id):
+        with self._lock:
+            return self._checkpoints_locked().get(member_id)
+
+    def save(self, member_id, nin, status, result_key, unchanged_streak, next_due_at, last_checked_at=None):
+        checkpoint = MemberCheckpoint(nin, status, result_key, unchanged_streak, time.time() if last_checked_at is None else last_checked_at, next_due_at)
+        with self._lock:
+            self._checkpoints_locked()[member_id] = checkpoint
+            self._execute_locked(
+                "INSERT OR REPLACE INTO monitor_checkpoints (member_id, nin, status, result_key, unchanged_streak, last_checked_at, next_due_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(member_id, nin, status, json.dumps(result_key, ensure_ascii=False), unchanged_streak, checkpoint.last_checked_at, next_due_at)]
+            )
+
+    def prune(self, keep_member_ids):
+        """حذف نقاط حفظ الأعضاء الذين لم يعودوا في القائمة. يعيد عدد المحذوفين."""
+        keep_member_ids = set(keep_member_ids)
+        with self._lock:
+            checkpoints = self._checkpoints_locked()
+            removed = [member_id for member_id in checkpoints if member_id not in keep_member_ids]
+            for member_id in removed:
+                del checkpoints[member_id]
+            if removed:
+                self._execute_locked("DELETE FROM monitor_checkpoints WHERE member_id = ?", [(member_id,) for member_id in removed])
+        return len(removed)
+
+    # --- دوال داخلية ---
+    def _checkpoints_locked(self):
+        if self._checkpoints is None:
+            self._checkpoints = {}
+            conn = self._connection_locked()
+            if conn is not None:
+                try:
+                    for member_id, nin, status, result_key, unchanged_streak, last_checked_at, next_due_at in conn.execute(
+                            "SELECT member_id, nin, status, result_key, unchanged_streak, last_checked_at, next_due_at FROM monitor_checkpoints"):
+                        try:
+                            result_key = tuple(json.loads(result_key)) if result_key else None
+                        except ValueError:
+                            continue
+                        self._checkpoints[member_id] = MemberCheckpoint(nin, status, result_key, unchanged_streak, last_checked_at, next_due_at)
+                except sqlite3.Error as e:
+                    logger.warning(f"فشل تحميل نقاط حفظ المراقبة: {e}")
+        return self._checkpoints
+
+
+# --- Shared Checkpoints (يستخدمها خيط المراقبة عبر MonitoringScheduler) ---
+SHARED_MONITOR_CHECKPOINTS = MonitorCheckpointStore()
@@ -0,0 +1,241 @@
+# monitor_scheduler.py
+import heapq
+import itertools
+import time
+import logging
+
+from config import (
+    SCHEDULER_PDF_INTERVAL_SECONDS, SCHEDULER_RETRY_INTERVAL_SECONDS, SCHEDULER_SLOW_INTERVAL_SECONDS,
+    SCHEDULER_UNCHANGED_BACKOFF_FACTOR, MONITOR_CHECKPOINT_FRESHNESS_SECONDS
+)
+
+from pdf_manifest import SHARED_PDF_MANIFEST
+
+logger = logging.getLogger(__name__)
+
+# --- فئات الحالات ---
+CLASS_BOOKING = "booking" # قد تظهر مواعيد في أي لحظة: الفحص بفترة المراقبة من الإعدادات
+CLASS_PDF = "pdf" # موعد محجوز لكن ملفات PDF ناقصة
+CLASS_SLOW = "slow" # حالات نادرًا ما تتغير من تلقاء نفسها
+CLASS_RETRY = "retry" # أخطاء مؤقتة: إعادة المحاولة مع تأخير يتضاعف مع الفشل المتتالي
+CLASS_TERMINAL = "terminal" # لا شيء يمكن أن يتغير دون تعديل العضو: خارج الجدولة
+
+BOOKING_STATUSES = frozenset(["جديد", "تم التحقق", "تم التحقق (فوري)", "تم جلب المعلومات", "تم جلب المعلومات (فوري)", "لا توجد مواعيد", "فشل جلب التواريخ"])
+PDF_STATUSES = frozenset(["تم الحجز", "فشل تحميل PDF", "لديه موعد مسبق", "مكتمل"])
+SLOW_STATUSES = frozenset(["يتطلب تسجيل مسبق", "غير مؤهل للحجز"])
+TERMINAL_STATUSES = frozenset(["مستفيد حاليًا من المنحة", "غير مؤهل مبدئيًا", "بيانات الإدخال خاطئة"])
+
+# أقصى مضاعف للفترة عندما تتكرر نفس النتيجة (الحجز يبقى قريبًا من فترة المراقبة حتى لا تفوت المواعيد)
+MAX_UNCHANGED_MULTIPLIER = {CLASS_BOOKING: 4.0, CLASS_PDF: 12.0, CLASS_SLOW: 4.0, CLASS_RETRY: 1.0}
+MAX_FAILURE_DOUBLINGS = 5
+
+
+class _MemberSchedule:
+    __slots__ = ("member", "status_key", "result_key", "status_class", "unchanged_streak", "due_at", "generation")
+
+    def __init__(self, member):
+        self.member = member
+        self.status_key = None
+        self.result_key = None
+        self.status_class = None
+        self.unchanged_streak = 0
+        self.due_at = None # None: خارج الجدولة (حالة نهائية)
+        self.generation = 0 # مدخلات الكومة ذات الجيل الأقدم ملغاة
+
+
+class MonitoringScheduler:
+    """
+    جدولة المراقبة حسب التغير بدلاً من المرور الدوري على جميع الأعضاء بالترتيب.
+    - كومة (heap) مرتبة حسب موعد الفحص التالي؛ يُفحص دائمًا العضو الأكثر تأخرًا.
+    - لكل فئة حالة فترة فحص خاصة بها، وتكرار نفس النتيجة يطيل الفترة لذلك العضو.
+    - الحالات النهائية تخرج من الجدولة، وتعود إليها عند تغير حالتها من خارج المراقبة
+      (تعديل العضو، فحص فوري، جلب أولي...)، وهذا ما يكتشفه sync().
+    - مع checkpoints (MonitorCheckpointStore): كل نتيجة تُحفظ، وعند بدء المراقبة يستأنف العضو الذي فُحص
+      خلال freshness_seconds موعده المحفوظ بدلاً من أن يكون مستحقًا فورًا (الفحص الأولي للأعضاء القدامى فقط).
+    لا يُستخدم إلا من خيط المراقبة.
+    """
+
+    def __init__(self, booking_interval_seconds, max_consecutive_failures, checkpoints=None, freshness_seconds=MONITOR_CHECKPOINT_FRESHNESS_SECONDS):
+        self.booking_interval_seconds = booking_interval_seconds
+        self.max_consecutive_failures = max_consecutive_failures
+        self.checkpoints = checkpoints
+        self.freshness_seconds = freshness_seconds
+        self.restored_count = 0 # عدد الأعضاء الذين استُؤنفت جدولتهم من نقاط الحفظ
+        self._checkpoints_pruned = False
+        self._states = {} # member_id -> _MemberSchedule
+        self._index_by_id = {} # member_id -> الفهرس في القائمة الرئيسية عند آخر sync
+        self._heap = [] # (due_at, seq, member_id, generation)
+        self._seq = itertools.count() # ترتيب ثابت عند تساوي المواعيد (ترتيب القائمة للأعضاء الجدد)
+
+    def set_booking_interval(self, seconds):
+        self.booking_interval_seconds = seconds
+
+    def sync(self, members, now=None):
+        """
+        مزامنة الجدولة مع القائمة: الأعضاء الجدد مستحقون فورًا (إلا من له نقطة حفظ حديثة)، المحذوفون يُزالون،
+        ومن تغيرت حالته من خارج المراقبة يُعاد تصنيفه. يعيد عدد الأعضاء الذين أعيدت جدولتهم.
+        """
+        now = time.monotonic() if now is None else now
+        if self.checkpoints is not None and not self._checkpoints_pruned and members:
+            self._checkpoints_pruned = True
+            self.checkpoints.prune(member.member_id for member in members)
+        states = self._states
+        index_by_id = {}
+        rescheduled = 0
+        for idx, member in enumerate(members):
+            member_id = member.member_id
+            index_by_id[member_id] = idx
+            state = states.get(member_id)
+            if state is None:
+                state = states[member_id] = _MemberSchedule(member)
+                state.status_key = self._status_key(member)
+                state.status_class = self.classify(member)
+                self._schedule(state, None if state.status_class == CLASS_TERMINAL else self._restore_checkpoint(state, now))
+                rescheduled += 1
+            elif state.status_key != self._status_key(member): # تغيير من خارج المراقبة
+                state.status_key = self._status_key(member)
+                state.status_class = self.classify(member)
+                state.unchanged_streak = 0
+                self._schedule(state, self._next_due(state, now))
+                rescheduled += 1
+        if len(index_by_id) != len(states):
+            for member_id in [member_id for member_id in states if member_id not in index_by_id]:
+                del states[member_id]
+        self._index_by_id = index_by_id
+        return rescheduled
+
+    def pop_due(self, members, now=None):
+        """(الفهرس، العضو) للعضو المستحق الأكثر تأخرًا، أو None إذا لم يكن هناك عضو مستحق."""
+        now = time.monotonic() if now is None else now
+        while self._heap and self._heap[0][0] <= now:
+            _due_at, _seq, member_id, generation = heapq.heappop(self._heap)
+            state = self._states.get(member_id)
+            if state is None or state.generation != generation:
+                continue # مدخل ملغى (أعيدت جدولة العضو أو حذفه)
+            state.due_at = None
+            idx = self._index_by_id.get(member_id, -1)
+            if 0 <= idx < len(members) and members[idx].member_id == member_id:
+                return idx, state.member
+            self._schedule(state, now) # تغيرت القائمة منذ آخر sync: يُعاد بعد المزامنة التالية
+            return None
+        return None
+
+    def seconds_until_next_due(self, now=None):
+        """الثواني حتى موعد أقرب عضو (0 إذا كان هناك عضو مستحق)، أو None إذا لا يوجد أعضاء مجدولون."""
+        now = time.monotonic() if now is None else now
+        heap = self._heap
+        while heap:
+            due_at, _seq, member_id, generation = heap[0]
+            state = self._states.get(member_id)
+            if state is not None and state.generation == generation:
+                return max(0.0, due_at - now)
+            heapq.heappop(heap)
+        return None
+
+    def due_count(self, now=None):
+        """عدد الأعضاء المستحقين الآن."""
+        now = time.monotonic() if now is None else now
+        return sum(1 for state in self._states.values() if state.due_at is not None and state.due_at <= now)
+
+    def defer(self, member, seconds, now=None):
+        """تأجيل عضو لم يُفحص (مثلاً قيد المعالجة في خيط آخر)."""
+        state = self._states.get(member.member_id)
+        if state is not None:
+            now = time.monotonic() if now is None else now
+            self._schedule(state, now + seconds)
+
+    def requeue(self, member, now=None):
+        """إعادة تصنيف العضو وجعله مستحقًا فورًا (مثلاً عند فقدان ملفات PDF المسجلة)."""
+        state = self._states.get(member.member_id)
+        if state is not None:
+            state.status_class = self.classify(member)
+            state.unchanged_streak = 0
+            self._schedule(state, None if state.status_class == CLASS_TERMINAL else (time.monotonic() if now is None else now))
+
+    def record_result(self, member, now=None):
+        """تسجيل نتيجة فحص العضو وجدولة فحصه التالي حسب فئة حالته الجديدة وتكرار النتيجة."""
+        state = self._states.get(member.member_id)
+        if state is None:
+            return
+        now = time.monotonic() if now is None else now
+        result_key = (member.status, member.rdv_date, member.already_has_rdv, bool(member.pdf_honneur_path), bool(member.pdf_rdv_path))
+        state.unchanged_streak = state.unchanged_streak + 1 if result_key == state.result_key else 0
+        state.result_key = result_key
+        state.status_key = self._status_key(member)
+        state.status_class = self.classify(member)
+        self._schedule(state, self._next_due(state, now))
+        if self.checkpoints is not None:
+            wall_now = time.time()
+            self.checkpoints.save(member.member_id, member.nin, member.status, result_key, state.unchanged_streak,
+                                  None if state.due_at is None else wall_now + (state.due_at - now), last_checked_at=wall_now)
+
+    def classify(self, member):
+        if member.consecutive_failures >= self.max_consecutive_failures:
+            return CLASS_TERMINAL # "فشل بشكل متكرر": يعود عند إعادة تعيين العداد (استعادة الاتصال أو التعديل)
+        status = member.status
+        if status in TERMINAL_STATUSES:
+            return CLASS_TERMINAL
+        if status in PDF_STATUSES:
+            return CLASS_TERMINAL if SHARED_PDF_MANIFEST.is_member_complete(member) else CLASS_PDF # من السجل، دون الوصول إلى القرص
+        if status in BOOKING_STATUSES:
+            return CLASS_BOOKING
+        if status in SLOW_STATUSES:
+            return CLASS_SLOW
+        return CLASS_RETRY
+
+    def stats(self):
+        """عدد الأعضاء في كل فئة (للسجل)."""
+        counts = {}
+        for state in self._states.values():
+            counts[state.status_class] = counts.get(state.status_class, 0) + 1
+        return counts
+
+    # --- دوال داخلية ---
+    def _status_key(self, member):
+        return (member.status, member.consecutive_failures >= self.max_consecutive_failures)
+
+    def _restore_checkpoint(self, state, now):
+        """
+        موعد الفحص الأول لعضو جديد في الجدولة: now إذا لم تكن له نقطة حفظ حديثة بنفس الحالة،
+        وإلا موعده المحفوظ (بحد أقصى انتهاء مدة الصلاحية) مع استعادة آخر نتيجة وعدد تكرارها.
+        """
+        member = state.member
+        checkpoint = self.checkpoints.get(member.member_id) if self.checkpoints is not None else None
+        if checkpoint is None or checkpoint.nin != member.nin or checkpoint.status != member.status: # تغير NIN: معرفات جديدة تُفحص من جديد
+            return now
+        wall_now = time.time()
+        age = wall_now - checkpoint.last_checked_at
+        if age < 0 or age >= self.freshness_seconds: # ساعة النظام تغيرت أو البيانات قديمة
+            return now
+        state.result_key = checkpoint.result_key
+        state.unchanged_streak = checkpoint.unchanged_streak
+        if checkpoint.next_due_at is None: # كان خارج الجدولة (مثلاً ملفات PDF مكتملة ثم فُقدت): من وقت آخر فحص
+            due_at = self._next_due(state, now - age)
+        else:
+            due_at = now + max(0.0, checkpoint.next_due_at - wall_now)
+        self.restored_count += 1
+        return min(due_at, now + self.freshness_seconds - age)
+
+    def _next_due(self, state, now):
+        status_class = state.status_class
+        if status_class == CLASS_TERMINAL:
+            return None
+        if status_class == CLASS_BOOKING:
+            interval = self.booking_interval_seconds
+        elif status_class == CLASS_PDF:
+            interval = SCHEDULER_PDF_INTERVAL_SECONDS
+        elif status_class == CLASS_SLOW:
+            interval = SCHEDULER_SLOW_INTERVAL_SECONDS
+        else:
+            interval = SCHEDULER_RETRY_INTERVAL_SECONDS * 2 ** min(state.member.consecutive_failures, MAX_FAILURE_DOUBLINGS)
+        multiplier = min(SCHEDULER_UNCHANGED_BACKOFF_FACTOR ** state.unchanged_streak, MAX_UNCHANGED_MULTIPLIER[status_class])
+        return now + interval * multiplier
+
+    def _schedule(self, state, due_at):
+        state.generation += 1
+        state.due_at = due_at
+        if due_at is not None:
+            heapq.heappush(self._heap, (due_at, next(self._seq), state.member.member_id, state.generation))
+        if len(self._heap) > 4 * len(self._states) + 64: # الكثير من المدخلات الملغاة: إعادة بناء الكومة
+            self._heap = [(s.due_at, next(self._seq), member_id, s.generation) for member_id, s in self._states.items() if s.due_at is not None]
+            heapq.heapify(self._heap)
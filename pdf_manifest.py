@@ -0,0 +1,136 @@
+# pdf_manifest.py
+import os
+import hashlib
+import sqlite3
+import time
+import logging
+
+from config import PDF_MANIFEST_DB_FILE
+from sqlite_store import SqliteStore
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PdfManifest(SqliteStore):
+    """
+    سجل دائم لملفات PDF المحملة (SQLite داخل APP_DATA_DIR): المسار، الحجم، وقت التعديل وبصمة SHA-256.
+    - الاستعلام (has / is_member_complete) من نسخة في الذاكرة، دون أي وصول إلى نظام الملفات.
+    - sweep() هو فحص السلامة الدوري: ملف محذوف أو تغير حجمه أو محتواه يُحذف من السجل ليُعاد تحميله.
+    - أي خطأ في قاعدة البيانات يعطل الحفظ فقط؛ السجل في الذاكرة يبقى صالحًا لهذه الجلسة.
+    """
+    SCHEMA = ("""
+        CREATE TABLE IF NOT EXISTS pdf_files (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            sha256 TEXT NOT NULL,
+            recorded_at REAL NOT NULL
+        )""",)
+    STORE_NAME = "سجل ملفات PDF"
+    DISABLED_EFFECT = "سيعمل السجل في الذاكرة فقط"
+
+    def __init__(self, db_path=PDF_MANIFEST_DB_FILE):
+        super().__init__(db_path)
+        self._entries = None # المسار -> (الحجم، وقت التعديل، البصمة)، يُحمل عند أول استخدام
+
+    def record(self, path, sha256=None):
+        """تسجيل ملف تم حفظه. sha256: البصمة إن حُسبت أثناء الكتابة (لتجنب إعادة قراءة الملف)."""
+        try:
+            stat = os.stat(path)
+            sha256 = sha256 or _file_sha256(path)
+        except OSError as e:
+            logger.warning(f"تعذر تسجيل ملف PDF في السجل ({path}): {e}")
+            return False
+        entry = (stat.st_size, stat.st_mtime, sha256)
+        with self._lock:
+            entries = self._entries_locked()
+            if entries.get(path) == entry:
+                return True
+            entries[path] = entry
+            self._execute_locked("INSERT OR REPLACE INTO pdf_files (path, size, mtime, sha256, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                                 [(path, stat.st_size, stat.st_mtime, sha256, time.time())])
+        return True
+
+    def has(self, path):
+        if not path:
+            return False
+        with self._lock:
+            return path in self._entries_locked()
+
+    def is_member_complete(self, member):
+        """جميع ملفات PDF المطلوبة للعضو مسجلة (الالتزام دائمًا، والموعد إذا كان لديه موعد)."""
+        with self._lock:
+            entries = self._entries_locked()
+            if not (member.pdf_honneur_path and member.pdf_honneur_path in entries):
+                return False
+            if member.already_has_rdv or member.rdv_id:
+                return bool(member.pdf_rdv_path and member.pdf_rdv_path in entries)
+            return True
+
+    def forget(self, paths):
+        with self._lock:
+            entries = self._entries_locked()
+            removed = [path for path in paths if path and entries.pop(path, None) is not None]
+            if removed:
+                self._execute_locked("DELETE FROM pdf_files WHERE path = ?", [(path,) for path in removed])
+
+    def sweep(self):
+        """
+        فحص سلامة الملفات المسجلة: stat لكل ملف، وإعادة حساب البصمة فقط عند تغير وقت التعديل مع بقاء الحجم.
+        يعيد مجموعة مسارات الملفات المفقودة أو المتغيرة (بعد حذفها من السجل).
+        """
+        with self._lock:
+            snapshot = list(self._entries_locked().items())
+        invalid, touched = set(), {}
+        for path, (size, mtime, sha256) in snapshot: # خارج القفل: الوصول إلى القرص قد يكون بطيئًا
+            try:
+                stat = os.stat(path)
+                if stat.st_size != size:
+                    invalid.add(path)
+                elif stat.st_mtime != mtime:
+                    if _file_sha256(path) == sha256:
+                        touched[path] = (size, stat.st_mtime, sha256)
+                    else:
+                        invalid.add(path)
+            except OSError:
+                invalid.add(path)
+        with self._lock:
+            entries = self._entries_locked()
+            for path, entry in touched.items():
+                if path in entries:
+                    entries[path] = entry
+            if touched:
+                self._execute_locked("UPDATE pdf_files SET mtime = ? WHERE path = ?", [(entry[1], path) for path, entry in touched.items()])
+        if invalid:
+            self.forget(invalid)
+            logger.warning(f"سجل ملفات PDF: {len(invalid)} ملف مفقود أو تغير من أصل {len(snapshot)}، سيُعاد تحميلها.")
+        else:
+            logger.info(f"سجل ملفات PDF: تم فحص {len(snapshot)} ملف، جميعها سليمة.")
+        return invalid
+
+    # --- دوال داخلية ---
+    def _entries_locked(self):
+        if self._entries is None:
+            self._entries = {}
+            conn = self._connection_locked()
+            if conn is not None:
+                try:
+                    for path, size, mtime, sha256 in conn.execute("SELECT path, size, mtime, sha256 FROM pdf_files"):
+                        self._entries[path] = (size, mtime, sha256)
+                except sqlite3.Error as e:
+                    logger.warning(f"فشل تحميل سجل ملفات PDF: {e}")
+        return self._entries
+
+
+# --- Shared Manifest (مشترك بين خيط المراقبة وخيوط التحميل والجدولة) ---
+SHARED_PDF_MANIFEST = PdfManifest()
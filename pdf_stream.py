@@ -0,0 +1,146 @@
+# pdf_stream.py
+import os
+import binascii
+import hashlib
+import logging
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_BYTES = 64 * 1024
+BASE64_FIELD_KEY = b'"base64Pdf"'
+PART_FILE_SUFFIX = ".part"
+_JSON_WHITESPACE = b" \t\r\n"
+
+
+class Base64PdfStreamDecoder:
+    """
+    استخراج قيمة base64Pdf من رد JSON يصل على دفعات، وفك ترميزها دفعة بدفعة إلى ملف.
+    يقبل الشكلين اللذين تقبلهما الخيوط: {"base64Pdf": "..."} أو نص JSON مباشر "...".
+    لا يُحتفظ في الذاكرة إلا بالدفعة الحالية وبقية base64 (أقل من 4 أحرف).
+    """
+    STATE_SEARCH, STATE_VALUE, STATE_DONE = 0, 1, 2
+    MAX_PREFIX_BYTES = 1024 * 1024 # رد لا يحتوي على الحقل في أوله: ليس ملف PDF
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.sha256 = hashlib.sha256()
+        self.bytes_written = 0
+        self._state = self.STATE_SEARCH
+        self._prefix = b"" # ما قبل بداية القيمة (ترويسة JSON صغيرة عادة)
+        self._pending = b"" # أحرف base64 لم تكتمل إلى مضاعف 4
+        self._escape_pending = False # آخر دفعة انتهت بـ \
+
+    @property
+    def is_complete(self):
+        return self._state == self.STATE_DONE
+
+    def feed(self, chunk):
+        if self._state == self.STATE_SEARCH:
+            self._prefix += chunk
+            value_start = self._find_value_start()
+            if value_start is None:
+                if len(self._prefix) > self.MAX_PREFIX_BYTES:
+                    raise ValueError("حقل base64Pdf غير موجود في بداية الرد.")
+                return
+            chunk, self._prefix = self._prefix[value_start:], b""
+            self._state = self.STATE_VALUE
+        if self._state == self.STATE_VALUE:
+            self._feed_value(chunk)
+
+    def _find_value_start(self):
+        data = self._prefix
+        stripped = data.lstrip(_JSON_WHITESPACE)
+        if stripped[:1] == b'"': # نص JSON مباشر
+            return len(data) - len(stripped) + 1
+        key_pos = data.find(BASE64_FIELD_KEY)
+        if key_pos < 0:
+            return None
+        pos = key_pos + len(BASE64_FIELD_KEY)
+        while pos < len(data) and data[pos] in _JSON_WHITESPACE:
+            pos += 1
+        if pos < len(data) and data[pos:pos + 1] == b":":
+            pos += 1
+            while pos < len(data) and data[pos] in _JSON_WHITESPACE:
+                pos += 1
+        if pos >= len(data):
+            return None # بقية الترويسة في الدفعة التالية
+        if data[pos:pos + 1] != b'"':
+            raise ValueError("قيمة base64Pdf ليست نصًا.")
+        return pos + 1
+
+    def _feed_value(self, chunk):
+        if self._escape_pending:
+            chunk = b"\\" + chunk
+            self._escape_pending = False
+        end = chunk.find(b'"')
+        while end > 0 and chunk[end - 1:end] == b"\\" and not self._is_escaped_backslash(chunk, end - 1):
+            end = chunk.find(b'"', end + 1)
+        if end >= 0:
+            chunk = chunk[:end]
+            self._state = self.STATE_DONE
+        elif chunk.endswith(b"\\") and not self._is_escaped_backslash(chunk, len(chunk) - 1):
+            chunk, self._escape_pending = chunk[:-1], True
+        if b"\\" in chunk: # الهروب الوحيد الممكن في base64 هو \/ (وأحيانًا \n أو \r عند تقسيم الأسطر)
+            chunk = chunk.replace(b"\\/", b"/").replace(b"\\n", b"").replace(b"\\r", b"")
+        self._write_base64(self._pending + chunk, final=self._state == self.STATE_DONE)
+
+    @staticmethod
+    def _is_escaped_backslash(chunk, pos):
+        backslashes = 0
+        while pos - backslashes - 1 >= 0 and chunk[pos - backslashes - 1:pos - backslashes] == b"\\":
+            backslashes += 1
+        return backslashes % 2 == 1
+
+    def _write_base64(self, data, final):
+        usable = len(data) if final else len(data) - len(data) % 4
+        self._pending = data[usable:]
+        if usable:
+            decoded = binascii.a2b_base64(data[:usable])
+            self.output_file.write(decoded)
+            self.sha256.update(decoded)
+            self.bytes_written += len(decoded)
+
+
+def stream_base64_pdf_to_file(response, file_path, chunk_size=STREAM_CHUNK_BYTES):
+    """
+    كتابة ملف PDF من رد بث (stream=True) إلى file_path عبر ملف مؤقت .part ثم إعادة تسمية ذرية.
+    يعيد ({"path", "size", "sha256"}، None) أو (None، رسالة الخطأ). أخطاء الشبكة أثناء القراءة تُرفع كما هي
+    (لتتم إعادة المحاولة في _make_request)، مع حذف الملف المؤقت.
+    """
+    part_path = file_path + PART_FILE_SUFFIX
+    try:
+        with open(part_path, 'wb') as part_file:
+            decoder = Base64PdfStreamDecoder(part_file)
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    decoder.feed(chunk)
+                if decoder.is_complete:
+                    break
+        if not decoder.is_complete or not decoder.bytes_written:
+            _remove_quietly(part_path)
+            return None, "استجابة غير متوقعة من الخادم (لا تحتوي على ملف PDF)."
+        os.replace(part_path, file_path)
+    except requests.exceptions.RequestException: # RequestException ترث OSError: يجب أن تسبق معالجة أخطاء الحفظ
+        _remove_quietly(part_path)
+        raise
+    except (ValueError, binascii.Error) as e:
+        _remove_quietly(part_path)
+        logger.error(f"رد تحميل PDF غير صالح لـ {file_path}: {e}")
+        return None, f"استجابة غير متوقعة من الخادم: {e}"
+    except OSError as e:
+        _remove_quietly(part_path)
+        logger.error(f"فشل حفظ ملف PDF {file_path}: {e}")
+        return None, f"خطأ في حفظ الملف: {e}"
+    except Exception:
+        _remove_quietly(part_path)
+        raise
+    return {"path": file_path, "size": decoder.bytes_written, "sha256": decoder.sha256.hexdigest()}, None
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
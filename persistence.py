@@ -0,0 +1,207 @@
+# persistence.py
+import json
+import os
+import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from config import DATA_FILE, DATA_FILE_TMP, DATA_FILE_BAK, MEMBERS_SAVE_DEBOUNCE_MS
+
+logger = logging.getLogger(__name__)
+
+
+class MembersPersistence(QObject):
+    """
+    محرك حفظ تدريجي ومؤجل لبيانات الأعضاء (members_data.json أو مخزن SQLite اختياري).
+    - mark_dirty() تُعلِّم العضو المعدل وتبدأ مؤقتًا قصيرًا يجمع عدة تغييرات في عملية كتابة واحدة.
+    - JSON: يتم الاحتفاظ بنص JSON المنسق لكل عضو، ولا يُعاد تسلسل إلا الأعضاء المعلَّمين.
+    - SQLite: يتم تحديث صفوف الأعضاء المعلَّمين فقط، وترتيب القائمة عند تغيره.
+    - الكتابة (tmp ثم bak ثم os.replace لملف JSON) تتم في خيط كاتب واحد خارج خيط الواجهة.
+    """
+    save_failed_signal = pyqtSignal(str) # رسالة الخطأ (تُرسل من خيط الكاتب إلى الواجهة)
+
+    def __init__(self, members_provider, store=None, debounce_ms=MEMBERS_SAVE_DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self._members_provider = members_provider # دالة تعيد القائمة الرئيسية الحالية
+        self._store = store # SqliteMemberStore أو None لملف JSON
+        self._fragment_cache = {} # id(member) -> (member, نص JSON المنسق للعضو)
+        self._saved_nin_by_id = {} # id(member) -> (member, NIN المحفوظ في المخزن)
+        self._last_order = None # ترتيب NIN المحفوظ آخر مرة في المخزن
+        self._store_write_failed = threading.Event() # يضبطه خيط الكاتب عند فشل الكتابة؛ الحالة أعلاه يملكها خيط الواجهة وحده
+        self._dirty_ids = set()
+        self._last_written_hash = None
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="MembersWriter") # كاتب واحد يضمن ترتيب عمليات الكتابة
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(debounce_ms)
+        self._save_timer.timeout.connect(self._write_pending_changes)
+
+    def mark_dirty(self, member=None):
+        """تعليم عضو كمعدل (أو تغيير في القائمة نفسها إذا كان member=None) وجدولة حفظ مؤجل."""
+        if member is not None:
+            self._dirty_ids.add(id(member))
+        if not self._save_timer.isActive(): # عدم إعادة تشغيل المؤقت: أقصى تأخير للحفظ هو فترة المؤقت
+            self._save_timer.start()
+
+    @property
+    def store(self):
+        return self._store
+
+    def set_store(self, store):
+        """تبديل الواجهة الخلفية للتخزين (None = JSON). يجب استدعاء flush() بعدها لكتابة القائمة كاملة."""
+        self._save_timer.stop()
+        self._writer.submit(lambda: None).result() # انتظار انتهاء أي كتابة جارية على المخزن القديم
+        self._store = store
+        self._fragment_cache = {}
+        self._saved_nin_by_id = {}
+        self._last_order = None
+        self._store_write_failed.clear()
+        self._last_written_hash = None
+
+    def mark_clean(self):
+        """اعتبار القائمة الحالية محفوظة بالكامل في المخزن (بعد التحميل منه مباشرة)."""
+        if self._store is None:
+            return
+        members = self._members_provider()
+        self._saved_nin_by_id = {id(m): (m, m.nin) for m in members}
+        self._last_order = [m.nin for m in members]
+        self._dirty_ids.clear()
+
+    def flush(self):
+        """حفظ فوري ومتزامن لجميع الأعضاء (يُستخدم عند الإغلاق وعند تبديل طريقة التخزين)."""
+        self._save_timer.stop()
+        try:
+            self._submit_pending(full=True).result()
+        except Exception as e:
+            logger.exception(f"خطأ أثناء انتظار الحفظ النهائي لبيانات الأعضاء: {e}")
+
+    def shutdown(self):
+        self.flush()
+        self._writer.shutdown(wait=True)
+        if self._store is not None:
+            self._store.close()
+
+    def query_nins(self, filter_key, filter_value):
+        """
+        استعلام فلترة مفهرس عبر المخزن (أو None إذا كان التخزين JSON أو الفلتر غير مدعوم).
+        يتم أولاً كتابة التغييرات المعلقة بشكل متزامن حتى تطابق النتائج ما في الذاكرة.
+        """
+        if self._store is None:
+            return None
+        self._save_timer.stop()
+        try:
+            self._submit_pending(full=False).result()
+            return self._store.query_nins(filter_key, filter_value)
+        except Exception as e:
+            logger.exception(f"فشل الاستعلام المفهرس ({filter_key}={filter_value}) من مخزن الأعضاء: {e}")
+            return None
+
+    def _write_pending_changes(self):
+        self._submit_pending(full=False)
+
+    def _submit_pending(self, full):
+        if self._store is not None:
+            upsert_rows, ordered_nins, deleted_nins = self._build_store_changes(full)
+            return self._writer.submit(self._write_store_changes, upsert_rows, ordered_nins, deleted_nins)
+        payload = self._build_payload(full)
+        return self._writer.submit(self._write_payload, payload, full)
+
+    def _build_store_changes(self, full):
+        # يتم على خيط الواجهة: تحديد الصفوف التي تغيرت فقط (معلَّمة، جديدة، أو تغير NIN الخاص بها)
+        if self._store_write_failed.is_set(): # فشلت كتابة سابقة: لا نعرف ما حُفظ، فيُعاد كتابة الترتيب وجميع الصفوف
+            self._store_write_failed.clear()
+            full = True
+        members = self._members_provider()
+        order = [m.nin for m in members]
+        order_changed = full or order != self._last_order
+        new_saved = {}
+        upsert_rows = []
+        deleted_nins = []
+        for position, member in enumerate(members):
+            key = id(member)
+            saved = self._saved_nin_by_id.get(key)
+            known = saved is not None and saved[0] is member
+            if known and saved[1] != member.nin:
+                deleted_nins.append(saved[1]) # تم تعديل NIN: حذف الصف القديم
+            if full or not known or key in self._dirty_ids or saved[1] != member.nin:
+                member_dict = member.to_dict()
+                member_dict['is_processing'] = False
+                upsert_rows.append(self._store.row_from_dict(member_dict, position))
+            new_saved[key] = (member, member.nin)
+        self._saved_nin_by_id = new_saved
+        self._dirty_ids.clear()
+        self._last_order = order
+        return upsert_rows, (order if order_changed else None), deleted_nins
+
+    def _write_store_changes(self, upsert_rows, ordered_nins, deleted_nins):
+        # يعمل في خيط الكاتب
+        if not upsert_rows and ordered_nins is None and not deleted_nins:
+            return
+        try:
+            self._store.write_changes(upsert_rows, ordered_nins, deleted_nins)
+            logger.info(f"تم حفظ {len(upsert_rows)} عضو معدل في قاعدة البيانات {self._store.db_path}")
+        except Exception as e:
+            logger.exception(f"خطأ عند حفظ بيانات الأعضاء في قاعدة البيانات {self._store.db_path}: {e}")
+            self._store_write_failed.set() # الدفعة التالية (على خيط الواجهة) تعيد كتابة الترتيب وجميع الصفوف
+            self.save_failed_signal.emit(str(e))
+
+    def _build_payload(self, full):
+        # يتم على خيط الواجهة: إعادة تسلسل الأعضاء المعلَّمين فقط وإعادة استخدام النص المخزن للباقين
+        new_cache = {}
+        parts = []
+        for member in self._members_provider():
+            key = id(member)
+            cached = None if full or key in self._dirty_ids else self._fragment_cache.get(key)
+            if cached is not None and cached[0] is member:
+                fragment = cached[1]
+            else:
+                fragment = self._serialize_member(member)
+            new_cache[key] = (member, fragment)
+            parts.append(fragment)
+        self._fragment_cache = new_cache # يتم إسقاط الأعضاء المحذوفين تلقائيًا
+        self._dirty_ids.clear()
+        # نفس ناتج json.dump(data, indent=4) للقائمة الكاملة
+        return "[\n" + ",\n".join(parts) + "\n]" if parts else "[]"
+
+    @staticmethod
+    def _serialize_member(member):
+        member_dict = member.to_dict()
+        member_dict['is_processing'] = False # ضمان أن is_processing لا يتم حفظها كـ True
+        member_json = json.dumps(member_dict, ensure_ascii=False, indent=4)
+        return "    " + member_json.replace("\n", "\n    ") # مستوى إزاحة واحد داخل القائمة
+
+    def _write_payload(self, payload, force):
+        # يعمل في خيط الكاتب
+        payload_hash = hash(payload)
+        if not force and payload_hash == self._last_written_hash and os.path.exists(DATA_FILE):
+            logger.debug("لا توجد تغييرات فعلية في بيانات الأعضاء منذ آخر حفظ. تم تخطي الكتابة.")
+            return
+        primary_path = DATA_FILE # المسار من config.py
+        tmp_path = DATA_FILE_TMP # المسار من config.py
+        bak_path = DATA_FILE_BAK # المسار من config.py
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+
+            if os.path.exists(primary_path):
+                try:
+                    shutil.copy2(primary_path, bak_path) # استخدام copy2 للحفاظ على الميتاداتا
+                    logger.debug(f"تم إنشاء نسخة احتياطية من {primary_path} إلى {bak_path}")
+                except Exception as e_bak:
+                    logger.error(f"فشل في إنشاء نسخة احتياطية لملف بيانات الأعضاء {primary_path}: {e_bak}")
+
+            os.replace(tmp_path, primary_path) # استبدال الملف الأساسي بالملف المؤقت
+            self._last_written_hash = payload_hash
+            logger.info(f"تم حفظ بيانات الأعضاء بنجاح في {primary_path}")
+
+        except Exception as e:
+            logger.exception(f"خطأ عند حفظ بيانات الأعضاء في {primary_path}: {e}")
+            if os.path.exists(tmp_path): # محاولة حذف الملف المؤقت إذا كان لا يزال موجودًا
+                try:
+                    os.remove(tmp_path)
+                except Exception as e_del_tmp:
+                    logger.error(f"فشل في حذف الملف المؤقت لبيانات الأعضاء {tmp_path} بعد خطأ في الحفظ: {e_del_tmp}")
+            self.save_failed_signal.emit(str(e))
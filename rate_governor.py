@@ -0,0 +1,132 @@
+# rate_governor.py
+import time
+import threading
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from config import API_RATE_MAX_PER_SECOND, API_RATE_MIN_PER_SECOND, API_RATE_BURST, MAX_BACKOFF_DELAY
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(header_value):
+    """قيمة ترويسة Retry-After بالثواني (رقم أو تاريخ HTTP)، محدودة بـ MAX_BACKOFF_DELAY. None إذا غابت أو كانت غير صالحة."""
+    if not header_value:
+        return None
+    header_value = header_value.strip()
+    try:
+        seconds = float(header_value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(header_value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return min(max(0.0, seconds), MAX_BACKOFF_DELAY)
+
+
+class RateGovernor:
+    """
+    منظم معدل مشترك لجميع طلبات البوابة في العملية (token bucket).
+    - كل طلب يأخذ رمزًا قبل الإرسال؛ الرموز تتجدد بالمعدل الحالي حتى سعة burst.
+    - عند 429: إيقاف عام لجميع العملاء حتى انتهاء Retry-After (أو تأخير 429 للعميل)، وخفض المعدل إلى النصف.
+    - عند أخطاء الخادم 5xx: خفض أخف للمعدل. كل طلب ناجح يرفع المعدل تدريجيًا حتى الحد الأقصى.
+    """
+    THROTTLE_DECREASE_FACTOR = 0.5
+    SERVER_ERROR_DECREASE_FACTOR = 0.8
+    RECOVERY_FACTOR = 1.05 # بعد كل طلب ناجح: زيادة المعدل 5% ...
+    RECOVERY_STEP = 0.05 # ... أو 0.05 طلب/ثانية على الأقل (للخروج من المعدلات المنخفضة جدًا)
+
+    def __init__(self, max_rate=API_RATE_MAX_PER_SECOND, min_rate=API_RATE_MIN_PER_SECOND, burst=API_RATE_BURST):
+        self._lock = threading.Lock()
+        self._max_rate = max_rate
+        self._min_rate = min_rate
+        self._burst = burst
+        self._rate = max_rate
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self.throttled_count = 0
+        self.server_error_count = 0
+        self.total_wait_seconds = 0.0 # مجموع وقت انتظار الطلبات في المنظم
+
+    def configure(self, max_rate=None, min_rate=None, burst=None):
+        with self._lock:
+            if max_rate is not None:
+                self._max_rate = max_rate
+                self._rate = max_rate
+            if min_rate is not None:
+                self._min_rate = min_rate
+            if burst is not None:
+                self._burst = burst
+                self._tokens = min(self._tokens, float(burst))
+            self._min_rate = min(self._min_rate, self._max_rate)
+            self._rate = min(max(self._rate, self._min_rate), self._max_rate)
+
+    @property
+    def current_rate(self):
+        """المعدل الحالي المسموح به (طلب/ثانية)."""
+        with self._lock:
+            return self._rate
+
+    def pause_remaining(self):
+        """الثواني المتبقية من الإيقاف العام بعد 429 (0 إذا لم يكن هناك إيقاف)."""
+        with self._lock:
+            return max(0.0, self._paused_until - time.monotonic())
+
+    def acquire(self, cancel_token=None):
+        """ينتظر حتى يُسمح بإرسال طلب. يعيد False إذا أُلغي cancel_token (CancellationToken) أثناء الانتظار."""
+        wait_started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self.total_wait_seconds += now - wait_started
+                    return True
+                wait_seconds = max(self._paused_until - now, (1.0 - self._tokens) / self._rate)
+            if cancel_token is None:
+                time.sleep(wait_seconds)
+            elif cancel_token.wait(wait_seconds):
+                return False
+
+    def on_success(self):
+        with self._lock:
+            self._rate = min(self._max_rate, max(self._rate * self.RECOVERY_FACTOR, self._rate + self.RECOVERY_STEP))
+
+    def on_throttled(self, retry_after_seconds):
+        """الخادم رد بـ 429: إيقاف جميع الطلبات لمدة retry_after_seconds وخفض المعدل."""
+        with self._lock:
+            self._rate = max(self._min_rate, self._rate * self.THROTTLE_DECREASE_FACTOR)
+            self._pause_locked(retry_after_seconds)
+            self.throttled_count += 1
+            rate = self._rate
+        logger.warning(f"منظم الطلبات: إيقاف جميع الطلبات {retry_after_seconds:.1f} ثانية بعد 429، المعدل الجديد {rate:.2f} طلب/ثانية.")
+
+    def on_server_error(self, retry_after_seconds=None):
+        """خطأ من الخادم (5xx): خفض المعدل، مع احترام Retry-After إذا أرسله الخادم (مثل 503)."""
+        with self._lock:
+            self._rate = max(self._min_rate, self._rate * self.SERVER_ERROR_DECREASE_FACTOR)
+            if retry_after_seconds:
+                self._pause_locked(retry_after_seconds)
+            self.server_error_count += 1
+            rate = self._rate
+        logger.info(f"منظم الطلبات: خطأ من الخادم، المعدل الجديد {rate:.2f} طلب/ثانية.")
+
+    def _pause_locked(self, seconds):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0 # لا دفعة طلبات فور انتهاء الإيقاف
+        self._last_refill = max(self._last_refill, self._paused_until)
+
+    def _refill(self, now):
+        if now > self._last_refill:
+            self._tokens = min(float(self._burst), self._tokens + (now - self._last_refill) * self._rate)
+            self._last_refill = now
+
+
+# --- Shared Governor (مشترك بين جميع نسخ AnemAPIClient، مثل SESSION في config) ---
+SHARED_RATE_GOVERNOR = RateGovernor()
@@ -0,0 +1,128 @@
+# response_cache.py
+import json
+import sqlite3
+import time
+import logging
+from urllib.parse import urlencode
+
+from config import API_CACHE_DB_FILE, API_CACHE_MAX_ENTRIES
+from sqlite_store import SqliteStore
+
+logger = logging.getLogger(__name__)
+
+VALIDATE_CANDIDATE_ENDPOINT = "validateCandidate/query"
+PRE_INSCRIPTION_ENDPOINT = "PreInscription/GetPreInscription"
+
+
+class ResponseCache(SqliteStore):
+    """
+    ذاكرة تخزين دائمة لردود البوابة (SQLite داخل APP_DATA_DIR)، مفتاحها الطلب (endpoint + params).
+    - مدة الصلاحية تُحدد عند القراءة (لكل endpoint مدته، انظر API_CACHE_TTL_SECONDS).
+    - عند تجاوز API_CACHE_MAX_ENTRIES يتم حذف الأقل استخدامًا مؤخرًا (LRU).
+    - أي خطأ في قاعدة البيانات يعطل التخزين فقط ولا يمنع الطلبات.
+    - الاتصال يُفتح عند أول استخدام، ويُشارك بين الخيوط مع قفل.
+    """
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            endpoint TEXT NOT NULL,
+            stored_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            data TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)",
+        f"DELETE FROM responses WHERE endpoint = '{VALIDATE_CANDIDATE_ENDPOINT}'", # ردود تحقق من إصدارات سابقة (لم تعد تُخزن)
+    )
+    STORE_NAME = "ذاكرة ردود البوابة"
+    DISABLED_EFFECT = "سيتم العمل بدونها"
+    TRIM_EVERY_PUTS = 100 # فحص الحجم مرة كل عدد من الإضافات بدلاً من كل إضافة
+
+    def __init__(self, db_path=API_CACHE_DB_FILE, max_entries=API_CACHE_MAX_ENTRIES):
+        super().__init__(db_path)
+        self.max_entries = max_entries
+        self._puts_since_trim = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(endpoint, params):
+        return f"{endpoint}?{urlencode(sorted((params or {}).items()))}"
+
+    def get(self, endpoint, params, ttl_seconds):
+        """الرد المخزن إذا كان عمره أقل من ttl_seconds، وإلا None."""
+        key = self.make_key(endpoint, params)
+        now = time.time()
+        with self._lock:
+            conn = self._connection_locked()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute("SELECT stored_at, data FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None or now - row[0] > ttl_seconds:
+                    self.misses += 1
+                    return None
+                with conn:
+                    conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return json.loads(row[1])
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(f"فشل القراءة من ذاكرة ردود البوابة ({key}): {e}")
+                return None
+
+    def put(self, endpoint, params, data):
+        key = self.make_key(endpoint, params)
+        now = time.time()
+        with self._lock:
+            conn = self._connection_locked()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, endpoint, stored_at, last_access, data) VALUES (?, ?, ?, ?, ?)",
+                        (key, endpoint, now, now, json.dumps(data, ensure_ascii=False))
+                    )
+                self._puts_since_trim += 1
+                if self._puts_since_trim >= self.TRIM_EVERY_PUTS:
+                    self._trim_locked(conn)
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logger.warning(f"فشل الحفظ في ذاكرة ردود البوابة ({key}): {e}")
+
+    def invalidate(self, endpoint, params):
+        self._delete_keys([self.make_key(endpoint, params)])
+
+    def invalidate_member(self, member):
+        """حذف الردود المخزنة الخاصة بمعرفات العضو الحالية (معلومات التسجيل المسبق)."""
+        if member.pre_inscription_id:
+            self._delete_keys([self.make_key(PRE_INSCRIPTION_ENDPOINT, {"Id": member.pre_inscription_id})])
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection_locked()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute("DELETE FROM responses")
+            except sqlite3.Error as e:
+                logger.warning(f"فشل مسح ذاكرة ردود البوابة: {e}")
+
+    # --- دوال داخلية ---
+    def _delete_keys(self, keys):
+        with self._lock:
+            self._execute_locked("DELETE FROM responses WHERE key = ?", [(key,) for key in keys])
+
+    def _trim_locked(self, conn):
+        self._puts_since_trim = 0
+        with conn:
+            deleted = conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+        if deleted:
+            logger.info(f"ذاكرة ردود البوابة: حذف {deleted} رد (الأقل استخدامًا) للبقاء ضمن {self.max_entries}.")
+
+
+# --- Shared Cache (مشتركة بين جميع نسخ AnemAPIClient) ---
+SHARED_RESPONSE_CACHE = ResponseCache()
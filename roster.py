@@ -0,0 +1,63 @@
+# roster.py
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RosterSnapshot:
+    """
+    نسخة ثابتة من قائمة الأعضاء (tuple) برقم إصدار. خيط المراقبة يمر على النسخة التي أخذها،
+    لذلك لا تؤثر عليه الإضافة أو الحذف في الواجهة أثناء الدورة.
+    """
+    __slots__ = ("version", "members", "_index_by_id")
+
+    def __init__(self, version, members):
+        self.version = version
+        self.members = members
+        self._index_by_id = None # member_id -> الفهرس في هذه النسخة، يُبنى عند أول استخدام
+
+    def __len__(self):
+        return len(self.members)
+
+    def __iter__(self):
+        return iter(self.members)
+
+    def index_of(self, member_id):
+        """فهرس العضو في هذه النسخة، أو -1 إذا لم يكن فيها."""
+        index_by_id = self._index_by_id
+        if index_by_id is None:
+            index_by_id = self._index_by_id = {member.member_id: idx for idx, member in enumerate(self.members)}
+        return index_by_id.get(member_id, -1)
+
+    def get(self, member_id):
+        idx = self.index_of(member_id)
+        return self.members[idx] if idx >= 0 else None
+
+
+class Roster:
+    """
+    قائمة الأعضاء المشتركة بين الواجهة ومحرك المراقبة بأسلوب النسخ عند الكتابة (copy-on-write).
+    - الواجهة تبقى المالكة الوحيدة لـ members_list، وبعد كل تغيير في العضوية تنشر نسخة جديدة (publish).
+    - المحرك يأخذ snapshot() في بداية كل خطوة: قراءة مرجع واحد، دون قفل ودون نسخ.
+    - الأعضاء يُعرفون في الإشارات بـ member_id (ثابت طوال الجلسة) وليس بفهرسهم، لأن الفهرس يتغير مع الإضافة والحذف.
+    """
+
+    def __init__(self, members=()):
+        self._publish_lock = threading.Lock()
+        self._snapshot = RosterSnapshot(0, tuple(members))
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def snapshot(self):
+        return self._snapshot
+
+    def publish(self, members):
+        """نشر نسخة جديدة من القائمة (يُستدعى من خيط الواجهة بعد كل إضافة/حذف/استيراد/تحميل). يعيد النسخة الجديدة."""
+        with self._publish_lock:
+            snapshot = RosterSnapshot(self._snapshot.version + 1, tuple(members))
+            self._snapshot = snapshot
+        logger.debug(f"نشر نسخة القائمة {snapshot.version}: {len(snapshot)} عضو.")
+        return snapshot
@@ -0,0 +1,144 @@
+# search_index.py
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# التشكيل والتطويل: لا يؤثران على المطابقة
+_ARABIC_DIACRITICS_RE = re.compile("[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+# توحيد أشكال الألف والهمزة والتاء المربوطة والألف المقصورة، والأرقام العربية الهندية
+_ARABIC_NORMALIZATION_TABLE = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ؤ": "و", "ئ": "ي", "ى": "ي", "ة": "ه",
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4",
+    "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+})
+_FIELD_SEPARATOR = "\x1f" # يمنع المطابقة عبر حدود حقلين متجاورين
+_NUMERIC_FIELDS = ("nin", "wassit_no", "ccp", "phone_number")
+_MIN_INDEXED_TERM_LENGTH = 3
+
+
+def normalize_search_text(text):
+    """توحيد النص للبحث: حذف التشكيل، توحيد الألف/الهمزة، وتحويل الأحرف اللاتينية إلى صغيرة."""
+    if not text:
+        return ""
+    if text.isascii(): # الحالة الشائعة للأرقام والأسماء اللاتينية
+        return text.lower()
+    return _ARABIC_DIACRITICS_RE.sub("", str(text)).translate(_ARABIC_NORMALIZATION_TABLE).lower()
+
+
+def _trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class MemberSearchIndex:
+    """
+    فهرس بحث للأعضاء يحل محل المرور على سبعة حقول لكل عضو عند كل حرف.
+    - لكل عضو مفتاح بحث موحد (NIN، الوسيط، CCP، الهاتف، الاسم بالعربية والفرنسية) يُحسب مرة واحدة
+      ولا يُعاد حسابه إلا عند invalidate(member) أو عند تغير القائمة.
+    - الحقول الرقمية مفهرسة بثلاثيات الأحرف (trigrams): البحث برقم من 3 خانات أو أكثر يفحص المرشحين فقط.
+    """
+
+    def __init__(self, members_provider):
+        self._members_provider = members_provider # دالة تعيد القائمة الرئيسية الحالية
+        self._entries = {} # id(member) -> (member, مفتاح البحث، القيم الرقمية)
+        self._trigram_postings = {} # ثلاثية -> قائمة id(member) (قد تحتوي مدخلات قديمة يتم استبعادها بالتحقق)
+        self._stale_postings = 0
+        self._roster_changed = True
+
+    def mark_roster_changed(self):
+        """تغيرت عضوية القائمة (تحميل، إضافة، حذف): تتم المزامنة عند البحث التالي."""
+        self._roster_changed = True
+
+    def invalidate(self, member):
+        """إعادة حساب مفتاح عضو تغيرت بياناته (الاسم، NIN، الهاتف...)."""
+        entry = self._entries.get(id(member))
+        if entry is not None and entry[0] is member:
+            self._index_member(member, previous_numeric=entry[2])
+
+    def search(self, term, candidates):
+        """الأعضاء من candidates (بنفس الترتيب) الذين يحتوي مفتاحهم على term بعد التوحيد."""
+        needle = normalize_search_text(term.strip())
+        if not needle:
+            return list(candidates)
+        self._sync_roster()
+        entries = self._entries
+
+        if needle.isdigit() and len(needle) >= _MIN_INDEXED_TERM_LENGTH:
+            matched_ids = self._ids_matching_number(needle)
+            return [m for m in candidates if id(m) in matched_ids and entries[id(m)][0] is m]
+
+        result = []
+        for member in candidates:
+            entry = entries.get(id(member))
+            if entry is None or entry[0] is not member:
+                entry = self._index_member(member)
+            if needle in entry[1]:
+                result.append(member)
+        return result
+
+    # --- دوال داخلية ---
+    def _sync_roster(self):
+        if not self._roster_changed:
+            return
+        members = self._members_provider()
+        old_entries = self._entries
+        self._entries = {}
+        reused_count = 0
+        for member in members:
+            entry = old_entries.get(id(member))
+            if entry is not None and entry[0] is member:
+                self._entries[id(member)] = entry
+                reused_count += 1
+            else:
+                self._index_member(member)
+        self._stale_postings += len(old_entries) - reused_count # مدخلات الأعضاء المحذوفين تبقى في القوائم حتى إعادة البناء
+        if self._stale_postings > len(self._entries): # الكثير من المدخلات القديمة: إعادة بناء الفهرس الرقمي
+            self._rebuild_postings()
+        self._roster_changed = False
+
+    def _index_member(self, member, previous_numeric=None):
+        numeric_values = tuple(normalize_search_text(getattr(member, field)) for field in _NUMERIC_FIELDS)
+        key = _FIELD_SEPARATOR.join(numeric_values + (
+            normalize_search_text(member.get_full_name_ar()),
+            normalize_search_text(member.nom_fr),
+            normalize_search_text(member.prenom_fr),
+        ))
+        entry = (member, key, numeric_values)
+        self._entries[id(member)] = entry
+        if numeric_values != previous_numeric:
+            if previous_numeric is not None:
+                self._stale_postings += 1
+            self._add_postings(id(member), numeric_values)
+        return entry
+
+    def _add_postings(self, member_id, numeric_values):
+        member_trigrams = set()
+        for value in numeric_values:
+            member_trigrams |= _trigrams(value)
+        postings = self._trigram_postings
+        for trigram in member_trigrams:
+            postings.setdefault(trigram, []).append(member_id)
+
+    def _rebuild_postings(self):
+        self._trigram_postings = {}
+        for member_id, (_member, _key, numeric_values) in self._entries.items():
+            self._add_postings(member_id, numeric_values)
+        self._stale_postings = 0
+        logger.debug(f"تمت إعادة بناء فهرس البحث الرقمي لـ {len(self._entries)} عضو.")
+
+    def _ids_matching_number(self, needle):
+        posting_lists = []
+        for trigram in _trigrams(needle):
+            posting = self._trigram_postings.get(trigram)
+            if not posting:
+                return set()
+            posting_lists.append(posting)
+        posting_lists.sort(key=len)
+        candidate_ids = set(posting_lists[0])
+        for posting in posting_lists[1:3]: # تقاطع أصغر القوائم يكفي، والتحقق النهائي يتم على المفتاح
+            candidate_ids.intersection_update(posting)
+            if not candidate_ids:
+                return candidate_ids
+        entries = self._entries
+        return {member_id for member_id in candidate_ids if member_id in entries and needle in entries[member_id][1]}
@@ -0,0 +1,62 @@
+# sqlite_store.py
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def open_connection(db_path, check_same_thread=True):
+    """اتصال SQLite بنفس إعدادات جميع قواعد البيانات في APP_DATA_DIR: WAL (القراءة أثناء الكتابة) و synchronous=NORMAL."""
+    conn = sqlite3.connect(db_path, timeout=10, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SqliteStore:
+    """
+    أساس المخازن الصغيرة في APP_DATA_DIR (ذاكرة الردود، سجل ملفات PDF، نقاط حفظ المراقبة):
+    اتصال واحد مشترك بين الخيوط يُفتح عند أول استخدام، وتحميه self._lock (الدوال المنتهية بـ _locked تُستدعى تحته).
+    - SCHEMA: أوامر إنشاء الجداول (وأي تنظيف عند الفتح) تُنفذ مرة واحدة مع فتح الاتصال.
+    - أي خطأ في فتح قاعدة البيانات يعطل المخزن (الحفظ فقط)، والبرنامج يعمل كما لو لم يكن موجودًا.
+    """
+    SCHEMA = ()
+    STORE_NAME = "قاعدة البيانات" # للسجل
+    DISABLED_EFFECT = "سيتم العمل بدونها" # للسجل: ما يحدث عند تعذر الفتح
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disabled = False
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connection_locked(self):
+        if self._conn is None and not self._disabled:
+            try:
+                conn = open_connection(self.db_path, check_same_thread=False)
+                with conn:
+                    for statement in self.SCHEMA:
+                        conn.execute(statement)
+                self._conn = conn
+            except sqlite3.Error as e:
+                logger.error(f"تعذر فتح {self.STORE_NAME} {self.db_path}، {self.DISABLED_EFFECT}: {e}")
+                self._disabled = True
+        return self._conn
+
+    def _execute_locked(self, sql, rows):
+        """executemany في معاملة واحدة؛ الخطأ يُسجل ولا يُرفع."""
+        conn = self._connection_locked()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.executemany(sql, rows)
+        except sqlite3.Error as e:
+            logger.warning(f"فشل الحفظ في {self.STORE_NAME}: {e}")
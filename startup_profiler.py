@@ -0,0 +1,133 @@
+# startup_profiler.py
+# وضع --profile-startup: قياس زمن استيراد الوحدات (مثل python -X importtime) ومراحل بدء التشغيل حتى أول رسم للنافذة.
+# هذه الوحدة تستخدم المكتبة القياسية فقط، ويجب استيرادها وتفعيلها قبل أي استيراد ثقيل في main_app.py.
+import sys
+import time
+import threading
+import logging
+
+PROFILE_STARTUP_ARG = "--profile-startup"
+TOP_IMPORTS_TO_LOG = 25
+
+_process_start = time.perf_counter()
+_enabled = False
+_milestones = [] # (الاسم، الثواني منذ بدء العملية)
+_import_times = {} # اسم الوحدة -> (الزمن الذاتي، الزمن التراكمي) بالثواني
+_import_state = threading.local() # لكل خيط: أزمنة الوحدات الأبناء لكل استيراد جارٍ
+_reported = False
+
+
+class _TimingLoader:
+    """
+    غلاف حول loader الأصلي يقيس create_module + exec_module (الزمن التراكمي يشمل الوحدات المستوردة بداخلها).
+    create_module مهم لوحدات C مثل PyQt5.QtWidgets، حيث يتم تحميل المكتبة نفسها.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._create_seconds = 0.0
+        self._create_children_seconds = 0.0 # وحدات استوردتها create_module نفسها (تُحسب لها وليس لهذه الوحدة)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        import_stack = _import_state.__dict__.setdefault("stack", [])
+        import_stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._loader.create_module(spec)
+        finally:
+            self._create_seconds = time.perf_counter() - started
+            self._create_children_seconds = import_stack.pop()
+
+    def exec_module(self, module):
+        import_stack = _import_state.__dict__.setdefault("stack", [])
+        import_stack.append(self._create_children_seconds)
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            cumulative = time.perf_counter() - started + self._create_seconds
+            children = import_stack.pop()
+            _import_times[module.__name__] = (cumulative - children, cumulative)
+            if import_stack:
+                import_stack[-1] += cumulative
+
+
+class _TimingFinder:
+    """يُضاف في بداية sys.meta_path: يترك البحث للـ finders الأخرى ويغلف loader الناتج."""
+
+    @classmethod
+    def find_spec(cls, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is cls or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimingLoader(spec.loader)
+                return spec
+        return None
+
+
+def is_requested(argv=None):
+    return PROFILE_STARTUP_ARG in (sys.argv if argv is None else argv)
+
+
+def enable():
+    """تفعيل القياس (مرة واحدة). الوحدات المستوردة قبل هذا الاستدعاء لا تظهر في التقرير."""
+    global _enabled
+    if _enabled:
+        return
+    _enabled = True
+    sys.meta_path.insert(0, _TimingFinder)
+    milestone("بدء القياس")
+
+
+def is_enabled():
+    return _enabled
+
+
+def milestone(name):
+    """تسجيل مرحلة من بدء التشغيل (لا يفعل شيئًا إذا لم يكن القياس مفعلًا)."""
+    if _enabled:
+        _milestones.append((name, time.perf_counter() - _process_start))
+
+
+def watch_first_paint(widget):
+    """تسجيل أول رسم للنافذة كمرحلة أخيرة، ثم كتابة التقرير في السجل."""
+    if not _enabled:
+        return
+    from PyQt5.QtCore import QObject, QEvent
+
+    class _FirstPaintFilter(QObject):
+        def eventFilter(self, watched, event):
+            if event.type() == QEvent.Paint:
+                watched.removeEventFilter(self)
+                milestone("أول رسم للنافذة الرئيسية")
+                report()
+            return False
+
+    widget._startup_first_paint_filter = _FirstPaintFilter(widget) # الاحتفاظ بمرجع طوال عمر النافذة
+    widget.installEventFilter(widget._startup_first_paint_filter)
+
+
+def report(logger=None):
+    """كتابة المراحل وأبطأ الوحدات المستوردة في السجل، ثم إيقاف قياس الاستيراد."""
+    global _reported
+    if not _enabled or _reported:
+        return
+    _reported = True
+    if _TimingFinder in sys.meta_path:
+        sys.meta_path.remove(_TimingFinder)
+    logger = logger or logging.getLogger(__name__)
+    previous = 0.0
+    for name, at_seconds in _milestones:
+        logger.info(f"[startup] {at_seconds * 1000:8.1f} ms (+{(at_seconds - previous) * 1000:7.1f} ms) {name}")
+        previous = at_seconds
+    total_import_seconds = sum(self_time for self_time, _cumulative in _import_times.values())
+    logger.info(f"[startup] الاستيراد: {len(_import_times)} وحدة، المجموع {total_import_seconds * 1000:.1f} ms. الأبطأ (تراكمي | ذاتي بالميكروثانية، مثل -X importtime):")
+    slowest = sorted(_import_times.items(), key=lambda item: item[1][1], reverse=True)[:TOP_IMPORTS_TO_LOG]
+    for module_name, (self_time, cumulative) in slowest:
+        logger.info(f"[startup] import time: {int(self_time * 1e6):>10} | {int(cumulative * 1e6):>10} | {module_name}")
@@ -3,90 +3,170 @@ import time
 import random
 import logging
 import os 
-import base64 
-from PyQt5.QtCore import QThread, pyqtSignal, QStandardPaths 
+import threading
+import requests
+from PyQt5.QtCore import QThread, QObject, QRunnable, pyqtSignal, QStandardPaths 
 
-from api_client import AnemAPIClient 
+from api_client import AnemAPIClient, ApiError, REQUEST_CANCELLED_ERROR, ELIGIBILITY_REFUSAL_MESSAGE, error_kind
+from cancellation import CancellationToken, SHARED_SHUTDOWN_TOKEN, bind_token, current_token
 from member import Member 
 from utils import get_icon_name_for_status 
+from monitor_scheduler import MonitoringScheduler
+from pdf_manifest import SHARED_PDF_MANIFEST
+from monitor_checkpoints import SHARED_MONITOR_CHECKPOINTS
+from response_cache import SHARED_RESPONSE_CACHE
 from config import (
     SETTING_MIN_MEMBER_DELAY, SETTING_MAX_MEMBER_DELAY,
     SETTING_MONITORING_INTERVAL, SETTING_BACKOFF_429,
-    SETTING_BACKOFF_GENERAL, SETTING_REQUEST_TIMEOUT, DEFAULT_SETTINGS
+    SETTING_BACKOFF_GENERAL, SETTING_REQUEST_TIMEOUT, DEFAULT_SETTINGS,
+    SCHEDULER_BUSY_RETRY_SECONDS, PDF_MANIFEST_SWEEP_INTERVAL_SECONDS
 )
 
 logger = logging.getLogger(__name__)
 
-SHORT_SKIP_DELAY_SECONDS = 0.1 
+STATUSES_FOR_PDF_CHECK_ONLY = ["مكتمل", "لديه موعد مسبق"]
 
-def _translate_api_error(error_string, operation_name="العملية"):
-    if not error_string:
+def _translate_api_error(error, operation_name="العملية"):
+    """رسالة للمستخدم حسب نوع الخطأ (ApiError.kind)؛ الرسائل دون نوع (مثل أخطاء حفظ الملفات) تُعرض مختصرة كما هي."""
+    if not error:
         return f"حدث خطأ غير محدد أثناء {operation_name}."
 
-    error_lower = str(error_string).lower()
-
-    if "timeout" in error_lower or "timed out" in error_lower:
-        if "connect" in error_lower:
+    kind = error_kind(error)
+    if kind == ApiError.TRANSIENT_NETWORK:
+        if isinstance(error.exception, requests.exceptions.ConnectTimeout):
             return f"انتهت مهلة الاتصال بالخادم أثناء {operation_name}. يرجى التحقق من اتصالك بالإنترنت."
-        else:
+        if isinstance(error.exception, requests.exceptions.Timeout) or error.status_code == 408:
             return f"انتهت مهلة الاستجابة من الخادم أثناء {operation_name}. قد يكون الخادم بطيئًا أو هناك مشكلة في الشبكة."
-    elif "connectionerror" in error_lower or "could not connect" in error_lower or "failed to establish a new connection" in error_lower:
+        if isinstance(error.exception, requests.exceptions.SSLError):
+            return f"حدث خطأ في شهادة الأمان (SSL) أثناء {operation_name}. قد يكون الاتصال غير آمن."
         return f"فشل الاتصال بالخادم أثناء {operation_name}. يرجى التحقق من اتصالك بالإنترنت وحالة الخادم."
-    elif "sslerror" in error_lower or "certificate_verify_failed" in error_lower:
-        return f"حدث خطأ في شهادة الأمان (SSL) أثناء {operation_name}. قد يكون الاتصال غير آمن."
-    elif "429" in error_lower or "طلبات كثيرة جدًا" in error_lower:
+    elif kind == ApiError.THROTTLED:
         return f"الخادم مشغول حاليًا (طلبات كثيرة جدًا) أثناء {operation_name}. يرجى المحاولة لاحقًا."
-    elif "404" in error_lower or "not found" in error_lower:
-        return f"تعذر العثور على المورد المطلوب على الخادم (404) أثناء {operation_name}."
-    elif "500" in error_lower or "internal server error" in error_lower:
-        return f"حدث خطأ داخلي في الخادم (500) أثناء {operation_name}. يرجى المحاولة لاحقًا."
-    elif "jsondecodeerror" in error_lower or "خطأ في تحليل البيانات" in error_lower:
+    elif kind == ApiError.SERVER_ERROR:
+        return f"حدث خطأ داخلي في الخادم ({error.status_code or 500}) أثناء {operation_name}. يرجى المحاولة لاحقًا."
+    elif kind == ApiError.CLIENT_ERROR:
+        if error.status_code == 404:
+            return f"تعذر العثور على المورد المطلوب على الخادم (404) أثناء {operation_name}."
+        return f"رفض الخادم الطلب ({error.status_code or 'N/A'}) أثناء {operation_name}. تحقق من بيانات العضو."
+    elif kind == ApiError.INVALID_RESPONSE:
         return f"تم استلام استجابة غير صالحة (ليست JSON) من الخادم أثناء {operation_name}."
-    elif "eligible:false" in error_lower or "نعتذر منكم" in error_string: 
-        if "نعتذر منكم! لا يمكنكم حجز موعد" in error_string:
-            return error_string
-        if operation_name == "حجز الموعد" and "\"Eligible\":false" in error_string and "\"serviceUp\":true" in error_string :
-             return "نعتذر منكم! لا يمكنكم حجز موعد للاستفادة من منحة البطالة لعدم استيفائك لأحد شروط الأهلية اللازمة."
-        return f"المستخدم غير مؤهل لـ {operation_name} حسب شروط المنصة."
-    
+    elif kind == ApiError.NOT_ELIGIBLE:
+        return str(error) if str(error) == ELIGIBILITY_REFUSAL_MESSAGE else f"المستخدم غير مؤهل لـ {operation_name} حسب شروط المنصة."
+    elif kind == ApiError.CANCELLED:
+        return f"تم إلغاء {operation_name}."
+
+    error_string = str(error)
     max_len = 70
     snippet = error_string[:max_len] + "..." if len(error_string) > max_len else error_string
     return f"فشل في {operation_name}: {snippet}"
 
 
-class FetchInitialInfoThread(QThread):
-    update_member_gui_signal = pyqtSignal(int, str, str, str) 
-    new_data_fetched_signal = pyqtSignal(int, str, str) 
-    member_processing_started_signal = pyqtSignal(int) 
-    member_processing_finished_signal = pyqtSignal(int) 
-    global_log_signal = pyqtSignal(str, bool, object, int) 
+class MemberClaims:
+    """
+    الأعضاء الذين يعالجهم عامل الآن (member_id -> العامل): خيط المراقبة ومهمة الجلب الأولي ومهمة تحميل الشهادات
+    تحجز العضو قبل أي طلب أو تعديل عليه، فلا يعالجه عاملان في نفس الوقت.
+    is_processing في الواجهة للعرض فقط (يصل بعد تأخير التجميع)، والمرجع هو هذا الحجز.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._owners = {}
+
+    def try_claim(self, member, owner):
+        """حجز العضو إذا كان حرًا. يعيد False إذا كان محجوزًا لعامل آخر."""
+        with self._condition:
+            if member.member_id in self._owners:
+                return False
+            self._owners[member.member_id] = owner
+            return True
+
+    def claim(self, member, owner, cancel_token):
+        """ينتظر حتى يتحرر العضو ثم يحجزه. يعيد False إذا أُلغي cancel_token (CancellationToken) قبل الحجز."""
+        handle = cancel_token.add_callback(self._wake_waiters)
+        try:
+            with self._condition:
+                while not cancel_token.is_cancelled():
+                    if member.member_id not in self._owners:
+                        self._owners[member.member_id] = owner
+                        return True
+                    self._condition.wait()
+                return False
+        finally:
+            cancel_token.remove_callback(handle)
+
+    def release(self, member, owner):
+        with self._condition:
+            if self._owners.get(member.member_id) is owner:
+                del self._owners[member.member_id]
+                self._condition.notify_all()
+
+    def is_claimed(self, member):
+        with self._condition:
+            return member.member_id in self._owners
+
+    def _wake_waiters(self):
+        with self._condition:
+            self._condition.notify_all()
+
+
+SHARED_MEMBER_CLAIMS = MemberClaims()
+
+
+class FetchInitialInfoSignals(QObject):
+    # الإشارات تحمل كائن العضو نفسه (وليس فهرسه): قد تتغير الفهارس أثناء انتظار المهمة في الطابور
+    update_member_gui_signal = pyqtSignal(object, str, str, str) 
+    new_data_fetched_signal = pyqtSignal(object, str, str) 
+    member_processing_started_signal = pyqtSignal(object) 
+    member_processing_finished_signal = pyqtSignal(object, bool) # العضو، وهل يجب تشغيل فحص فوري بعد الجلب
+    global_log_signal = pyqtSignal(str, bool, object) 
 
-    def __init__(self, member, index, api_client, settings, parent=None): 
-        super().__init__(parent)
+
+class FetchInitialInfoJob(QRunnable):
+    """مهمة جلب المعلومات الأولية لعضو واحد، تُنفذ على خيوط InitialFetchQueue المحدودة (بدلاً من QThread لكل عضو)."""
+
+    def __init__(self, member, api_client, signals, pacer, auto_check_after=False, on_done=None): 
+        super().__init__()
+        self.setAutoDelete(False) # الطابور يحتفظ بالمرجع حتى انتهاء المهمة
         self.member = member 
-        self.index = index
         self.api_client = api_client
-        self.settings = settings 
+        self.signals = signals 
+        self.pacer = pacer 
+        self.auto_check_after = auto_check_after 
+        self._on_done = on_done 
         self.is_running = True 
+        self.cancel_token = CancellationToken(SHARED_SHUTDOWN_TOKEN) # الإيقاف يقطع انتظار الدور والطلب الجاري فورًا
+        self.started = False 
 
     def stop(self): 
         self.is_running = False
-        logger.info(f"طلب إيقاف خيط جلب المعلومات الأولية للعضو: {self.member.nin}")
+        self.cancel_token.cancel()
+        logger.info(f"طلب إيقاف مهمة جلب المعلومات الأولية للعضو: {self.member.nin}")
 
     def _emit_global_log(self, message, is_general=True):
-        self.global_log_signal.emit(message, is_general, self.member if not is_general else None, self.index if not is_general else -1)
+        self.signals.global_log_signal.emit(message, is_general, self.member if not is_general else None)
 
     def run(self):
+        with bind_token(self.cancel_token):
+            self._run()
+
+    def _run(self):
+        self.started = True
+        try:
+            # التأخير المشترك بين جميع مهام الجلب (نفس إعدادات التأخير بين الأعضاء) بدلاً من تأخير عشوائي مستقل لكل خيط
+            got_turn = self.pacer.wait_for_turn(self.cancel_token)
+        except Exception as e:
+            logger.exception(f"خطأ في انتظار دور مهمة الجلب للعضو {self.member.nin}: {e}")
+            got_turn = self.is_running
+        if not got_turn or not self.is_running or not SHARED_MEMBER_CLAIMS.claim(self.member, self, self.cancel_token): # ينتظر انتهاء المراقبة أو التحميل الجاري لنفس العضو
+            self._finish(emit_finished=False)
+            return
+
         logger.info(f"بدء جلب المعلومات الأولية للعضو: {self.member.nin}")
-        self.member_processing_started_signal.emit(self.index) 
+        self.signals.member_processing_started_signal.emit(self.member) 
         self._emit_global_log(f"جاري جلب المعلومات الأولية...", is_general=False)
         
         try:
             if not self.is_running: return 
-            initial_delay = random.uniform(0.5, 1.5) 
-            logger.debug(f"FetchInitialInfoThread: تأخير عشوائي {initial_delay:.2f} ثانية قبل معالجة {self.member.nin}")
-            time.sleep(initial_delay)
-            if not self.is_running: return 
 
             data_val, error_val = self.api_client.validate_candidate(self.member.wassit_no, self.member.nin)
 
@@ -114,7 +194,7 @@ class FetchInitialInfoThread(QThread):
                     self.member.prenom_ar = prenom_ar
                     self.member.nom_fr = nom_fr
                     self.member.prenom_fr = prenom_fr
-                    self.new_data_fetched_signal.emit(self.index, nom_ar, prenom_ar)
+                    self.signals.new_data_fetched_signal.emit(self.member, nom_ar, prenom_ar)
                     activity_detail_text = f"مستفيد حاليًا. تاريخ بدء الاستفادة: {date_debut}."
                     self.member.set_activity_detail(activity_detail_text)
                     self._emit_global_log(f"مستفيد حاليًا.", is_general=False)
@@ -156,7 +236,7 @@ class FetchInitialInfoThread(QThread):
                                 self.member.prenom_ar = data_info.get("prenomDemandeurAr", "")
                                 self.member.nom_fr = data_info.get("nomDemandeurFr", "")
                                 self.member.prenom_fr = data_info.get("prenomDemandeurFr", "")
-                                self.new_data_fetched_signal.emit(self.index, self.member.nom_ar, self.member.prenom_ar)
+                                self.signals.new_data_fetched_signal.emit(self.member, self.member.nom_ar, self.member.prenom_ar)
                                 activity_msg += f" الاسم: {self.member.get_full_name_ar()}"
                                 self._emit_global_log(f"تم جلب اسم العضو الذي لديه موعد.", is_general=False)
                                 logger.info(f"تم جلب الاسم واللقب للعضو {self.member.nin} الذي لديه موعد مسبق.")
@@ -189,7 +269,7 @@ class FetchInitialInfoThread(QThread):
                                 self.member.prenom_ar = data_info.get("prenomDemandeurAr", "")
                                 self.member.nom_fr = data_info.get("nomDemandeurFr", "")
                                 self.member.prenom_fr = data_info.get("prenomDemandeurFr", "")
-                                self.new_data_fetched_signal.emit(self.index, self.member.nom_ar, self.member.prenom_ar)
+                                self.signals.new_data_fetched_signal.emit(self.member, self.member.nom_ar, self.member.prenom_ar)
                                 self.member.status = "تم جلب المعلومات" 
                                 final_activity_text = f"تم جلب الاسم: {self.member.get_full_name_ar()}. {initial_status_text}"
                                 self.member.set_activity_detail(final_activity_text)
@@ -212,45 +292,77 @@ class FetchInitialInfoThread(QThread):
                 self._emit_global_log(f"فشل التحقق الأولي: استجابة فارغة.", is_general=False)
         except Exception as e:
             if not self.is_running: return 
-            logger.exception(f"خطأ غير متوقع في FetchInitialInfoThread للعضو {self.member.nin}: {e}")
+            logger.exception(f"خطأ غير متوقع في FetchInitialInfoJob للعضو {self.member.nin}: {e}")
             self.member.status = "خطأ في الجلب الأولي"
             self.member.set_activity_detail(f"خطأ عام أثناء جلب المعلومات الأولية: {str(e)}", is_error=True)
             self._emit_global_log(f"خطأ في الجلب الأولي: {str(e)}", is_general=False)
         finally:
             if self.is_running: 
                 final_icon = get_icon_name_for_status(self.member.status)
-                self.update_member_gui_signal.emit(self.index, self.member.status, self.member.last_activity_detail, final_icon)
+                self.signals.update_member_gui_signal.emit(self.member, self.member.status, self.member.last_activity_detail, final_icon)
                 self._emit_global_log(f"انتهاء جلب المعلومات الأولية. الحالة: {self.member.status}", is_general=False)
-            self.member_processing_finished_signal.emit(self.index) 
+            self._finish(emit_finished=True)
+
+    def _finish(self, emit_finished):
+        SHARED_MEMBER_CLAIMS.release(self.member, self)
+        if self._on_done:
+            self._on_done(self)
+        if emit_finished:
+            self.signals.member_processing_finished_signal.emit(self.member, self.auto_check_after and self.is_running) 
 
 
 class MonitoringThread(QThread):
+    # int في الإشارات هو member_id (ثابت) وليس الفهرس: القائمة قد تتغير في الواجهة أثناء الدورة
     update_member_gui_signal = pyqtSignal(int, str, str, str) 
     new_data_fetched_signal = pyqtSignal(int, str, str)      
     global_log_signal = pyqtSignal(str, bool, object, int) 
     member_being_processed_signal = pyqtSignal(int, bool)    
-    countdown_update_signal = pyqtSignal(str) 
+    countdown_update_signal = pyqtSignal(str, float) # البادئة، والموعد النهائي (time.monotonic()) تعرضه الواجهة بنفسها، أو 0 للمسح
 
     SITE_CHECK_INTERVAL_SECONDS = 60 
+    WAKE_CONDITION_POLL_SECONDS = 1 # فحص شرط الإيقاظ (أعضاء جدد/معدلون) أثناء انتظار الجدولة
     MAX_CONSECUTIVE_MEMBER_FAILURES = 5 
     CONSECUTIVE_NETWORK_ERROR_THRESHOLD = 3 
 
-    def __init__(self, members_list_ref, settings):
+    def __init__(self, roster, settings):
         super().__init__()
-        self.members_list_ref = members_list_ref 
+        self.roster = roster # Roster: كل خطوة تعمل على snapshot() ثابتة، والواجهة تنشر نسخة جديدة عند كل تغيير
         self.settings = settings.copy() 
+        self.scheduler = MonitoringScheduler(0, self.MAX_CONSECUTIVE_MEMBER_FAILURES, checkpoints=SHARED_MONITOR_CHECKPOINTS) # الفترة تُضبط في _apply_settings
         self._apply_settings() 
 
         self.is_running = True 
         self.is_connection_lost_mode = False 
-        self.current_member_index_to_process = 0 
         self.consecutive_network_error_trigger_count = 0 
         self.initial_scan_completed = False 
+        self.next_pdf_manifest_sweep_at = 0.0 # الفحص الأول عند بدء المراقبة
+        self.manual_only = False # تشغيل للفحص الفوري فقط (المراقبة متوقفة): الخيط ينتهي عند فراغ طابور "فحص الآن"
+        self.booking_in_flight = False # طلب RendezVous/Create مرسل: الإغلاق ينتظر نتيجته (لا يُلغى أثناء التنفيذ)
+        self._check_now_lock = threading.Lock()
+        self._check_now_ids = {} # member_id -> None: طلبات "فحص الآن" بالترتيب، تسبق الأعضاء المستحقين في الجدولة
+        self._exiting = False # run() في وضع الفحص الفوري قرر الانتهاء (تحت _check_now_lock)
+        self._wake_event = threading.Event() # يُضبط عند طلب "فحص الآن" وعند الإلغاء: ينهي الانتظار الجاري فورًا
+        self.cancel_token = self._new_cancel_token()
+
+    def _new_cancel_token(self):
+        cancel_token = CancellationToken(SHARED_SHUTDOWN_TOKEN)
+        cancel_token.add_callback(self._wake_event.set)
+        return cancel_token
+
+    def prepare_start(self, settings, manual_only=False):
+        """إعادة تهيئة الحالة قبل start() (يُستدعى من خيط الواجهة والخيط متوقف): رمز إلغاء جديد وتطبيق الإعدادات الحالية."""
+        self.manual_only = manual_only
+        self.is_running = True
+        self.is_connection_lost_mode = False
+        self.consecutive_network_error_trigger_count = 0
+        self.cancel_token = self._new_cancel_token() # الرمز السابق أُلغي عند الإيقاف
+        self.update_thread_settings(settings)
 
     def _apply_settings(self):
         self.interval_ms = self.settings.get(SETTING_MONITORING_INTERVAL, DEFAULT_SETTINGS[SETTING_MONITORING_INTERVAL]) * 60 * 1000
         self.min_member_delay = self.settings.get(SETTING_MIN_MEMBER_DELAY, DEFAULT_SETTINGS[SETTING_MIN_MEMBER_DELAY])
         self.max_member_delay = self.settings.get(SETTING_MAX_MEMBER_DELAY, DEFAULT_SETTINGS[SETTING_MAX_MEMBER_DELAY])
+        self.scheduler.set_booking_interval(self.interval_ms / 1000)
         
         self.api_client = AnemAPIClient(
             initial_backoff_general=self.settings.get(SETTING_BACKOFF_GENERAL, DEFAULT_SETTINGS[SETTING_BACKOFF_GENERAL]),
@@ -259,8 +371,8 @@ class MonitoringThread(QThread):
         )
         logger.info(f"MonitoringThread settings applied: Interval={self.interval_ms/60000:.1f}min, MemberDelay=[{self.min_member_delay}-{self.max_member_delay}]s")
 
-    def _emit_global_log(self, message, is_general=True, member_obj=None, member_idx=-1):
-        self.global_log_signal.emit(message, is_general, member_obj, member_idx)
+    def _emit_global_log(self, message, is_general=True, member_obj=None):
+        self.global_log_signal.emit(message, is_general, member_obj, member_obj.member_id if member_obj is not None else -1)
 
     def _get_member_display_name_with_index_from_thread(self, member_obj, original_index_in_main_list):
         name_part = member_obj.get_full_name_ar()
@@ -273,23 +385,105 @@ class MonitoringThread(QThread):
         self.settings = new_settings.copy()
         self._apply_settings()
 
-    def _wait_with_countdown(self, total_seconds, countdown_prefix=""):
-        for i in range(total_seconds, 0, -1):
-            if not self.is_running: break
-            minutes, seconds = divmod(i, 60)
-            hours, minutes = divmod(minutes, 60)
-            time_str = f"{countdown_prefix}{hours:02d}:{minutes:02d}:{seconds:02d}"
-            self.countdown_update_signal.emit(time_str)
-            time.sleep(1)
+    def _wait_with_countdown(self, total_seconds, countdown_prefix="", wake_condition=None):
+        """
+        انتظار على _wake_event بدلاً من time.sleep: ينتهي فور الإيقاف، وعند طلب "فحص الآن" إذا كان wake_condition يسمح بذلك.
+        العد التنازلي يُرسل مرة واحدة كموعد نهائي، والواجهة تحدث العرض كل ثانية بنفسها.
+        """
+        deadline = time.monotonic() + total_seconds
+        self.countdown_update_signal.emit(countdown_prefix, deadline)
+        while self.is_running and not self.cancel_token.is_cancelled():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0: break
+            if wake_condition is not None and wake_condition(): break
+            if self._wake_event.wait(remaining if wake_condition is None else min(remaining, self.WAKE_CONDITION_POLL_SECONDS)):
+                self._wake_event.clear() # الإيقاف يُفحص في شرط الحلقة، وطلب "فحص الآن" عبر wake_condition
         if self.is_running: 
-            self.countdown_update_signal.emit("")
-
+            self.countdown_update_signal.emit("", 0.0)
+
+    def _scheduler_has_due_member(self):
+        """شرط الإيقاظ أثناء الانتظار: طلب "فحص الآن"، أو عضو جديد أو تغيرت حالته من خارج المراقبة أصبح مستحقًا."""
+        if self.has_pending_check_now():
+            return True
+        self.scheduler.sync(self.roster.snapshot().members)
+        return self.scheduler.seconds_until_next_due() == 0
+
+    # --- "فحص الآن" (تُستدعى من خيط الواجهة) ---
+    def request_check_now(self, members):
+        """إضافة أعضاء إلى طابور الفحص الفوري (أولوية على الجدولة). يعيد عدد الأعضاء المضافين (غير الموجودين مسبقًا)."""
+        added = 0
+        with self._check_now_lock:
+            for member in members:
+                if member.member_id not in self._check_now_ids:
+                    self._check_now_ids[member.member_id] = None
+                    added += 1
+        if added:
+            self._wake_event.set() # إنهاء انتظار الجدولة الجاري (وليس التأخير بين الأعضاء)
+        return added
+
+    def has_pending_check_now(self, member=None):
+        with self._check_now_lock:
+            return member.member_id in self._check_now_ids if member is not None else bool(self._check_now_ids)
+
+    def accepts_check_now(self):
+        """هل سيعالج الخيط الجاري الطلبات المضافة؟ False: يجب انتظار انتهائه (wait) ثم تشغيله من جديد."""
+        with self._check_now_lock:
+            return self._accepts_check_now_locked()
+
+    def continue_as_monitoring(self):
+        """تحويل تشغيل الفحص الفوري فقط إلى مراقبة كاملة دون إعادة تشغيل الخيط. يعيد False إذا كان الخيط ينهي عمله."""
+        with self._check_now_lock:
+            if not self._accepts_check_now_locked():
+                return False
+            self.manual_only = False
+            return True
+
+    def _accepts_check_now_locked(self):
+        return self.isRunning() and self.is_running and not self._exiting
+
+    def _pop_check_now(self, snapshot):
+        """(الفهرس، العضو) لأقدم طلب "فحص الآن" لعضو لا يزال في القائمة، أو None."""
+        with self._check_now_lock:
+            while self._check_now_ids:
+                member_id = next(iter(self._check_now_ids))
+                del self._check_now_ids[member_id]
+                idx = snapshot.index_of(member_id)
+                if idx >= 0:
+                    return idx, snapshot.members[idx]
+        return None
+
+    def _finish_manual_run(self):
+        """وضع الفحص الفوري فقط: الانتهاء إذا فرغ الطابور ولم يتحول الخيط إلى مراقبة (القرار تحت نفس القفل مع الطلبات)."""
+        with self._check_now_lock:
+            if self.manual_only and not self._check_now_ids:
+                self._exiting = True
+            return self._exiting
+
+
+    def _announce_monitoring_start(self):
+        if not self.initial_scan_completed:
+            self.scheduler.sync(self.roster.snapshot().members)
+            restored_count, stale_count = self.scheduler.restored_count, self.scheduler.due_count()
+            if restored_count:
+                logger.info(f"استئناف المراقبة من نقاط الحفظ: {restored_count} عضو فُحص مؤخرًا يستأنف موعده المحفوظ، والفحص الأولي لـ {stale_count} عضو فقط.")
+                self._emit_global_log(f"استئناف المراقبة: {restored_count} عضو فُحص مؤخرًا. جاري الفحص الأولي لـ {stale_count} عضو...")
+            else:
+                logger.info("بدء الفحص الأولي لجميع الأعضاء عند بدء المراقبة...")
+                self._emit_global_log("جاري الفحص الأولي لجميع الأعضاء...")
 
     def run(self):
-        statuses_to_completely_skip_monitoring = ["مستفيد حاليًا من المنحة"]
-        statuses_for_pdf_check_only = ["مكتمل", "لديه موعد مسبق"] 
-        
+        with bind_token(self.cancel_token): # طلبات api_client من هذا الخيط تُلغى عند stop_monitoring()
+            self._run_engine()
+
+    def _run_engine(self):
+        with self._check_now_lock:
+            self._exiting = False
+        monitoring_announced = False
         while self.is_running:
+            if not self.manual_only and not monitoring_announced: # عند البدء، أو عند التحول من الفحص الفوري فقط
+                monitoring_announced = True
+                self._announce_monitoring_start()
+
             if self.is_connection_lost_mode:
                 self._emit_global_log(f"الاتصال بالخادم مفقود. جاري فحص توفر الموقع...")
                 site_available, site_check_error = self.api_client.check_main_site_availability() 
@@ -301,7 +495,7 @@ class MonitoringThread(QThread):
                     self.is_connection_lost_mode = False
                     self.consecutive_network_error_trigger_count = 0 
                     logger.info("إعادة تعيين عداد الفشل المتتالي لجميع الأعضاء بعد استعادة الاتصال.")
-                    for member_to_reset in self.members_list_ref:
+                    for member_to_reset in self.roster.snapshot().members:
                         member_to_reset.consecutive_failures = 0
                     continue 
                 else:
@@ -311,311 +505,252 @@ class MonitoringThread(QThread):
                     self._wait_with_countdown(self.SITE_CHECK_INTERVAL_SECONDS, "فحص الموقع بعد: ")
                     if not self.is_running: break
                     continue 
-            
-            if self.is_running and not self.initial_scan_completed and not self.is_connection_lost_mode:
-                logger.info("بدء الفحص الأولي لجميع الأعضاء عند بدء المراقبة...")
-                self._emit_global_log("جاري الفحص الأولي لجميع الأعضاء...")
-                
-                initial_scan_members_list = list(self.members_list_ref) 
 
-                if not initial_scan_members_list:
-                    logger.info("الفحص الأولي: لا يوجد أعضاء للفحص.")
-                    self._emit_global_log("الفحص الأولي: لا يوجد أعضاء.")
+            if not self.manual_only and time.monotonic() >= self.next_pdf_manifest_sweep_at:
+                self._sweep_pdf_manifest()
+
+            snapshot = self.roster.snapshot()
+            members = snapshot.members # نفس النسخة للمزامنة والاختيار (الفهارس متوافقة)
+            self.scheduler.sync(members)
+            due = self._pop_check_now(snapshot)
+            is_check_now = due is not None
+            if due is None and self.manual_only:
+                if self._finish_manual_run(): break
+                continue # تحول إلى مراقبة كاملة أو وصل طلب جديد
+            if due is None:
+                due = self.scheduler.pop_due(members)
+
+            if due is None:
+                if not self.initial_scan_completed:
+                    self.initial_scan_completed = True
+                    logger.info(f"اكتمل الفحص الأولي. الأعضاء حسب الفئة: {self.scheduler.stats()}")
+                    self._emit_global_log("اكتمل الفحص الأولي. بدء المراقبة الدورية...")
+                seconds_until_next = self.scheduler.seconds_until_next_due()
+                if seconds_until_next is None:
+                    if not members:
+                        logger.info("المراقبة الدورية: لا يوجد أعضاء للمراقبة.")
+                        self._emit_global_log("لا يوجد أعضاء للمراقبة الدورية. الانتظار...")
+                    else:
+                        logger.info("المراقبة الدورية: جميع الأعضاء في حالات نهائية. الانتظار حتى تعديل أحدهم...")
+                        self._emit_global_log("لا يوجد أعضاء يحتاجون إلى فحص حاليًا. الانتظار...")
+                    seconds_until_next = min(self.interval_ms / 1000, 30)
                 else:
-                    for initial_scan_idx, member_to_process in enumerate(initial_scan_members_list):
-                        if not self.is_running: break
-                        
-                        try:
-                            actual_member_in_main_list = self.members_list_ref[initial_scan_idx]
-                            if actual_member_in_main_list != member_to_process:
-                                 logger.warning(f"الفحص الأولي: تم تخطي العضو (فهرس {initial_scan_idx}) لأنه تغير أو تم حذفه من القائمة الرئيسية.")
-                                 continue
-                        except IndexError:
-                             logger.warning(f"الفحص الأولي: تم تخطي العضو (فهرس {initial_scan_idx}) لأنه لم يعد موجودًا في القائمة الرئيسية.")
-                             continue
-
-                        member_display_name = self._get_member_display_name_with_index_from_thread(member_to_process, initial_scan_idx)
-
-                        if member_to_process.is_processing:
-                            logger.debug(f"الفحص الأولي: تجاوز العضو {member_display_name} لأنه قيد المعالجة.")
-                            continue
-
-                        if member_to_process.consecutive_failures >= self.MAX_CONSECUTIVE_MEMBER_FAILURES:
-                            if "فشل بشكل متكرر" not in member_to_process.status:
-                                logger.warning(f"الفحص الأولي: تجاوز العضو {member_display_name} بسبب {member_to_process.consecutive_failures} محاولات فاشلة.")
-                                member_to_process.status = "فشل بشكل متكرر"
-                                member_to_process.set_activity_detail(f"تم تجاوز العضو بسبب {member_to_process.consecutive_failures} محاولات فاشلة متتالية.", is_error=True)
-                                self.update_member_gui_signal.emit(initial_scan_idx, member_to_process.status, member_to_process.last_activity_detail, get_icon_name_for_status(member_to_process.status))
-                            continue
-                        
-                        if member_to_process.status in statuses_to_completely_skip_monitoring:
-                            logger.info(f"الفحص الأولي: تجاوز العضو {member_display_name} لأنه في حالة: {member_to_process.status}.")
-                            self.update_member_gui_signal.emit(initial_scan_idx, member_to_process.status, member_to_process.last_activity_detail, get_icon_name_for_status(member_to_process.status))
-                            self.member_being_processed_signal.emit(initial_scan_idx, False)
-                            if self.is_running: time.sleep(SHORT_SKIP_DELAY_SECONDS)
-                            continue
-
-                        self.member_being_processed_signal.emit(initial_scan_idx, True)
-                        logger.info(f"الفحص الأولي للعضو {member_display_name} - الحالة الحالية: {member_to_process.status}")
-                        self._emit_global_log(f"فحص أولي...", is_general=False, member_obj=member_to_process, member_idx=initial_scan_idx)
-                        
-                        member_had_api_error_this_cycle = False
-                        try:
-                            if member_to_process.status in statuses_for_pdf_check_only:
-                                logger.info(f"الفحص الأولي: العضو {member_display_name} ({member_to_process.status})، فحص PDF فقط.")
-                                if member_to_process.pre_inscription_id:
-                                    _, api_error_occurred_pdf = self.process_pdf_download(initial_scan_idx, member_to_process)
-                                    if api_error_occurred_pdf: member_had_api_error_this_cycle = True
-                                else:
-                                    member_to_process.set_activity_detail("الفحص الأولي: لا يمكن تحميل PDF، ID التسجيل مفقود.", is_error=True)
-                            else: 
-                                validation_success, api_error_occurred_validation = self.process_validation(initial_scan_idx, member_to_process)
-                                if api_error_occurred_validation: member_had_api_error_this_cycle = True
-                                if not self.is_running: break
-
-                                is_in_stop_state_after_validation = member_to_process.status in [
-                                    "مستفيد حاليًا من المنحة", "غير مؤهل مبدئيًا", "بيانات الإدخال خاطئة", 
-                                    "لديه موعد مسبق", "غير مؤهل للحجز", "فشل التحقق" 
-                                ]
-
-                                if not is_in_stop_state_after_validation and validation_success:
-                                    if member_to_process.pre_inscription_id and not (member_to_process.nom_ar and member_to_process.prenom_ar):
-                                        if not self.is_running: break
-                                        _, api_error_occurred_info = self.process_pre_inscription_info(initial_scan_idx, member_to_process)
-                                        if api_error_occurred_info: member_had_api_error_this_cycle = True
-                                        if not self.is_running or "فشل جلب" in member_to_process.status: pass
-
-                                    if not self.is_running: break
-                                    can_attempt_booking = member_to_process.status in ["تم جلب المعلومات", "تم التحقق", "لا توجد مواعيد", "فشل جلب التواريخ", "يتطلب تسجيل مسبق"] and \
-                                                          member_to_process.has_actual_pre_inscription and member_to_process.pre_inscription_id and \
-                                                          member_to_process.demandeur_id and member_to_process.structure_id and \
-                                                          not member_to_process.already_has_rdv and not member_to_process.have_allocation
-                                    
-                                    if can_attempt_booking:
-                                        _, api_error_occurred_booking = self.process_available_dates_and_book(initial_scan_idx, member_to_process)
-                                        if api_error_occurred_booking: member_had_api_error_this_cycle = True
-                                        if not self.is_running or member_to_process.status in ["فشل الحجز", "غير مؤهل للحجز"]: pass
-                            
-                            pdf_attempt_worthy_statuses_after_processing = ["تم الحجز", "مكتمل", "فشل تحميل PDF", "لديه موعد مسبق"] 
-                            if member_to_process.status in pdf_attempt_worthy_statuses_after_processing and member_to_process.pre_inscription_id:
-                                if not self.is_running: break
-                                logger.info(f"الفحص الأولي: العضو {member_display_name} ({member_to_process.status}) يستدعي محاولة تحميل PDF.")
-                                _, api_error_occurred_pdf = self.process_pdf_download(initial_scan_idx, member_to_process)
-                                if api_error_occurred_pdf: member_had_api_error_this_cycle = True
-                            
-                            if member_had_api_error_this_cycle:
-                                member_to_process.consecutive_failures += 1
-                                self.consecutive_network_error_trigger_count +=1 
-                            else:
-                                member_to_process.consecutive_failures = 0
-                                if not member_had_api_error_this_cycle : self.consecutive_network_error_trigger_count = 0
-
-
-                        except Exception as e:
-                            if not self.is_running: break
-                            logger.exception(f"الفحص الأولي: خطأ غير متوقع للعضو {member_display_name}: {e}")
-                            member_to_process.status = "خطأ في المعالجة"
-                            member_to_process.set_activity_detail(f"خطأ عام أثناء الفحص الأولي: {str(e)}", is_error=True)
-                            member_to_process.consecutive_failures +=1
-                            self.consecutive_network_error_trigger_count +=1
-                            self.update_member_gui_signal.emit(initial_scan_idx, member_to_process.status, member_to_process.last_activity_detail, "SP_MessageBoxCritical")
-                        finally:
-                            if self.is_running:
-                                self.member_being_processed_signal.emit(initial_scan_idx, False)
-                                self.update_member_gui_signal.emit(initial_scan_idx, member_to_process.status, member_to_process.last_activity_detail, get_icon_name_for_status(member_to_process.status))
-
-                        if not self.is_running: break
-                        if self.consecutive_network_error_trigger_count >= self.CONSECUTIVE_NETWORK_ERROR_THRESHOLD:
-                            logger.warning(f"الفحص الأولي: {self.consecutive_network_error_trigger_count} أعضاء متتاليين واجهوا أخطاء شبكة. الدخول في وضع فحص الاتصال.")
-                            self._emit_global_log("الفحص الأولي: أخطاء شبكة متتالية. إيقاف مؤقت.")
-                            self.is_connection_lost_mode = True
-                            break 
-
-                        member_delay = random.uniform(self.min_member_delay, self.max_member_delay)
-                        logger.info(f"الفحص الأولي: تأخير {member_delay:.2f} ثانية قبل العضو التالي.")
-                        self._wait_with_countdown(int(member_delay)) 
-                        if not self.is_running: break
-                        if self.is_running:
-                            time.sleep(member_delay - int(member_delay))
-                    
-                    if self.is_connection_lost_mode: 
-                        continue 
-
-                self.initial_scan_completed = True
-                self.current_member_index_to_process = 0 
-                logger.info("اكتمل الفحص الأولي لجميع الأعضاء.")
-                self._emit_global_log("اكتمل الفحص الأولي. بدء المراقبة الدورية...")
-            
-            if not self.is_running: break 
-
-            current_members_snapshot_indices = list(range(len(self.members_list_ref)))
-
-            if not current_members_snapshot_indices: 
-                logger.info("المراقبة الدورية: لا يوجد أعضاء للمراقبة.")
-                self._emit_global_log("لا يوجد أعضاء للمراقبة الدورية. الانتظار...")
-                self._wait_with_countdown(int(min(self.interval_ms / 1000, 30)), "الدورة التالية بعد: ")
+                    logger.info(f"المراقبة الدورية: الفحص التالي بعد {seconds_until_next:.0f} ثانية. الأعضاء حسب الفئة: {self.scheduler.stats()}")
+                self._wait_with_countdown(max(1.0, seconds_until_next), "الفحص التالي بعد: ", wake_condition=self._scheduler_has_due_member)
                 if not self.is_running: break
-                continue 
+                continue
 
-            logger.info(f"بدء دورة مراقبة دورية... (من الفهرس {self.current_member_index_to_process}) عدد الأعضاء الكلي: {len(current_members_snapshot_indices)}")
-            self._emit_global_log(f"بدء دورة مراقبة دورية... ({time.strftime('%H:%M:%S')})")
+            main_list_idx, member_to_process = due
+            member_display_name = self._get_member_display_name_with_index_from_thread(member_to_process, main_list_idx)
 
-            processed_in_this_cycle = False 
-
-            if self.current_member_index_to_process >= len(current_members_snapshot_indices):
-                self.current_member_index_to_process = 0 
+            if not SHARED_MEMBER_CLAIMS.try_claim(member_to_process, self): 
+                if is_check_now:
+                    logger.info(f"الفحص الفوري: تجاوز العضو {member_display_name} لأنه قيد المعالجة (جلب أولي أو تحميل).")
+                    self._emit_global_log("العضو قيد المعالجة حاليًا، لم يتم الفحص الفوري.", is_general=False, member_obj=member_to_process)
+                    continue
+                logger.debug(f"المراقبة: تأجيل العضو {member_display_name} لأنه قيد المعالجة.")
+                self.scheduler.defer(member_to_process, SCHEDULER_BUSY_RETRY_SECONDS)
+                continue
 
-            start_index_for_this_run = self.current_member_index_to_process
-            num_members_to_process_this_run = len(current_members_snapshot_indices)
+            try:
+                if is_check_now:
+                    self._check_member_now(main_list_idx, member_to_process, member_display_name)
+                else:
+                    self._process_member(main_list_idx, member_to_process, member_display_name)
+            finally:
+                SHARED_MEMBER_CLAIMS.release(member_to_process, self)
+                self.scheduler.record_result(member_to_process) # يُسجل حتى عند الإيقاف أثناء الفحص حتى لا يخرج العضو من الجدولة
 
-            for i in range(num_members_to_process_this_run):
-                if not self.is_running: break 
+            if not self.is_running: break 
 
-                main_list_idx = (start_index_for_this_run + i) % len(current_members_snapshot_indices) 
-                
-                if main_list_idx >= len(self.members_list_ref): 
-                    logger.warning(f"المراقبة الدورية: تجاوز العضو (فهرس {main_list_idx}) لأنه لم يعد موجودًا.")
-                    continue
-                
-                member_to_process = self.members_list_ref[main_list_idx]
-                member_display_name_periodic = self._get_member_display_name_with_index_from_thread(member_to_process, main_list_idx)
+            if self.consecutive_network_error_trigger_count >= self.CONSECUTIVE_NETWORK_ERROR_THRESHOLD:
+                logger.warning(f"المراقبة: {self.consecutive_network_error_trigger_count} أعضاء متتاليين واجهوا أخطاء شبكة. الدخول في وضع فحص الاتصال.")
+                self._emit_global_log("أخطاء شبكة متتالية. إيقاف مؤقت للمراقبة.")
+                self.is_connection_lost_mode = True
+                continue 
 
+            member_delay = random.uniform(self.min_member_delay, self.max_member_delay)
+            logger.info(f"المراقبة: تأخير {member_delay:.2f} ثانية قبل العضو التالي.")
+            self._wait_with_countdown(member_delay) 
+            if not self.is_running: break
+        
+        if self.manual_only and self.is_running:
+            logger.info("خيط المراقبة: انتهت طلبات الفحص الفوري.")
+            return
+        logger.info("خيط المراقبة يتوقف.")
+        self._emit_global_log("تم إيقاف خيط المراقبة.")
 
-                if member_to_process.is_processing: 
-                    logger.debug(f"المراقبة الدورية: تجاوز العضو {member_display_name_periodic} لأنه قيد المعالجة.")
-                    continue
+    def _sweep_pdf_manifest(self):
+        """فحص سلامة ملفات PDF المسجلة، وإعادة جدولة الأعضاء الذين فُقدت ملفاتهم أو تغيرت."""
+        self.next_pdf_manifest_sweep_at = time.monotonic() + PDF_MANIFEST_SWEEP_INTERVAL_SECONDS
+        invalid_paths = SHARED_PDF_MANIFEST.sweep()
+        if not invalid_paths:
+            return
+        members = self.roster.snapshot().members
+        self.scheduler.sync(members)
+        affected_members = [m for m in members if m.pdf_honneur_path in invalid_paths or m.pdf_rdv_path in invalid_paths]
+        for member in affected_members:
+            self.scheduler.requeue(member)
+        logger.warning(f"فحص ملفات PDF: {len(affected_members)} عضو فُقدت ملفاته أو تغيرت، تمت إعادة جدولته لإعادة التحميل.")
+        self._emit_global_log(f"فحص ملفات PDF: إعادة تحميل ملفات {len(affected_members)} عضو (ملفات مفقودة أو تالفة).")
+
+    def _process_member(self, main_list_idx, member_to_process, member_display_name):
+        """فحص عضو واحد مستحق حسب حالته (تحقق، معلومات، حجز، PDF) وتحديث عدادات الفشل."""
+        if member_to_process.consecutive_failures >= self.MAX_CONSECUTIVE_MEMBER_FAILURES:
+            if "فشل بشكل متكرر" not in member_to_process.status : 
+                logger.warning(f"المراقبة: تجاوز العضو {member_display_name} بسبب {member_to_process.consecutive_failures} محاولات فاشلة.")
+                member_to_process.status = "فشل بشكل متكرر"
+                member_to_process.set_activity_detail(f"تم تجاوز العضو بسبب {member_to_process.consecutive_failures} محاولات فاشلة متتالية.", is_error=True)
+                self.update_member_gui_signal.emit(member_to_process.member_id, member_to_process.status, member_to_process.last_activity_detail, get_icon_name_for_status(member_to_process.status))
+            return
 
-                if member_to_process.consecutive_failures >= self.MAX_CONSECUTIVE_MEMBER_FAILURES:
-                    if "فشل بشكل متكرر" not in member_to_process.status : 
-                        logger.warning(f"المراقبة الدورية: تجاوز العضو {member_display_name_periodic} بسبب {member_to_process.consecutive_failures} محاولات فاشلة.")
-                        member_to_process.status = "فشل بشكل متكرر"
-                        member_to_process.set_activity_detail(f"تم تجاوز العضو بسبب {member_to_process.consecutive_failures} محاولات فاشلة متتالية.", is_error=True)
-                        self.update_member_gui_signal.emit(main_list_idx, member_to_process.status, member_to_process.last_activity_detail, get_icon_name_for_status(member_to_process.status))
-                    continue 
-                
-                if member_to_process.status in statuses_to_completely_skip_monitoring:
-                    logger.info(f"المراقبة الدورية: تجاوز العضو {member_display_name_periodic} لأنه في حالة: {member_to_process.status}.")
-                    self.update_member_gui_signal.emit(main_list_idx, member_to_process.status, member_to_process.last_activity_detail, get_icon_name_for_status(member_to_process.status))
-                    self.member_being_processed_signal.emit(main_list_idx, False) 
-                    if self.is_running: time.sleep(SHORT_SKIP_DELAY_SECONDS)
-                    self.current_member_index_to_process = (main_list_idx + 1) % len(self.members_list_ref) if self.members_list_ref else 0
-                    continue 
+        self.member_being_processed_signal.emit(member_to_process.member_id, True) 
+        
+        logger.info(f"المراقبة: فحص العضو {member_display_name} - الحالة: {member_to_process.status}")
+        self._emit_global_log(f"جاري فحص دوري..." if self.initial_scan_completed else f"فحص أولي...", is_general=False, member_obj=member_to_process)
+        
+        cycle_errors = [] # أخطاء مراحل هذه الدورة (ApiError أو True لرد غير متوقع)
 
-                self.member_being_processed_signal.emit(main_list_idx, True) 
-                
-                logger.info(f"المراقبة الدورية: فحص العضو {member_display_name_periodic} - الحالة: {member_to_process.status}")
-                self._emit_global_log(f"جاري فحص دوري...", is_general=False, member_obj=member_to_process, member_idx=main_list_idx)
-                
-                processed_in_this_cycle = True 
-                member_had_api_error_this_cycle = False 
+        try:
+            if member_to_process.status in STATUSES_FOR_PDF_CHECK_ONLY:
+                logger.info(f"المراقبة: العضو {member_display_name} ({member_to_process.status})، فحص PDF فقط.")
+                if member_to_process.pre_inscription_id: 
+                    pdf_success, api_error_occurred_pdf = self.process_pdf_download(main_list_idx, member_to_process)
+                    if api_error_occurred_pdf: cycle_errors.append(api_error_occurred_pdf)
+                else:
+                    member_to_process.set_activity_detail("المراقبة: لا يمكن تحميل PDF، ID التسجيل مفقود.", is_error=True)
+            else: 
+                validation_success, api_error_occurred_validation = self.process_validation(main_list_idx, member_to_process)
+                if api_error_occurred_validation: cycle_errors.append(api_error_occurred_validation)
+                if not self.is_running: return
 
-                try:
-                    if member_to_process.status in statuses_for_pdf_check_only:
-                        logger.info(f"المراقبة الدورية: العضو {member_display_name_periodic} ({member_to_process.status})، فحص PDF فقط.")
-                        if member_to_process.pre_inscription_id: 
-                            pdf_success, api_error_occurred_pdf = self.process_pdf_download(main_list_idx, member_to_process)
-                            if api_error_occurred_pdf: member_had_api_error_this_cycle = True
-                        else:
-                            member_to_process.set_activity_detail("المراقبة الدورية: لا يمكن تحميل PDF، ID التسجيل مفقود.", is_error=True)
-                    else: 
-                        validation_success, api_error_occurred_validation = self.process_validation(main_list_idx, member_to_process)
-                        if api_error_occurred_validation: member_had_api_error_this_cycle = True
-                        if not self.is_running: break
-
-                        is_in_stop_state_after_validation = member_to_process.status in [
-                            "مستفيد حاليًا من المنحة", "غير مؤهل مبدئيًا", "بيانات الإدخال خاطئة", 
-                            "لديه موعد مسبق", "غير مؤهل للحجز", "فشل التحقق"
-                        ]
-
-                        if not is_in_stop_state_after_validation and validation_success:
-                            if member_to_process.pre_inscription_id and not (member_to_process.nom_ar and member_to_process.prenom_ar):
-                                if not self.is_running: break
-                                info_success, api_error_occurred_info = self.process_pre_inscription_info(main_list_idx, member_to_process)
-                                if api_error_occurred_info: member_had_api_error_this_cycle = True
-                                if not self.is_running or "فشل جلب" in member_to_process.status: pass 
-
-                            if not self.is_running: break
-                            can_attempt_booking = member_to_process.status in ["تم جلب المعلومات", "تم التحقق", "لا توجد مواعيد", "فشل جلب التواريخ", "يتطلب تسجيل مسبق"] and \
-                                                  member_to_process.has_actual_pre_inscription and member_to_process.pre_inscription_id and \
-                                                  member_to_process.demandeur_id and member_to_process.structure_id and \
-                                                  not member_to_process.already_has_rdv and not member_to_process.have_allocation
-                            
-                            if can_attempt_booking:
-                                booking_successful, api_error_occurred_booking = self.process_available_dates_and_book(main_list_idx, member_to_process)
-                                if api_error_occurred_booking: member_had_api_error_this_cycle = True
-                                if not self.is_running or member_to_process.status in ["فشل الحجز", "غير مؤهل للحجز"]: pass 
-                    
-                    pdf_attempt_worthy_statuses_after_processing = ["تم الحجز", "مكتمل", "فشل تحميل PDF", "لديه موعد مسبق"]
-                    if member_to_process.status in pdf_attempt_worthy_statuses_after_processing and member_to_process.pre_inscription_id:
-                        if not self.is_running: break
-                        logger.info(f"المراقبة الدورية: العضو {member_display_name_periodic} ({member_to_process.status}) يستدعي محاولة تحميل PDF.")
-                        pdf_success, api_error_occurred_pdf = self.process_pdf_download(main_list_idx, member_to_process)
-                        if api_error_occurred_pdf: member_had_api_error_this_cycle = True
+                is_in_stop_state_after_validation = member_to_process.status in [
+                    "مستفيد حاليًا من المنحة", "غير مؤهل مبدئيًا", "بيانات الإدخال خاطئة", 
+                    "لديه موعد مسبق", "غير مؤهل للحجز", "فشل التحقق"
+                ]
+
+                if not is_in_stop_state_after_validation and validation_success:
+                    if member_to_process.pre_inscription_id and not (member_to_process.nom_ar and member_to_process.prenom_ar):
+                        if not self.is_running: return
+                        info_success, api_error_occurred_info = self.process_pre_inscription_info(main_list_idx, member_to_process)
+                        if api_error_occurred_info: cycle_errors.append(api_error_occurred_info)
+
+                    if not self.is_running: return
+                    can_attempt_booking = member_to_process.status in ["تم جلب المعلومات", "تم التحقق", "لا توجد مواعيد", "فشل جلب التواريخ", "يتطلب تسجيل مسبق"] and \
+                                          member_to_process.has_actual_pre_inscription and member_to_process.pre_inscription_id and \
+                                          member_to_process.demandeur_id and member_to_process.structure_id and \
+                                          not member_to_process.already_has_rdv and not member_to_process.have_allocation
                     
-                    if member_had_api_error_this_cycle:
-                        member_to_process.consecutive_failures += 1
-                        self.consecutive_network_error_trigger_count +=1 
-                    else: 
-                        member_to_process.consecutive_failures = 0
-                        self.consecutive_network_error_trigger_count = 0 
-
-                except Exception as e:
-                    if not self.is_running: break
-                    logger.exception(f"المراقبة الدورية: خطأ غير متوقع للعضو {member_display_name_periodic}: {e}")
-                    member_to_process.status = "خطأ في المعالجة"
-                    member_to_process.set_activity_detail(f"خطأ عام أثناء المراقبة الدورية: {str(e)}", is_error=True)
-                    member_to_process.consecutive_failures +=1 
-                    self.consecutive_network_error_trigger_count +=1 
-                    self.update_member_gui_signal.emit(main_list_idx, member_to_process.status, member_to_process.last_activity_detail, "SP_MessageBoxCritical")
-                finally:
-                    if self.is_running:
-                        self.member_being_processed_signal.emit(main_list_idx, False) 
-                        self.update_member_gui_signal.emit(main_list_idx, member_to_process.status, member_to_process.last_activity_detail, get_icon_name_for_status(member_to_process.status))
+                    if can_attempt_booking:
+                        booking_successful, api_error_occurred_booking = self.process_available_dates_and_book(main_list_idx, member_to_process)
+                        if api_error_occurred_booking: cycle_errors.append(api_error_occurred_booking)
+            
+            pdf_attempt_worthy_statuses_after_processing = ["تم الحجز", "مكتمل", "فشل تحميل PDF", "لديه موعد مسبق"]
+            if member_to_process.status in pdf_attempt_worthy_statuses_after_processing and member_to_process.pre_inscription_id:
+                if not self.is_running: return
+                logger.info(f"المراقبة: العضو {member_display_name} ({member_to_process.status}) يستدعي محاولة تحميل PDF.")
+                pdf_success, api_error_occurred_pdf = self.process_pdf_download(main_list_idx, member_to_process)
+                if api_error_occurred_pdf: cycle_errors.append(api_error_occurred_pdf)
+            
+            self._update_failure_counters(member_to_process, cycle_errors)
 
-                if not self.is_running: break 
+        except Exception as e:
+            if not self.is_running: return
+            logger.exception(f"المراقبة: خطأ غير متوقع للعضو {member_display_name}: {e}")
+            member_to_process.status = "خطأ في المعالجة"
+            member_to_process.set_activity_detail(f"خطأ عام أثناء المراقبة: {str(e)}", is_error=True)
+            member_to_process.consecutive_failures +=1 
+            self.consecutive_network_error_trigger_count +=1 
+            self.update_member_gui_signal.emit(member_to_process.member_id, member_to_process.status, member_to_process.last_activity_detail, "SP_MessageBoxCritical")
+        finally:
+            if self.is_running:
+                self.member_being_processed_signal.emit(member_to_process.member_id, False) 
+                self.update_member_gui_signal.emit(member_to_process.member_id, member_to_process.status, member_to_process.last_activity_detail, get_icon_name_for_status(member_to_process.status))
 
-                if self.consecutive_network_error_trigger_count >= self.CONSECUTIVE_NETWORK_ERROR_THRESHOLD:
-                    logger.warning(f"المراقبة الدورية: {self.consecutive_network_error_trigger_count} أعضاء متتاليين واجهوا أخطاء شبكة. الدخول في وضع فحص الاتصال.")
-                    self._emit_global_log("أخطاء شبكة متتالية. إيقاف مؤقت للمراقبة الدورية.")
-                    self.is_connection_lost_mode = True
-                    break 
 
-                member_delay = random.uniform(self.min_member_delay, self.max_member_delay)
-                logger.info(f"المراقبة الدورية: تأخير {member_delay:.2f} ثانية قبل العضو التالي.")
-                self._wait_with_countdown(int(member_delay)) 
-                if not self.is_running: break
-                if self.is_running: 
-                    time.sleep(member_delay - int(member_delay))
+    def _check_member_now(self, main_list_idx, member_to_process, member_display_name):
+        """
+        "فحص الآن" بطلب من المستخدم: تحقق من البوابة، ثم المعلومات والحجز وPDF حسب الحالة،
+        حتى للعضو المتجاوز بعد فشل متكرر. نفس العميل والتأخير بين الأعضاء وحالة المعالجة التي تستخدمها المراقبة.
+        """
+        self.member_being_processed_signal.emit(member_to_process.member_id, True)
+        logger.info(f"بدء فحص فوري للعضو: {member_display_name}")
+        self._emit_global_log("بدء الفحص الفوري...", is_general=False, member_obj=member_to_process)
 
-                self.current_member_index_to_process = (main_list_idx + 1) % len(self.members_list_ref) if self.members_list_ref else 0
+        cycle_errors = []
+        try:
+            validation_can_progress, api_error_validation = self.process_validation(main_list_idx, member_to_process)
+            if api_error_validation: cycle_errors.append(api_error_validation)
+            if not self.is_running: return
 
-            if not self.is_running: break 
-            if self.is_connection_lost_mode: continue 
+            stop_after_validation = member_to_process.status in ["مستفيد حاليًا من المنحة", "بيانات الإدخال خاطئة", "فشل التحقق", "غير مؤهل مبدئيًا", "لديه موعد مسبق", "غير مؤهل للحجز"]
+            if not stop_after_validation:
+                if validation_can_progress and member_to_process.pre_inscription_id and not (member_to_process.nom_ar and member_to_process.prenom_ar):
+                    info_success, api_error_info = self.process_pre_inscription_info(main_list_idx, member_to_process)
+                    if api_error_info: cycle_errors.append(api_error_info)
+                    if not self.is_running: return
+
+                can_attempt_booking = member_to_process.status in ["تم جلب المعلومات", "تم التحقق", "لا توجد مواعيد", "فشل جلب التواريخ", "يتطلب تسجيل مسبق"] and \
+                                      member_to_process.has_actual_pre_inscription and member_to_process.pre_inscription_id and \
+                                      member_to_process.demandeur_id and member_to_process.structure_id and \
+                                      not member_to_process.already_has_rdv and not member_to_process.have_allocation
+                if can_attempt_booking:
+                    booking_successful, api_error_booking = self.process_available_dates_and_book(main_list_idx, member_to_process)
+                    if api_error_booking: cycle_errors.append(api_error_booking)
+                    if not self.is_running: return
+            else:
+                logger.info(f"الفحص الفوري: الحالة النهائية بعد التحقق أو حالة تمنع المتابعة: {member_to_process.status}")
+
+            if member_to_process.status in ["تم الحجز", "لديه موعد مسبق", "مستفيد حاليًا من المنحة", "مكتمل", "فشل تحميل PDF"] and member_to_process.pre_inscription_id:
+                logger.info(f"الفحص الفوري للعضو {member_display_name} ({member_to_process.status}) يستدعي محاولة تحميل PDF.")
+                pdf_success, api_error_pdf = self.process_pdf_download(main_list_idx, member_to_process)
+                if api_error_pdf: cycle_errors.append(api_error_pdf)
+                if not self.is_running: return
 
-            self.current_member_index_to_process = 0 
-
-            if processed_in_this_cycle:
-                logger.info(f"إكمال دورة مراقبة دورية. الدورة القادمة بعد {self.interval_ms / 60000:.1f} دقيقة.")
-                self._emit_global_log(f"انتهاء دورة المراقبة الدورية.")
-            else: 
-                logger.info(f"المراقبة الدورية: لم يتم فحص أي أعضاء. الانتظار للدورة القادمة.")
-                self._emit_global_log("المراقبة الدورية: لم يتم فحص أي أعضاء مؤهلين. الانتظار...")
-            
-            self._wait_with_countdown(int(self.interval_ms / 1000), "الدورة التالية بعد: ")
-            if not self.is_running: break
-        
-        logger.info("خيط المراقبة يتوقف.")
-        self._emit_global_log("تم إيقاف خيط المراقبة.")
+            self._update_failure_counters(member_to_process, cycle_errors) # فحص ناجح يعيد العضو المتجاوز إلى الجدولة
+            logger.info(f"الفحص الفوري للعضو {member_display_name} انتهى بالحالة: {member_to_process.status}. التفاصيل: {member_to_process.full_last_activity_detail}")
+            self._emit_global_log(f"فحص انتهى بالحالة: {member_to_process.status} - {member_to_process.last_activity_detail}", is_general=False, member_obj=member_to_process)
 
+        except Exception as e:
+            if not self.is_running: return
+            logger.exception(f"خطأ غير متوقع في الفحص الفوري للعضو {member_display_name}: {e}")
+            member_to_process.status = "خطأ في الفحص الفوري"
+            member_to_process.set_activity_detail(f"خطأ عام أثناء الفحص الفوري: {str(e)}", is_error=True)
+            member_to_process.consecutive_failures += 1
+            self._emit_global_log(f"خطأ فحص: {str(e)}", is_general=False, member_obj=member_to_process)
+        finally:
+            if self.is_running:
+                self.member_being_processed_signal.emit(member_to_process.member_id, False)
+                self.update_member_gui_signal.emit(member_to_process.member_id, member_to_process.status, member_to_process.last_activity_detail, get_icon_name_for_status(member_to_process.status))
+
+    def _update_failure_counters(self, member_obj, cycle_errors):
+        """
+        عدادات الفشل حسب نوع الخطأ وليس نص الرسالة:
+        - فشل العضو المتتالي (consecutive_failures): أي خطأ ما عدا رفض الأهلية.
+        - أخطاء الشبكة المتتالية (وضع فقدان الاتصال): أخطاء الشبكة و5xx فقط؛ رد 4xx أو رد غير صالح يعني أن الخادم متاح.
+        دورة أُلغيت (إيقاف المراقبة) لا تغير العدادات.
+        """
+        if any(error_kind(error) == ApiError.CANCELLED for error in cycle_errors):
+            return
+        member_errors = [error for error in cycle_errors if error_kind(error) != ApiError.NOT_ELIGIBLE]
+        if member_errors:
+            member_obj.consecutive_failures += 1
+        else:
+            member_obj.consecutive_failures = 0
+        if any(getattr(error, "is_connectivity_failure", False) for error in member_errors):
+            self.consecutive_network_error_trigger_count += 1
+        else:
+            self.consecutive_network_error_trigger_count = 0
 
-    def _update_member_and_emit(self, main_list_idx, member_obj_being_updated, new_status, detail_text, icon_name):
+    def _update_member_and_emit(self, main_list_idx, member_obj_being_updated, new_status, detail_text, icon_name, always_emit=False):
+        # always_emit: نتيجة يجب أن تصل إلى الواجهة (وتُحفظ) حتى بعد الإيقاف، مثل نتيجة طلب الحجز المرسل
         member_obj_being_updated.status = new_status
         is_error_flag = "فشل" in new_status or "خطأ" in new_status or "غير مؤهل" in new_status or "بيانات الإدخال خاطئة" in new_status
         member_obj_being_updated.set_activity_detail(detail_text, is_error=is_error_flag)
         member_display_name = self._get_member_display_name_with_index_from_thread(member_obj_being_updated, main_list_idx)
         logger.info(f"تحديث حالة العضو {member_display_name}: {new_status} - التفاصيل: {member_obj_being_updated.last_activity_detail}")
-        if self.is_running: 
-            self.update_member_gui_signal.emit(main_list_idx, member_obj_being_updated.status, member_obj_being_updated.last_activity_detail, icon_name)
+        if self.is_running or always_emit: 
+            self.update_member_gui_signal.emit(member_obj_being_updated.member_id, member_obj_being_updated.status, member_obj_being_updated.last_activity_detail, icon_name)
 
     def process_validation(self, main_list_idx, member_obj): 
         if not self.is_running: return False, False
@@ -633,8 +768,8 @@ class MonitoringThread(QThread):
         if error:
             new_status = "فشل التحقق"
             detail_text_for_gui = _translate_api_error(error, operation_name)
-            api_error_occurred = True
-            self._emit_global_log(f"فشل التحقق الدوري: {detail_text_for_gui}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+            api_error_occurred = error
+            self._emit_global_log(f"فشل التحقق الدوري: {detail_text_for_gui}", is_general=False, member_obj=member_obj)
         elif data:
             member_obj.have_allocation = data.get("haveAllocation", False)
             member_obj.allocation_details = data.get("detailsAllocation", {})
@@ -653,10 +788,10 @@ class MonitoringThread(QThread):
                     member_obj.prenom_ar = prenom_ar
                     member_obj.nom_fr = nom_fr
                     member_obj.prenom_fr = prenom_fr
-                    if self.is_running: self.new_data_fetched_signal.emit(main_list_idx, nom_ar, prenom_ar) 
+                    if self.is_running: self.new_data_fetched_signal.emit(member_obj.member_id, nom_ar, prenom_ar) 
                 
                 detail_text_for_gui = f"مستفيد حاليًا. تاريخ بدء الاستفادة: {date_debut}."
-                self._emit_global_log(f"مستفيد حاليًا.", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                self._emit_global_log(f"مستفيد حاليًا.", is_general=False, member_obj=member_obj)
                 validation_can_progress = False 
             else: 
                 member_obj.has_actual_pre_inscription = data.get("havePreInscription", False)
@@ -679,11 +814,11 @@ class MonitoringThread(QThread):
                             break
                     new_status = "بيانات الإدخال خاطئة"
                     detail_text_for_gui = error_msg_from_controls
-                    self._emit_global_log(f"خطأ في بيانات الإدخال (دوري): {error_msg_from_controls}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                    self._emit_global_log(f"خطأ في بيانات الإدخال (دوري): {error_msg_from_controls}", is_general=False, member_obj=member_obj)
                 elif member_obj.already_has_rdv:
                     new_status = "لديه موعد مسبق"
                     detail_text_for_gui = f"لديه موعد محجوز بالفعل (ID: {member_obj.rdv_id or 'N/A'})."
-                    self._emit_global_log(f"لديه موعد مسبق.", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                    self._emit_global_log(f"لديه موعد مسبق.", is_general=False, member_obj=member_obj)
                     if member_obj.pre_inscription_id and not (member_obj.nom_ar and member_obj.prenom_ar):
                         validation_can_progress = True 
                     else:
@@ -704,17 +839,17 @@ class MonitoringThread(QThread):
                     elif isinstance(data, dict) and data.get("Eligible") is False and data.get("serviceUp") is True: 
                          detail_text_for_gui = "نعتذر منكم! لا يمكنكم حجز موعد للاستفادة من منحة البطالة لعدم استيفائك لأحد شروط الأهلية اللازمة."
 
-                    self._emit_global_log(f"غير مؤهل للحجز (دوري): {detail_text_for_gui}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                    self._emit_global_log(f"غير مؤهل للحجز (دوري): {detail_text_for_gui}", is_general=False, member_obj=member_obj)
                 else: 
                     new_status = "فشل التحقق" 
                     detail_text_for_gui = "حالة غير معروفة بعد التحقق من البيانات (دوري)."
                     api_error_occurred = True
-                    self._emit_global_log(f"فشل التحقق الدوري: حالة غير معروفة.", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                    self._emit_global_log(f"فشل التحقق الدوري: حالة غير معروفة.", is_general=False, member_obj=member_obj)
         else: 
             new_status = "فشل التحقق"
             detail_text_for_gui = "استجابة فارغة من الخادم عند التحقق من البيانات (دوري)."
             api_error_occurred = True
-            self._emit_global_log(f"فشل التحقق الدوري: استجابة فارغة.", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+            self._emit_global_log(f"فشل التحقق الدوري: استجابة فارغة.", is_general=False, member_obj=member_obj)
         
         icon = get_icon_name_for_status(new_status) 
         self._update_member_and_emit(main_list_idx, member_obj, new_status, detail_text_for_gui, icon)
@@ -729,8 +864,12 @@ class MonitoringThread(QThread):
             self._update_member_and_emit(main_list_idx, member_obj, member_obj.status, detail_text, get_icon_name_for_status(member_obj.status))
             return False, False 
         
-        self._update_member_and_emit(main_list_idx, member_obj, "جاري جلب الاسم...", f"محاولة جلب الاسم واللقب للعضو {member_display_name}", get_icon_name_for_status("جاري جلب الاسم..."))
-        data, error = self.api_client.get_pre_inscription_info(member_obj.pre_inscription_id)
+        cached_info = self.api_client.get_cached_pre_inscription_info(member_obj.pre_inscription_id)
+        if cached_info is not None: # بيانات الهوية مخزنة وحديثة: لا طلب ولا حالة "جاري جلب الاسم..."
+            data, error = cached_info, None
+        else:
+            self._update_member_and_emit(main_list_idx, member_obj, "جاري جلب الاسم...", f"محاولة جلب الاسم واللقب للعضو {member_display_name}", get_icon_name_for_status("جاري جلب الاسم..."))
+            data, error = self.api_client.get_pre_inscription_info(member_obj.pre_inscription_id)
         if not self.is_running: return False, False
         
         new_status = member_obj.status 
@@ -742,8 +881,8 @@ class MonitoringThread(QThread):
         if error:
             if "جاري جلب الاسم..." in new_status : new_status = "فشل جلب المعلومات" 
             detail_text_for_gui = _translate_api_error(error, operation_name)
-            api_error_occurred = True
-            self._emit_global_log(f"فشل جلب اسم العضو: {detail_text_for_gui}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+            api_error_occurred = error
+            self._emit_global_log(f"فشل جلب اسم العضو: {detail_text_for_gui}", is_general=False, member_obj=member_obj)
         elif data:
             member_obj.nom_fr = data.get("nomDemandeurFr", "")
             member_obj.prenom_fr = data.get("prenomDemandeurFr", "")
@@ -766,14 +905,14 @@ class MonitoringThread(QThread):
                  detail_text_for_gui = f"تم جلب الاسم: {member_obj.get_full_name_ar()}. {current_activity}"
             
             detail_text_for_gui = detail_text_for_gui.strip()
-            if self.is_running: self.new_data_fetched_signal.emit(main_list_idx, member_obj.nom_ar, member_obj.prenom_ar) 
-            self._emit_global_log(f"تم جلب اسم العضو.", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+            if self.is_running: self.new_data_fetched_signal.emit(member_obj.member_id, member_obj.nom_ar, member_obj.prenom_ar) 
+            self._emit_global_log(f"تم جلب اسم العضو.", is_general=False, member_obj=member_obj)
             info_fetched_successfully = True
         else: 
             if "جاري جلب الاسم..." in new_status : new_status = "فشل جلب المعلومات"
             detail_text_for_gui = "استجابة فارغة عند جلب معلومات الاسم."
             api_error_occurred = True 
-            self._emit_global_log(f"فشل جلب اسم العضو: استجابة فارغة.", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+            self._emit_global_log(f"فشل جلب اسم العضو: استجابة فارغة.", is_general=False, member_obj=member_obj)
         
         icon = get_icon_name_for_status(new_status)
         self._update_member_and_emit(main_list_idx, member_obj, new_status, detail_text_for_gui, icon)
@@ -792,21 +931,22 @@ class MonitoringThread(QThread):
             return False, False 
         
         self._update_member_and_emit(main_list_idx, member_obj, "جاري البحث عن مواعيد...", f"البحث عن مواعيد للعضو {member_display_name}", get_icon_name_for_status("جاري البحث عن مواعيد..."))
-        self._emit_global_log(f"جاري البحث عن مواعيد...", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+        self._emit_global_log(f"جاري البحث عن مواعيد...", is_general=False, member_obj=member_obj)
         data, error = self.api_client.get_available_dates(member_obj.structure_id, member_obj.pre_inscription_id)
         if not self.is_running: return False, False
         
         new_status = member_obj.status
         icon = get_icon_name_for_status(new_status)
         booking_successful = False
+        booking_sent = False
         api_error_occurred_this_stage = False 
         detail_text_for_gui = member_obj.last_activity_detail
 
         if error:
             new_status = "فشل جلب التواريخ"
             detail_text_for_gui = _translate_api_error(error, operation_name_dates)
-            api_error_occurred_this_stage = True
-            self._emit_global_log(f"فشل جلب التواريخ: {detail_text_for_gui}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+            api_error_occurred_this_stage = error
+            self._emit_global_log(f"فشل جلب التواريخ: {detail_text_for_gui}", is_general=False, member_obj=member_obj)
         elif data and "dates" in data:
             available_dates = data["dates"]
             if available_dates:
@@ -818,31 +958,40 @@ class MonitoringThread(QThread):
                     new_status = "خطأ في تنسيق التاريخ"
                     detail_text_for_gui = f"تنسيق تاريخ غير صالح من الخادم: {selected_date_str}"
                     api_error_occurred_this_stage = True 
-                    self._emit_global_log(f"خطأ في تنسيق التاريخ من الخادم: {selected_date_str}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                    self._emit_global_log(f"خطأ في تنسيق التاريخ من الخادم: {selected_date_str}", is_general=False, member_obj=member_obj)
                     self._update_member_and_emit(main_list_idx, member_obj, new_status, detail_text_for_gui, get_icon_name_for_status(new_status))
                     return False, api_error_occurred_this_stage
                 
                 self._update_member_and_emit(main_list_idx, member_obj, "جاري حجز الموعد...", f"محاولة الحجز في {formatted_date}", get_icon_name_for_status("جاري حجز الموعد..."))
-                self._emit_global_log(f"جاري حجز موعد في تاريخ {formatted_date}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                self._emit_global_log(f"جاري حجز موعد في تاريخ {formatted_date}", is_general=False, member_obj=member_obj)
                 if not (member_obj.ccp and member_obj.nom_fr and member_obj.prenom_fr):
                     new_status = "فشل الحجز"
                     detail_text_for_gui = "معلومات CCP أو الاسم الفرنسي مفقودة للحجز."
-                    self._emit_global_log(f"فشل حجز الموعد: معلومات ناقصة (CCP أو الاسم الفرنسي).", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                    self._emit_global_log(f"فشل حجز الموعد: معلومات ناقصة (CCP أو الاسم الفرنسي).", is_general=False, member_obj=member_obj)
                     self._update_member_and_emit(main_list_idx, member_obj, new_status, detail_text_for_gui, get_icon_name_for_status(new_status))
                     return False, False 
                 
                 if not self.is_running: return False, api_error_occurred_this_stage 
-                book_data, book_error = self.api_client.create_rendezvous(
-                    member_obj.pre_inscription_id, member_obj.ccp, member_obj.nom_fr, member_obj.prenom_fr,
-                    formatted_date, member_obj.demandeur_id
-                )
-                if not self.is_running: return False, api_error_occurred_this_stage 
+                self.booking_in_flight = True
+                try:
+                    book_data, book_error = self.api_client.create_rendezvous(
+                        member_obj.pre_inscription_id, member_obj.ccp, member_obj.nom_fr, member_obj.prenom_fr,
+                        formatted_date, member_obj.demandeur_id
+                    )
+                finally:
+                    self.booking_in_flight = False
+                booking_sent = error_kind(book_error) != ApiError.CANCELLED # الإلغاء قبل الإرسال فقط؛ نتيجة الطلب المرسل تُسجل حتى بعد الإيقاف
+                if not booking_sent: return False, api_error_occurred_this_stage 
 
-                if book_error: 
+                if book_error and error_kind(book_error) == ApiError.NOT_ELIGIBLE: # رفض أهلية في رد خطأ HTTP: ليس فشلاً للعضو
+                    new_status = "غير مؤهل للحجز"
+                    detail_text_for_gui = _translate_api_error(book_error, operation_name_book)
+                    self._emit_global_log(f"غير مؤهل للحجز: {detail_text_for_gui}", is_general=False, member_obj=member_obj)
+                elif book_error: 
                     new_status = "فشل الحجز"
                     detail_text_for_gui = _translate_api_error(book_error, operation_name_book)
-                    api_error_occurred_this_stage = True
-                    self._emit_global_log(f"فشل حجز الموعد: {detail_text_for_gui}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                    api_error_occurred_this_stage = book_error
+                    self._emit_global_log(f"فشل حجز الموعد: {detail_text_for_gui}", is_general=False, member_obj=member_obj)
                 elif book_data: 
                     if isinstance(book_data, dict) and book_data.get("Eligible") is False and book_data.get("serviceUp") is True:
                         new_status = "غير مؤهل للحجز"
@@ -850,14 +999,14 @@ class MonitoringThread(QThread):
                         if not api_message or not isinstance(api_message, str) or api_message.strip() == "":
                              api_message = "نعتذر منكم! لا يمكنكم حجز موعد للاستفادة من منحة البطالة لعدم استيفائك لأحد شروط الأهلية اللازمة."
                         detail_text_for_gui = api_message
-                        self._emit_global_log(f"غير مؤهل للحجز: {api_message}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                        self._emit_global_log(f"غير مؤهل للحجز: {api_message}", is_general=False, member_obj=member_obj)
                         logger.warning(f"العضو {member_display_name} غير مؤهل للحجز (Eligible:false, serviceUp:true): {book_data}")
                         api_error_occurred_this_stage = False 
                     elif isinstance(book_data, dict) and book_data.get("Eligible") is False : 
                         new_status = "غير مؤهل للحجز"
                         api_message = book_data.get("message", "نعتذر منكم! لا يمكنكم حجز موعد للاستفادة من منحة البطالة لعدم استيفائك لأحد شروط الأهلية اللازمة.")
                         detail_text_for_gui = api_message
-                        self._emit_global_log(f"غير مؤهل للحجز: {api_message}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                        self._emit_global_log(f"غير مؤهل للحجز: {api_message}", is_general=False, member_obj=member_obj)
                         logger.warning(f"العضو {member_display_name} غير مؤهل للحجز حسب استجابة الخادم: {book_data}")
                         api_error_occurred_this_stage = False 
                     elif isinstance(book_data, dict) and book_data.get("code") == 0 and book_data.get("rendezVousId"): 
@@ -866,7 +1015,7 @@ class MonitoringThread(QThread):
                         member_obj.rdv_source = "system" # Set source to system
                         new_status = "تم الحجز"
                         detail_text_for_gui = f"تم الحجز بنجاح في: {formatted_date}, ID: {member_obj.rdv_id}"
-                        self._emit_global_log(f"تم حجز موعد بنجاح في {formatted_date}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                        self._emit_global_log(f"تم حجز موعد بنجاح في {formatted_date}", is_general=False, member_obj=member_obj)
                         booking_successful = True
                     else: 
                         new_status = "فشل الحجز"
@@ -881,22 +1030,22 @@ class MonitoringThread(QThread):
                              except: pass 
 
                              detail_text_for_gui = raw_text_message
-                             self._emit_global_log(f"غير مؤهل للحجز (استجابة نصية): {raw_text_message}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                             self._emit_global_log(f"غير مؤهل للحجز (استجابة نصية): {raw_text_message}", is_general=False, member_obj=member_obj)
                              logger.warning(f"العضو {member_display_name} غير مؤهل للحجز (استجابة نصية): {book_data['raw_text'][:200]}")
                              api_error_occurred_this_stage = False
                         else:
                             detail_text_for_gui = f"فشل الحجز: {err_msg_detail}"
                             api_error_occurred_this_stage = True 
-                            self._emit_global_log(f"فشل حجز الموعد: {detail_text_for_gui}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                            self._emit_global_log(f"فشل حجز الموعد: {detail_text_for_gui}", is_general=False, member_obj=member_obj)
                 else: 
                     new_status = "فشل الحجز"
                     detail_text_for_gui = "استجابة غير متوقعة أو فارغة عند محاولة الحجز."
                     api_error_occurred_this_stage = True
-                    self._emit_global_log(f"فشل حجز الموعد: استجابة غير متوقعة.", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                    self._emit_global_log(f"فشل حجز الموعد: استجابة غير متوقعة.", is_general=False, member_obj=member_obj)
             else: 
                 new_status = "لا توجد مواعيد"
                 detail_text_for_gui = "لا توجد مواعيد متاحة حاليًا للحجز."
-                self._emit_global_log(f"لا توجد مواعيد متاحة.", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+                self._emit_global_log(f"لا توجد مواعيد متاحة.", is_general=False, member_obj=member_obj)
                 if not member_obj.has_actual_pre_inscription: 
                     new_status = "يتطلب تسجيل مسبق"
                     detail_text_for_gui = "مؤهل ولكن لا يوجد تسجيل مسبق بعد (لا مواعيد متاحة حاليًا)."
@@ -904,63 +1053,14 @@ class MonitoringThread(QThread):
             new_status = "فشل جلب التواريخ"
             detail_text_for_gui = "لم يتم العثور على تواريخ أو استجابة غير صالحة من الخادم."
             api_error_occurred_this_stage = True
-            self._emit_global_log(f"فشل جلب التواريخ: استجابة غير صالحة.", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
+            self._emit_global_log(f"فشل جلب التواريخ: استجابة غير صالحة.", is_general=False, member_obj=member_obj)
         
+        if booking_successful or new_status == "غير مؤهل للحجز":
+            SHARED_RESPONSE_CACHE.invalidate_member(member_obj) # الموعد أو الأهلية تغيرت: لا رد مخزن من قبلها
         icon = get_icon_name_for_status(new_status)
-        self._update_member_and_emit(main_list_idx, member_obj, new_status, detail_text_for_gui, icon)
+        self._update_member_and_emit(main_list_idx, member_obj, new_status, detail_text_for_gui, icon, always_emit=booking_sent)
         return booking_successful, api_error_occurred_this_stage
 
-    def _download_single_pdf_for_monitoring(self, main_list_idx, member_obj, report_type, filename_suffix_base, member_specific_dir):
-        if not self.is_running: return None, False, "", ""
-        operation_name = f"تحميل شهادة {filename_suffix_base}"
-        member_display_name = self._get_member_display_name_with_index_from_thread(member_obj, main_list_idx)
-        file_path = None
-        success = False
-        error_msg_for_toast = ""
-        status_msg_for_gui_cell = f"جاري تحميل {filename_suffix_base}..."
-        
-        current_path_attr = 'pdf_honneur_path' if report_type == "HonneurEngagementReport" else 'pdf_rdv_path'
-        
-        current_pdf_path_value = getattr(member_obj, current_path_attr)
-        if current_pdf_path_value and os.path.exists(current_pdf_path_value):
-            logger.info(f"ملف {report_type} موجود بالفعل للعضو {member_display_name} في {current_pdf_path_value}. تخطي التحميل.")
-            return current_pdf_path_value, True, "", f"شهادة {filename_suffix_base} موجودة بالفعل."
-
-        self._update_member_and_emit(main_list_idx, member_obj, status_msg_for_gui_cell, f"بدء تحميل {report_type}", get_icon_name_for_status(status_msg_for_gui_cell))
-        self._emit_global_log(f"جاري تحميل شهادة {filename_suffix_base}...", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
-        if not self.is_running: return None, False, "", "" 
-        response_data, api_err = self.api_client.download_pdf(report_type, member_obj.pre_inscription_id)
-        if not self.is_running: return None, False, "", "" 
-
-        if api_err:
-            error_msg_for_toast = _translate_api_error(api_err, operation_name)
-            self._emit_global_log(f"فشل تحميل شهادة {filename_suffix_base}: {error_msg_for_toast}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
-        elif response_data and (isinstance(response_data, str) or (isinstance(response_data, dict) and "base64Pdf" in response_data)):
-            pdf_b64 = response_data if isinstance(response_data, str) else response_data.get("base64Pdf")
-            try:
-                pdf_content = base64.b64decode(pdf_b64)
-                safe_member_name_part = "".join(c for c in (member_obj.get_full_name_ar() or member_obj.nin) if c.isalnum() or c in (' ', '_', '-')).rstrip().replace(" ","_")
-                if not safe_member_name_part: safe_member_name_part = member_obj.nin 
-                final_filename = f"{filename_suffix_base}_{safe_member_name_part}.pdf" 
-                file_path = os.path.join(member_specific_dir, final_filename)
-                with open(file_path, 'wb') as f:
-                    f.write(pdf_content)
-                setattr(member_obj, current_path_attr, file_path) 
-                success = True
-                status_msg_for_gui_cell = f"تم تحميل {final_filename} بنجاح."
-                self._emit_global_log(f"تم تحميل شهادة {filename_suffix_base} بنجاح.", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
-            except Exception as e_save:
-                error_msg_for_toast = f"خطأ في حفظ ملف {report_type}: {str(e_save)}"
-                self._emit_global_log(f"خطأ في حفظ شهادة {filename_suffix_base}: {e_save}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
-        else:
-            error_msg_for_toast = f"استجابة غير متوقعة من الخادم لـ {operation_name}."
-            self._emit_global_log(f"فشل تحميل شهادة {filename_suffix_base}: استجابة غير متوقعة.", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
-        
-        if not success:
-            status_msg_for_gui_cell = f"فشل تحميل {filename_suffix_base}: {error_msg_for_toast.split(':')[0]}" 
-        
-        return file_path, success, error_msg_for_toast, status_msg_for_gui_cell
-
     def process_pdf_download(self, main_list_idx, member_obj): 
         if not self.is_running: return False, False
         member_display_name = self._get_member_display_name_with_index_from_thread(member_obj, main_list_idx)
@@ -968,43 +1068,37 @@ class MonitoringThread(QThread):
             detail_text = "ID التسجيل مفقود لتحميل PDF."
             self._update_member_and_emit(main_list_idx, member_obj, member_obj.status, detail_text, get_icon_name_for_status(member_obj.status))
             return False, False 
-        
-        documents_location = QStandardPaths.writableLocation(QStandardPaths.DocumentsLocation)
-        base_app_dir_name = "ملفات_المنحة_البرنامج"
-        member_name_for_folder = member_obj.get_full_name_ar()
-        if not member_name_for_folder or member_name_for_folder.isspace(): 
-            member_name_for_folder = member_obj.nin 
-        
-        safe_folder_name_part = "".join(c for c in member_name_for_folder if c.isalnum() or c in (' ', '_', '-')).rstrip().replace(" ", "_")
-        if not safe_folder_name_part: safe_folder_name_part = member_obj.nin 
-        
-        member_specific_output_dir = os.path.join(documents_location, base_app_dir_name, safe_folder_name_part)
-        
-        try:
-            os.makedirs(member_specific_output_dir, exist_ok=True) 
-        except Exception as e_mkdir:
-            logger.error(f"فشل إنشاء مجلد للعضو {member_display_name} في process_pdf_download: {e_mkdir}")
-            user_friendly_mkdir_error = f"فشل إنشاء مجلد لحفظ الملفات: {e_mkdir}"
-            self._update_member_and_emit(main_list_idx, member_obj, "فشل تحميل PDF", user_friendly_mkdir_error, get_icon_name_for_status("فشل تحميل PDF"))
-            self._emit_global_log(f"فشل إنشاء مجلد: {e_mkdir}", is_general=False, member_obj=member_obj, member_idx=main_list_idx)
-            return False, False 
+
+        if SHARED_PDF_MANIFEST.is_member_complete(member_obj): # الملفات مسجلة وسليمة حسب آخر فحص: لا وصول إلى القرص ولا تحديثات للواجهة
+            if member_obj.status not in ("مكتمل", "مستفيد حاليًا من المنحة"):
+                self._update_member_and_emit(main_list_idx, member_obj, "مكتمل", "جميع ملفات PDF محملة بالفعل.", get_icon_name_for_status("مكتمل"))
+            return True, False
+
+        def on_download_start(report_type):
+            filename_suffix_base = PDF_REPORT_TYPES[report_type][0]
+            status_msg_for_gui_cell = f"جاري تحميل {filename_suffix_base}..."
+            self._update_member_and_emit(main_list_idx, member_obj, status_msg_for_gui_cell, f"بدء تحميل {report_type}", get_icon_name_for_status(status_msg_for_gui_cell))
+            self._emit_global_log(f"جاري تحميل شهادة {filename_suffix_base}...", is_general=False, member_obj=member_obj)
         
         all_relevant_pdfs_downloaded_successfully = True
         any_api_error_this_pdf_stage = False
         download_details_agg = [] 
 
+        required_report_types = required_pdf_report_types(member_obj)
+        for report_type in required_report_types:
+            if not self.is_running: return False, any_api_error_this_pdf_stage 
+            file_path, success, error_msg, status_msg = download_member_pdf(self.api_client, member_obj, report_type, on_download_start)
+            filename_suffix_base = PDF_REPORT_TYPES[report_type][0]
+            download_details_agg.append(status_msg)
+            if success:
+                logger.info(f"شهادة {filename_suffix_base} للعضو {member_display_name}: {status_msg}")
+            else:
+                all_relevant_pdfs_downloaded_successfully = False
+                self._emit_global_log(f"فشل تحميل شهادة {filename_suffix_base}: {error_msg}", is_general=False, member_obj=member_obj)
+            if error_msg: any_api_error_this_pdf_stage = error_msg # يحمل نوع الخطأ (ApiError) إن وجد
         if not self.is_running: return False, any_api_error_this_pdf_stage 
-        fp_h, s_h, err_h, stat_h = self._download_single_pdf_for_monitoring(main_list_idx, member_obj, "HonneurEngagementReport", "التزام", member_specific_output_dir)
-        download_details_agg.append(stat_h)
-        if not s_h: all_relevant_pdfs_downloaded_successfully = False
-        if err_h: any_api_error_this_pdf_stage = True 
-        
-        if self.is_running and (member_obj.already_has_rdv or member_obj.rdv_id): 
-            fp_r, s_r, err_r, stat_r = self._download_single_pdf_for_monitoring(main_list_idx, member_obj, "RdvReport", "موعد", member_specific_output_dir)
-            download_details_agg.append(stat_r)
-            if not s_r: all_relevant_pdfs_downloaded_successfully = False
-            if err_r: any_api_error_this_pdf_stage = True
-        elif self.is_running: 
+
+        if "RdvReport" not in required_report_types: 
             msg_skip_rdv = "شهادة الموعد غير مطلوبة (لا يوجد موعد مسجل)."
             logger.info(msg_skip_rdv + f" للعضو {member_display_name}")
             download_details_agg.append(msg_skip_rdv)
@@ -1025,268 +1119,252 @@ class MonitoringThread(QThread):
     def stop_monitoring(self): 
         logger.info("طلب إيقاف المراقبة...")
         self.is_running = False
-
-
-class SingleMemberCheckThread(QThread):
-    update_member_gui_signal = pyqtSignal(int, str, str, str) 
-    new_data_fetched_signal = pyqtSignal(int, str, str)      
-    member_processing_started_signal = pyqtSignal(int)       
-    member_processing_finished_signal = pyqtSignal(int)      
-    global_log_signal = pyqtSignal(str, bool, object, int) 
-
-    def __init__(self, member, index, api_client, settings, parent=None):
-        super().__init__(parent)
+        with self._check_now_lock:
+            self._check_now_ids.clear() # طلبات الفحص الفوري لا تُنفذ بعد الإيقاف
+        self.cancel_token.cancel() # ينهي الانتظار والطلب الجاري فورًا بدلاً من انتظار انتهاء مهلته
+
+
+# --- تحميل شهادات PDF: تنفيذ واحد مشترك بين خيط المراقبة وطابور التحميل (download_manager.py) ---
+PDF_REPORT_TYPES = {
+    "HonneurEngagementReport": ("التزام", "pdf_honneur_path"), # (جزء اسم الملف، حقل المسار في العضو)
+    "RdvReport": ("موعد", "pdf_rdv_path"),
+}
+PDF_BASE_DIR_NAME = "ملفات_المنحة_البرنامج"
+_documents_location = None # مجلد المستندات: يُحدد مرة واحدة بدلاً من QStandardPaths لكل تحميل
+
+
+def _safe_file_name_part(text, fallback):
+    safe_part = "".join(c for c in text if c.isalnum() or c in (' ', '_', '-')).rstrip().replace(" ", "_")
+    return safe_part or fallback
+
+
+def member_pdf_output_dir(member):
+    """مجلد ملفات العضو داخل المستندات (باسمه العربي، أو NIN إذا لم يكن الاسم معروفًا)."""
+    global _documents_location
+    if _documents_location is None:
+        _documents_location = QStandardPaths.writableLocation(QStandardPaths.DocumentsLocation)
+    member_name_for_folder = member.get_full_name_ar()
+    if not member_name_for_folder or member_name_for_folder.isspace():
+        member_name_for_folder = member.nin
+    return os.path.join(_documents_location, PDF_BASE_DIR_NAME, _safe_file_name_part(member_name_for_folder, member.nin))
+
+
+def required_pdf_report_types(member):
+    """شهادة الالتزام دائمًا، وشهادة الموعد إذا كان للعضو موعد."""
+    if member.already_has_rdv or member.rdv_id:
+        return ("HonneurEngagementReport", "RdvReport")
+    return ("HonneurEngagementReport",)
+
+
+class _InFlightDownload:
+    __slots__ = ("done", "result", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = (None, "خطأ غير متوقع أثناء التحميل.")
+        self.waiters = [] # أحداث الطلبات المكررة المنتظرة (تُضبط عند الانتهاء، أو عند إلغاء رمز المنتظر نفسه)
+
+
+class InFlightPdfDownloads:
+    """
+    التحميلات الجارية حسب (ID التسجيل المسبق، نوع الشهادة): الطلب المكرر أثناء تحميل نفس الشهادة
+    (من طابور التحميل أو من خيط المراقبة) ينتظر نتيجة التحميل الجاري بدلاً من طلب ثانٍ.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._downloads = {}
+        self.deduplicated_count = 0
+
+    def run(self, key, download):
+        with self._lock:
+            in_flight = self._downloads.get(key)
+            is_owner = in_flight is None
+            if is_owner:
+                in_flight = self._downloads[key] = _InFlightDownload()
+            else:
+                self.deduplicated_count += 1
+        if not is_owner:
+            return self._wait_for(in_flight)
+        try:
+            in_flight.result = download()
+        finally:
+            with self._lock:
+                del self._downloads[key]
+                in_flight.done.set()
+                waiters = in_flight.waiters
+            for waiter in waiters:
+                waiter.set()
+        return in_flight.result
+
+    def _wait_for(self, in_flight):
+        # إلغاء رمز المنتظر ينهي انتظاره فقط؛ التحميل الجاري يستمر لصاحبه
+        woken = threading.Event()
+        with self._lock:
+            if in_flight.done.is_set():
+                return in_flight.result
+            in_flight.waiters.append(woken)
+        cancel_token = current_token()
+        handle = cancel_token.add_callback(woken.set)
+        try:
+            woken.wait()
+        finally:
+            cancel_token.remove_callback(handle)
+        if in_flight.done.is_set():
+            return in_flight.result
+        return None, ApiError(REQUEST_CANCELLED_ERROR, ApiError.CANCELLED)
+
+
+SHARED_PDF_DOWNLOADS = InFlightPdfDownloads()
+
+
+def download_member_pdf(api_client, member, report_type, on_download_start=None, on_download_finished=None):
+    """
+    تحميل شهادة واحدة إلى مجلد العضو، إلا إذا كانت موجودة بالفعل (في السجل أو على القرص).
+    on_download_start(report_type) يُستدعى قبل الطلب فقط (وليس عندما يكون الملف موجودًا)،
+    و on_download_finished(report_type, size_bytes) بعد تحميل ناجح (لحساب سرعة التحميل).
+    يعيد (المسار، النجاح، رسالة الخطأ للمستخدم، رسالة الحالة).
+    """
+    filename_suffix_base, path_attr = PDF_REPORT_TYPES[report_type]
+    operation_name = f"تحميل شهادة {filename_suffix_base}"
+    if not member.pre_inscription_id:
+        error_msg = "ID التسجيل المسبق مفقود."
+        return None, False, error_msg, f"فشل: {error_msg}"
+
+    current_pdf_path_value = getattr(member, path_attr)
+    if current_pdf_path_value and (SHARED_PDF_MANIFEST.has(current_pdf_path_value) or os.path.exists(current_pdf_path_value)):
+        if not SHARED_PDF_MANIFEST.has(current_pdf_path_value):
+            SHARED_PDF_MANIFEST.record(current_pdf_path_value) # ملفات سابقة للسجل تُسجل عند أول فحص
+        logger.info(f"ملف {report_type} موجود بالفعل للعضو {member.nin} في {current_pdf_path_value}. تخطي التحميل.")
+        return current_pdf_path_value, True, "", f"شهادة {filename_suffix_base} موجودة بالفعل."
+
+    if on_download_start is not None:
+        on_download_start(report_type)
+    member_specific_dir = member_pdf_output_dir(member)
+    try:
+        os.makedirs(member_specific_dir, exist_ok=True) 
+    except OSError as e_mkdir:
+        logger.error(f"فشل إنشاء مجلد للعضو {member.nin}: {e_mkdir}")
+        error_msg = f"فشل إنشاء مجلد لحفظ الملفات: {e_mkdir}"
+        return None, False, error_msg, f"فشل تحميل {filename_suffix_base}: {error_msg.split(':')[0]}"
+
+    filename = f"{filename_suffix_base}_{_safe_file_name_part(member.get_full_name_ar() or member.nin, member.nin)}.pdf" 
+    pre_inscription_id = member.pre_inscription_id
+    download_info, api_err = SHARED_PDF_DOWNLOADS.run(
+        (pre_inscription_id, report_type),
+        lambda: api_client.download_pdf_to_file(report_type, pre_inscription_id, os.path.join(member_specific_dir, filename))
+    )
+    if api_err:
+        error_msg = _translate_api_error(api_err, operation_name)
+        if isinstance(api_err, ApiError):
+            error_msg = api_err.with_message(error_msg) # النوع يبقى لعدادات الفشل في المراقبة
+        return None, False, error_msg, f"فشل تحميل {filename_suffix_base}: {error_msg.split(':')[0]}"
+
+    file_path = download_info["path"]
+    SHARED_PDF_MANIFEST.record(file_path, sha256=download_info["sha256"])
+    setattr(member, path_attr, file_path) 
+    if on_download_finished is not None:
+        on_download_finished(report_type, download_info["size"])
+    return file_path, True, "", f"تم تحميل {os.path.basename(file_path)} بنجاح."
+
+
+class PdfDownloadSignals(QObject):
+    # الإشارات تحمل كائن العضو نفسه (وليس فهرسه): قد تتغير الفهارس أثناء انتظار المهمة في الطابور
+    member_processing_started_signal = pyqtSignal(object) 
+    member_processing_finished_signal = pyqtSignal(object) 
+    report_finished_signal = pyqtSignal(object, str, str, bool, str, bool) # العضو، نوع الشهادة، المسار أو رسالة الحالة، النجاح، رسالة الخطأ، تفاعلي
+    member_finished_signal = pyqtSignal(object, str, str, str, bool, str, bool) # العضو، مسار الالتزام، مسار الموعد، الرسالة، النجاح الكلي، أول خطأ، تفاعلي
+    progress_signal = pyqtSignal(int, int, float, float, float) # المنتهون، إجمالي الدفعة، عضو/دقيقة، بايت/ثانية، الثواني المتبقية (-1 غير معروف)
+    global_log_signal = pyqtSignal(str, bool, object) 
+
+
+class MemberPdfDownloadJob(QRunnable):
+    """
+    تحميل جميع شهادات عضو واحد، تُنفذ على خيوط PdfDownloadManager المحدودة (بدلاً من QThread لكل عضو).
+    interactive: طلب المستخدم لعضو واحد (رسائل ونوافذ، دون انتظار)، وإلا جزء من تحميل جماعي
+    (تحديث الجدول فقط، وبنفس التأخير بين الأعضاء المستخدم في الجلب الأولي عبر pacer).
+    """
+
+    def __init__(self, member, api_client, signals, interactive=True, pacer=None, on_done=None): 
+        super().__init__()
+        self.setAutoDelete(False) # الطابور يحتفظ بالمرجع حتى انتهاء المهمة
         self.member = member 
-        self.index = index   
         self.api_client = api_client
-        self.settings = settings 
+        self.signals = signals 
+        self.interactive = interactive 
+        self.pacer = pacer 
+        self._on_done = on_done 
         self.is_running = True 
+        self.cancel_token = CancellationToken(SHARED_SHUTDOWN_TOKEN)
+        self.started = False 
+        self.downloaded_bytes = 0 
 
-    def stop(self):
+    def stop(self): 
         self.is_running = False
-        logger.info(f"طلب إيقاف خيط الفحص الفردي للعضو: {self.member.nin}")
+        self.cancel_token.cancel()
+        logger.info(f"طلب إيقاف مهمة تحميل شهادات العضو: {self.member.nin}")
 
-    def _emit_global_log(self, message, is_general=True): 
-        self.global_log_signal.emit(message, is_general, self.member if not is_general else None, self.index if not is_general else -1)
+    def _emit_global_log(self, message, is_general=True):
+        self.signals.global_log_signal.emit(message, is_general, self.member if not is_general else None)
 
+    def _add_downloaded_bytes(self, report_type, size_bytes):
+        self.downloaded_bytes += size_bytes
 
     def run(self):
-        member_display_name = f"{self.member.get_full_name_ar() or self.member.nin} (رقم {self.index + 1})"
-        logger.info(f"بدء فحص فوري للعضو: {member_display_name}")
-        self.member_processing_started_signal.emit(self.index) 
-        self._emit_global_log(f"بدء الفحص الفوري...")
-
-        member_had_api_error_overall = False 
-        
-        temp_monitor_logic_provider = MonitoringThread(members_list_ref=[self.member], settings=self.settings) 
-        temp_monitor_logic_provider.is_running = self.is_running 
-        temp_monitor_logic_provider.update_member_gui_signal.connect(self._handle_temp_monitor_gui_update) 
-        temp_monitor_logic_provider.new_data_fetched_signal.connect(self.new_data_fetched_signal)
-        temp_monitor_logic_provider.global_log_signal.connect(self.global_log_signal)
-
-
-        try:
-            if not self.is_running: return 
-
-            self.member.status = "جاري التحقق (فوري)..." 
-            self.member.set_activity_detail(f"التحقق من صحة بيانات {member_display_name}")
-            self._emit_gui_update() 
-            if not self.is_running: return
-
-            validation_can_progress, api_error_validation = temp_monitor_logic_provider.process_validation(0, self.member) 
-            if api_error_validation: member_had_api_error_overall = True
-            if not self.is_running: return
-
-            if self.member.status in ["مستفيد حاليًا من المنحة", "بيانات الإدخال خاطئة", "فشل التحقق", "غير مؤهل مبدئيًا", "لديه موعد مسبق", "غير مؤهل للحجز"]:
-                logger.info(f"الفحص الفوري: الحالة النهائية بعد التحقق أو حالة تمنع المتابعة: {self.member.status}")
-                return 
-
-            if validation_can_progress and self.member.pre_inscription_id and not (self.member.nom_ar and self.member.prenom_ar):
-                if not self.is_running: return
-                info_success, api_error_info = temp_monitor_logic_provider.process_pre_inscription_info(0, self.member)
-                if api_error_info: member_had_api_error_overall = True
-                if not self.is_running: return
-                if self.member.status == "فشل جلب المعلومات": 
-                    logger.info(f"الفحص الفوري: فشل جلب الاسم.")
-                    return
-            
-            can_attempt_booking_single = self.member.status in ["تم جلب المعلومات", "تم التحقق", "لا توجد مواعيد", "فشل جلب التواريخ", "يتطلب تسجيل مسبق"] and \
-                                         self.member.has_actual_pre_inscription and self.member.pre_inscription_id and \
-                                         self.member.demandeur_id and self.member.structure_id and \
-                                         not self.member.already_has_rdv and not self.member.have_allocation
-            if can_attempt_booking_single: 
-                if not self.is_running: return
-                booking_successful, api_error_booking = temp_monitor_logic_provider.process_available_dates_and_book(0, self.member)
-                if api_error_booking: member_had_api_error_overall = True
-                if not self.is_running: return
-                if self.member.status in ["فشل الحجز", "غير مؤهل للحجز"]:
-                    logger.info(f"الفحص الفوري: فشل الحجز أو غير مؤهل.")
-                    return
-            
-            pdf_attempt_worthy_statuses_for_single_check = ["تم الحجز", "لديه موعد مسبق", "مستفيد حاليًا من المنحة", "مكتمل", "فشل تحميل PDF"] 
-            if self.member.status in pdf_attempt_worthy_statuses_for_single_check and self.member.pre_inscription_id:
-                if not self.is_running: return
-                logger.info(f"الفحص الفوري للعضو {member_display_name} ({self.member.status}) يستدعي محاولة تحميل PDF.")
-                pdf_success, api_error_pdf = temp_monitor_logic_provider.process_pdf_download(0, self.member)
-                if api_error_pdf: member_had_api_error_overall = True
-                if not self.is_running: return
-            
-            final_log_message = f"الفحص الفوري للعضو {member_display_name} انتهى بالحالة: {self.member.status}. التفاصيل: {self.member.full_last_activity_detail}"
-            logger.info(final_log_message)
-            self._emit_global_log(f"فحص انتهى بالحالة: {self.member.status} - {self.member.last_activity_detail}")
-
-        except Exception as e:
-            if not self.is_running: return
-            logger.exception(f"خطأ غير متوقع في SingleMemberCheckThread للعضو {member_display_name}: {e}")
-            self.member.status = "خطأ في الفحص الفوري"
-            self.member.set_activity_detail(f"خطأ عام أثناء الفحص الفوري: {str(e)}", is_error=True)
-            self._emit_global_log(f"خطأ فحص: {str(e)}")
-        finally:
-            temp_monitor_logic_provider.is_running = False 
-            if self.is_running: 
-                self._emit_gui_update() 
-            self.member_processing_finished_signal.emit(self.index) 
-            logger.info(f"انتهاء الفحص الفوري للعضو: {member_display_name}")
-
-    def _handle_temp_monitor_gui_update(self, original_idx_ignored, status_text, detail_text, icon_name_str):
-        if self.is_running:
-            self.member.status = status_text 
-            is_error = "فشل" in status_text or "خطأ" in status_text or "غير مؤهل" in status_text
-            self.member.set_activity_detail(detail_text, is_error=is_error)
-            self.update_member_gui_signal.emit(self.index, self.member.status, self.member.last_activity_detail, icon_name_str)
-
-
-    def _emit_gui_update(self):
-        if not self.is_running: return 
-        final_icon = get_icon_name_for_status(self.member.status)
-        self.update_member_gui_signal.emit(self.index, self.member.status, self.member.last_activity_detail, final_icon)
-
-
-class DownloadAllPdfsThread(QThread): 
-    all_pdfs_download_finished_signal = pyqtSignal(int, str, str, str, bool, str) 
-    individual_pdf_status_signal = pyqtSignal(int, str, str, bool, str) 
-    member_processing_started_signal = pyqtSignal(int)
-    member_processing_finished_signal = pyqtSignal(int)
-    global_log_signal = pyqtSignal(str, bool, object, int) 
-
-    def __init__(self, member, index, api_client, parent=None):
-        super().__init__(parent)
-        self.member = member
-        self.index = index
-        self.api_client = api_client
-        self.is_running = True 
-
-    def _emit_global_log(self, message, is_general=True): 
-        self.global_log_signal.emit(message, is_general, self.member if not is_general else None, self.index if not is_general else -1)
-
-    def _get_member_display_name_with_index_from_thread(self, member_obj, original_index_in_main_list):
-        name_part = member_obj.get_full_name_ar()
-        if not name_part or name_part.isspace():
-            name_part = member_obj.nin 
-        return f"{name_part} (رقم {original_index_in_main_list + 1})"
-
-
-    def _download_single_pdf(self, pdf_type, filename_suffix_base, member_specific_dir):
-        if not self.is_running: return None, False, "", ""
-        operation_name = f"تحميل شهادة {filename_suffix_base}"
-        member_display_name = self._get_member_display_name_with_index_from_thread(self.member, self.index)
-        file_path = None
-        success = False
-        error_msg_toast = "" 
-        status_for_gui_cell = f"جاري تحميل {filename_suffix_base}..."
-        self._emit_global_log(f"{status_for_gui_cell}...")
+        with bind_token(self.cancel_token):
+            self._run()
 
-        if not self.member.pre_inscription_id:
-            error_msg_toast = "ID التسجيل المسبق مفقود."
-            status_for_gui_cell = f"فشل: {error_msg_toast}"
-            if self.is_running: self.individual_pdf_status_signal.emit(self.index, pdf_type, status_for_gui_cell, False, error_msg_toast)
-            return None, False, error_msg_toast, status_for_gui_cell
-
-        current_path_attr = 'pdf_honneur_path' if pdf_type == "HonneurEngagementReport" else 'pdf_rdv_path'
-        
-        current_pdf_path_value = getattr(self.member, current_path_attr)
-        if current_pdf_path_value and os.path.exists(current_pdf_path_value):
-            logger.info(f"ملف {pdf_type} موجود بالفعل للعضو {member_display_name} في {current_pdf_path_value}. تخطي التحميل.")
-            status_for_gui_cell = f"شهادة {filename_suffix_base} موجودة بالفعل."
-            if self.is_running: self.individual_pdf_status_signal.emit(self.index, pdf_type, current_pdf_path_value, True, "") 
-            return current_pdf_path_value, True, "", status_for_gui_cell
-
-        if not self.is_running: return None, False, "", ""
-        response_data, api_err = self.api_client.download_pdf(pdf_type, self.member.pre_inscription_id)
-        if not self.is_running: return None, False, "", ""
-
-
-        if api_err:
-            error_msg_toast = _translate_api_error(api_err, operation_name)
-        elif response_data and (isinstance(response_data, str) or (isinstance(response_data, dict) and "base64Pdf" in response_data)):
-            pdf_b64 = response_data if isinstance(response_data, str) else response_data.get("base64Pdf")
+    def _run(self):
+        self.started = True
+        if self.is_running and self.pacer is not None and not self.interactive:
             try:
-                pdf_content = base64.b64decode(pdf_b64)
-                safe_member_name_part = "".join(c for c in (self.member.get_full_name_ar() or self.member.nin) if c.isalnum() or c in (' ', '_', '-')).rstrip().replace(" ","_")
-                if not safe_member_name_part: safe_member_name_part = self.member.nin 
-                filename = f"{filename_suffix_base}_{safe_member_name_part}.pdf" 
-                file_path = os.path.join(member_specific_dir, filename)
-                with open(file_path, 'wb') as f:
-                    f.write(pdf_content)
-                setattr(self.member, current_path_attr, file_path) 
-                success = True
-                status_for_gui_cell = f"تم تحميل {filename} بنجاح."
-            except Exception as e_save:
-                error_msg_toast = f"خطأ في حفظ ملف {report_type}: {str(e_save)}"
-        else:
-            error_msg_toast = f"استجابة غير متوقعة من الخادم لـ {operation_name}."
-        
-        if not success:
-            status_for_gui_cell = f"فشل تحميل {filename_suffix_base}: {error_msg_toast.split(':')[0]}"
-        
-        if self.is_running: self.individual_pdf_status_signal.emit(self.index, pdf_type, file_path if success else status_for_gui_cell, success, error_msg_toast)
-        return file_path, success, error_msg_toast, status_for_gui_cell
-
-    def run(self):
-        member_display_name = self._get_member_display_name_with_index_from_thread(self.member, self.index)
-        logger.info(f"بدء تحميل جميع الشهادات للعضو: {member_display_name}")
-        self.member_processing_started_signal.emit(self.index) 
-        self._emit_global_log(f"جاري تحميل شهادات...")
+                self.pacer.wait_for_turn(self.cancel_token)
+            except Exception as e:
+                logger.exception(f"خطأ في انتظار دور مهمة التحميل للعضو {self.member.nin}: {e}")
+        if not self.is_running or not SHARED_MEMBER_CLAIMS.claim(self.member, self, self.cancel_token): # ينتظر انتهاء المراقبة أو الجلب الجاري لنفس العضو
+            self._finish()
+            return
+        member = self.member
+        logger.info(f"بدء تحميل جميع الشهادات للعضو: {member.nin}")
+        self.signals.member_processing_started_signal.emit(member) 
+        self._emit_global_log(f"جاري تحميل شهادات...", is_general=False)
 
         all_downloads_successful = True 
         first_error_encountered = "" 
         aggregated_status_messages = [] 
-        
-        path_honneur_final = self.member.pdf_honneur_path 
-        path_rdv_final = self.member.pdf_rdv_path       
-
-        documents_location = QStandardPaths.writableLocation(QStandardPaths.DocumentsLocation)
-        base_app_dir_name = "ملفات_المنحة_البرنامج"
-        member_name_for_folder = self.member.get_full_name_ar()
-        if not member_name_for_folder or member_name_for_folder.isspace(): 
-            member_name_for_folder = self.member.nin 
-        
-        safe_folder_name_part = "".join(c for c in member_name_for_folder if c.isalnum() or c in (' ', '_', '-')).rstrip().replace(" ", "_")
-        if not safe_folder_name_part: safe_folder_name_part = self.member.nin 
-        
-        member_specific_output_dir = os.path.join(documents_location, base_app_dir_name, safe_folder_name_part)
-        
         try:
-            os.makedirs(member_specific_output_dir, exist_ok=True) 
-            logger.info(f"تم إنشاء/التحقق من مجلد العضو: {member_specific_output_dir}")
-        except Exception as e_mkdir:
-            logger.error(f"فشل إنشاء مجلد للعضو {member_display_name}: {e_mkdir}")
-            user_friendly_mkdir_error = f"فشل إنشاء مجلد لحفظ الملفات: {e_mkdir}"
-            if self.is_running: self.all_pdfs_download_finished_signal.emit(self.index, None, None, user_friendly_mkdir_error, False, str(e_mkdir))
-            if self.is_running: self.member_processing_finished_signal.emit(self.index)
-            return
+            required_report_types = required_pdf_report_types(member)
+            for report_type in required_report_types:
+                if not self.is_running: return
+                file_path, success, error_msg, status_msg = download_member_pdf(self.api_client, member, report_type, on_download_finished=self._add_downloaded_bytes)
+                aggregated_status_messages.append(status_msg)
+                if not success:
+                    all_downloads_successful = False
+                    first_error_encountered = first_error_encountered or error_msg
+                if self.is_running: self.signals.report_finished_signal.emit(member, report_type, file_path if success else status_msg, success, error_msg, self.interactive)
+            if not self.is_running: return
 
-        if not self.is_running: self.member_processing_finished_signal.emit(self.index); return 
-        fp_h, s_h, err_h, stat_h = self._download_single_pdf("HonneurEngagementReport", "التزام", member_specific_output_dir)
-        aggregated_status_messages.append(stat_h)
-        if s_h: path_honneur_final = fp_h
-        else: all_downloads_successful = False; first_error_encountered = first_error_encountered or err_h 
-        
-        if self.is_running and (self.member.already_has_rdv or self.member.rdv_id): 
-            fp_r, s_r, err_r, stat_r = self._download_single_pdf("RdvReport", "موعد", member_specific_output_dir)
-            aggregated_status_messages.append(stat_r)
-            if s_r: path_rdv_final = fp_r
-            else: all_downloads_successful = False; first_error_encountered = first_error_encountered or err_r
-        elif self.is_running: 
-            msg_skip_rdv = "شهادة الموعد غير مطلوبة/متوفرة (لا يوجد موعد مسجل)."
-            logger.info(msg_skip_rdv + f" للعضو {member_display_name}")
-            aggregated_status_messages.append(msg_skip_rdv)
-            if self.is_running: self.individual_pdf_status_signal.emit(self.index, "RdvReport", msg_skip_rdv, True, "") 
-
-        final_overall_status_msg_for_signal = "; ".join(msg for msg in aggregated_status_messages if msg)
-        if not all_downloads_successful and first_error_encountered:
-            final_overall_status_msg_for_signal = f"فشل تحميل بعض الملفات. أول خطأ: {first_error_encountered.split(':')[0]}"
-        elif all_downloads_successful:
-             final_overall_status_msg_for_signal = "تم تحميل جميع الشهادات المطلوبة بنجاح."
-        
-        if self.is_running:
-            self.all_pdfs_download_finished_signal.emit(self.index, path_honneur_final, path_rdv_final, final_overall_status_msg_for_signal, all_downloads_successful, first_error_encountered)
-            self._emit_global_log(f"انتهاء تحميل شهادات. الحالة: {final_overall_status_msg_for_signal}")
-        
-        self.member_processing_finished_signal.emit(self.index) 
-        logger.info(f"انتهاء تحميل جميع الشهادات للعضو: {member_display_name}. النجاح الكلي: {all_downloads_successful}")
+            if "RdvReport" not in required_report_types: 
+                msg_skip_rdv = "شهادة الموعد غير مطلوبة/متوفرة (لا يوجد موعد مسجل)."
+                aggregated_status_messages.append(msg_skip_rdv)
+
+            final_overall_status_msg = "; ".join(msg for msg in aggregated_status_messages if msg)
+            if not all_downloads_successful and first_error_encountered:
+                final_overall_status_msg = f"فشل تحميل بعض الملفات. أول خطأ: {first_error_encountered.split(':')[0]}"
+            elif all_downloads_successful:
+                final_overall_status_msg = "تم تحميل جميع الشهادات المطلوبة بنجاح."
+            self.signals.member_finished_signal.emit(member, member.pdf_honneur_path or "", member.pdf_rdv_path or "", final_overall_status_msg, all_downloads_successful, first_error_encountered, self.interactive)
+            self._emit_global_log(f"انتهاء تحميل شهادات. الحالة: {final_overall_status_msg}", is_general=False)
+            logger.info(f"انتهاء تحميل جميع الشهادات للعضو: {member.nin}. النجاح الكلي: {all_downloads_successful}")
+        except Exception as e:
+            logger.exception(f"خطأ غير متوقع في تحميل شهادات العضو {member.nin}: {e}")
+            if self.is_running:
+                self.signals.member_finished_signal.emit(member, member.pdf_honneur_path or "", member.pdf_rdv_path or "", f"خطأ عام أثناء تحميل الشهادات: {e}", False, str(e), self.interactive)
+        finally:
+            self.signals.member_processing_finished_signal.emit(member) 
+            self._finish()
 
-    def stop(self): 
-        self.is_running = False
-        member_display_name = self._get_member_display_name_with_index_from_thread(self.member, self.index)
-        logger.info(f"طلب إيقاف خيط تحميل جميع الشهادات للعضو: {member_display_name}")
+    def _finish(self):
+        SHARED_MEMBER_CLAIMS.release(self.member, self)
+        if self._on_done:
+            self._on_done(self)
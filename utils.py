@@ -44,6 +44,16 @@ def get_icon_name_for_status(status_text):
 
     return "SP_CustomBase"
 
+def clean_ccp_digits(text):
+    """أرقام الحساب البريدي فقط (حذف المسافات وأي رموز أخرى)، كما في حقل CCP بنوافذ الإضافة والتعديل."""
+    return ''.join(filter(str.isdigit, text or ""))
+
+def format_ccp_digits(cleaned_text):
+    """عرض CCP كـ 'الحساب المفتاح' (10 أرقام ثم مسافة ثم الباقي)."""
+    if len(cleaned_text) > 10:
+        return f"{cleaned_text[:10]} {cleaned_text[10:]}"
+    return cleaned_text
+
 # -->> هذه هي الدالة الجديدة المضافة <<--
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """